@@ -60,14 +60,21 @@ def gen_group(brief, n=G, temp=1.05):
                     "completion": full})
     return res
 
-def score_attempt(att, input_vec):
+def render_attempt(att, input_vec):
     if not att["frames"]: return None
-    frames, mont, sc = H.render_score_keep(att["frames"])
-    if sc is None: return None
+    frames, mont, emb = H.render_embed(att["frames"])
+    if emb is None: return None
     rel, cap = REL.relevance(None, mont, input_vec=input_vec)
-    reward = REL.gated_reward(sc["keep_pctile"], rel, sc["nn_cos"])
-    return {**att, "mont": mont, "keep_pctile": sc["keep_pctile"], "nn_cos": sc["nn_cos"],
-            "x": sc["x"], "y": sc["y"], "nbr": sc["nbr"], "relevance": rel, "caption": cap, "reward": reward}
+    return {**att, "mont": mont, "emb": emb, "relevance": rel, "caption": cap}
+
+def score_attempts(rendered):
+    """Score the rendered group against the keep library in one batch (one GEMM, not one argsort per attempt)."""
+    out = []
+    for r, sc in zip(rendered, H.score_keep_batch([r.pop("emb") for r in rendered])):
+        reward = REL.gated_reward(sc["keep_pctile"], r["relevance"], sc["nn_cos"])
+        out.append({**r, "keep_pctile": sc["keep_pctile"], "nn_cos": sc["nn_cos"],
+                    "x": sc["x"], "y": sc["y"], "nbr": sc["nbr"], "reward": reward})
+    return out
 
 # load + dedup ideas (reuse harvest_dpo's premise-key dedup so inputs are distinct)
 ideas = []
@@ -106,7 +113,8 @@ def process_input(idea, iid, run=RUN, gkey=None):
     input_vec = REL.embed_text(premise)
     group = gen_group(brief)
     with ThreadPoolExecutor(max_workers=8) as ex:
-        scored = [r for r in ex.map(lambda a: score_attempt(a, input_vec), group) if r]
+        rendered = [r for r in ex.map(lambda a: render_attempt(a, input_vec), group) if r]
+    scored = score_attempts(rendered)
     if len(scored) < 2: return False
     rewards = np.array([s["reward"] for s in scored], float)
     base = float(rewards.mean()); scored.sort(key=lambda s: -s["reward"])
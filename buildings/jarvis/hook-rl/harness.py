@@ -1,11 +1,17 @@
 """Core hook-RL engine: render (Replicate FLUX) -> montage -> embed (Gemini) -> score (views axis) -> R2.
 Embedding matches raw_embed.py EXACTLY: 5 frames width-320 tiled 5x1, gemini-embedding-2, 1536-D, visual channel."""
-import os, io, json, time, base64, random, threading, urllib.request, urllib.error
+import os, io, json, time, base64, random, threading, urllib.request, urllib.error, sys
 from pathlib import Path
 from concurrent.futures import ThreadPoolExecutor
 import numpy as np, joblib
 from PIL import Image
 import boto3
+# Repo-root modules: scp'd next to this file on the box (see README); in a checkout, at the repo root.
+try:
+    import embedding_gateway, knn_density
+except ModuleNotFoundError:
+    sys.path.append(str(Path(__file__).resolve().parents[3]))
+    import embedding_gateway, knn_density
 
 HERE = "/home/ubuntu/hookrl"
 def load_env():
@@ -19,20 +25,15 @@ GEMINI, REPL, BUCKET = ENV["GEMINI_API_KEY"], ENV["REPLICATE_API_TOKEN"], ENV["R
 s3 = boto3.client("s3", endpoint_url="https://%s.r2.cloudflarestorage.com" % ENV["R2_ACCOUNT_ID"],
     aws_access_key_id=ENV["R2_ACCESS_KEY_ID"], aws_secret_access_key=ENV["R2_SECRET_ACCESS_KEY"], region_name="auto")
 
-EMB_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-embedding-2:embedContent"
+# Through the shared gateway: the worker threads' montages coalesce into batchEmbedContents calls,
+# and every process on the box paces against one quota bucket.
 def embed_image(jpg_bytes, tries=6):
     b64 = base64.b64encode(jpg_bytes).decode()
-    body = json.dumps({"content": {"parts": [{"inlineData": {"mimeType": "image/jpeg", "data": b64}}]},
-                       "outputDimensionality": 1536}).encode()
-    for a in range(tries):
-        try:
-            req = urllib.request.Request(EMB_URL, data=body, method="POST",
-                headers={"Content-Type": "application/json", "x-goog-api-key": GEMINI})
-            with urllib.request.urlopen(req, timeout=60) as r:
-                return np.array(json.loads(r.read())["embedding"]["values"], np.float32)
-        except Exception:
-            if a < tries - 1: time.sleep(1.5 * (a + 1)); continue
-            return None
+    try:
+        return embedding_gateway.embed([{"inlineData": {"mimeType": "image/jpeg", "data": b64}}], GEMINI,
+                                       dimensions=1536, tries=tries)
+    except embedding_gateway.EmbeddingGatewayError:
+        return None
 
 class BillingHalt(Exception):
     """Replicate billing/quota failure — stop the run cleanly so it can be resumed."""
@@ -118,52 +119,77 @@ def _load_map():
         _KEEPSORT[0] = np.sort(_KEEP[0][~np.isnan(_KEEP[0])])
         _MAP[0] = True
 
+BATCH_ROWS = 256  # candidates per similarity GEMM (256 x 11k float32 sims ~ 11MB)
+def _neighbors(embs):
+    """Blocked GEMM over the candidates -> (top-12 library rows by descending cos, their cos).
+    knn_density.top_similarities picks the 12 nearest without sorting the whole library per candidate."""
+    E = np.asarray(embs, np.float32)
+    En = E / (np.linalg.norm(E, axis=1, keepdims=True) + 1e-8)
+    tsims, top, _ = knn_density.top_similarities(En, real_vecs(), 12, query_block=BATCH_ROWS)
+    return top, tsims
+
+def _neighbor_fields(top, tsims, xy):
+    """nbr list + the 12 neighbours' map points (nearest last, as order[-12:] was) and their non-NaN mask."""
+    nbr = [[_NIDS[0][i], round(float(c), 4)] for i, c in zip(top, tsims)]
+    pts = xy[top[::-1]]; good = ~np.isnan(pts[:, 0])
+    return nbr, pts, good
+
+def score_keep_batch(embs):
+    """score_keep for a whole best-of-N round: one blocked top-12 pass instead of an argsort per montage."""
+    if not len(embs): return []
+    top, tsims = _neighbors(embs)
+    _load_map()
+    out = []
+    for t, ts in zip(top, tsims):
+        nbr, kxy, g2 = _neighbor_fields(t, ts, _KXY[0])
+        w = np.maximum(0.001, ts); ke = _KEEP[0][t]; good = ~np.isnan(ke)
+        keep_pred = float(np.sum(ke[good] * w[good]) / (np.sum(w[good]) + 1e-9))
+        keep_pctile = float(np.searchsorted(_KEEPSORT[0], keep_pred, side="left") / len(_KEEPSORT[0]))
+        out.append({"keep_pred": round(keep_pred, 2), "keep_pctile": round(keep_pctile, 4),
+                    "nn_cos": float(ts[0]), "x": round(float(np.mean(kxy[g2, 0])), 1),
+                    "y": round(float(np.mean(kxy[g2, 1])), 1), "nbr": nbr})
+    return out
+
 def score_keep(emb):
     """Reward axis = KEEP-RATE (causal). Score a montage by the sim-weighted keep-estimate of its
     12 nearest library hooks (the extrapolated 11k keep labels), as percentile. Plus nn_cos density."""
-    en = emb / (np.linalg.norm(emb) + 1e-8)
-    sims = real_vecs() @ en
-    _load_map()
-    order = np.argsort(sims); top = order[-12:][::-1]
-    nbr = [[_NIDS[0][i], round(float(sims[i]), 4)] for i in top]
-    w = np.maximum(0.001, sims[top]); ke = _KEEP[0][top]; good = ~np.isnan(ke)
-    keep_pred = float(np.sum(ke[good] * w[good]) / (np.sum(w[good]) + 1e-9))
-    keep_pctile = float((_KEEPSORT[0] < keep_pred).mean())
-    kxy = _KXY[0][order[-12:]]; g2 = ~np.isnan(kxy[:, 0])
-    return {"keep_pred": round(keep_pred, 2), "keep_pctile": round(keep_pctile, 4),
-            "nn_cos": float(sims.max()), "x": round(float(np.mean(kxy[g2, 0])), 1),
-            "y": round(float(np.mean(kxy[g2, 1])), 1), "nbr": nbr}
+    return score_keep_batch([emb])[0]
 
-def score(emb):
+def score_batch(embs):
+    """score for a whole best-of-N round: PLS on the stacked rows, one GEMM for the neighbours."""
+    if not len(embs): return []
     ax = axis()
-    z = ((emb - ax["mu"]) / ax["sd"]).reshape(1, -1)
-    pred = float(ax["pls"].predict(z).ravel()[0])
-    pctile = float((ax["pctile_ref"] < pred).mean())
-    en = emb / (np.linalg.norm(emb) + 1e-8)
-    sims = real_vecs() @ en
+    E = np.asarray(embs, np.float32)
+    preds = np.asarray(ax["pls"].predict((E - ax["mu"]) / ax["sd"]), float).reshape(len(E), -1)[:, 0]
+    top, tsims = _neighbors(E)
     _load_map()
-    order = np.argsort(sims)
-    top = order[-12:][::-1]                      # 12 nearest library hooks, by id+sim
-    nbr = [[_NIDS[0][i], round(float(sims[i]), 4)] for i in top]
-    xy = _ROWXY[0][order[-12:]]; good = ~np.isnan(xy[:, 0])
-    return {"pred": pred, "pctile": pctile, "nn_cos": float(sims.max()),
-            "nn10_cos": float(np.sort(sims)[-10:].mean()),
-            "x": round(float(np.mean(xy[good, 0])), 1), "y": round(float(np.mean(xy[good, 1])), 1),
-            "nbr": nbr}
+    out = []
+    for pred, t, ts in zip(preds, top, tsims):
+        nbr, xy, good = _neighbor_fields(t, ts, _ROWXY[0])
+        out.append({"pred": float(pred), "pctile": float((ax["pctile_ref"] < pred).mean()), "nn_cos": float(ts[0]),
+                    "nn10_cos": float(ts[:10][::-1].mean()),
+                    "x": round(float(np.mean(xy[good, 0])), 1), "y": round(float(np.mean(xy[good, 1])), 1),
+                    "nbr": nbr})
+    return out
 
-def render_score_hook(prompts):
+def score(emb):
+    return score_batch([emb])[0]
+
+def render_embed(prompts):
+    """Render + montage + embed one hook -> (frames, montage, embedding); any may be None.
+    Harvest loops run this per candidate in threads, then score the round with one *_batch call."""
     frames = render_frames(prompts)
     if any(f is None for f in frames): return None, None, None
     mont = build_montage(frames)
-    emb = embed_image(mont)
+    return frames, mont, embed_image(mont)
+
+def render_score_hook(prompts):
+    frames, mont, emb = render_embed(prompts)
     if emb is None: return frames, mont, None
     return frames, mont, score(emb)
 
 def render_score_keep(prompts):
-    frames = render_frames(prompts)
-    if any(f is None for f in frames): return None, None, None
-    mont = build_montage(frames)
-    emb = embed_image(mont)
+    frames, mont, emb = render_embed(prompts)
     if emb is None: return frames, mont, None
     return frames, mont, score_keep(emb)
 
@@ -61,9 +61,9 @@ def gen_specs(brief, n=N, temp=1.05):
 def render_one(cm_fr):
     cm, fr = cm_fr
     if not fr: return None
-    frames, mont, sc = H.render_score_hook(fr)
-    if sc is None: return None
-    return {"cm": cm, "fr": fr, "mont": mont, "sc": sc}
+    frames, mont, emb = H.render_embed(fr)
+    if emb is None: return None
+    return {"cm": cm, "fr": fr, "mont": mont, "emb": emb}
 
 ideas = []  # robust to the live idea-generator appending concurrently (skip half-written/bad lines)
 for l in open(IDEABANK):
@@ -113,6 +113,7 @@ try:
         with ThreadPoolExecutor(max_workers=RENDER_WORKERS) as ex:
             for r in ex.map(render_one, valid):
                 if r: cands.append(r)
+        for c, sc in zip(cands, H.score_batch([c.pop("emb") for c in cands])): c["sc"] = sc
         if not cands: continue
         cands.sort(key=lambda z: -z["sc"]["pctile"])
         for rank, c in enumerate(cands[:KEEP]):
@@ -61,9 +61,9 @@ def gen_specs(brief, n=N, temp=1.05):
 def render_one(cm_fr):
     cm, fr = cm_fr
     if not fr: return None
-    frames, mont, sc = H.render_score_keep(fr)
-    if sc is None: return None
-    return {"cm": cm, "fr": fr, "mont": mont, "sc": sc, "reward": H.reward_of(sc)}
+    frames, mont, emb = H.render_embed(fr)
+    if emb is None: return None
+    return {"cm": cm, "fr": fr, "mont": mont, "emb": emb}
 
 ideas = []
 for l in open(IDEABANK):
@@ -109,6 +109,8 @@ try:
         with ThreadPoolExecutor(max_workers=RENDER_WORKERS) as ex:
             for r in ex.map(render_one, valid):
                 if r: cands.append(r)
+        for c, sc in zip(cands, H.score_keep_batch([c.pop("emb") for c in cands])):
+            c["sc"] = sc; c["reward"] = H.reward_of(sc)
         if len(cands) < 2: continue
         cands.sort(key=lambda z: -z["reward"])
         win, los = cands[0], cands[-1]
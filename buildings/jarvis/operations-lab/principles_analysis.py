@@ -15,9 +15,11 @@ from __future__ import annotations
 import hashlib
 import math
 import re
+import sys
 import unicodedata
 import warnings
 from dataclasses import asdict, dataclass
+from pathlib import Path
 from typing import Any, Mapping, Sequence
 
 import numpy as np
@@ -34,6 +36,9 @@ from sklearn.metrics import (
 )
 from sklearn.mixture import GaussianMixture
 
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from group_bootstrap import bootstrap_mean_differences, group_codes  # noqa: E402
+
 try:
     from sklearn.cluster import HDBSCAN
 except ImportError:  # pragma: no cover - exercised only on older runtimes.
@@ -848,35 +853,22 @@ def _group_bootstrap_differences(
     valid = np.isfinite(target)
     y = target[valid]
     x = membership[valid]
-    valid_groups = groups[valid]
-    unique_groups = np.asarray(sorted(set(valid_groups.tolist())), dtype=object)
-    if len(unique_groups) < 2:
+    codes, group_count = group_codes(groups[valid])
+    if group_count < 2:
         return None, None
-    by_group = {
-        group: np.where(valid_groups == group)[0]
-        for group in unique_groups
-    }
-    continuous: list[float] = []
-    binary: list[float] = []
-    rng = np.random.default_rng(seed)
-    for _ in range(repeats):
-        sampled = rng.choice(unique_groups, size=len(unique_groups), replace=True)
-        indices = np.concatenate([by_group[group] for group in sampled])
-        sampled_x = x[indices]
-        if len(np.unique(sampled_x)) < 2:
-            continue
-        sampled_y = y[indices]
-        inside = sampled_y[sampled_x]
-        outside = sampled_y[~sampled_x]
-        continuous.append(float(np.mean(inside) - np.mean(outside)))
-        inside_binary = inside >= threshold
-        outside_binary = outside >= threshold
-        binary.append(float(np.mean(inside_binary) - np.mean(outside_binary)))
-    if len(continuous) < max(10, repeats // 5):
+    samples = bootstrap_mean_differences(
+        codes,
+        group_count,
+        x,
+        [y, y >= threshold],
+        repeats=repeats,
+        seed=seed,
+    )
+    if len(samples) < max(10, repeats // 5):
         return None, None
     return (
-        [float(value) for value in np.percentile(continuous, [2.5, 97.5])],
-        [float(value) for value in np.percentile(binary, [2.5, 97.5])],
+        [float(value) for value in np.percentile(samples[:, 0], [2.5, 97.5])],
+        [float(value) for value in np.percentile(samples[:, 1], [2.5, 97.5])],
     )
 
 
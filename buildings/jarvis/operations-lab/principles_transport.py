@@ -8,7 +8,8 @@ The module deliberately separates geometry from outcomes:
 * observed keep is reported as a disjoint-ID, small-tail diagnostic and can
   earn only a directional-consistency label under preregistered criteria.
 
-It performs no file or network I/O and imports no Business World project code.
+It performs no file or network I/O and imports no Business World project code
+beyond the sibling group_bootstrap engine.
 """
 
 from __future__ import annotations
@@ -16,11 +17,16 @@ from __future__ import annotations
 import hashlib
 import json
 import math
+import sys
 from dataclasses import asdict, dataclass
+from pathlib import Path
 from typing import Any, Mapping, Sequence
 
 import numpy as np
 
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from group_bootstrap import bootstrap_mean_differences, group_codes  # noqa: E402
+
 
 SCHEMA_VERSION = "operations-principles-transport-v1"
 EPSILON = 1e-12
@@ -445,36 +451,18 @@ def _group_bootstrap_effects(
     repeats: int,
     seed: int,
 ) -> tuple[list[float], list[float]]:
-    unique_groups, inverse = np.unique(groups, return_inverse=True)
-    if len(unique_groups) < 2:
+    codes, group_count = group_codes(groups)
+    if group_count < 2:
         return [], []
-    inside = membership.astype(np.float64)
-    outside = 1.0 - inside
-    event = (values >= threshold).astype(np.float64)
-    group_inside_n = np.bincount(inverse, weights=inside)
-    group_outside_n = np.bincount(inverse, weights=outside)
-    group_inside_sum = np.bincount(inverse, weights=values * inside)
-    group_outside_sum = np.bincount(inverse, weights=values * outside)
-    group_inside_hits = np.bincount(inverse, weights=event * inside)
-    group_outside_hits = np.bincount(inverse, weights=event * outside)
-    rng = np.random.default_rng(seed)
-    continuous: list[float] = []
-    threshold_effects: list[float] = []
-    for _ in range(repeats):
-        selected = rng.integers(0, len(unique_groups), size=len(unique_groups))
-        inside_n = float(np.sum(group_inside_n[selected]))
-        outside_n = float(np.sum(group_outside_n[selected]))
-        if inside_n <= 0 or outside_n <= 0:
-            continue
-        continuous.append(float(
-            np.sum(group_inside_sum[selected]) / inside_n
-            - np.sum(group_outside_sum[selected]) / outside_n
-        ))
-        threshold_effects.append(float(
-            np.sum(group_inside_hits[selected]) / inside_n
-            - np.sum(group_outside_hits[selected]) / outside_n
-        ))
-    return continuous, threshold_effects
+    samples = bootstrap_mean_differences(
+        codes,
+        group_count,
+        membership,
+        [values, values >= threshold],
+        repeats=repeats,
+        seed=seed,
+    )
+    return samples[:, 0].tolist(), samples[:, 1].tolist()
 
 
 def _association(
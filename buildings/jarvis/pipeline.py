@@ -5,14 +5,21 @@ Steps: THEORIZE → QUALIFY → QUANTIFY → RESOLVE → DATASET → EXPERIMENT
 """
 
 import argparse
+import contextlib
+import io
 import json
+import multiprocessing
 import os
 import math
 import datetime
+import hashlib
 import sys
+import tempfile
 import re
 import time
 import subprocess
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
 from pathlib import Path
 
 import numpy as np
@@ -2378,187 +2385,239 @@ def now_iso():
     return datetime.datetime.utcnow().isoformat() + "Z"
 
 
-# ── extract_metric ─────────────────────────────────────────────────────────
-def extract_metric(key, analysis):
-    """Extract float value from video analysis.json. Returns (value, skip_reason)."""
-    meta = analysis.get("metadata", {}) or {}
-    analytics = analysis.get("analytics", {}) or {}
-    _t = analysis.get("transcript") or ""
-    transcript = (_t.get("fullText", "") if isinstance(_t, dict) else _t).strip()
-    ai = analysis.get("aiAnalysis", {}) or {}
-    frames = analysis.get("frames", []) or []
-    segments = (ai.get("segments", []) or []) if isinstance(ai, dict) else []
-    curve = analytics.get("retentionCurve", []) or []
-    daily = analytics.get("dailyViews", []) or []
+# ── Metric registry ────────────────────────────────────────────────────────
+# Keys registered here dispatch straight to their extractor; every other key
+# falls through to the legacy if-chain in extract_metric below. The retention
+# curve and analytics metrics live here, each reading only its own fields.
+_METRIC_EXTRACTORS = {}
 
-    def curve_val(idx):
-        if len(curve) <= idx:
-            return None
-        return curve[idx]["retention"]
 
-    if key == "hook_retention_pct":
-        v = curve_val(10)
-        return (v, None) if v is not None else (None, "no curve")
+def register_metric(key):
+    """Decorator: route extract_metric(key, analysis) to fn(analysis)."""
+    def decorator(fn):
+        _METRIC_EXTRACTORS[key] = fn
+        return fn
+    return decorator
 
-    if key == "final_5pct_retention":
-        if len(curve) < 5:
-            return (None, "curve too short")
-        return (float(np.mean([p["retention"] for p in curve[-5:]])), None)
 
-    if key == "mid_video_cliff":
-        if len(curve) < 2:
-            return (None, "no curve")
-        vals = [p["retention"] for p in curve]
-        return (float(max(abs(vals[i] - vals[i - 1]) for i in range(1, len(vals)))), None)
+def _analytics(analysis):
+    return analysis.get("analytics", {}) or {}
 
-    if key == "retention_entropy":
-        if not curve:
-            return (None, "no curve")
-        vals = [abs(p["retention"]) for p in curve]
-        total = sum(vals)
-        if total == 0:
-            return (0.0, None)
-        probs = [v / total for v in vals if v > 0]
-        return (float(-sum(p * math.log2(p) for p in probs)), None)
 
-    if key == "hook_drop_rate":
-        if len(curve) < 10:
-            return (None, "curve too short")
-        vals = [p["retention"] for p in curve[:10]]
-        slope, _, _, _, _ = stats.linregress(range(10), vals)
-        return (float(slope), None)
+def _retention(analysis):
+    """Retention values of analytics.retentionCurve, in curve order (None for a null point)."""
+    return [p.get("retention") for p in (_analytics(analysis).get("retentionCurve", []) or [])]
 
-    if key == "early_momentum":
-        v25, v10 = curve_val(25), curve_val(10)
-        if v25 is None or v10 is None:
-            return (None, "no curve")
-        return (float(v25 - v10), None)
 
-    if key == "retention_25pct":
-        v = curve_val(25)
-        return (v, None) if v is not None else (None, "no curve")
+def _daily_views(analysis):
+    return _analytics(analysis).get("dailyViews", []) or []
 
-    if key == "retention_50pct":
-        v = curve_val(50)
-        return (v, None) if v is not None else (None, "no curve")
 
-    if key == "retention_75pct":
-        v = curve_val(75)
+def _retention_at(idx):
+    def extractor(analysis):
+        vals = _retention(analysis)
+        v = vals[idx] if len(vals) > idx else None
         return (v, None) if v is not None else (None, "no curve")
+    return extractor
 
-    if key == "retention_90pct":
-        v = curve_val(90)
-        return (v, None) if v is not None else (None, "no curve")
 
-    if key == "above_baseline_mean":
-        if not curve:
-            return (None, "no curve")
-        vals = [p["retention"] for p in curve]
-        n = len(vals)
-        above = [vals[i] - (1.0 - i / max(n - 1, 1)) for i in range(n)]
-        return (float(np.mean(above)), None)
+for _key, _idx in (("hook_retention_pct", 10), ("retention_25pct", 25), ("retention_50pct", 50),
+                   ("retention_75pct", 75), ("retention_90pct", 90)):
+    register_metric(_key)(_retention_at(_idx))
 
-    if key == "peak_count":
-        if len(curve) < 3:
-            return (None, "curve too short")
-        vals = [p["retention"] for p in curve]
-        peaks = sum(1 for i in range(1, len(vals) - 1) if vals[i] > vals[i - 1] and vals[i] > vals[i + 1])
-        return (float(peaks), None)
 
-    if key == "drop_count":
-        if len(curve) < 2:
-            return (None, "no curve")
-        vals = [p["retention"] for p in curve]
-        drops = sum(1 for i in range(1, len(vals)) if (vals[i - 1] - vals[i]) > 0.03)
-        return (float(drops), None)
+@register_metric("final_5pct_retention")
+def _final_5pct_retention(analysis):
+    vals = _retention(analysis)
+    if len(vals) < 5:
+        return (None, "curve too short")
+    return (float(np.mean(vals[-5:])), None)
 
-    if key == "max_peak_delta":
-        if len(curve) < 2:
-            return (None, "no curve")
-        vals = [p["retention"] for p in curve]
-        increases = [vals[i] - vals[i - 1] for i in range(1, len(vals)) if vals[i] > vals[i - 1]]
-        return (float(max(increases)) if increases else 0.0, None)
 
-    if key == "max_drop_delta":
-        if len(curve) < 2:
-            return (None, "no curve")
-        vals = [p["retention"] for p in curve]
-        drops = [vals[i - 1] - vals[i] for i in range(1, len(vals)) if vals[i] < vals[i - 1]]
-        return (float(max(drops)) if drops else 0.0, None)
+@register_metric("mid_video_cliff")
+def _mid_video_cliff(analysis):
+    vals = _retention(analysis)
+    if len(vals) < 2:
+        return (None, "no curve")
+    return (float(max(abs(vals[i] - vals[i - 1]) for i in range(1, len(vals)))), None)
 
-    if key == "retention_variance":
-        if not curve:
-            return (None, "no curve")
-        return (float(np.var([p["retention"] for p in curve])), None)
 
-    if key == "retention_skew":
-        if len(curve) < 3:
-            return (None, "curve too short")
-        return (float(stats.skew([p["retention"] for p in curve])), None)
+@register_metric("retention_entropy")
+def _retention_entropy(analysis):
+    vals = [abs(v) for v in _retention(analysis)]
+    if not vals:
+        return (None, "no curve")
+    total = sum(vals)
+    if total == 0:
+        return (0.0, None)
+    probs = [v / total for v in vals if v > 0]
+    return (float(-sum(p * math.log2(p) for p in probs)), None)
 
-    if key == "view_accel_7day":
-        if not daily:
-            return (None, "no daily views")
-        week1 = sum(d.get("views", 0) for d in daily[:7])
-        return (float(math.log10(week1 + 1)), None)
 
-    if key == "week1_week2_ratio":
-        if len(daily) < 7:
-            return (None, "insufficient daily views")
-        w1 = sum(d.get("views", 0) for d in daily[:7])
-        w2 = sum(d.get("views", 0) for d in daily[7:14])
-        return (float(w2 / (w1 + 1)), None)
+@register_metric("hook_drop_rate")
+def _hook_drop_rate(analysis):
+    vals = _retention(analysis)
+    if len(vals) < 10:
+        return (None, "curve too short")
+    slope, _, _, _, _ = stats.linregress(range(10), vals[:10])
+    return (float(slope), None)
 
-    if key == "non_sub_view_share":
-        total = analytics.get("totalViews", 0) or 0
-        non_sub = analytics.get("nonSubscriberViews", 0) or 0
-        if not total:
-            return (None, "no views")
-        return (float(non_sub / total), None)
 
-    if key == "swipe_away_rate":
-        v = analytics.get("swipedAwayRate")
-        return (float(v), None) if v is not None else (None, "no swipe data")
+@register_metric("early_momentum")
+def _early_momentum(analysis):
+    vals = _retention(analysis)
+    v25, v10 = (vals[25], vals[10]) if len(vals) > 25 else (None, None)
+    if v25 is None or v10 is None:
+        return (None, "no curve")
+    return (float(v25 - v10), None)
 
-    if key == "daily_view_peak_day":
-        if not daily:
-            return (None, "no daily views")
-        return (float(int(np.argmax([d.get("views", 0) for d in daily]))), None)
 
-    if key == "like_rate":
+@register_metric("above_baseline_mean")
+def _above_baseline_mean(analysis):
+    vals = _retention(analysis)
+    if not vals:
+        return (None, "no curve")
+    n = len(vals)
+    above = [vals[i] - (1.0 - i / max(n - 1, 1)) for i in range(n)]
+    return (float(np.mean(above)), None)
+
+
+@register_metric("peak_count")
+def _peak_count(analysis):
+    vals = _retention(analysis)
+    if len(vals) < 3:
+        return (None, "curve too short")
+    peaks = sum(1 for i in range(1, len(vals) - 1) if vals[i] > vals[i - 1] and vals[i] > vals[i + 1])
+    return (float(peaks), None)
+
+
+@register_metric("drop_count")
+def _drop_count(analysis):
+    vals = _retention(analysis)
+    if len(vals) < 2:
+        return (None, "no curve")
+    return (float(sum(1 for i in range(1, len(vals)) if (vals[i - 1] - vals[i]) > 0.03)), None)
+
+
+@register_metric("max_peak_delta")
+def _max_peak_delta(analysis):
+    vals = _retention(analysis)
+    if len(vals) < 2:
+        return (None, "no curve")
+    increases = [vals[i] - vals[i - 1] for i in range(1, len(vals)) if vals[i] > vals[i - 1]]
+    return (float(max(increases)) if increases else 0.0, None)
+
+
+@register_metric("max_drop_delta")
+def _max_drop_delta(analysis):
+    vals = _retention(analysis)
+    if len(vals) < 2:
+        return (None, "no curve")
+    drops = [vals[i - 1] - vals[i] for i in range(1, len(vals)) if vals[i] < vals[i - 1]]
+    return (float(max(drops)) if drops else 0.0, None)
+
+
+@register_metric("retention_variance")
+def _retention_variance(analysis):
+    vals = _retention(analysis)
+    if not vals:
+        return (None, "no curve")
+    return (float(np.var(vals)), None)
+
+
+@register_metric("retention_skew")
+def _retention_skew(analysis):
+    vals = _retention(analysis)
+    if len(vals) < 3:
+        return (None, "curve too short")
+    return (float(stats.skew(vals)), None)
+
+
+@register_metric("view_accel_7day")
+def _view_accel_7day(analysis):
+    daily = _daily_views(analysis)
+    if not daily:
+        return (None, "no daily views")
+    week1 = sum(d.get("views", 0) for d in daily[:7])
+    return (float(math.log10(week1 + 1)), None)
+
+
+@register_metric("week1_week2_ratio")
+def _week1_week2_ratio(analysis):
+    daily = _daily_views(analysis)
+    if len(daily) < 7:
+        return (None, "insufficient daily views")
+    w1 = sum(d.get("views", 0) for d in daily[:7])
+    w2 = sum(d.get("views", 0) for d in daily[7:14])
+    return (float(w2 / (w1 + 1)), None)
+
+
+@register_metric("daily_view_peak_day")
+def _daily_view_peak_day(analysis):
+    daily = _daily_views(analysis)
+    if not daily:
+        return (None, "no daily views")
+    return (float(int(np.argmax([d.get("views", 0) for d in daily]))), None)
+
+
+@register_metric("non_sub_view_share")
+def _non_sub_view_share(analysis):
+    analytics = _analytics(analysis)
+    total = analytics.get("totalViews", 0) or 0
+    if not total:
+        return (None, "no views")
+    return (float((analytics.get("nonSubscriberViews", 0) or 0) / total), None)
+
+
+@register_metric("swipe_away_rate")
+def _swipe_away_rate(analysis):
+    v = _analytics(analysis).get("swipedAwayRate")
+    return (float(v), None) if v is not None else (None, "no swipe data")
+
+
+def _per_thousand_views(field):
+    def extractor(analysis):
+        analytics = _analytics(analysis)
         total = analytics.get("totalViews", 0) or 0
         if not total:
             return (None, "no views")
-        return (float((analytics.get("likes", 0) or 0) / total * 1000), None)
+        return (float((analytics.get(field, 0) or 0) / total * 1000), None)
+    return extractor
 
-    if key == "comment_rate":
-        total = analytics.get("totalViews", 0) or 0
-        if not total:
-            return (None, "no views")
-        return (float((analytics.get("comments", 0) or 0) / total * 1000), None)
 
-    if key == "share_rate":
-        total = analytics.get("totalViews", 0) or 0
-        if not total:
-            return (None, "no views")
-        return (float((analytics.get("shares", 0) or 0) / total * 1000), None)
+for _key, _field in (("like_rate", "likes"), ("comment_rate", "comments"), ("share_rate", "shares"),
+                     ("subs_gained_per_view", "subscribersGained"), ("revenue_per_view", "estimatedRevenue")):
+    register_metric(_key)(_per_thousand_views(_field))
 
-    if key == "subs_gained_per_view":
-        total = analytics.get("totalViews", 0) or 0
-        if not total:
-            return (None, "no views")
-        return (float((analytics.get("subscribersGained", 0) or 0) / total * 1000), None)
 
-    if key == "subs_per_like":
-        likes = analytics.get("likes", 0) or 0
-        subs = analytics.get("subscribersGained", 0) or 0
-        return (float(subs / (likes + 1)), None)
+@register_metric("subs_per_like")
+def _subs_per_like(analysis):
+    analytics = _analytics(analysis)
+    likes = analytics.get("likes", 0) or 0
+    subs = analytics.get("subscribersGained", 0) or 0
+    return (float(subs / (likes + 1)), None)
 
-    if key == "revenue_per_view":
-        total = analytics.get("totalViews", 0) or 0
-        if not total:
-            return (None, "no views")
-        return (float((analytics.get("estimatedRevenue", 0) or 0) / total * 1000), None)
+
+# ── extract_metric ─────────────────────────────────────────────────────────
+def extract_metric(key, analysis):
+    """Extract float value from video analysis.json. Returns (value, skip_reason)."""
+    registered = _METRIC_EXTRACTORS.get(key)
+    if registered is not None:
+        return registered(analysis)
+    meta = analysis.get("metadata", {}) or {}
+    analytics = analysis.get("analytics", {}) or {}
+    _t = analysis.get("transcript") or ""
+    transcript = (_t.get("fullText", "") if isinstance(_t, dict) else _t).strip()
+    ai = analysis.get("aiAnalysis", {}) or {}
+    frames = analysis.get("frames", []) or []
+    segments = (ai.get("segments", []) or []) if isinstance(ai, dict) else []
+    curve = analytics.get("retentionCurve", []) or []
+    daily = analytics.get("dailyViews", []) or []
+
+    def curve_val(idx):
+        if len(curve) <= idx:
+            return None
+        return curve[idx]["retention"]
 
     if key == "duration_log":
         dur = meta.get("duration", 0)
@@ -4550,6 +4609,350 @@ def extract_metric(key, analysis):
     return (None, f"unknown key: {key}")
 
 
+# ── Batched correlation kernel ─────────────────────────────────────────────
+# Pearson, Spearman, Fisher CIs and p-values for many (column of X, column of
+# Y) pairs at once, each pair over its own pairwise-complete rows (a NaN/inf in
+# either column drops that row for that pair only). Replaces one scipy
+# pearsonr/spearmanr call per pair in the derived families.
+def _fisher_ci(r, n):
+    """95% CI via Fisher z, same epsilon/SE convention as the per-pair runners."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z = 0.5 * np.log((1 + r + 1e-10) / (1 - r + 1e-10))
+        se = 1.0 / np.sqrt(np.maximum(n - 3, 1))
+    return np.tanh(z - 1.96 * se), np.tanh(z + 1.96 * se)
+
+
+def _correlation_p_value(r, n):
+    """Two-tailed p for r over n pairs (t with n-2 df, as pearsonr/spearmanr)."""
+    df = np.maximum(n - 2, 1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = np.abs(r) * np.sqrt(df / np.maximum(1.0 - r * r, 0.0))
+    return np.where(np.isnan(r), np.nan, 2 * stats.t.sf(t, df))
+
+
+def _sorted_ranks(s, w):
+    """Average-tie ranks of the weighted rows of already-sorted columns `s`."""
+    c = np.cumsum(w, axis=0)
+    start = np.ones(s.shape, dtype=bool)
+    start[1:] = s[1:] != s[:-1]
+    end = np.ones(s.shape, dtype=bool)
+    end[:-1] = start[1:]
+    before = np.maximum.accumulate(np.where(start, c - w, 0.0), axis=0)
+    last = np.minimum.accumulate(np.where(end, c, np.inf)[::-1], axis=0)[::-1]
+    return before + (last - before + 1) / 2
+
+
+def _weighted_r(a, b, w, n):
+    """Column-wise Pearson r of a and b over the rows where w is 1."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        da = (a - (a * w).sum(axis=0) / n) * w
+        db = (b - (b * w).sum(axis=0) / n) * w
+        return (da * db).sum(axis=0) / np.sqrt((da * da).sum(axis=0) * (db * db).sum(axis=0))
+
+
+def paired_correlations(X, Y, spearman=True):
+    """Correlation stats of column i of X against column i of Y, for each i.
+
+    Returns a dict of length-m arrays: n, r, p_value, ci_low, ci_high and,
+    with spearman=True, rho, p_rho, rho_ci_low, rho_ci_high. Pairs with fewer
+    than 3 rows or a constant side are NaN, as scipy's are.
+    """
+    X = np.asarray(X, dtype=float)
+    Y = np.asarray(Y, dtype=float)
+    if X.ndim == 1:
+        X, Y = X[:, None], Y[:, None]
+    w = (np.isfinite(X) & np.isfinite(Y)).astype(float)
+    n = w.sum(axis=0)
+
+    def standardized(V):
+        count = np.maximum(n, 1)
+        V0 = np.where(w > 0, V, 0.0)
+        V0 = np.where(w > 0, V0 - V0.sum(axis=0) / count, 0.0)
+        scale = np.sqrt((V0 * V0).sum(axis=0) / count)
+        return V0 / np.where(scale > 0, scale, 1.0)
+
+    def constant(V):
+        return (np.where(w > 0, V, -np.inf).max(axis=0) <= np.where(w > 0, V, np.inf).min(axis=0))
+
+    xs, ys = standardized(X), standardized(Y)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r = (xs * ys).sum(axis=0) / np.sqrt((xs * xs).sum(axis=0) * (ys * ys).sum(axis=0))
+    degenerate = (n < 3) | constant(X) | constant(Y)
+    r = np.where(degenerate, np.nan, np.clip(r, -1.0, 1.0))
+    out = {"n": n.astype(int), "r": r, "p_value": _correlation_p_value(r, n)}
+    out["ci_low"], out["ci_high"] = _fisher_ci(r, n)
+    if not spearman:
+        return out
+
+    # Every pair keeps its own rows, so rank all columns at once against
+    # their joint masks: one argsort per side instead of a loop over pairs.
+    def ranks(V):
+        keys = np.where(w > 0, V, np.inf)
+        order = np.argsort(keys, axis=0, kind="stable")
+        ranked = np.empty_like(w)
+        np.put_along_axis(ranked, order, _sorted_ranks(
+            np.take_along_axis(keys, order, axis=0), np.take_along_axis(w, order, axis=0)), axis=0)
+        return ranked
+
+    rho = _weighted_r(ranks(X), ranks(Y), w, n)
+    rho = np.where(degenerate, np.nan, np.clip(rho, -1.0, 1.0))
+    out["rho"] = rho
+    out["p_rho"] = _correlation_p_value(rho, n)
+    out["rho_ci_low"], out["rho_ci_high"] = _fisher_ci(rho, n)
+    return out
+
+
+# ── Columnar feature matrix ────────────────────────────────────────────────
+# extract_metric re-parses one analysis dict per call, and the dataset step and
+# every derived experiment used to call it per (key, video) — the same retention
+# curves were walked thousands of times per run. FeatureMatrix evaluates each
+# key once per load_videos() snapshot and hands out NumPy columns instead.
+FEATURE_MATRIX_SCHEMA = "jarvis-feature-matrix-v1"
+FEATURE_CACHE_DIR = Path(os.environ.get("JARVIS_FEATURE_CACHE_DIR")
+                         or Path(tempfile.gettempdir()) / "jarvis-feature-matrix")
+# Other snapshots' caches are pruned only once unused this long: a pooled derived
+# run or a second pipeline on another snapshot may still be reading its own.
+FEATURE_CACHE_MAX_AGE = float(os.environ.get("JARVIS_FEATURE_CACHE_MAX_AGE_DAYS") or 7) * 86400
+
+# Patterns extract_metric tries before the `_x_` interaction branch; a key
+# matching one of them is never an interaction even if it contains "_x_".
+_PRE_INTERACTION_PATTERNS = tuple(re.compile(p) for p in (
+    r'^retention_pct_(\d+)$',
+    r'^retention_mean_(\d+)_(\d+)$',
+    r'^retention_slope_(\d+)_(\d+)$',
+    r'^retention_volatility_(\d+)_(\d+)$',
+    r'^views_log_days_(\d+)_(\d+)$',
+    r'^views_ratio_(\w+)_vs_(\w+)$',
+))
+
+_FEATURE_MATRIX = {"videos": None, "matrix": None}
+
+
+def _pipeline_source_sha256():
+    with open(__file__, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _interaction_components(key):
+    """(a, b) when extract_metric scores `key` as a*b, else None."""
+    if key in _METRIC_EXTRACTORS or key in METRIC_DEFINITIONS:
+        return None
+    if any(p.match(key) for p in _PRE_INTERACTION_PATTERNS):
+        return None
+    m = re.match(r'^(.+)_x_(.+)$', key)
+    if not m or not get_metric_definition(m.group(1)) or not get_metric_definition(m.group(2)):
+        return None
+    return m.group(1), m.group(2)
+
+
+class FeatureMatrix:
+    """(videos with a viewCount) x (metric keys) matrix of extract_metric results.
+
+    Rows keep load_videos() order. A column is filled the first time a key is
+    requested; `_x_` interactions are the product of their component columns.
+    Columns persist to an NPZ named by the snapshot hash (every analysis.json
+    plus this file's source), so a rerun over unchanged data extracts nothing.
+    """
+
+    def __init__(self, videos, cache_dir=FEATURE_CACHE_DIR):
+        self.rows = []
+        self.videos = []
+        for vid in videos:
+            if vid.get("metadata", {}).get("viewCount", 0):
+                self.rows.append(len(self.videos))
+                self.videos.append(vid)
+            else:
+                self.rows.append(None)
+        self.ids = [vid.get("_ytId") for vid in self.videos]
+        self.log_views = np.array(
+            [math.log10(vid["metadata"]["viewCount"]) for vid in self.videos], dtype=float)
+        self.snapshot = self._snapshot_hash(videos)
+        self.path = Path(cache_dir) / f"features-{self.snapshot[:24]}.npz"
+        self._columns = {}
+        self._pair_stats = {}
+        self._dirty = False
+        self._frozen = False
+        self._load()
+
+    @classmethod
+    def attached(cls, keys, block, pair_stats=None):
+        """Read-only matrix over a (rows x keys+1) block whose last column is
+        log10 views — the layout _share_feature_matrix publishes to workers."""
+        self = cls.__new__(cls)
+        self.rows = list(range(len(block)))
+        self.videos = []
+        self.ids = [None] * len(block)
+        self.log_views = block[:, -1]
+        self.snapshot = self.path = None
+        self._columns = {}
+        for j, key in enumerate(keys):
+            values = block[:, j]
+            self._columns[key] = (values, ~np.isfinite(values), [""] * len(block))
+        self._pair_stats = dict(pair_stats or {})
+        self._dirty = False
+        self._frozen = True
+        return self
+
+    @staticmethod
+    def _snapshot_hash(videos):
+        digest = hashlib.sha256()
+        digest.update(FEATURE_MATRIX_SCHEMA.encode())
+        digest.update(_pipeline_source_sha256().encode())
+        for vid in videos:
+            content = vid.get("_sha256") or hashlib.sha256(
+                json.dumps(vid, sort_keys=True, default=str).encode()).hexdigest()
+            digest.update(f"{vid.get('_ytId')}:{content}\n".encode())
+        return digest.hexdigest()
+
+    def _load(self):
+        try:
+            with np.load(self.path) as npz:
+                if npz["ids"].tolist() != [str(i) for i in self.ids]:
+                    return
+                keys = npz["keys"].tolist()
+                values, missing, reasons = npz["values"], npz["missing"], npz["reasons"]
+        except (OSError, KeyError, ValueError):
+            return
+        for j, key in enumerate(keys):
+            self._columns[key] = (values[:, j].copy(), missing[:, j].copy(),
+                                  reasons[:, j].tolist())
+        try:
+            os.utime(self.path)  # in use: keep it out of other runs' pruning
+        except OSError:
+            pass
+
+    def _extract(self, key):
+        parts = _interaction_components(key)
+        if parts:
+            va, ma, ra = self._column(parts[0])
+            vb, mb, rb = self._column(parts[1])
+            missing = ma | mb
+            with np.errstate(over="ignore", invalid="ignore"):
+                values = np.where(missing, np.nan, va * vb)
+            reasons = [(ra[i] or rb[i] or "missing component") if missing[i] else ""
+                       for i in range(len(self.videos))]
+            return values, missing, reasons
+        values = np.full(len(self.videos), np.nan)
+        missing = np.zeros(len(self.videos), dtype=bool)
+        reasons = []
+        for row, vid in enumerate(self.videos):
+            value, skip_reason = extract_metric(key, vid)
+            if value is None:
+                missing[row] = True
+            else:
+                values[row] = float(value)
+            reasons.append(skip_reason or "")
+        return values, missing, reasons
+
+    def _column(self, key):
+        if key not in self._columns:
+            if self._frozen:
+                raise RuntimeError(f"feature column {key!r} is not in the shared feature matrix")
+            self._columns[key] = self._extract(key)
+            self._dirty = True
+        return self._columns[key]
+
+    def column(self, key):
+        """Float column for `key`; NaN where the metric is missing or invalid."""
+        return self._column(key)[0]
+
+    def valid(self, key):
+        """Rows where extract_metric returned a finite value."""
+        values, missing, _ = self._column(key)
+        return ~missing & np.isfinite(values)
+
+    def pair_correlations(self, pairs):
+        """{(key_a, key_b): stats} over pairwise-complete rows. Pairs not yet
+        cached are filled by one paired_correlations call over just those pairs."""
+        pairs = list(dict.fromkeys(tuple(p) for p in pairs))
+        todo = [p for p in pairs if p not in self._pair_stats]
+        if todo:
+            out = paired_correlations(
+                np.column_stack([self.column(a) for a, _ in todo]),
+                np.column_stack([self.column(b) for _, b in todo]))
+            for j, pair in enumerate(todo):
+                self._pair_stats[pair] = {
+                    name: int(v[j]) if name == "n" else float(v[j])
+                    for name, v in out.items()
+                }
+        return {p: self._pair_stats[p] for p in pairs}
+
+    def pair_correlation(self, key_a, key_b):
+        return self.pair_correlations([(key_a, key_b)])[(key_a, key_b)]
+
+    def correlation_matrix(self, keys_a, keys_b=None, spearman=True):
+        """All-pairs stats for keys_a x keys_b as a dict of (len(a) x len(b))
+        arrays — the correlation_matrix tool. keys_b defaults to keys_a; that
+        symmetric sweep computes each unordered pair once and mirrors it."""
+        keys_a = list(keys_a)
+        symmetric = keys_b is None
+        keys_b = keys_a if symmetric else list(keys_b)
+        cells = [(i, j) for i in range(len(keys_a)) for j in range(len(keys_b))]
+        if symmetric:
+            wanted = [(keys_a[min(i, j)], keys_a[max(i, j)]) for i, j in cells]
+        else:
+            wanted = [(keys_a[i], keys_b[j]) for i, j in cells]
+        stats_by_pair = self.pair_correlations(wanted)
+        names = ["n", "r", "p_value", "ci_low", "ci_high"]
+        if spearman:
+            names += ["rho", "p_rho", "rho_ci_low", "rho_ci_high"]
+        out = {name: np.full((len(keys_a), len(keys_b)), np.nan) for name in names}
+        for (i, j), pair in zip(cells, wanted):
+            for name in names:
+                out[name][i, j] = stats_by_pair[pair][name]
+        out["n"] = out["n"].astype(int)
+        return out
+
+    def skip_reason(self, key, row):
+        """Why `row` has no usable value — the reason step_prep_dataset logs."""
+        return self._column(key)[2][row] or "invalid value"
+
+    def flush(self):
+        """Atomically persist every extracted column for this snapshot."""
+        if not self._dirty or not self._columns:
+            return
+        keys = sorted(self._columns)
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_name(f"{self.path.stem}.{os.getpid()}.tmp.npz")
+            np.savez(
+                tmp,
+                schema=np.array(FEATURE_MATRIX_SCHEMA),
+                ids=np.array([str(i) for i in self.ids]),
+                keys=np.array(keys),
+                values=np.column_stack([self._columns[k][0] for k in keys]),
+                missing=np.column_stack([self._columns[k][1] for k in keys]),
+                reasons=np.array([self._columns[k][2] for k in keys], dtype=str).T,
+            )
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"  [FEATURES] cache write failed: {e}")
+            return
+        self._dirty = False
+        cutoff = time.time() - FEATURE_CACHE_MAX_AGE
+        for stale in self.path.parent.glob("features-*.npz"):
+            try:
+                if stale != self.path and stale.stat().st_mtime < cutoff:
+                    stale.unlink()
+            except OSError:
+                pass
+
+
+def feature_matrix(videos):
+    """Shared FeatureMatrix for this load_videos() result."""
+    if _FEATURE_MATRIX["videos"] is not videos:
+        _FEATURE_MATRIX["videos"] = videos
+        _FEATURE_MATRIX["matrix"] = FeatureMatrix(videos)
+    return _FEATURE_MATRIX["matrix"]
+
+
+def _metric_view_pairs(key, videos):
+    """[(value, log10 views)] for every video with a finite value of `key`."""
+    features = feature_matrix(videos)
+    ok = features.valid(key)
+    return list(zip(features.column(key)[ok].tolist(), features.log_views[ok].tolist()))
+
+
 # ── PIPELINE STEPS ─────────────────────────────────────────────────────────
 
 def step_theorize(queue, existing_keys):
@@ -4726,20 +5129,20 @@ def step_resolve(key, resolutions):
 def step_prep_dataset(key, videos):
     """Step 5: Extract per-video values. Store full dataset."""
     dataset, skip_counts = [], {}
-    for vid in videos:
-        view_count = vid.get("metadata", {}).get("viewCount", 0)
-        if not view_count:
+    features = feature_matrix(videos)
+    values, ok = features.column(key), features.valid(key)
+    for row in features.rows:
+        if row is None:
             skip_counts["no viewCount"] = skip_counts.get("no viewCount", 0) + 1
             continue
-        value, skip_reason = extract_metric(key, vid)
-        if value is None or (isinstance(value, float) and (math.isnan(value) or math.isinf(value))):
-            r = skip_reason or "invalid value"
+        if not ok[row]:
+            r = features.skip_reason(key, row)
             skip_counts[r] = skip_counts.get(r, 0) + 1
             continue
         dataset.append({
-            "ytId": vid["_ytId"],
-            "value": float(value),
-            "target_value": float(math.log10(view_count)),
+            "ytId": features.ids[row],
+            "value": float(values[row]),
+            "target_value": float(features.log_views[row]),
         })
     skipped = sum(skip_counts.values())
     print(f"  [DATASET]   {len(dataset)} videos included, {skipped} skipped {skip_counts if skipped else ''}")
@@ -4884,47 +5287,25 @@ def _extract_two_vectors(key_a, key_b, videos, target="views"):
     """Extract paired float vectors for two indicator keys across all videos.
     Returns (xa, xb, y_views, n) where y_views is log10(viewCount).
     Any video missing either value is skipped."""
-    xa_list, xb_list, y_list = [], [], []
-    for vid in videos:
-        vc = vid.get("metadata", {}).get("viewCount", 0)
-        if not vc:
-            continue
-        va, _ = extract_metric(key_a, vid)
-        vb, _ = extract_metric(key_b, vid)
-        if va is None or vb is None:
-            continue
-        if isinstance(va, float) and (math.isnan(va) or math.isinf(va)):
-            continue
-        if isinstance(vb, float) and (math.isnan(vb) or math.isinf(vb)):
-            continue
-        xa_list.append(float(va))
-        xb_list.append(float(vb))
-        y_list.append(float(math.log10(vc)))
-    xa = np.array(xa_list, dtype=float)
-    xb = np.array(xb_list, dtype=float)
-    y = np.array(y_list, dtype=float)
+    features = feature_matrix(videos)
+    ok = features.valid(key_a) & features.valid(key_b)
+    xa = features.column(key_a)[ok]
+    xb = features.column(key_b)[ok]
+    y = features.log_views[ok]
     return xa, xb, y, len(xa)
 
 
 def run_pair_correlation(key_a, key_b, videos):
     """Pair correlation: Pearson + Spearman between indicator A and indicator B
     (not vs views). Returns a derived experiment dict or None."""
-    xa, xb, _, n = _extract_two_vectors(key_a, key_b, videos)
+    c = feature_matrix(videos).pair_correlation(key_a, key_b)
+    n = c["n"]
     if n < 50:
         print(f"  [PAIR_CORR] SKIP: n={n} < 50 for {key_a} <-> {key_b}")
         return None
-    mask = ~(np.isnan(xa) | np.isnan(xb) | np.isinf(xa) | np.isinf(xb))
-    xa, xb = xa[mask], xb[mask]
-    n = len(xa)
-    if n < 50:
-        return None
 
-    r, p = pearsonr(xa, xb)
-    rho, p_rho = spearmanr(xa, xb)
-    z = 0.5 * math.log((1 + r + 1e-10) / (1 - r + 1e-10))
-    se = 1.0 / math.sqrt(max(n - 3, 1))
-    ci_low = math.tanh(z - 1.96 * se)
-    ci_high = math.tanh(z + 1.96 * se)
+    r, p, rho, p_rho = c["r"], c["p_value"], c["rho"], c["p_rho"]
+    ci_low, ci_high = c["ci_low"], c["ci_high"]
 
     abs_r = abs(r)
     direction = "positive" if r >= 0 else "negative"
@@ -5058,34 +5439,16 @@ def run_depth3_interaction(key_a, key_b, key_c, videos, tools):
     if n_ab < 50:
         return None
     # Also need key_c
-    xc_list = []
-    y_list = []
-    xa_list = []
-    xb_list = []
-    for vid in videos:
-        vc = vid.get("metadata", {}).get("viewCount", 0)
-        if not vc:
-            continue
-        va, _ = extract_metric(key_a, vid)
-        vb, _ = extract_metric(key_b, vid)
-        v_c, _ = extract_metric(key_c, vid)
-        if va is None or vb is None or v_c is None:
-            continue
-        vals = [float(va), float(vb), float(v_c)]
-        if any(math.isnan(v) or math.isinf(v) for v in vals):
-            continue
-        xa_list.append(vals[0])
-        xb_list.append(vals[1])
-        xc_list.append(vals[2])
-        y_list.append(float(math.log10(vc)))
-
-    n = len(xa_list)
+    features = feature_matrix(videos)
+    ok = features.valid(key_a) & features.valid(key_b) & features.valid(key_c)
+    n = int(ok.sum())
     if n < 50:
         print(f"  [DEPTH3] SKIP: n={n} < 50")
         return None
 
-    interaction_vals = np.array(xa_list) * np.array(xb_list) * np.array(xc_list)
-    y_arr = np.array(y_list)
+    interaction_vals = (features.column(key_a)[ok] * features.column(key_b)[ok]
+                        * features.column(key_c)[ok])
+    y_arr = features.log_views[ok]
     mask = ~(np.isnan(interaction_vals) | np.isinf(interaction_vals))
     interaction_vals, y_arr = interaction_vals[mask], y_arr[mask]
     n = len(interaction_vals)
@@ -5150,23 +5513,14 @@ def run_rank_pair_correlation(key_a, key_b, videos):
     """Rank-based (Spearman) pair correlation between A and B.
     Captures monotonic non-linear relationships that Pearson misses.
     Primary metric is rho (Spearman), with Pearson for comparison."""
-    xa, xb, _, n = _extract_two_vectors(key_a, key_b, videos)
-    if n < 50:
-        return None
-    mask = ~(np.isnan(xa) | np.isnan(xb) | np.isinf(xa) | np.isinf(xb))
-    xa, xb = xa[mask], xb[mask]
-    n = len(xa)
+    c = feature_matrix(videos).pair_correlation(key_a, key_b)
+    n = c["n"]
     if n < 50:
         return None
 
-    rho, p_rho = spearmanr(xa, xb)
-    r, p_r = pearsonr(xa, xb)
-
+    rho, p_rho, r, p_r = c["rho"], c["p_rho"], c["r"], c["p_value"]
     # Fisher z-transform for Spearman CI
-    z = 0.5 * math.log((1 + rho + 1e-10) / (1 - rho + 1e-10))
-    se = 1.0 / math.sqrt(max(n - 3, 1))
-    ci_low = math.tanh(z - 1.96 * se)
-    ci_high = math.tanh(z + 1.96 * se)
+    ci_low, ci_high = c["rho_ci_low"], c["rho_ci_high"]
 
     # Nonlinearity gap: how much rank-based exceeds linear
     nonlinearity_gap = abs(rho) - abs(r)
@@ -5230,18 +5584,7 @@ def run_bucketed_curve(key_a, videos):
     """Bucketed curve analysis: split indicator A into quantile buckets,
     compute mean views per bucket, derive monotonicity score and bucket span.
     Captures non-linear staircase/threshold relationships with views."""
-    vals = []
-    for vid in videos:
-        vc = vid.get("metadata", {}).get("viewCount", 0)
-        if not vc:
-            continue
-        va, _ = extract_metric(key_a, vid)
-        if va is None:
-            continue
-        fv = float(va)
-        if math.isnan(fv) or math.isinf(fv):
-            continue
-        vals.append((fv, math.log10(vc)))
+    vals = _metric_view_pairs(key_a, videos)
     n = len(vals)
     if n < 60:
         print(f"  [BUCKET] SKIP: n={n} < 60 for {key_a}")
@@ -5333,18 +5676,7 @@ def run_bucketed_curve(key_a, videos):
 def run_piecewise_to_views(key_a, videos):
     """Piecewise linearity test: compare slope of A→views in lower half vs upper half.
     Detects threshold/saturation effects where the relationship changes shape."""
-    vals = []
-    for vid in videos:
-        vc = vid.get("metadata", {}).get("viewCount", 0)
-        if not vc:
-            continue
-        va, _ = extract_metric(key_a, vid)
-        if va is None:
-            continue
-        fv = float(va)
-        if math.isnan(fv) or math.isinf(fv):
-            continue
-        vals.append((fv, math.log10(vc)))
+    vals = _metric_view_pairs(key_a, videos)
     n = len(vals)
     if n < 60:
         print(f"  [PIECEWISE] SKIP: n={n} < 60 for {key_a}")
@@ -5430,18 +5762,7 @@ def run_piecewise_to_views(key_a, videos):
 def run_threshold_delta(key_a, videos):
     """Threshold delta: split indicator into quartiles, measure views correlation
     per segment. Identifies which quartile transition shows the biggest effect change."""
-    vals = []
-    for vid in videos:
-        vc = vid.get("metadata", {}).get("viewCount", 0)
-        if not vc:
-            continue
-        va, _ = extract_metric(key_a, vid)
-        if va is None:
-            continue
-        fv = float(va)
-        if math.isnan(fv) or math.isinf(fv):
-            continue
-        vals.append((fv, math.log10(vc)))
+    vals = _metric_view_pairs(key_a, videos)
     n = len(vals)
     if n < 80:
         print(f"  [THRESH] SKIP: n={n} < 80 for {key_a}")
@@ -5527,18 +5848,7 @@ def run_threshold_delta(key_a, videos):
 def run_quantile_gap(key_a, videos):
     """Top/bottom quantile gap: compare mean log_views in top 25% vs bottom 25%
     of indicator A. Simple, inspectable effect size measure."""
-    vals = []
-    for vid in videos:
-        vc = vid.get("metadata", {}).get("viewCount", 0)
-        if not vc:
-            continue
-        va, _ = extract_metric(key_a, vid)
-        if va is None:
-            continue
-        fv = float(va)
-        if math.isnan(fv) or math.isinf(fv):
-            continue
-        vals.append((fv, math.log10(vc)))
+    vals = _metric_view_pairs(key_a, videos)
     n = len(vals)
     if n < 60:
         print(f"  [QGAP] SKIP: n={n} < 60 for {key_a}")
@@ -5627,8 +5937,8 @@ def run_residual_pair(key_a, key_b, videos):
     if n < 60:
         return None
 
-    r_a_views, _ = pearsonr(xa, y)
-    r_b_views, _ = pearsonr(xb, y)
+    r_a_views, r_b_views = paired_correlations(np.column_stack([xa, xb]), np.column_stack([y, y]),
+                                               spearman=False)["r"]
 
     slope_a = np.polyfit(xa, y, 1)[0] if np.std(xa) > 1e-10 else 0
     intercept_a = np.mean(y) - slope_a * np.mean(xa)
@@ -5636,7 +5946,8 @@ def run_residual_pair(key_a, key_b, videos):
 
     if np.std(residuals) < 1e-10:
         return None
-    r_residual, p_residual = pearsonr(xb, residuals)
+    c = paired_correlations(xb, residuals, spearman=False)
+    r_residual, p_residual = float(c["r"][0]), float(c["p_value"][0])
     incremental = abs(r_residual)
 
     abs_r = abs(r_residual)
@@ -5696,18 +6007,7 @@ def run_residual_pair(key_a, key_b, videos):
 def run_monotonic_consistency(key_a, videos):
     """Monotonic bucket consistency: test if the bucket curve holds across
     3, 5, and 7 bucket resolutions. High consistency = robust signal."""
-    vals = []
-    for vid in videos:
-        vc = vid.get("metadata", {}).get("viewCount", 0)
-        if not vc:
-            continue
-        va, _ = extract_metric(key_a, vid)
-        if va is None:
-            continue
-        fv = float(va)
-        if math.isnan(fv) or math.isinf(fv):
-            continue
-        vals.append((fv, math.log10(vc)))
+    vals = _metric_view_pairs(key_a, videos)
     n = len(vals)
     if n < 70:
         print(f"  [MONOCON] SKIP: n={n} < 70 for {key_a}")
@@ -5798,18 +6098,7 @@ def run_monotonic_consistency(key_a, videos):
 def run_regime_gap(key_a, videos):
     """Regime gap: compare mean indicator value in top-25% view videos vs bottom-25%.
     Discovers which pre-upload signals separate high-view from low-view content."""
-    vals = []
-    for vid in videos:
-        vc = vid.get("metadata", {}).get("viewCount", 0)
-        if not vc:
-            continue
-        va, _ = extract_metric(key_a, vid)
-        if va is None:
-            continue
-        fv = float(va)
-        if math.isnan(fv) or math.isinf(fv):
-            continue
-        vals.append((fv, math.log10(vc)))
+    vals = _metric_view_pairs(key_a, videos)
     n = len(vals)
     if n < 60:
         print(f"  [REGIME] SKIP: n={n} < 60 for {key_a}")
@@ -5891,27 +6180,20 @@ def run_regime_gap(key_a, videos):
 def run_bridge_strength(key_pre, key_post, videos):
     """Bridge strength: how strongly a pre-upload indicator correlates with a
     post-upload indicator. Reveals mechanism pathways from content → audience response."""
-    xa, xb, y, n = _extract_two_vectors(key_pre, key_post, videos)
+    features = feature_matrix(videos)
+    c = features.pair_correlation(key_pre, key_post)
+    n = c["n"]
     if n < 50:
         print(f"  [BRIDGE] SKIP: n={n} < 50 for {key_pre} -> {key_post}")
         return None
-    mask = ~(np.isnan(xa) | np.isnan(xb) | np.isinf(xa) | np.isinf(xb))
-    xa, xb = xa[mask], xb[mask]
-    y_clean = y[mask]
-    n = len(xa)
-    if n < 50:
-        return None
 
-    r_bridge, p_bridge = pearsonr(xa, xb)
-    rho_bridge, p_rho = spearmanr(xa, xb)
+    r_bridge, p_bridge, rho_bridge, p_rho = c["r"], c["p_value"], c["rho"], c["p_rho"]
+    ci_low, ci_high = c["ci_low"], c["ci_high"]
 
-    r_pre_views, _ = pearsonr(xa, y_clean)
-    r_post_views, _ = pearsonr(xb, y_clean)
-
-    z = 0.5 * math.log((1 + r_bridge + 1e-10) / (1 - r_bridge + 1e-10))
-    se = 1.0 / math.sqrt(max(n - 3, 1))
-    ci_low = math.tanh(z - 1.96 * se)
-    ci_high = math.tanh(z + 1.96 * se)
+    ok = features.valid(key_pre) & features.valid(key_post)
+    xs = np.column_stack([features.column(key_pre)[ok], features.column(key_post)[ok]])
+    views = features.log_views[ok]
+    r_pre_views, r_post_views = paired_correlations(xs, np.column_stack([views, views]), spearman=False)["r"]
 
     pathway_strength = abs(r_bridge) * abs(r_post_views)
 
@@ -6411,10 +6693,69 @@ def generate_derived_candidates(indicators, existing_derived_keys):
 
 
 # ── Derived experiment runner ─────────────────────────────────────────────
+# Family runners in execution order; cmd_derived_run merges results into
+# derived_experiments.json and graph.json in exactly this order.
+DERIVED_RUNNERS = {
+    "pair_correlation": run_pair_correlation,
+    "conditional_delta_to_views": run_conditional_delta,
+    "depth3_interaction_to_views": run_depth3_interaction,
+    "rank_pair_correlation": run_rank_pair_correlation,
+    "bucketed_curve_to_views": run_bucketed_curve,
+    "piecewise_to_views": run_piecewise_to_views,
+    "threshold_delta_to_views": run_threshold_delta,
+    "quantile_gap_to_views": run_quantile_gap,
+    "residual_pair_to_views": run_residual_pair,
+    "monotonic_bucket_consistency": run_monotonic_consistency,
+    "regime_gap_to_views": run_regime_gap,
+    "bridge_strength_pre_to_post": run_bridge_strength,
+}
+
+# Families whose A<->B statistics come from FeatureMatrix.pair_correlations.
+CORRELATION_PAIR_KINDS = ("pair_correlation", "rank_pair_correlation", "bridge_strength_pre_to_post")
+
+_DERIVED_WORKER = {}
+
+
+def _run_derived_candidate(kind, keys, videos, tools):
+    if kind == "depth3_interaction_to_views":
+        return run_depth3_interaction(*keys, videos, tools)
+    return DERIVED_RUNNERS[kind](*keys, videos)
+
+
+def _share_feature_matrix(features, keys):
+    """Publish the candidate columns plus log views as one shared-memory block.
+    Returns (SharedMemory, spec); the caller owns close() and unlink()."""
+    keys = sorted(keys)
+    block = np.column_stack([features.column(k) for k in keys] + [features.log_views])
+    shm = shared_memory.SharedMemory(create=True, size=max(block.nbytes, 1))
+    np.ndarray(block.shape, dtype=np.float64, buffer=shm.buf)[:] = block
+    return shm, {"name": shm.name, "shape": block.shape, "keys": keys,
+                 "pair_stats": dict(features._pair_stats)}
+
+
+def _init_derived_worker(spec, tools):
+    shm = shared_memory.SharedMemory(name=spec["name"])
+    block = np.ndarray(spec["shape"], dtype=np.float64, buffer=shm.buf)
+    block.flags.writeable = False
+    videos = []
+    _FEATURE_MATRIX["videos"] = videos
+    _FEATURE_MATRIX["matrix"] = FeatureMatrix.attached(spec["keys"], block, spec["pair_stats"])
+    _DERIVED_WORKER.update(shm=shm, videos=videos, tools=tools)
+
+
+def _derived_task(kind, keys):
+    """Pool entry point: (result, captured stdout) so logs print in merge order."""
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        result = _run_derived_candidate(kind, keys, _DERIVED_WORKER["videos"],
+                                        _DERIVED_WORKER["tools"])
+    return result, out.getvalue()
+
 
-def cmd_derived_run(max_per_kind=None, kinds=None):
+def cmd_derived_run(max_per_kind=None, kinds=None, workers=None):
     """Run new experiment families: pair_correlation, conditional_delta, depth3.
-    Also retroactively tags existing interaction_to_views experiments."""
+    Also retroactively tags existing interaction_to_views experiments.
+    workers > 1 fans candidates out to a process pool (0 = one per core)."""
     indicators = load_json(INDICATORS_FILE, [])
     derived = load_json(DERIVED_EXPERIMENTS_FILE, [])
     tools = load_json(TOOLS_FILE, [])
@@ -6503,153 +6844,56 @@ def cmd_derived_run(max_per_kind=None, kinds=None):
 
     completed = {k: 0 for k in all_kinds}
 
-    # ── pair_correlation ──
-    if "pair_correlation" in all_kinds:
-        print(f"\n--- pair_correlation ({len(candidates.get('pair_correlation', []))} candidates) ---")
-        for key_a, key_b in candidates.get("pair_correlation", []):
-            if completed["pair_correlation"] >= limit:
-                break
-            result = run_pair_correlation(key_a, key_b, videos)
-            if result:
-                derived.append(result)
-                _add_derived_edge(graph, result)
-                completed["pair_correlation"] += 1
-
-    # ── conditional_delta_to_views ──
-    if "conditional_delta_to_views" in all_kinds:
-        print(f"\n--- conditional_delta_to_views ({len(candidates.get('conditional_delta_to_views', []))} candidates) ---")
-        for key_a, key_b in candidates.get("conditional_delta_to_views", []):
-            if completed["conditional_delta_to_views"] >= limit:
-                break
-            result = run_conditional_delta(key_a, key_b, videos)
-            if result:
-                derived.append(result)
-                _add_derived_edge(graph, result)
-                completed["conditional_delta_to_views"] += 1
-
-    # ── depth3_interaction_to_views ──
-    if "depth3_interaction_to_views" in all_kinds:
-        print(f"\n--- depth3_interaction_to_views ({len(candidates.get('depth3_interaction_to_views', []))} candidates) ---")
-        for key_a, key_b, key_c in candidates.get("depth3_interaction_to_views", []):
-            if completed["depth3_interaction_to_views"] >= limit:
-                break
-            result = run_depth3_interaction(key_a, key_b, key_c, videos, tools)
-            if result:
-                derived.append(result)
-                _add_derived_edge(graph, result)
-                completed["depth3_interaction_to_views"] += 1
-
-    # ── rank_pair_correlation ──
-    if "rank_pair_correlation" in all_kinds:
-        print(f"\n--- rank_pair_correlation ({len(candidates.get('rank_pair_correlation', []))} candidates) ---")
-        for key_a, key_b in candidates.get("rank_pair_correlation", []):
-            if completed["rank_pair_correlation"] >= limit:
-                break
-            result = run_rank_pair_correlation(key_a, key_b, videos)
-            if result:
-                derived.append(result)
-                _add_derived_edge(graph, result)
-                completed["rank_pair_correlation"] += 1
-
-    # ── bucketed_curve_to_views ──
-    if "bucketed_curve_to_views" in all_kinds:
-        print(f"\n--- bucketed_curve_to_views ({len(candidates.get('bucketed_curve_to_views', []))} candidates) ---")
-        for (key_a,) in candidates.get("bucketed_curve_to_views", []):
-            if completed["bucketed_curve_to_views"] >= limit:
-                break
-            result = run_bucketed_curve(key_a, videos)
-            if result:
-                derived.append(result)
-                _add_derived_edge(graph, result)
-                completed["bucketed_curve_to_views"] += 1
-
-    # ── piecewise_to_views ──
-    if "piecewise_to_views" in all_kinds:
-        print(f"\n--- piecewise_to_views ({len(candidates.get('piecewise_to_views', []))} candidates) ---")
-        for (key_a,) in candidates.get("piecewise_to_views", []):
-            if completed["piecewise_to_views"] >= limit:
-                break
-            result = run_piecewise_to_views(key_a, videos)
-            if result:
-                derived.append(result)
-                _add_derived_edge(graph, result)
-                completed["piecewise_to_views"] += 1
-
-    # ── threshold_delta_to_views ──
-    if "threshold_delta_to_views" in all_kinds:
-        print(f"\n--- threshold_delta_to_views ({len(candidates.get('threshold_delta_to_views', []))} candidates) ---")
-        for (key_a,) in candidates.get("threshold_delta_to_views", []):
-            if completed["threshold_delta_to_views"] >= limit:
-                break
-            result = run_threshold_delta(key_a, videos)
-            if result:
-                derived.append(result)
-                _add_derived_edge(graph, result)
-                completed["threshold_delta_to_views"] += 1
-
-    # ── quantile_gap_to_views ──
-    if "quantile_gap_to_views" in all_kinds:
-        print(f"\n--- quantile_gap_to_views ({len(candidates.get('quantile_gap_to_views', []))} candidates) ---")
-        for (key_a,) in candidates.get("quantile_gap_to_views", []):
-            if completed["quantile_gap_to_views"] >= limit:
-                break
-            result = run_quantile_gap(key_a, videos)
-            if result:
-                derived.append(result)
-                _add_derived_edge(graph, result)
-                completed["quantile_gap_to_views"] += 1
-
-    # ── residual_pair_to_views ──
-    if "residual_pair_to_views" in all_kinds:
-        print(f"\n--- residual_pair_to_views ({len(candidates.get('residual_pair_to_views', []))} candidates) ---")
-        for key_a, key_b in candidates.get("residual_pair_to_views", []):
-            if completed["residual_pair_to_views"] >= limit:
-                break
-            result = run_residual_pair(key_a, key_b, videos)
-            if result:
-                derived.append(result)
-                _add_derived_edge(graph, result)
-                completed["residual_pair_to_views"] += 1
-
-    # ── monotonic_bucket_consistency ──
-    if "monotonic_bucket_consistency" in all_kinds:
-        print(f"\n--- monotonic_bucket_consistency ({len(candidates.get('monotonic_bucket_consistency', []))} candidates) ---")
-        for (key_a,) in candidates.get("monotonic_bucket_consistency", []):
-            if completed["monotonic_bucket_consistency"] >= limit:
-                break
-            result = run_monotonic_consistency(key_a, videos)
-            if result:
-                derived.append(result)
-                _add_derived_edge(graph, result)
-                completed["monotonic_bucket_consistency"] += 1
-
-    # ── regime_gap_to_views ──
-    if "regime_gap_to_views" in all_kinds:
-        print(f"\n--- regime_gap_to_views ({len(candidates.get('regime_gap_to_views', []))} candidates) ---")
-        for (key_a,) in candidates.get("regime_gap_to_views", []):
-            if completed["regime_gap_to_views"] >= limit:
-                break
-            result = run_regime_gap(key_a, videos)
-            if result:
-                derived.append(result)
-                _add_derived_edge(graph, result)
-                completed["regime_gap_to_views"] += 1
-
-    # ── bridge_strength_pre_to_post ──
-    if "bridge_strength_pre_to_post" in all_kinds:
-        print(f"\n--- bridge_strength_pre_to_post ({len(candidates.get('bridge_strength_pre_to_post', []))} candidates) ---")
-        for key_pre, key_post in candidates.get("bridge_strength_pre_to_post", []):
-            if completed["bridge_strength_pre_to_post"] >= limit:
-                break
-            result = run_bridge_strength(key_pre, key_post, videos)
-            if result:
-                derived.append(result)
-                _add_derived_edge(graph, result)
-                completed["bridge_strength_pre_to_post"] += 1
+    tasks = {kind: candidates.get(kind, []) for kind in DERIVED_RUNNERS if kind in all_kinds}
+    # Every symmetric pair statistic the sweep needs, in one kernel call.
+    feature_matrix(videos).pair_correlations(
+        [tuple(cand) for kind in CORRELATION_PAIR_KINDS for cand in tasks.get(kind, [])])
+    if workers == 0:
+        workers = os.cpu_count() or 1
+    workers = max(1, workers or 1)
+    pool = shm = None
+    if workers > 1 and any(tasks.values()):
+        shm, spec = _share_feature_matrix(
+            feature_matrix(videos),
+            {k for kind_candidates in tasks.values() for cand in kind_candidates for k in cand})
+        pool = ProcessPoolExecutor(max_workers=workers,
+                                   mp_context=multiprocessing.get_context("spawn"),
+                                   initializer=_init_derived_worker, initargs=(spec, tools))
+        print(f"  workers={workers} (shared feature matrix {spec['shape'][0]}x{len(spec['keys'])})")
+
+    # Candidates run in windows; results are merged strictly in candidate
+    # order and stop at `limit`, so a pooled run accepts exactly the
+    # experiments the serial loop would.
+    try:
+        for kind, kind_candidates in tasks.items():
+            print(f"\n--- {kind} ({len(kind_candidates)} candidates) ---")
+            pos = 0
+            while pos < len(kind_candidates) and completed[kind] < limit:
+                window = kind_candidates[pos:pos + (workers * 2 if pool else 1)]
+                pos += len(window)
+                if pool:
+                    outcomes = pool.map(_derived_task, [kind] * len(window), window)
+                else:
+                    outcomes = ((_run_derived_candidate(kind, cand, videos, tools), "")
+                                for cand in window)
+                for result, log in outcomes:
+                    if completed[kind] >= limit:
+                        break
+                    print(log, end="")
+                    if result:
+                        derived.append(result)
+                        _add_derived_edge(graph, result)
+                        completed[kind] += 1
+    finally:
+        if pool:
+            pool.shutdown(cancel_futures=True)
+            shm.close()
+            shm.unlink()
 
     # ── Save all ──
     save_json(DERIVED_EXPERIMENTS_FILE, derived)
     save_json(GRAPH_FILE, graph)
+    feature_matrix(videos).flush()
 
     total = sum(completed.values())
     print(f"\n{'=' * 60}")
@@ -6757,11 +7001,12 @@ def load_videos():
         if not analysis_path.exists():
             continue
         try:
-            with open(analysis_path) as f:
-                data = json.load(f)
+            raw = analysis_path.read_bytes()
+            data = json.loads(raw)
             analytics = data.get("analytics", {}) or {}
             if analytics.get("retentionCurve") and analytics.get("avgRetention") is not None:
                 data["_ytId"] = vid_dir.name
+                data["_sha256"] = hashlib.sha256(raw).hexdigest()
                 videos.append(data)
         except Exception:
             pass
@@ -6933,6 +7178,7 @@ def cmd_run(n_to_run):
                 save_json(DERIVED_EXPERIMENTS_FILE, derived)
             existing_keys.add(key)
             ran += 1
+    feature_matrix(videos).flush()
 
     print(f"\n{'=' * 60}")
     print(f"RUN COMPLETE: {ran} indicators processed")
@@ -7219,6 +7465,7 @@ def cmd_auto_run(max_iterations, max_minutes=None, max_failures=None,
         raise
 
     _finish_progress(prog, stop_reason)
+    feature_matrix(videos).flush()
 
     elapsed = (time.time() - start_time) / 60
 
@@ -7277,6 +7524,7 @@ if __name__ == "__main__":
     parser.add_argument("--preupload-ratio", type=float, metavar="R", default=None, help="Autonomous: target fraction of pre-upload candidates (0.0-1.0, e.g. 0.8)")
     parser.add_argument("--derived-run", action="store_true", help="Run derived experiment families (pair_correlation, conditional_delta, depth3)")
     parser.add_argument("--derived-max", type=int, metavar="N", default=25, help="Derived: max experiments per kind (default 25)")
+    parser.add_argument("--derived-workers", type=int, metavar="N", default=1, help="Derived: worker processes (default 1 = in-process; 0 = one per core)")
     parser.add_argument("--derived-kinds", type=str, metavar="K", default=None, help="Derived: comma-separated kinds (pair_correlation,conditional_delta_to_views,depth3_interaction_to_views)")
     args = parser.parse_args()
 
@@ -7293,6 +7541,6 @@ if __name__ == "__main__":
                      args.max_no_signal, args.llm_candidates, args.preupload_ratio)
     elif args.derived_run:
         dk = args.derived_kinds.split(",") if args.derived_kinds else None
-        cmd_derived_run(max_per_kind=args.derived_max, kinds=dk)
+        cmd_derived_run(max_per_kind=args.derived_max, kinds=dk, workers=args.derived_workers)
     else:
         parser.print_help()
@@ -22,6 +22,7 @@ from __future__ import annotations
 
 import argparse
 import hashlib
+import heapq
 import io
 import itertools
 import json
@@ -33,6 +34,7 @@ import sys
 import time
 import unicodedata
 from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any, Iterable
@@ -52,6 +54,7 @@ HERE = Path(__file__).resolve().parent
 ROOT = HERE.parents[2]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
+import ridge_path  # noqa: E402
 from shorts_score_ledger import (  # noqa: E402
     GOVERNANCE as COORDINATE_GOVERNANCE,
     ledger_json_bytes,
@@ -118,6 +121,13 @@ CREATOR_ADAPTIVE_KEEP_V1_SPEC = {
     "minimumHistoryN": 8,
 }
 EXPERIMENT_COUNT = 50_000
+# Candidates solved per stacked batch, and processes the search may shard across.
+SEARCH_BATCH = 4096
+SEARCH_WORKERS = max(1, int(os.environ.get("PREDICTOR_SEARCH_WORKERS") or 1))
+# Alpha grids are scored from one ridge_path decomposition per fold, so they can be dense.
+RIDGE_ALPHAS = ridge_path.ALPHAS
+# The sparse selectors run a whole subset search per alpha, so they keep the decade grid.
+SPARSE_RIDGE_ALPHAS = (0.1, 1.0, 10.0, 100.0, 1000.0)
 MODALITIES = ("visual", "text", "together")
 MODALITY_SHORT = {"visual": "vis", "text": "txt", "together": "tog"}
 VIEWS_VALIDATION_AXIS_TARGETS = ("views", "outlier", "gt10M")
@@ -2549,11 +2559,113 @@ def search_candidates(
     return search_candidate_datasets(datasets, candidates, top_n, alpha)
 
 
+def candidate_sse(
+    statistics: list[dict[str, Any]],
+    candidate: tuple[int, ...],
+    alpha: float,
+) -> float:
+    """Held-out SSE of one ridge subset summed over the fold statistics."""
+    indices = np.asarray((0,) + tuple(index + 1 for index in candidate), dtype=int)
+    sse = 0.0
+    for stats in statistics:
+        xtx = stats["trainXtX"][np.ix_(indices, indices)].copy()
+        xty = stats["trainXty"][indices]
+        if len(indices) > 1:
+            xtx[1:, 1:] += np.eye(len(indices) - 1) * alpha
+        xtx[0, 0] += 1e-8
+        try:
+            coefficients = np.linalg.solve(xtx, xty)
+        except np.linalg.LinAlgError:
+            coefficients = np.linalg.pinv(xtx) @ xty
+        test_xtx = stats["testXtX"][np.ix_(indices, indices)]
+        test_xty = stats["testXty"][indices]
+        sse += float(stats["testYty"] - 2 * coefficients @ test_xty + coefficients @ test_xtx @ coefficients)
+    return sse
+
+
+def batched_candidate_sse(
+    statistics: list[dict[str, Any]],
+    candidates: list[tuple[int, ...]],
+    alpha: float,
+) -> np.ndarray:
+    """candidate_sse for same-size candidates, solved as one stacked system per fold.
+
+    Each stacked slice is the same ridge system candidate_sse builds, so the
+    batched LAPACK solve returns the same coefficients. A batch containing a
+    singular system falls back to the per-candidate path (and its pinv).
+    """
+    columns = np.asarray(
+        [(0,) + tuple(index + 1 for index in candidate) for candidate in candidates],
+        dtype=int,
+    )
+    width = columns.shape[1]
+    ridge = np.eye(width) * alpha
+    ridge[0, 0] = 1e-8
+    rows, cols = columns[:, :, None], columns[:, None, :]
+    sse = np.zeros(len(candidates), dtype=float)
+    for stats in statistics:
+        try:
+            coefficients = np.linalg.solve(
+                stats["trainXtX"][rows, cols] + ridge,
+                stats["trainXty"][columns][..., None],
+            )[..., 0]
+        except np.linalg.LinAlgError:
+            return np.asarray([candidate_sse(statistics, candidate, alpha) for candidate in candidates])
+        test_xtx = stats["testXtX"][rows, cols]
+        test_xty = stats["testXty"][columns]
+        sse += (
+            stats["testYty"]
+            - 2 * np.einsum("ij,ij->i", coefficients, test_xty)
+            + np.einsum("ij,ij->i", np.einsum("ij,ijk->ik", coefficients, test_xtx), coefficients)
+        )
+    return sse
+
+
+def search_candidate_range(
+    statistics: list[dict[str, Any]],
+    baseline_sse: float,
+    candidates: list[tuple[int, ...]],
+    start: int,
+    top_n: int,
+    alpha: float,
+) -> list[tuple[float, int, float, tuple[int, ...]]]:
+    """Heap leaderboard of candidates[start:] entries as (rank key, tie order, score, candidate).
+
+    The tie order reproduces the insert-and-resort leaderboard this replaced:
+    among equal scores the first top_n candidates keep later entries, and any
+    later candidate loses to everything already on the board.
+    """
+    by_size: dict[int, list[int]] = defaultdict(list)
+    for offset, candidate in enumerate(candidates):
+        by_size[len(candidate)].append(offset)
+    scores = np.empty(len(candidates), dtype=float)
+    for offsets in by_size.values():
+        for batch_start in range(0, len(offsets), SEARCH_BATCH):
+            batch = offsets[batch_start:batch_start + SEARCH_BATCH]
+            sse = batched_candidate_sse(statistics, [candidates[offset] for offset in batch], alpha)
+            scores[batch] = 1 - sse / baseline_sse if baseline_sse > 0 else -math.inf
+    leaderboard: list[tuple[float, int, float, tuple[int, ...]]] = []
+    for offset, score in enumerate(scores.tolist()):
+        sequence = start + offset
+        entry = (
+            score if score == score else -math.inf,
+            sequence if sequence < top_n else -sequence,
+            score,
+            candidates[offset],
+        )
+        if len(leaderboard) < top_n:
+            heapq.heappush(leaderboard, entry)
+        elif entry[:2] > leaderboard[0][:2]:
+            heapq.heapreplace(leaderboard, entry)
+    return leaderboard
+
+
 def search_candidate_datasets(
     datasets: list[tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]],
     candidates: list[tuple[int, ...]],
     top_n: int = 100,
     alpha: float = 2.0,
+    workers: int | None = None,
 ) -> list[dict[str, Any]]:
     statistics = []
     baseline_sse = 0.0
@@ -2575,34 +2687,30 @@ def search_candidate_datasets(
         baseline_sse += float(np.sum((test_y - train_y.mean()) ** 2))
     if not statistics:
         raise RuntimeError("candidate search has no valid training/validation datasets")
-    leaderboard: list[tuple[float, tuple[int, ...]]] = []
-    for candidate in candidates:
-        indices = np.asarray((0,) + tuple(index + 1 for index in candidate), dtype=int)
-        sse = 0.0
-        for stats in statistics:
-            xtx = stats["trainXtX"][np.ix_(indices, indices)].copy()
-            xty = stats["trainXty"][indices]
-            if len(indices) > 1:
-                xtx[1:, 1:] += np.eye(len(indices) - 1) * alpha
-            xtx[0, 0] += 1e-8
-            try:
-                coefficients = np.linalg.solve(xtx, xty)
-            except np.linalg.LinAlgError:
-                coefficients = np.linalg.pinv(xtx) @ xty
-            test_xtx = stats["testXtX"][np.ix_(indices, indices)]
-            test_xty = stats["testXty"][indices]
-            sse += float(stats["testYty"] - 2 * coefficients @ test_xty + coefficients @ test_xtx @ coefficients)
-        score = 1 - sse / baseline_sse if baseline_sse > 0 else -math.inf
-        if len(leaderboard) < top_n:
-            leaderboard.append((score, candidate))
-            if len(leaderboard) == top_n:
-                leaderboard.sort(key=lambda item: item[0])
-        elif score > leaderboard[0][0]:
-            leaderboard[0] = (score, candidate)
-            leaderboard.sort(key=lambda item: item[0])
+    workers = max(1, min(workers or SEARCH_WORKERS, len(candidates) // SEARCH_BATCH))
+    # Shards pickle search_candidate_range by module name, which a file-loaded copy lacks.
+    if workers > 1 and sys.modules.get(__name__) is not None:
+        # Contiguous shards keep each candidate's global position, so merging the
+        # shard boards by the same key gives the single-process board.
+        bounds = np.linspace(0, len(candidates), workers + 1).round().astype(int)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            boards = executor.map(
+                search_candidate_range,
+                *zip(*[
+                    (statistics, baseline_sse, candidates[low:high], int(low), top_n, alpha)
+                    for low, high in zip(bounds[:-1], bounds[1:])
+                ]),
+            )
+            leaderboard = heapq.nlargest(
+                top_n,
+                itertools.chain.from_iterable(boards),
+                key=lambda entry: entry[:2],
+            )
+    else:
+        leaderboard = search_candidate_range(statistics, baseline_sse, candidates, 0, top_n, alpha)
     return [
         {"score": clean_number(score), "indices": list(candidate)}
-        for score, candidate in sorted(leaderboard, key=lambda item: item[0], reverse=True)
+        for _, _, score, candidate in sorted(leaderboard, key=lambda entry: (-entry[0], entry[1]))
     ]
 
 
@@ -2645,54 +2753,78 @@ def cross_fit_subset(
     return prediction
 
 
-def select_ridge_alpha(
-    X: np.ndarray,
-    y: np.ndarray,
+def subset_ridge_path(
+    train_X: np.ndarray,
+    train_y: np.ndarray,
+    test_X: np.ndarray,
     indices: list[int],
-    folds: np.ndarray,
+    alphas: Iterable[float] = RIDGE_ALPHAS,
+) -> np.ndarray:
+    """fit_subset's held-out predictions for every alpha, shape (test rows, alphas)."""
+    train_scaled, test_scaled, _, _, _ = impute_scale(train_X[:, indices], test_X[:, indices])
+    return ridge_path.predict(ridge_path.fit(train_scaled, train_y), test_scaled, tuple(alphas))
+
+
+def best_path_alpha(
+    actual: np.ndarray,
+    predictions: np.ndarray,
+    alphas: Iterable[float],
+    minimum_rows: int = 8,
+    metrics: Any = None,
+    sensitivity: list[dict[str, Any]] | None = None,
+    default: float = 2.0,
 ) -> float:
-    best_alpha, best_score = 2.0, -math.inf
-    for alpha in (0.1, 1.0, 10.0, 100.0, 1000.0):
-        prediction = cross_fit_subset(X, y, indices, folds, alpha)
+    """First alpha whose held-out column has the highest r2 (by `metrics`)."""
+    metrics = metrics or regression_metrics
+    best_alpha, best_score = default, -math.inf
+    for column, alpha in enumerate(alphas):
+        prediction = predictions[:, column]
         valid = np.isfinite(prediction)
-        if valid.sum() < 8:
+        if valid.sum() < minimum_rows:
             continue
-        score = regression_metrics(y[valid], prediction[valid])["r2"]
+        result = metrics(actual[valid], prediction[valid])
+        if sensitivity is not None:
+            sensitivity.append({"alpha": alpha, "metrics": result})
+        score = result["r2"]
         numeric_score = float(score) if finite(score) else -math.inf
         if numeric_score > best_score:
             best_alpha, best_score = alpha, numeric_score
     return best_alpha
 
 
+def select_ridge_alpha(
+    X: np.ndarray,
+    y: np.ndarray,
+    indices: list[int],
+    folds: np.ndarray,
+    alphas: Iterable[float] = RIDGE_ALPHAS,
+) -> float:
+    alphas = tuple(alphas)
+    predictions = np.full((len(y), len(alphas)), np.nan, dtype=float)
+    for fold in sorted(set(int(value) for value in folds)):
+        train = folds != fold
+        test = ~train
+        if train.sum() < 4 or test.sum() < 1:
+            continue
+        predictions[test] = subset_ridge_path(X[train], y[train], X[test], indices, alphas)
+    return best_path_alpha(np.asarray(y, dtype=float), predictions, alphas)
+
+
 def select_ridge_alpha_datasets(
     datasets: list[tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]],
     indices: list[int],
+    alphas: Iterable[float] = RIDGE_ALPHAS,
 ) -> float:
-    best_alpha, best_score = 2.0, -math.inf
-    for alpha in (0.1, 1.0, 10.0, 100.0, 1000.0):
-        actual, predicted = [], []
-        for train_X, train_y, test_X, test_y in datasets:
-            if len(train_y) < 4 or not len(test_y):
-                continue
-            estimate, _ = fit_subset(
-                train_X,
-                train_y,
-                indices,
-                test_X,
-                alpha,
-            )
-            actual.extend(np.asarray(test_y, dtype=float).tolist())
-            predicted.extend(np.asarray(estimate, dtype=float).tolist())
-        if len(actual) < 8:
+    alphas = tuple(alphas)
+    actual, predictions = [], []
+    for train_X, train_y, test_X, test_y in datasets:
+        if len(train_y) < 4 or not len(test_y):
             continue
-        score = regression_metrics(
-            np.asarray(actual, dtype=float),
-            np.asarray(predicted, dtype=float),
-        )["r2"]
-        numeric_score = float(score) if finite(score) else -math.inf
-        if numeric_score > best_score:
-            best_alpha, best_score = alpha, numeric_score
-    return best_alpha
+        predictions.append(subset_ridge_path(train_X, train_y, test_X, indices, alphas))
+        actual.append(np.asarray(test_y, dtype=float))
+    if not actual:
+        return 2.0
+    return best_path_alpha(np.concatenate(actual), np.concatenate(predictions), alphas)
 
 
 def select_sparse_ridge_alpha(
@@ -2703,7 +2835,7 @@ def select_sparse_ridge_alpha(
 ) -> float:
     low_order = [candidate for candidate in candidates if len(candidate) <= 2]
     best_alpha, best_score = 2.0, -math.inf
-    for alpha in (0.1, 1.0, 10.0, 100.0, 1000.0):
+    for alpha in SPARSE_RIDGE_ALPHAS:
         row = search_candidates(
             X,
             y,
@@ -2724,7 +2856,7 @@ def select_sparse_ridge_alpha_datasets(
 ) -> float:
     low_order = [candidate for candidate in candidates if len(candidate) <= 2]
     best_alpha, best_score = 2.0, -math.inf
-    for alpha in (0.1, 1.0, 10.0, 100.0, 1000.0):
+    for alpha in SPARSE_RIDGE_ALPHAS:
         row = search_candidate_datasets(
             datasets,
             low_order,
@@ -7655,7 +7787,7 @@ def apply_validation_promotion_gates(
     return target
 
 
-RAW_RIDGE_ALPHAS = (0.1, 1.0, 10.0, 100.0, 1000.0)
+RAW_RIDGE_ALPHAS = RIDGE_ALPHAS
 
 
 def select_grouped_raw_alpha(
@@ -7681,26 +7813,24 @@ def select_grouped_raw_alpha(
     folds = group_folds(sampled_groups, 3)
     if len(set(folds.tolist())) < 2:
         return 10.0, []
-    sensitivity = []
-    best_alpha, best_score = 10.0, -math.inf
-    for alpha in RAW_RIDGE_ALPHAS:
-        prediction = np.full(len(indices), np.nan)
-        for fold in sorted(set(folds.tolist())):
-            training = folds != fold
-            validation = ~training
-            if training.sum() < 50 or validation.sum() < 20:
-                continue
-            model = Ridge(alpha=alpha, solver="lsqr", tol=1e-3).fit(
-                X[indices[training]],
-                y[indices[training]],
-            )
-            prediction[validation] = model.predict(X[indices[validation]])
-        valid = np.isfinite(prediction)
-        metrics = log_view_metrics(y[indices[valid]], prediction[valid])
-        score = float(metrics["r2"]) if finite(metrics.get("r2")) else -math.inf
-        sensitivity.append({"alpha": alpha, "metrics": metrics})
-        if score > best_score:
-            best_alpha, best_score = alpha, score
+    sensitivity: list[dict[str, Any]] = []
+    predictions = np.full((len(indices), len(RAW_RIDGE_ALPHAS)), np.nan)
+    for fold in sorted(set(folds.tolist())):
+        training = folds != fold
+        validation = ~training
+        if training.sum() < 50 or validation.sum() < 20:
+            continue
+        path = ridge_path.fit(X[indices[training]], y[indices[training]])
+        predictions[validation] = ridge_path.predict(path, X[indices[validation]], RAW_RIDGE_ALPHAS)
+    best_alpha = best_path_alpha(
+        np.asarray(y[indices], dtype=float),
+        predictions,
+        RAW_RIDGE_ALPHAS,
+        minimum_rows=0,
+        metrics=log_view_metrics,
+        sensitivity=sensitivity,
+        default=10.0,
+    )
     return best_alpha, sensitivity
 
 
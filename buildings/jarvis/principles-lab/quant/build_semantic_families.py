@@ -6,15 +6,19 @@ from __future__ import annotations
 import gzip
 import hashlib
 import json
+import sys
 from collections import defaultdict
 from pathlib import Path
 from typing import Any
 
-import faiss
 import numpy as np
 
 
 HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE.parents[3]))
+
+import knn_graph  # noqa: E402  (repo root: the shared revision-pinned neighbor graph)
+
 CACHE = HERE / ".cache"
 PANEL_PATH = CACHE / "unified-panel.json.gz"
 MANIFEST_PATH = HERE / "snapshot-manifest.json"
@@ -76,6 +80,29 @@ def vector_path(format_name: str, objects: dict[str, dict[str, Any]]) -> Path:
     return (HERE / payload["localObject"]).resolve()
 
 
+def neighbor_graph(
+    format_name: str,
+    objects: dict[str, dict[str, Any]],
+    ids: np.ndarray,
+    vectors: np.ndarray,
+) -> knn_graph.KnnGraph:
+    """The exact kNN graph of the frozen archive's unit rows, pinned by its source ETag.
+
+    It lives under its own archive name (and novelty state), apart from the
+    live corpus graph of the same channel, and is pinned so newer frozen
+    revisions never prune it.
+    """
+    payload = objects[f"{format_name}:together:vectors"]
+    return knn_graph.load_or_build(
+        vectors,
+        ids,
+        f"frozen/{payload['key'].rsplit('/', 1)[0]}",
+        f"npz-{payload['sourceEtag'].strip(chr(34))}",
+        provenance={"frozenKey": payload["frozenKey"], "sha256": payload["sha256"]},
+        pin=True,
+    )
+
+
 def duplicate_similarities(
     vectors: np.ndarray,
     exact_families: list[str],
@@ -128,6 +155,10 @@ def build_format(
     with np.load(vector_path(format_name, objects), allow_pickle=True) as archive:
         all_ids = archive["ids"].astype(str)
         all_vectors = archive["vecs"].astype(np.float32, copy=False)
+        # One normalization: the null threshold and the graph edges are the same cosines.
+        all_vectors = (
+            all_vectors / (np.linalg.norm(all_vectors, axis=1, keepdims=True) + 1e-9)
+        ).astype(np.float32, copy=False)
         selected = np.asarray(
             [
                 index
@@ -138,21 +169,17 @@ def build_format(
         )
         ids = all_ids[selected]
         vectors = np.ascontiguousarray(all_vectors[selected])
+    graph = neighbor_graph(format_name, objects, all_ids, all_vectors)
     exact_families = [panel[format_name][video_id]["exactFamilyId"] for video_id in ids]
     duplicates = duplicate_similarities(vectors, exact_families)
     random_values = random_similarities(vectors, SEED + (0 if format_name == "shorts" else 1))
     null_cutoff = float(np.quantile(random_values, NULL_QUANTILE))
     threshold = max(MIN_COSINE, null_cutoff)
 
-    index = faiss.IndexHNSWFlat(
-        vectors.shape[1],
-        32,
-        faiss.METRIC_INNER_PRODUCT,
-    )
-    index.hnsw.efConstruction = 96
-    index.hnsw.efSearch = 160
-    index.add(vectors)
-    similarities, neighbors = index.search(vectors, NEIGHBORS + 1)
+    similarities, graph_rows = graph.row_neighbors(selected, NEIGHBORS + 1, within=selected)
+    panel_position = np.full(len(graph), -1, dtype=np.int64)
+    panel_position[selected] = np.arange(len(selected))
+    neighbors = panel_position[graph_rows]
     neighbor_sets = [
         set(int(value) for value in row[1:] if value >= 0)
         for row in neighbors
@@ -215,6 +242,8 @@ def build_format(
         "exactDuplicatePairComparisons": len(duplicates),
         "exactDuplicateRecallAtThreshold": rounded(duplicate_recall),
         "nearestNeighbors": NEIGHBORS,
+        "neighborSearch": "exact cosine, panel rows only",
+        "neighborGraph": graph.summary(),
         "semanticEdgeRule": "mutual top-20 neighbor and cosine at or above threshold",
         "exactEdges": exact_edges,
         "semanticEdges": semantic_edges,
@@ -3,8 +3,13 @@
 from __future__ import annotations
 
 import hashlib
+import json
 import math
+import os
+import shutil
+import tempfile
 import weakref
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from dataclasses import dataclass
 from typing import Callable
 
@@ -15,6 +20,7 @@ EPS = 1e-9
 REPRESENTATIONS = ("raw", "influence", "nonadditive", "context")
 REPRESENTATION_VERSION = "direct-segment-sum-v2"
 GEOMETRIES = ("euclidean", "spherical", "whitened")
+ATLAS_CELL_VERSION = "atlas-cell-v1"
 _GROUP_BUCKET_CACHE: dict[int, tuple[weakref.ReferenceType, list[str], dict[str, np.ndarray]]] = {}
 
 
@@ -253,6 +259,255 @@ def summarize_map_clusters(rows: list[dict], cluster_map: dict,
     return summaries
 
 
+def _digest(*arrays) -> str:
+    digest = hashlib.sha1()
+    for array in arrays:
+        array = np.ascontiguousarray(array)
+        digest.update(f"{array.dtype.str}:{array.shape};".encode())
+        digest.update(array.tobytes())
+    return digest.hexdigest()
+
+
+def grow_centers(centers: np.ndarray, points: np.ndarray, cluster_count: int) -> np.ndarray:
+    """Extend a smaller solution to `cluster_count` centers by farthest-point additions.
+
+    The warm start for k reuses the k' < k centroids of the previous cluster
+    count and adds, one at a time, the fit point farthest from every center
+    chosen so far, so the new centers land in the worst-covered regions.
+    """
+    points = np.asarray(points, np.float64)
+    chosen = [np.asarray(center, np.float64) for center in centers[:cluster_count]]
+    nearest = np.full(len(points), np.inf)
+    for center in chosen:
+        nearest = np.minimum(nearest, np.square(points - center).sum(axis=1))
+    while len(chosen) < cluster_count:
+        center = points[int(np.argmax(nearest))]
+        chosen.append(center)
+        nearest = np.minimum(nearest, np.square(points - center).sum(axis=1))
+    return np.asarray(chosen, np.float32)
+
+
+_SHARED: dict[str, dict[str, np.ndarray]] = {}
+
+
+def _shared_arrays(shared) -> dict[str, np.ndarray]:
+    """A chain's inputs: in-process arrays, or a folder of .npy files every worker maps read-only."""
+    if isinstance(shared, dict):
+        return shared
+    if shared not in _SHARED:
+        _SHARED[shared] = {
+            name[:-4]: np.load(os.path.join(shared, name), mmap_mode="r")
+            for name in os.listdir(shared) if name.endswith(".npy")
+        }
+    return _SHARED[shared]
+
+
+def _save_atomic(path: str, **arrays) -> None:
+    tmp = f"{path}.tmp{os.getpid()}.npz"
+    np.savez(tmp, **arrays)
+    os.replace(tmp, path)
+
+
+def _load_cell(path: str) -> dict | None:
+    try:
+        with np.load(path, allow_pickle=False) as stored:
+            return {
+                "rows": json.loads(str(stored["rows"])),
+                "best": int(stored["best"]),
+                "labels": stored["labels"],
+                "centers": [stored[f"centers{seed}"] if f"centers{seed}" in stored.files else None
+                            for seed in range(int(stored["seeds"]))],
+            }
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def _fit_cell(values: np.ndarray, groups: np.ndarray, unique_groups: np.ndarray,
+              nuisance: dict[str, np.ndarray] | None, task: dict, dimension: int,
+              cluster_count: int, warm: list[np.ndarray | None], warm_from: int | None) -> dict | None:
+    from sklearn.cluster import MiniBatchKMeans
+    from sklearn.metrics import adjusted_rand_score
+
+    representation, geometry = task["representation"], task["geometry"]
+    fit_sample, eval_sample = task["fit_sample"], task["eval_sample"]
+    labels_by_seed = []
+    rows_for_group = []
+    centers = [None] * task["seeds"]
+    for seed_index in range(task["seeds"]):
+        rng = np.random.RandomState(1729 + seed_index * 1009 + dimension * 37 + cluster_count)
+        train_count = max(2, int(round(len(unique_groups) * .8)))
+        train_groups = set(rng.permutation(unique_groups)[:train_count].tolist())
+        train_indices = balanced_sample(groups, min(fit_sample, len(values)), rng, train_groups)
+        if len(train_indices) < cluster_count:
+            continue
+        init = "k-means++"
+        if warm[seed_index] is not None:
+            init = grow_centers(warm[seed_index], values[train_indices], cluster_count)
+        model = MiniBatchKMeans(
+            n_clusters=cluster_count,
+            init=init,
+            random_state=seed_index,
+            n_init=1,
+            max_iter=30,
+            batch_size=min(512, max(64, len(train_indices))),
+            reassignment_ratio=.01,
+        ).fit(values[train_indices])
+        centers[seed_index] = model.cluster_centers_.astype(np.float32)
+        labels = model.predict(values)
+        labels_by_seed.append(labels)
+        eval_indices = balanced_sample(groups, min(eval_sample, len(values)), rng)
+        eval_labels = labels[eval_indices]
+        margin = centroid_margin(values[eval_indices], model.cluster_centers_, eval_labels)
+        holdout_indices = np.flatnonzero(~np.isin(groups, list(train_groups)))
+        if len(holdout_indices) > eval_sample:
+            holdout_indices = rng.choice(holdout_indices, eval_sample, replace=False)
+        holdout_margin = centroid_margin(
+            values[holdout_indices], model.cluster_centers_, labels[holdout_indices]
+        ) if len(holdout_indices) else margin
+        entropy, min_fraction = cluster_entropy(labels, cluster_count)
+        row = {
+            "id": hashlib.sha1(
+                f"cluster:{task['namespace']}:{representation}:{dimension}:"
+                f"{geometry}:{cluster_count}:{seed_index}".encode()
+            ).hexdigest()[:20],
+            "stage": "component-cluster",
+            "representation": representation,
+            "pcaDimensions": dimension,
+            "geometry": geometry,
+            "clusterCount": cluster_count,
+            "seed": seed_index,
+            "fitHooksFraction": .8,
+            "fitInstances": int(len(train_indices)),
+            "margin": margin,
+            "heldoutHookMargin": holdout_margin,
+            "fitExcludedHookMargin": holdout_margin,
+            "fitExcludedMetricContract": (
+                "hooks excluded from K-means fitting but not from the full-corpus PCA; "
+                "descriptive, not independent held-out validation"
+            ),
+            "entropy": entropy,
+            "minimumClusterFraction": min_fraction,
+            "outcomesUsed": False,
+        }
+        if task["warm_start"]:
+            row["initialization"] = (f"warm-start from k={warm_from} centroids"
+                                     if warm[seed_index] is not None else "k-means++")
+        rows_for_group.append(row)
+
+    if not rows_for_group:
+        return None
+    stability = 1.0
+    if len(labels_by_seed) > 1:
+        stability_indices = np.arange(len(groups))
+        stability_sample = task["stability_sample"]
+        if stability_sample and len(groups) > stability_sample:
+            stability_indices = balanced_sample(
+                groups, stability_sample,
+                np.random.RandomState(6007 + dimension * 43 + cluster_count * 11),
+            )
+        agreements = []
+        for left in range(len(labels_by_seed)):
+            for right in range(left + 1, len(labels_by_seed)):
+                agreements.append(adjusted_rand_score(
+                    labels_by_seed[left][stability_indices],
+                    labels_by_seed[right][stability_indices],
+                ))
+        stability = float(np.mean(agreements)) if agreements else 1.0
+
+    rng = np.random.RandomState(991 + dimension * 31 + cluster_count * 7)
+    null_values = _null_matrix(values, rng)
+    null_indices = balanced_sample(groups, min(fit_sample, len(values)), rng)
+    null_model = MiniBatchKMeans(
+        n_clusters=cluster_count,
+        random_state=991,
+        n_init=1,
+        max_iter=30,
+        batch_size=min(512, max(64, len(null_indices))),
+    ).fit(null_values[null_indices])
+    null_eval = balanced_sample(groups, min(eval_sample, len(values)), rng)
+    null_labels = null_model.predict(null_values[null_eval])
+    null_margin = centroid_margin(null_values[null_eval], null_model.cluster_centers_, null_labels)
+
+    for row in rows_for_group:
+        row["seedStabilityARI"] = stability
+        row["permutedNullMargin"] = null_margin
+        row["marginAboveNull"] = row["margin"] - null_margin
+        row["qualityForBrowsing"] = (
+            max(0.0, row["marginAboveNull"]) *
+            max(0.0, row["fitExcludedHookMargin"]) *
+            max(0.0, stability) *
+            max(0.0, row["entropy"])
+        )
+    best_seed = max(range(len(rows_for_group)),
+                    key=lambda index: rows_for_group[index]["qualityForBrowsing"])
+    best_labels = labels_by_seed[best_seed]
+    if nuisance:
+        length_nmi = normalized_mutual_information(
+            best_labels, nuisance.get("length", np.zeros(len(best_labels), int))
+        )
+        position_nmi = normalized_mutual_information(
+            best_labels, nuisance.get("position", np.zeros(len(best_labels), int))
+        )
+        generality = cross_group_generality(best_labels, groups)
+        row = rows_for_group[best_seed]
+        row["lengthNMI"] = length_nmi
+        row["positionNMI"] = position_nmi
+        row["crossHookGenerality"] = generality
+        row["lengthIndependence"] = 1.0 - length_nmi
+        row["positionIndependence"] = 1.0 - position_nmi
+        row["qualityForBrowsing"] *= (
+            max(0.0, generality) ** .5 *
+            max(0.0, 1.0 - length_nmi) *
+            max(0.0, 1.0 - position_nmi) ** .5
+        )
+    return {"rows": rows_for_group, "best": best_seed,
+            "labels": best_labels.astype(np.int16), "centers": centers}
+
+
+def run_cluster_chain(task: dict) -> list[dict | None]:
+    """Every cluster count of one (representation, dimension, geometry) chain, in grid order.
+
+    Cells already on disk under task["cell_dir"] are reused, so a resumed sweep
+    only fits what is missing; with warm starts each k is initialized from the
+    previous k's centroids (stored with the cell) instead of a cold k-means++.
+    """
+    shared = _shared_arrays(task["shared"])
+    scores = shared[task["scores"]]
+    groups = shared["groups"]
+    nuisance = {name[len("nuisance-"):]: values for name, values in shared.items()
+                if name.startswith("nuisance-")} or None
+    unique_groups = np.asarray(sorted(set(groups)))
+    dimension = task["dimension"]
+    values = transform_geometry(np.asarray(scores[:, :dimension]), task["geometry"])
+    results = []
+    warm = [None] * task["seeds"]
+    warm_from = None
+    for cluster_count in task["cluster_grid"]:
+        path = None
+        result = None
+        if task["cell_dir"]:
+            cell_key = hashlib.sha1(
+                f"{task['fingerprint']}:{dimension}:{task['geometry']}:{cluster_count}".encode()
+            ).hexdigest()[:24]
+            path = os.path.join(task["cell_dir"], f"{cell_key}.npz")
+            result = _load_cell(path)
+        if result is None:
+            result = _fit_cell(values, groups, unique_groups, nuisance, task, dimension,
+                               cluster_count, warm, warm_from)
+            if path and result is not None:
+                centers = {f"centers{seed}": value for seed, value in enumerate(result["centers"])
+                           if value is not None}
+                _save_atomic(path, rows=np.asarray(json.dumps(result["rows"])),
+                             best=np.asarray(result["best"]), labels=result["labels"],
+                             seeds=np.asarray(task["seeds"]), **centers)
+        results.append(result)
+        if task["warm_start"] and result is not None:
+            warm = [center if center is not None else previous
+                    for center, previous in zip(result["centers"], warm)]
+            warm_from = cluster_count
+    return results
+
+
 def run_cluster_sweep(representations: dict[str, np.ndarray | MatrixSource], groups: np.ndarray,
                       max_dimension: int = 12, max_clusters: int = 28,
                       seeds: int = 3, fit_sample: int = 2048,
@@ -261,10 +516,19 @@ def run_cluster_sweep(representations: dict[str, np.ndarray | MatrixSource], gro
                       cluster_counts: list[int] | None = None,
                       nuisance: dict[str, np.ndarray] | None = None,
                       experiment_namespace: str = "candidate",
-                      stability_sample: int = 0) -> AtlasSweep:
-    from sklearn.cluster import MiniBatchKMeans
+                      stability_sample: int = 0, workers: int = 1,
+                      cell_dir: str | os.PathLike | None = None,
+                      warm_start: bool = False) -> AtlasSweep:
+    """Sweep dimension x geometry x cluster count x seed for every representation.
+
+    Each (representation, dimension, geometry) chain walks its cluster counts
+    in order and runs as one task; with workers > 1 the chains run in a
+    process pool that maps each representation's PCA scores from one shared
+    .npy instead of pickling them per task. cell_dir makes the sweep
+    resumable: every finished cell is written there and reused on rerun.
+    warm_start seeds each k from the previous k's centroids.
+    """
     from sklearn.decomposition import PCA
-    from sklearn.metrics import adjusted_rand_score
 
     groups = np.asarray(groups).astype(str)
     experiments = []
@@ -282,11 +546,26 @@ def run_cluster_sweep(representations: dict[str, np.ndarray | MatrixSource], gro
                         if cluster_counts else list(range(2, cluster_cap + 1)))
         configuration_total += len(dimension_grid) * len(GEOMETRIES) * len(cluster_grid)
     configuration_complete = 0
-    unique_groups = np.asarray(sorted(set(groups)))
     if progress:
         progress({"configurationsComplete": 0, "configurationsTotal": configuration_total,
                   "experimentsComplete": 0})
 
+    pooled = workers > 1
+    scratch = None
+    if cell_dir:
+        cell_dir = os.fspath(cell_dir)
+        os.makedirs(cell_dir, exist_ok=True)
+    if pooled:
+        scratch = tempfile.mkdtemp(prefix="atlas-shared-", dir=cell_dir)
+        shared = scratch
+        np.save(os.path.join(scratch, "groups.npy"), groups)
+        for name, values in (nuisance or {}).items():
+            np.save(os.path.join(scratch, f"nuisance-{name}.npy"), np.asarray(values))
+    else:
+        shared = {"groups": groups, **{f"nuisance-{name}": np.asarray(values)
+                                       for name, values in (nuisance or {}).items()}}
+    base_fingerprint = _digest(groups, *[np.asarray(values) for _, values in sorted((nuisance or {}).items())])
+    tasks = []
     for representation, source in representations.items():
         matrix = source.load() if isinstance(source, MatrixSource) else source
         matrix = row_unit(matrix)
@@ -304,155 +583,76 @@ def run_cluster_sweep(representations: dict[str, np.ndarray | MatrixSource], gro
             "independentHoldout": False,
         }
         cluster_cap = min(max_clusters, max(2, int(math.sqrt(len(matrix)))))
+        del matrix
 
         dimension_grid = ([value for value in dimensions if 2 <= value <= rank_cap]
                           if dimensions else list(range(2, rank_cap + 1)))
         cluster_grid = ([value for value in cluster_counts if 2 <= value <= cluster_cap]
                         if cluster_counts else list(range(2, cluster_cap + 1)))
-
+        scores_name = f"scores-{len(tasks)}-{representation}"
+        if pooled:
+            np.save(os.path.join(scratch, f"{scores_name}.npy"), scores)
+        else:
+            shared[scores_name] = scores
+        fingerprint = hashlib.sha1(json.dumps([
+            ATLAS_CELL_VERSION, experiment_namespace, representation, base_fingerprint, _digest(scores),
+            seeds, fit_sample, eval_sample, stability_sample,
+            cluster_grid if warm_start else None,
+        ]).encode()).hexdigest()
         for dimension in dimension_grid:
-            base = scores[:, :dimension]
             for geometry in GEOMETRIES:
-                values = transform_geometry(base, geometry)
-                for cluster_count in cluster_grid:
-                    labels_by_seed = []
-                    rows_for_group = []
-                    for seed_index in range(seeds):
-                        rng = np.random.RandomState(1729 + seed_index * 1009 + dimension * 37 + cluster_count)
-                        train_count = max(2, int(round(len(unique_groups) * .8)))
-                        train_groups = set(rng.permutation(unique_groups)[:train_count].tolist())
-                        train_indices = balanced_sample(groups, min(fit_sample, len(values)), rng, train_groups)
-                        if len(train_indices) < cluster_count:
-                            continue
-                        model = MiniBatchKMeans(
-                            n_clusters=cluster_count,
-                            random_state=seed_index,
-                            n_init=1,
-                            max_iter=30,
-                            batch_size=min(512, max(64, len(train_indices))),
-                            reassignment_ratio=.01,
-                        ).fit(values[train_indices])
-                        labels = model.predict(values)
-                        labels_by_seed.append(labels)
-                        eval_indices = balanced_sample(groups, min(eval_sample, len(values)), rng)
-                        eval_labels = labels[eval_indices]
-                        margin = centroid_margin(values[eval_indices], model.cluster_centers_, eval_labels)
-                        holdout_indices = np.flatnonzero(~np.isin(groups, list(train_groups)))
-                        if len(holdout_indices) > eval_sample:
-                            holdout_indices = rng.choice(holdout_indices, eval_sample, replace=False)
-                        holdout_margin = centroid_margin(
-                            values[holdout_indices], model.cluster_centers_, labels[holdout_indices]
-                        ) if len(holdout_indices) else margin
-                        entropy, min_fraction = cluster_entropy(labels, cluster_count)
-                        row = {
-                            "id": hashlib.sha1(
-                                f"cluster:{experiment_namespace}:{representation}:{dimension}:"
-                                f"{geometry}:{cluster_count}:{seed_index}".encode()
-                            ).hexdigest()[:20],
-                            "stage": "component-cluster",
-                            "representation": representation,
-                            "pcaDimensions": dimension,
-                            "geometry": geometry,
-                            "clusterCount": cluster_count,
-                            "seed": seed_index,
-                            "fitHooksFraction": .8,
-                            "fitInstances": int(len(train_indices)),
-                            "margin": margin,
-                            "heldoutHookMargin": holdout_margin,
-                            "fitExcludedHookMargin": holdout_margin,
-                            "fitExcludedMetricContract": (
-                                "hooks excluded from K-means fitting but not from the full-corpus PCA; "
-                                "descriptive, not independent held-out validation"
-                            ),
-                            "entropy": entropy,
-                            "minimumClusterFraction": min_fraction,
-                            "outcomesUsed": False,
-                        }
-                        rows_for_group.append(row)
-
-                    if not rows_for_group:
-                        continue
-                    stability = 1.0
-                    if len(labels_by_seed) > 1:
-                        stability_indices = np.arange(len(groups))
-                        if stability_sample and len(groups) > stability_sample:
-                            stability_indices = balanced_sample(
-                                groups, stability_sample,
-                                np.random.RandomState(6007 + dimension * 43 + cluster_count * 11),
-                            )
-                        agreements = []
-                        for left in range(len(labels_by_seed)):
-                            for right in range(left + 1, len(labels_by_seed)):
-                                agreements.append(adjusted_rand_score(
-                                    labels_by_seed[left][stability_indices],
-                                    labels_by_seed[right][stability_indices],
-                                ))
-                        stability = float(np.mean(agreements)) if agreements else 1.0
-
-                    rng = np.random.RandomState(991 + dimension * 31 + cluster_count * 7)
-                    null_values = _null_matrix(values, rng)
-                    null_indices = balanced_sample(groups, min(fit_sample, len(values)), rng)
-                    null_model = MiniBatchKMeans(
-                        n_clusters=cluster_count,
-                        random_state=991,
-                        n_init=1,
-                        max_iter=30,
-                        batch_size=min(512, max(64, len(null_indices))),
-                    ).fit(null_values[null_indices])
-                    null_eval = balanced_sample(groups, min(eval_sample, len(values)), rng)
-                    null_labels = null_model.predict(null_values[null_eval])
-                    null_margin = centroid_margin(null_values[null_eval], null_model.cluster_centers_, null_labels)
-
-                    for row in rows_for_group:
-                        row["seedStabilityARI"] = stability
-                        row["permutedNullMargin"] = null_margin
-                        row["marginAboveNull"] = row["margin"] - null_margin
-                        row["qualityForBrowsing"] = (
-                            max(0.0, row["marginAboveNull"]) *
-                            max(0.0, row["fitExcludedHookMargin"]) *
-                            max(0.0, stability) *
-                            max(0.0, row["entropy"])
-                        )
-                        experiments.append(row)
-                    best_seed = max(range(len(rows_for_group)),
-                                    key=lambda index: rows_for_group[index]["qualityForBrowsing"])
-                    best_labels = labels_by_seed[best_seed]
-                    if nuisance:
-                        length_nmi = normalized_mutual_information(
-                            best_labels, nuisance.get("length", np.zeros(len(best_labels), int))
-                        )
-                        position_nmi = normalized_mutual_information(
-                            best_labels, nuisance.get("position", np.zeros(len(best_labels), int))
-                        )
-                        generality = cross_group_generality(best_labels, groups)
-                        row = rows_for_group[best_seed]
-                        row["lengthNMI"] = length_nmi
-                        row["positionNMI"] = position_nmi
-                        row["crossHookGenerality"] = generality
-                        row["lengthIndependence"] = 1.0 - length_nmi
-                        row["positionIndependence"] = 1.0 - position_nmi
-                        row["qualityForBrowsing"] *= (
-                            max(0.0, generality) ** .5 *
-                            max(0.0, 1.0 - length_nmi) *
-                            max(0.0, 1.0 - position_nmi) ** .5
-                        )
-                    map_candidates.append({
-                        **rows_for_group[best_seed],
-                        "labels": best_labels.astype(np.int16),
-                    })
-                    configuration_complete += 1
-                    if progress:
-                        progress({
-                            "configurationsComplete": configuration_complete,
-                            "configurationsTotal": configuration_total,
-                            "experimentsComplete": len(experiments),
-                            "representation": representation,
-                            "pcaDimensions": dimension,
-                            "geometry": geometry,
-                            "clusterCount": cluster_count,
-                        })
-
-        del matrix
+                tasks.append({
+                    "shared": shared, "scores": scores_name, "representation": representation,
+                    "dimension": dimension, "geometry": geometry, "cluster_grid": cluster_grid,
+                    "seeds": seeds, "fit_sample": fit_sample, "eval_sample": eval_sample,
+                    "stability_sample": stability_sample, "namespace": experiment_namespace,
+                    "warm_start": warm_start, "cell_dir": cell_dir, "fingerprint": fingerprint,
+                })
+
+    chain_results = [None] * len(tasks)
+
+    experiments_complete = 0
+
+    def finished(index: int, results: list[dict | None]) -> None:
+        nonlocal configuration_complete, experiments_complete
+        chain_results[index] = results
+        task = tasks[index]
+        for cluster_count, result in zip(task["cluster_grid"], results):
+            if result is None:
+                continue
+            configuration_complete += 1
+            experiments_complete += len(result["rows"])
+            if progress:
+                progress({
+                    "configurationsComplete": configuration_complete,
+                    "configurationsTotal": configuration_total,
+                    "experimentsComplete": experiments_complete,
+                    "representation": task["representation"],
+                    "pcaDimensions": task["dimension"],
+                    "geometry": task["geometry"],
+                    "clusterCount": cluster_count,
+                })
+
+    try:
+        if pooled:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = {executor.submit(run_cluster_chain, task): index
+                           for index, task in enumerate(tasks)}
+                for future in as_completed(futures):
+                    finished(futures[future], future.result())
+        else:
+            for index, task in enumerate(tasks):
+                finished(index, run_cluster_chain(task))
+    finally:
+        if scratch:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+    for results in chain_results:
+        for result in results:
+            if result is None:
+                continue
+            experiments.extend(result["rows"])
+            map_candidates.append({**result["rows"][result["best"]], "labels": result["labels"]})
 
     pareto_fields = ["marginAboveNull", "fitExcludedHookMargin", "seedStabilityARI", "entropy"]
     if nuisance:
@@ -2,14 +2,16 @@
 
 from __future__ import annotations
 
+import base64
 import gzip
 import hashlib
 import io
 import json
 import math
 import os
-import re
 import sqlite3
+import sys
+import tempfile
 import threading
 import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
@@ -17,17 +19,22 @@ from pathlib import Path
 
 import boto3
 import numpy as np
-import requests
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+import embedding_gateway  # noqa: E402
 
 
 MODEL = "gemini-embedding-2"
 DIMENSIONS = 1536
-API_ROOT = "https://generativelanguage.googleapis.com/v1beta/models"
 R2_PREFIX = "shorts/promise-lab-v1"
+SHARED_CACHE_PATH = os.environ.get("GEMINI_EMBED_CACHE") or os.path.join(
+    tempfile.gettempdir(), "gemini-embed-cache.sqlite3")
+SHARED_CACHE_MAX_BYTES = int(float(os.environ.get("GEMINI_EMBED_CACHE_MAX_MB", "4096")) * 2 ** 20)
+# Eviction trims to this share of max_bytes, so the row count is re-read only every ~10% of writes.
+EVICT_LOW_WATER = 0.9
 
-_EMBED_RATE_LOCK = threading.Lock()
-_EMBED_NEXT_SLOT = 0.0
-_EMBED_BLOCKED_UNTIL = 0.0
+_SHARED_CACHES: dict = {}
+_SHARED_CACHES_LOCK = threading.Lock()
 
 
 class EmbeddingTransportError(RuntimeError):
@@ -37,60 +44,6 @@ class EmbeddingTransportError(RuntimeError):
         self.retryable = bool(retryable)
 
 
-def _duration_seconds(value) -> float | None:
-    match = re.search(r"([0-9]+(?:\.[0-9]+)?)\s*([sm]?)", str(value or ""), re.I)
-    if not match:
-        return None
-    amount = float(match.group(1))
-    return amount * (60.0 if match.group(2).lower() == "m" else 1.0)
-
-
-def _retry_delay_seconds(response, attempt: int) -> float:
-    header = _duration_seconds((getattr(response, "headers", {}) or {}).get("retry-after"))
-    if header is not None:
-        return max(0.25, header)
-    try:
-        payload = response.json()
-    except Exception:
-        payload = {}
-    details = ((payload.get("error") or {}).get("details") or []) if isinstance(payload, dict) else []
-    for detail in details:
-        if isinstance(detail, dict) and detail.get("retryDelay") is not None:
-            parsed = _duration_seconds(detail.get("retryDelay"))
-            if parsed is not None:
-                return max(0.25, parsed)
-    message = str(((payload.get("error") or {}).get("message") or "") if isinstance(payload, dict) else "")
-    match = re.search(r"retry\s+in\s+([0-9]+(?:\.[0-9]+)?)\s*s", message, re.I)
-    if match:
-        return max(0.25, float(match.group(1)))
-    return min(60.0, 1.5 * (2 ** max(0, int(attempt))))
-
-
-def _wait_for_embedding_quota(request_count: int) -> None:
-    """Serialize content requests below the project RPM instead of bursting into 429s."""
-    global _EMBED_NEXT_SLOT
-    rpm = max(1.0, float(os.environ.get("PROMISE_LAB_EMBED_RPM", "4500")))
-    spacing = 60.0 * max(1, int(request_count)) / rpm
-    while True:
-        with _EMBED_RATE_LOCK:
-            now = time.monotonic()
-            ready = max(_EMBED_NEXT_SLOT, _EMBED_BLOCKED_UNTIL)
-            if now >= ready:
-                _EMBED_NEXT_SLOT = now + spacing
-                return
-            wait = ready - now
-        time.sleep(wait)
-
-
-def _defer_embedding_quota(seconds: float) -> None:
-    global _EMBED_BLOCKED_UNTIL
-    with _EMBED_RATE_LOCK:
-        _EMBED_BLOCKED_UNTIL = max(
-            _EMBED_BLOCKED_UNTIL,
-            time.monotonic() + max(0.25, float(seconds)),
-        )
-
-
 def json_ready(value):
     if isinstance(value, dict):
         return {str(key): json_ready(item) for key, item in value.items()}
@@ -126,9 +79,41 @@ def vector_key(text: str, model: str = MODEL, dimensions: int = DIMENSIONS) -> s
     return hashlib.sha256(f"{model}\0{dimensions}\0{text}".encode("utf-8")).hexdigest()
 
 
+def content_address(parts: list[dict], model: str = MODEL, dimensions: int = DIMENSIONS,
+                    canonicalize=None) -> tuple[str, str, list[dict]]:
+    """(key, descriptor, parts to send) for a multimodal content.
+
+    Image parts are addressed by the sha256 of their (optionally canonicalized)
+    bytes and the canonical bytes are what gets sent, so a key always names the
+    exact payload its vector came from. A lone text part keys exactly like
+    vector_key(), sharing rows with the text cache.
+    """
+    if len(parts) == 1 and set(parts[0]) == {"text"}:
+        text = str(parts[0]["text"])
+        return vector_key(text, model, dimensions), text, [{"text": text}]
+    labels, sent = [], []
+    for part in parts:
+        if "inlineData" in part:
+            mime = part["inlineData"].get("mimeType", "")
+            raw = base64.b64decode(part["inlineData"]["data"])
+            if canonicalize is not None:
+                canonical = canonicalize(raw)
+                if canonical != raw:
+                    part = {"inlineData": {"mimeType": mime, "data": base64.b64encode(canonical).decode()}}
+                    raw = canonical
+            labels.append(["image", mime, hashlib.sha256(raw).hexdigest()])
+        else:
+            labels.append(["text", str(part.get("text", ""))])
+        sent.append(part)
+    descriptor = json.dumps(labels, ensure_ascii=False, separators=(",", ":"))
+    key = hashlib.sha256(f"{model}\0{dimensions}\0parts\0{descriptor}".encode("utf-8")).hexdigest()
+    return key, descriptor, sent
+
+
 class EmbeddingStore:
     def __init__(self, path: str | Path, model: str = MODEL, dimensions: int = DIMENSIONS,
-                 batch_size: int | None = None, workers: int | None = None, on_retry=None):
+                 batch_size: int | None = None, workers: int | None = None, on_retry=None,
+                 max_bytes: int | None = None, canonicalize=None):
         self.path = Path(path)
         self.path.parent.mkdir(parents=True, exist_ok=True)
         self.model = model
@@ -136,9 +121,18 @@ class EmbeddingStore:
         self.batch_size = int(batch_size or os.environ.get("PROMISE_LAB_BATCH_SIZE", "100"))
         self.workers = int(workers or os.environ.get("PROMISE_LAB_EMBED_WORKERS", "8"))
         self.on_retry = on_retry
+        # 0 keeps every vector; otherwise least-recently-read rows are evicted past this size.
+        self.max_bytes = int(max_bytes if max_bytes is not None else 0)
+        self.canonicalize = canonicalize
+        # Upper bound on stored rows, counted once and advanced per write (replaced keys overcount).
+        self._rows: int | None = None
         self.env = load_env()
         self.api_key = self.env.get("GEMINI_API_KEY", "")
         self._lock = threading.Lock()
+        # Texts some thread is embedding right now, so concurrent callers wait instead of paying twice.
+        self._inflight: dict[str, threading.Event] = {}
+        self._inflight_lock = threading.Lock()
+        self.usage = new_usage()
         self.db = sqlite3.connect(self.path, timeout=120, check_same_thread=False)
         self.db.execute("PRAGMA journal_mode=WAL")
         self.db.execute("PRAGMA synchronous=NORMAL")
@@ -152,6 +146,11 @@ class EmbeddingStore:
               created_at REAL NOT NULL
             )
         """)
+        columns = {row[1] for row in self.db.execute("PRAGMA table_info(vectors)")}
+        if "last_used" not in columns:
+            self.db.execute("ALTER TABLE vectors ADD COLUMN last_used REAL NOT NULL DEFAULT 0")
+            self.db.execute("UPDATE vectors SET last_used = created_at")
+        self.db.execute("CREATE INDEX IF NOT EXISTS vectors_last_used ON vectors(last_used)")
         self.db.commit()
 
     def _notify_retry(self, status: int, message: str, delay: float, attempt: int) -> None:
@@ -190,10 +189,11 @@ class EmbeddingStore:
             self.db.execute("DELETE FROM vectors")
             self.db.commit()
             self.db.execute("VACUUM")
+            self._rows = 0
 
-    def _cached(self, texts: list[str]) -> dict[str, np.ndarray]:
-        keys = [vector_key(text, self.model, self.dimensions) for text in texts]
-        found: dict[str, np.ndarray] = {}
+    def _read(self, keys: list[str]) -> dict[str, tuple[str, np.ndarray]]:
+        """key -> (text, vector) for stored keys, marking each hit as recently used."""
+        found: dict[str, tuple[str, np.ndarray]] = {}
         with self._lock:
             for offset in range(0, len(keys), 400):
                 chunk = keys[offset:offset + 400]
@@ -204,90 +204,218 @@ class EmbeddingStore:
                     f"SELECT key, text, vector FROM vectors WHERE key IN ({q})",
                     chunk,
                 ).fetchall()
-                for _, text, blob in rows:
+                for key, text, blob in rows:
                     vec = np.frombuffer(blob, dtype=np.float32).copy()
                     if vec.size == self.dimensions:
-                        found[text] = vec
+                        found[key] = (text, vec)
+            if found and self.max_bytes:
+                now = time.time()
+                self.db.executemany(
+                    "UPDATE vectors SET last_used=? WHERE key=?",
+                    [(now, key) for key in found],
+                )
+                self.db.commit()
         return found
 
+    def _cached(self, texts: list[str]) -> dict[str, np.ndarray]:
+        keys = [vector_key(text, self.model, self.dimensions) for text in texts]
+        return {text: vec for text, vec in self._read(keys).values()}
+
     def _post_batch(self, texts: list[str]) -> list[np.ndarray]:
         if not self.api_key:
             raise EmbeddingTransportError(
                 "GEMINI_API_KEY is not configured",
                 retryable=False,
             )
-        url = f"{API_ROOT}/{self.model}:batchEmbedContents"
-        body = {
-            "requests": [
-                {
-                    "model": f"models/{self.model}",
-                    "content": {"parts": [{"text": text}]},
-                    "outputDimensionality": self.dimensions,
-                }
-                for text in texts
-            ]
-        }
-        last_error = ""
-        last_status = 0
-        retryable = True
+        # The shared gateway packs these texts (and any concurrent caller's) into
+        # batchEmbedContents calls under the machine-wide quota, retrying per text.
         attempts = max(8, int(os.environ.get("PROMISE_LAB_EMBED_RETRIES", "48")))
-        for attempt in range(attempts):
-            _wait_for_embedding_quota(len(texts))
-            response_status = 0
-            try:
-                response = requests.post(
-                    url,
-                    headers={"x-goog-api-key": self.api_key, "Content-Type": "application/json"},
-                    json=body,
-                    timeout=120,
-                )
-                response_status = int(response.status_code)
-                last_status = response_status
-                if response.status_code == 200:
-                    payload = response.json().get("embeddings") or []
-                    vectors = [np.asarray(item.get("values") or [], np.float32) for item in payload]
-                    if len(vectors) != len(texts) or any(vec.size != self.dimensions for vec in vectors):
-                        raise RuntimeError("Gemini batch response shape did not match the request")
-                    return vectors
-                last_error = f"HTTP {response.status_code}: {response.text[:300]}"
-                if response.status_code not in (408, 429, 500, 502, 503, 504):
-                    retryable = False
-                    break
-                delay = _retry_delay_seconds(response, attempt)
-                self._notify_retry(response.status_code, response.text, delay, attempt + 1)
-                if response.status_code == 429:
-                    _defer_embedding_quota(delay + 1.0)
-                    continue
-            except Exception as exc:
-                last_error = str(exc)
-                delay = min(60.0, 1.5 * (2 ** attempt))
-                self._notify_retry(response_status, last_error, delay, attempt + 1)
-            time.sleep(delay)
-        raise EmbeddingTransportError(
-            f"Gemini batch embedding failed: {last_error}",
-            status=last_status,
-            retryable=retryable,
-        )
+        try:
+            return embedding_gateway.embed_many(
+                [[{"text": text}] for text in texts],
+                self.api_key,
+                self.dimensions,
+                self.model,
+                tries=attempts,
+                timeout=120,
+                on_retry=self._gateway_retry,
+            )
+        except embedding_gateway.EmbeddingGatewayError as exc:
+            raise EmbeddingTransportError(
+                f"Gemini batch embedding failed: {exc}",
+                status=exc.status,
+                retryable=exc.retryable,
+            ) from exc
+
+    def _gateway_retry(self, event: dict) -> None:
+        self._notify_retry(event["status"], event["message"], event["delay"], event["attempt"])
 
     def _save(self, texts: list[str], vectors: list[np.ndarray]) -> None:
+        keys = [vector_key(text, self.model, self.dimensions) for text in texts]
+        self._write(keys, texts, vectors)
+
+    def _write(self, keys: list[str], texts: list[str], vectors: list[np.ndarray]) -> None:
         now = time.time()
         rows = []
-        for text, vector in zip(texts, vectors):
+        for key, text, vector in zip(keys, texts, vectors):
             arr = np.asarray(vector, np.float32)
-            rows.append((vector_key(text, self.model, self.dimensions), self.model,
-                         self.dimensions, text, arr.tobytes(), now))
+            rows.append((key, self.model, self.dimensions, text, arr.tobytes(), now, now))
         with self._lock:
             self.db.executemany(
-                "INSERT OR REPLACE INTO vectors(key,model,dimensions,text,vector,created_at) VALUES(?,?,?,?,?,?)",
+                "INSERT OR REPLACE INTO vectors(key,model,dimensions,text,vector,created_at,last_used)"
+                " VALUES(?,?,?,?,?,?,?)",
                 rows,
             )
+            if self.max_bytes:
+                if self._rows is None:
+                    self._rows = int(self.db.execute("SELECT COUNT(*) FROM vectors").fetchone()[0])
+                self._rows += len(rows)
+                if self._rows > self._capacity():
+                    self._evict()
             self.db.commit()
 
-    def embed_many(self, texts: list[str]) -> dict[str, np.ndarray]:
+    def _capacity(self) -> int:
+        return max(1, self.max_bytes // (4 * self.dimensions))
+
+    def _evict(self) -> None:
+        """Drop least-recently-read rows down to the low-water mark once over max_bytes (caller holds _lock)."""
+        count = int(self.db.execute("SELECT COUNT(*) FROM vectors").fetchone()[0])
+        keep = self._capacity()
+        self._rows = count
+        if count > keep:
+            low = max(1, int(keep * EVICT_LOW_WATER))
+            self.db.execute(
+                "DELETE FROM vectors WHERE key IN (SELECT key FROM vectors ORDER BY last_used LIMIT ?)",
+                (count - low,),
+            )
+            self._rows = low
+
+    def canonical_parts(self, parts: list[dict]) -> list[dict]:
+        """The parts to send for a content: image bytes canonicalized exactly as they are keyed."""
+        return content_address(parts, self.model, self.dimensions, self.canonicalize)[2]
+
+    def get_many(self, contents: list[list[dict]]) -> list[np.ndarray | None]:
+        """Bulk cache read for multimodal contents, None where a vector is not stored."""
+        keys = [content_address(parts, self.model, self.dimensions, self.canonicalize)[0]
+                for parts in contents]
+        found = self._read(list(dict.fromkeys(keys)))
+        return [found[key][1] if key in found else None for key in keys]
+
+    def put_many(self, contents: list[list[dict]], vectors: list[np.ndarray]) -> None:
+        addressed = [content_address(parts, self.model, self.dimensions, self.canonicalize)
+                     for parts in contents]
+        self._write([key for key, _, _ in addressed], [text for _, text, _ in addressed], vectors)
+
+    def embed_contents(self, contents: list[list[dict]], tries: int = 4,
+                       timeout: float = 60) -> list[np.ndarray]:
+        """Vectors for multimodal contents: stored ones from disk, the rest through the gateway."""
+        addressed = [content_address(parts, self.model, self.dimensions, self.canonicalize)
+                     for parts in contents]
+        found = {key: vec for key, (_, vec) in self._read([key for key, _, _ in addressed]).items()}
+        pending: dict[str, tuple[str, str, list[dict]]] = {}
+        for key, text, sent in addressed:
+            if key not in found:
+                pending.setdefault(key, (key, text, sent))
+        missing = list(pending.values())
+        if missing:
+            if not self.api_key:
+                raise EmbeddingTransportError("GEMINI_API_KEY is not configured", retryable=False)
+            try:
+                vectors = embedding_gateway.embed_many(
+                    [sent for _, _, sent in missing],
+                    self.api_key,
+                    self.dimensions,
+                    self.model,
+                    tries=tries,
+                    timeout=timeout,
+                    on_retry=self._gateway_retry,
+                )
+            except embedding_gateway.EmbeddingGatewayError as exc:
+                raise EmbeddingTransportError(
+                    f"Gemini batch embedding failed: {exc}",
+                    status=exc.status,
+                    retryable=exc.retryable,
+                ) from exc
+            self._write([key for key, _, _ in missing], [text for _, text, _ in missing], vectors)
+            found.update((key, vec) for (key, _, _), vec in zip(missing, vectors))
+        return [found[key].copy() for key, _, _ in addressed]
+
+    def get_by_keys(self, keys: list[str]) -> dict[str, np.ndarray]:
+        """Bulk lookup by content hash (vector_key / content_address keys): key -> vector for stored keys."""
+        return {key: vec for key, (_, vec) in self._read(list(dict.fromkeys(keys))).items()}
+
+    def import_sqlite(self, path: str | Path) -> int:
+        """Copy another store file's vectors for this model and width into this one; returns rows added.
+
+        Keys are content hashes, so rows already present are kept and the copy is
+        idempotent. Older files without last_used are accepted.
+        """
+        with self._lock:
+            self.db.execute("ATTACH DATABASE ? AS legacy", (str(path),))
+            try:
+                tables = {row[0] for row in self.db.execute(
+                    "SELECT name FROM legacy.sqlite_master WHERE type='table'")}
+                if "vectors" not in tables:
+                    return 0
+                before = self.db.total_changes
+                self.db.execute(
+                    "INSERT OR IGNORE INTO vectors(key,model,dimensions,text,vector,created_at,last_used)"
+                    " SELECT key,model,dimensions,text,vector,created_at,created_at FROM legacy.vectors"
+                    " WHERE model=? AND dimensions=? AND length(vector)=?",
+                    (self.model, self.dimensions, 4 * self.dimensions),
+                )
+                self.db.commit()
+                return self.db.total_changes - before
+            finally:
+                self.db.execute("DETACH DATABASE legacy")
+
+    def _count_usage(self, usage: dict | None, **counts: int) -> None:
+        with self._inflight_lock:
+            for target in (self.usage, usage):
+                if target is not None:
+                    for name, value in counts.items():
+                        target[name] = target.get(name, 0) + int(value)
+
+    def embed_many(self, texts: list[str], usage: dict | None = None) -> dict[str, np.ndarray]:
+        """text -> vector, embedding only texts no store (or concurrent caller) has yet.
+
+        `usage` (see new_usage) and self.usage count distinct texts looked up,
+        read from disk, received from a concurrent caller, and embedded.
+        """
         ordered = list(dict.fromkeys(str(text) for text in texts if str(text) != ""))
         found = self._cached(ordered)
+        hits = len(found)
         missing = [text for text in ordered if text not in found]
-        batches = [missing[i:i + self.batch_size] for i in range(0, len(missing), self.batch_size)]
+        claimed, waiting = [], []
+        with self._inflight_lock:
+            for text in missing:
+                if text in self._inflight:
+                    waiting.append((text, self._inflight[text]))
+                else:
+                    self._inflight[text] = threading.Event()
+                    claimed.append(text)
+        try:
+            self._embed_claimed(claimed, found)
+        finally:
+            with self._inflight_lock:
+                for text in claimed:
+                    self._inflight.pop(text).set()
+        shared = 0
+        if waiting:
+            for _, event in waiting:
+                event.wait()
+            received = self._cached([text for text, _ in waiting])
+            shared = len(received)
+            found.update(received)
+            # The other caller failed; embed what it left behind.
+            orphaned = [text for text, _ in waiting if text not in found]
+            self._embed_claimed(orphaned, found)
+            claimed.extend(orphaned)
+        self._count_usage(usage, lookups=len(ordered), hits=hits, shared=shared, embedded=len(claimed))
+        return found
+
+    def _embed_claimed(self, texts: list[str], found: dict[str, np.ndarray]) -> None:
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
         if batches:
             with ThreadPoolExecutor(max_workers=max(1, self.workers)) as pool:
                 jobs = {pool.submit(self._post_batch, batch): batch for batch in batches}
@@ -296,7 +424,44 @@ class EmbeddingStore:
                     vectors = job.result()
                     self._save(batch, vectors)
                     found.update(zip(batch, vectors))
-        return found
+
+
+def new_usage() -> dict[str, int]:
+    """Counters embed_many fills: lookups = hits (disk) + shared (concurrent caller) + embedded."""
+    return {"lookups": 0, "hits": 0, "shared": 0, "embedded": 0}
+
+
+def usage_summary(usage: dict) -> dict:
+    lookups = int(usage.get("lookups") or 0)
+    reused = int(usage.get("hits") or 0) + int(usage.get("shared") or 0)
+    return {**usage, "hitRate": reused / lookups if lookups else None}
+
+
+class UsageView:
+    """A caller's handle on a shared EmbeddingStore that keeps its own usage counters."""
+
+    def __init__(self, store: EmbeddingStore):
+        self.store = store
+        self.usage = new_usage()
+
+    def embed_many(self, texts: list[str]) -> dict[str, np.ndarray]:
+        return self.store.embed_many(texts, usage=self.usage)
+
+
+def shared_cache(canonicalize=None) -> EmbeddingStore:
+    """The machine-wide multimodal vector cache, opened once per process.
+
+    Montage, thumbnail and transcript embeddings from the raw/ builds and the
+    upload scorer land here, so restarts and re-scores read vectors from disk.
+    """
+    with _SHARED_CACHES_LOCK:
+        if canonicalize not in _SHARED_CACHES:
+            _SHARED_CACHES[canonicalize] = EmbeddingStore(
+                SHARED_CACHE_PATH,
+                max_bytes=SHARED_CACHE_MAX_BYTES,
+                canonicalize=canonicalize,
+            )
+        return _SHARED_CACHES[canonicalize]
 
 
 class R2Store:
@@ -19,6 +19,7 @@ import subprocess
 import unicodedata
 import wave
 from difflib import SequenceMatcher
+from functools import lru_cache
 from pathlib import Path
 from typing import Any
 
@@ -330,14 +331,27 @@ def ctc_align_canonical_words(audio_path: Path, canonical_words: list[dict],
     }
 
 
-def media_duration_seconds(path: Path) -> float:
-    value = subprocess.run(
+@lru_cache(maxsize=64)
+def _probe(path: str, modified_ns: int, size: int) -> dict:
+    result = subprocess.run(
         [
-            "ffprobe", "-v", "error", "-show_entries", "format=duration",
-            "-of", "default=nw=1:nk=1", str(path),
+            "ffprobe", "-v", "error", "-show_entries",
+            "format=duration,start_time:stream=codec_type,start_time", "-of", "json",
+            path,
         ],
         check=True, capture_output=True, text=True,
-    ).stdout.strip()
+    )
+    return json.loads(result.stdout)
+
+
+def probe_media(path: Path) -> dict:
+    """One ffprobe of a source's duration and stream clocks, shared by every audit of the same file."""
+    stat = Path(path).stat()
+    return _probe(str(path), stat.st_mtime_ns, stat.st_size)
+
+
+def media_duration_seconds(path: Path) -> float:
+    value = str((probe_media(path).get("format") or {}).get("duration") or "").strip()
     duration = float(value)
     if not np.isfinite(duration) or duration <= 0:
         raise ValueError(f"invalid media duration for {path}: {value!r}")
@@ -346,15 +360,7 @@ def media_duration_seconds(path: Path) -> float:
 
 def source_timeline_audit(path: Path) -> dict:
     """Verify where decoded audio sample zero sits on the source timeline."""
-    result = subprocess.run(
-        [
-            "ffprobe", "-v", "error", "-show_entries",
-            "format=start_time:stream=codec_type,start_time", "-of", "json",
-            str(path),
-        ],
-        check=True, capture_output=True, text=True,
-    )
-    payload = json.loads(result.stdout)
+    payload = probe_media(path)
     format_start = float((payload.get("format") or {}).get("start_time") or 0.0)
     streams = payload.get("streams") or []
     audio = [row for row in streams if row.get("codec_type") == "audio"]
@@ -90,6 +90,10 @@ def main() -> None:
     parser.add_argument("--eval-sample", type=int, default=1536)
     parser.add_argument("--map-limit", type=int, default=300)
     parser.add_argument("--no-upload", action="store_true")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="processes for the cluster sweep (one dimension x geometry chain each)")
+    parser.add_argument("--cold-start", action="store_true",
+                        help="fit every cluster count from k-means++ instead of the previous k's centroids")
     args = parser.parse_args()
 
     manifest = json.loads(MANIFEST_PATH.read_text(encoding="utf-8"))
@@ -199,6 +203,9 @@ def main() -> None:
             f"{REPRESENTATION_VERSION}"
         ),
         stability_sample=4096,
+        workers=args.workers,
+        cell_dir=CACHE / "all-span-atlas-cells",
+        warm_start=not args.cold_start,
     )
     for row in sweep.experiments:
         row["scope"] = "all-contiguous-spans"
@@ -233,6 +240,8 @@ def main() -> None:
         "pcaDimensionsTested": DIMENSION_GRID,
         "clusterCountsTested": CLUSTER_GRID,
         "seedsPerConfiguration": args.seeds,
+        "clusterInitialization": ("k-means++ per cluster count" if args.cold_start
+                                  else "warm-started from the previous cluster count's centroids"),
         "seedStabilityAuditInstances": min(4096, row_count),
         "experimentCount": len(sweep.experiments),
         "mapCount": len(sweep.maps),
@@ -171,6 +171,10 @@ def main() -> None:
     parser.add_argument("--eval-sample", type=int, default=768)
     parser.add_argument("--map-limit", type=int, default=300)
     parser.add_argument("--no-upload", action="store_true")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="processes for the cluster sweep (one dimension x geometry chain each)")
+    parser.add_argument("--cold-start", action="store_true",
+                        help="fit every cluster count from k-means++ instead of the previous k's centroids")
     parser.add_argument(
         "--upload-intermediates",
         action="store_true",
@@ -222,6 +226,9 @@ def main() -> None:
         map_limit=args.map_limit,
         progress=report_progress,
         experiment_namespace=f"candidate-components:{REPRESENTATION_VERSION}",
+        workers=args.workers,
+        cell_dir=CACHE / "atlas-cells",
+        warm_start=not args.cold_start,
     )
     atlas = {
         "version": 4,
@@ -236,6 +243,8 @@ def main() -> None:
         "pcaDimensionsTested": [2, args.max_dimension],
         "clusterCountsTested": [2, args.max_clusters],
         "seedsPerConfiguration": args.seeds,
+        "clusterInitialization": ("k-means++ per cluster count" if args.cold_start
+                                  else "warm-started from the previous cluster count's centroids"),
         "experimentCount": len(sweep.experiments),
         "mapCount": len(sweep.maps),
         "outcomesUsed": False,
@@ -37,7 +37,7 @@ def experiment_id(video_id: str, method: str, segments: int) -> str:
 
 
 def cache_matches_source(cached: dict, metadata: dict, null_repeats: int,
-                         bootstrap_repeats: int) -> bool:
+                         bootstrap_repeats: int, span_costs: str = "direct") -> bool:
     """Require boundary results to identify the exact intervention source."""
     fingerprint = metadata.get("fingerprint")
     cached_fingerprint = cached.get("sourceFingerprint")
@@ -53,6 +53,7 @@ def cache_matches_source(cached: dict, metadata: dict, null_repeats: int,
         and fingerprint_matches
         and int(cached.get("nullRepeats") or 0) == null_repeats
         and int(cached.get("bootstrapRepeats") or 0) == bootstrap_repeats
+        and cached.get("spanCosts", "direct") == span_costs
         and (
             cached.get("embeddingModel") in (None, metadata.get("embeddingModel"))
         )
@@ -108,9 +109,11 @@ def main() -> None:
     parser.add_argument("--limit", type=int, default=0)
     parser.add_argument("--null-repeats", type=int, default=32)
     parser.add_argument("--bootstrap-repeats", type=int, default=12)
+    parser.add_argument("--closed-form-span-costs", action="store_true")
     parser.add_argument("--force", action="store_true")
     parser.add_argument("--no-upload", action="store_true")
     args = parser.parse_args()
+    span_costs = "closed-form" if args.closed_form_span_costs else "direct"
 
     r2 = None if args.no_upload else R2Store()
     tensor_paths = sorted(TENSOR_DIR.glob("*.npz"))
@@ -126,7 +129,7 @@ def main() -> None:
         cached = json.loads(output_path.read_text(encoding="utf-8")) if output_path.exists() else None
         metadata = json.loads((META_DIR / f"{video_id}.json").read_text(encoding="utf-8"))
         if (cached and not args.force and cache_matches_source(
-                cached, metadata, args.null_repeats, args.bootstrap_repeats)):
+                cached, metadata, args.null_repeats, args.bootstrap_repeats, span_costs)):
             result = cached
             if attach_source_contract(result, metadata):
                 atomic_json(output_path, result)
@@ -138,6 +141,7 @@ def main() -> None:
                 null_repeats=args.null_repeats,
                 bootstrap_repeats=args.bootstrap_repeats,
                 seed=int(hashlib.sha1(video_id.encode()).hexdigest()[:8], 16),
+                closed_form=args.closed_form_span_costs,
             )
             result.update({
                 "version": 4,
@@ -195,7 +199,8 @@ def main() -> None:
         stored_null_repeats = int(result.get("nullRepeats") or 0)
         stored_bootstrap_repeats = int(result.get("bootstrapRepeats") or 0)
         if not cache_matches_source(
-                result, metadata, stored_null_repeats, stored_bootstrap_repeats):
+                result, metadata, stored_null_repeats, stored_bootstrap_repeats,
+                result.get("spanCosts", "direct")):
             raise RuntimeError(f"stale discovery artifact for active hook {video_id}")
         if attach_source_contract(result, metadata):
             atomic_json(discovery_path, result)
@@ -21,7 +21,8 @@ from sklearn.decomposition import PCA
 from cluster_outcomes import retention_at, retention_window_slope
 from component_lattice import build_all_span_primitives, build_component_lattice
 from deconfounding import natural_baseline_features, retention_curve_families
-from embedding_store import DIMENSIONS, MODEL, R2_PREFIX, EmbeddingStore, R2Store, json_ready
+from embedding_store import (DIMENSIONS, MODEL, R2_PREFIX, EmbeddingStore, R2Store, UsageView,
+                             json_ready, usage_summary)
 from forward_response import (
     ResponseCandidate,
     category_balanced_spearman,
@@ -57,7 +58,10 @@ ROOT = HERE.parents[2]
 CACHE = HERE / ".cache"
 DETAILS = CACHE / "opening-20s"
 VECTORS = CACHE / "opening-20s-vectors"
-EMBED_CACHE = CACHE / "opening-20s-embedding-cache"
+# One content-hashed store for every opening's span and context texts, kept across rebuilds.
+SPAN_EMBEDDINGS = CACHE / "opening-span-embeddings.sqlite3"
+# Per-video caches from before the shared store; migrated into it on the next build.
+LEGACY_EMBED_CACHE = CACHE / "opening-20s-embedding-cache"
 SUMMARY_PATH = CACHE / "opening-20s.json"
 MODEL_PATH = CACHE / "opening-20s-model.json"
 PROGRESS_PATH = CACHE / "opening-20s-progress.json"
@@ -240,6 +244,18 @@ def remove_sqlite(path: Path) -> None:
         candidate.unlink(missing_ok=True)
 
 
+def migrate_embedding_caches(store: EmbeddingStore, folder: Path = LEGACY_EMBED_CACHE) -> dict:
+    """Import per-video SQLite caches into the shared store, then delete them."""
+    files = sorted(folder.glob("*.sqlite3")) if folder.exists() else []
+    imported = 0
+    for path in files:
+        imported += store.import_sqlite(path)
+        remove_sqlite(path)
+    if folder.exists() and not any(folder.iterdir()):
+        folder.rmdir()
+    return {"files": len(files), "vectorsImported": imported}
+
+
 def content_key(source: dict, opening: dict, partition_model: dict,
                 lattice_model: dict, horizon_extension: dict,
                 length_support: dict | None = None) -> str:
@@ -324,9 +340,9 @@ def streaming_partition_payload(decomposition: dict) -> dict:
 
 
 def build_one(source: dict, partition_model: dict, lattice_model: dict,
-              horizon_extension: dict, length_support: dict,
-              rebuild: bool = False, keep_embedding_cache: bool = False,
-              embedding_workers: int = 8) -> dict:
+              horizon_extension: dict, length_support: dict, store,
+              rebuild: bool = False) -> dict:
+    """Build (or reuse) one opening's 20-second lattice; `store` embeds through the shared span store."""
     video_id = str(source["id"])
     opening = load_local_opening(video_id, ROOT)
     key = content_key(
@@ -340,9 +356,6 @@ def build_one(source: dict, partition_model: dict, lattice_model: dict,
         if detail.get("buildContentKey") == key:
             return detail
 
-    embedding_path = EMBED_CACHE / f"{video_id}.sqlite3"
-    store = EmbeddingStore(embedding_path, workers=max(1, int(embedding_workers)))
-    persisted = False
     try:
         primitives = build_all_span_primitives(opening["text"], store)
         partition = streaming_partition_payload(build_streaming_components(
@@ -512,12 +525,8 @@ def build_one(source: dict, partition_model: dict, lattice_model: dict,
             "countCalibrationUsesCategories": False,
         })
         atomic_gzip_json(detail_path, lattice)
-        persisted = True
         return lattice
     finally:
-        store.close()
-        if persisted and not keep_embedding_cache:
-            remove_sqlite(embedding_path)
         gc.collect()
 
 
@@ -1613,7 +1622,6 @@ def main() -> None:
     parser.add_argument("--limit", type=int, default=0)
     parser.add_argument("--video-id", default="")
     parser.add_argument("--rebuild", action="store_true")
-    parser.add_argument("--keep-embedding-cache", action="store_true")
     parser.add_argument("--skip-response", action="store_true")
     parser.add_argument("--response-only", action="store_true")
     parser.add_argument("--inference-repeats", type=int, default=2048)
@@ -1675,7 +1683,6 @@ def main() -> None:
     length_support = measured_length_support(full_corpus, horizon_extension)
     DETAILS.mkdir(parents=True, exist_ok=True)
     VECTORS.mkdir(parents=True, exist_ok=True)
-    EMBED_CACHE.mkdir(parents=True, exist_ok=True)
     if args.migrate_current:
         update_progress(
             status="running", stage="removing superseded lattice channels",
@@ -1722,14 +1729,22 @@ def main() -> None:
             horizonSeconds=OPENING_HORIZON_SECONDS, error="",
         )
         details = {}
+        store = EmbeddingStore(SPAN_EMBEDDINGS, workers=max(1, int(args.embedding_workers)))
+        migrated = migrate_embedding_caches(store)
+        if migrated["files"]:
+            print(
+                f"[embeddings] imported {migrated['vectorsImported']} vectors from "
+                f"{migrated['files']} per-video caches into {SPAN_EMBEDDINGS.name}",
+                flush=True,
+            )
 
-        def build_source(source: dict) -> tuple[dict, dict]:
-            return source, build_one(
+        def build_source(source: dict) -> tuple[dict, dict, dict]:
+            view = UsageView(store)
+            detail = build_one(
                 source, partition_model, lattice_model, horizon_extension,
-                length_support,
-                rebuild=args.rebuild, keep_embedding_cache=args.keep_embedding_cache,
-                embedding_workers=args.embedding_workers,
+                length_support, view, rebuild=args.rebuild,
             )
+            return source, detail, view.usage
 
         completed = 0
         if args.source_workers > 1:
@@ -1742,7 +1757,7 @@ def main() -> None:
             pool = None
             iterator = (build_source(source) for source in corpus)
         try:
-            for source, detail in iterator:
+            for source, detail, usage in iterator:
                 completed += 1
                 video_id = str(source["id"])
                 details[video_id] = {
@@ -1762,13 +1777,15 @@ def main() -> None:
                         int(row.get("spanCount") or 0) for row in details.values()
                     ),
                     stage=f"built {video_id} through 20.0 seconds",
+                    embeddingCache=usage_summary(store.usage),
                 )
                 row = details[video_id]
                 print(
                     f"[{completed}/{len(corpus)}] {video_id}: "
                     f"{row['tokenCount']} tokens, "
                     f"{len(row['canonicalComponents'])} components, "
-                    f"{row['spanCount']} spans",
+                    f"{row['spanCount']} spans, "
+                    f"{usage['embedded']}/{usage['lookups']} texts embedded",
                     flush=True,
                 )
         except KeyboardInterrupt:
@@ -1790,6 +1807,13 @@ def main() -> None:
         finally:
             if pool is not None:
                 pool.shutdown(wait=True)
+            store.close()
+        cache_usage = usage_summary(store.usage)
+        print(
+            f"[embeddings] {cache_usage['lookups']} span texts, {cache_usage['embedded']} embedded, "
+            f"hit rate {cache_usage['hitRate'] or 0:.1%}",
+            flush=True,
+        )
 
     model_artifact = current_opening_model(horizon_extension, length_support)
     atomic_json(MODEL_PATH, model_artifact)
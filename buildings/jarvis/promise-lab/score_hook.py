@@ -11,7 +11,9 @@ import json
 import math
 import os
 import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import numpy as np
@@ -542,12 +544,63 @@ def _validated_token_clock(tokens: list, token_clock: list[dict]) -> list[dict]:
     return output
 
 
+def _load_context_study() -> dict:
+    try:
+        return load_artifact(CONTEXT_STUDY_FILE)
+    except Exception:
+        return {"categories": []}
+
+
+class _StageClock:
+    """Wall milliseconds per scoring stage, recorded into ``timings`` when given."""
+
+    def __init__(self, timings: dict | None):
+        self.timings = timings
+        self.started = time.perf_counter()
+
+    def mark(self, stage: str) -> None:
+        if self.timings is None:
+            return
+        now = time.perf_counter()
+        self.timings[stage] = round(1000.0 * (now - self.started), 3)
+        self.started = now
+
+
+class _TimedStore:
+    """Embedding-store view that adds embedding wall time to ``timings``.
+
+    Stage times include the embedding calls made inside them; ``embeddingMs``
+    says how much of the total was spent waiting on the embedding cache/API.
+    """
+
+    def __init__(self, store: EmbeddingStore, timings: dict):
+        self.store = store
+        self.timings = timings
+        self.dimensions = store.dimensions
+
+    def embed_many(self, texts: list[str]) -> dict[str, np.ndarray]:
+        started = time.perf_counter()
+        try:
+            return self.store.embed_many(texts)
+        finally:
+            self.timings["embeddingMs"] = round(
+                self.timings.get("embeddingMs", 0.0)
+                + 1000.0 * (time.perf_counter() - started), 3,
+            )
+            self.timings["embeddingCalls"] = self.timings.get("embeddingCalls", 0) + 1
+
+
 def _score_variable_text(text: str, partition_model: dict, opening_model: dict,
                          retention_model: dict, store: EmbeddingStore,
                          planned_duration_seconds: float | None,
                          token_clock_override: list[dict] | None = None,
                          timing_source: str | None = None,
-                         forecast_duration_override: float | None = None) -> dict:
+                         forecast_duration_override: float | None = None,
+                         context_study: dict | None = None,
+                         timings: dict | None = None) -> dict:
+    clock = _StageClock(timings)
+    if timings is not None:
+        store = _TimedStore(store, timings)
     scope = _variable_prediction_scope(text, retention_model, planned_duration_seconds)
     source_text = scope["analyzedText"]
     tokens = tokenize(source_text)
@@ -590,20 +643,20 @@ def _score_variable_text(text: str, partition_model: dict, opening_model: dict,
         measured_token_support=support,
     )
     _attach_typed_component_timing(decomposition, token_clock)
+    clock.mark("decomposition")
     primitives = {"text": source_text, "tokens": tokens, "tokenClock": token_clock}
     prefix_features, prefix_trace = _variable_prefix_features(
         primitives, decomposition, scope, retention_model, store,
     )
+    clock.mark("prefixFeatures")
     curves = _variable_curve_payload(
         prefix_features, retention_model, scope["forecastDurationSeconds"],
     )
+    clock.mark("curves")
     entry = curves["entryIndexed"]
     absolute = curves["observedAbsolute"]
-    context_study = {}
-    try:
-        context_study = load_artifact(CONTEXT_STUDY_FILE)
-    except Exception:
-        context_study = {"categories": []}
+    if context_study is None:
+        context_study = _load_context_study()
     for component in decomposition["chunks"]:
         component["outcomePlane"] = score_component_context(component, context_study)
         component["outcomePlanesByLag"] = (
@@ -616,6 +669,7 @@ def _score_variable_text(text: str, partition_model: dict, opening_model: dict,
     order_sensitivity = sequence_order_sensitivity(
         decomposition["chunks"], context_study,
     )
+    clock.mark("context")
     public_components = [
         {key: value for key, value in component.items() if not key.startswith("_")}
         for component in decomposition["chunks"]
@@ -638,6 +692,7 @@ def _score_variable_text(text: str, partition_model: dict, opening_model: dict,
         component["timelineAttribution"] = attribution_by_component.get(
             int(component["index"])
         )
+    clock.mark("attribution")
     forecast_end = float(entry["timesSeconds"][-1])
     endpoint = float(entry["predicted"][-1])
     retention5 = (
@@ -763,7 +818,9 @@ def score_text(text: str, partition_model: dict | None = None,
                store: EmbeddingStore | None = None,
                opening_model: dict | None = None,
                opening_retention_model: dict | None = None,
-               planned_duration_seconds: float | None = None) -> dict:
+               planned_duration_seconds: float | None = None,
+               context_study: dict | None = None,
+               timings: dict | None = None) -> dict:
     """Score typed text with the exact temporal contract used by the saved library."""
     partition_model = partition_model or load_artifact(PARTITION_FILE)
     opening_model = opening_model or load_artifact(OPENING_MODEL_FILE)
@@ -779,7 +836,7 @@ def score_text(text: str, partition_model: dict | None = None,
     try:
         return _score_variable_text(
             text, partition_model, opening_model, retention_model, store,
-            planned_duration_seconds,
+            planned_duration_seconds, context_study=context_study, timings=timings,
         )
     finally:
         if owned_store:
@@ -792,7 +849,9 @@ def score_timed_text(text: str, token_clock: list[dict],
                      partition_model: dict | None = None,
                      store: EmbeddingStore | None = None,
                      opening_model: dict | None = None,
-                     opening_retention_model: dict | None = None) -> dict:
+                     opening_retention_model: dict | None = None,
+                     context_study: dict | None = None,
+                     timings: dict | None = None) -> dict:
     """Score observed spoken timing with the unchanged frozen model."""
     partition_model = partition_model or load_artifact(PARTITION_FILE)
     opening_model = opening_model or load_artifact(OPENING_MODEL_FILE)
@@ -810,11 +869,255 @@ def score_timed_text(text: str, token_clock: list[dict],
             text, partition_model, opening_model, retention_model, store,
             None, token_clock_override=token_clock, timing_source=timing_source,
             forecast_duration_override=media_duration_seconds,
+            context_study=context_study, timings=timings,
         )
     finally:
         if owned_store:
             store.close()
 
+# Numeric leaves the serving path always reads through ``np.asarray``. Parsing
+# them once keeps the per-call conversions down to a no-op (float64 readers) or
+# one cast (float32 readers); JSON floats are doubles, so values are unchanged.
+FROZEN_ARRAY_KEYS = frozenset({
+    "coefficient", "coefficients", "intercept",
+    "scalerMean", "scalerScale",
+    "pcaMean", "pcaComponents", "whiteningScale",
+    "mean", "inverseCovariance",
+})
+
+
+def freeze_model_arrays(value):
+    """Turn the frozen model's numeric lists into read-only float64 arrays, in place."""
+    if isinstance(value, dict):
+        for key, item in value.items():
+            if key in FROZEN_ARRAY_KEYS and isinstance(item, list) and len(item) > 1:
+                try:
+                    array = np.asarray(item, np.float64)
+                except (TypeError, ValueError):
+                    freeze_model_arrays(item)
+                    continue
+                array.setflags(write=False)
+                value[key] = array
+            else:
+                freeze_model_arrays(item)
+    elif isinstance(value, list):
+        for item in value:
+            freeze_model_arrays(item)
+    return value
+
+
+class ResidentScorer:
+    """The frozen serving models and one embedding store, loaded once.
+
+    ``score_text``/``score_timed_text`` re-read and re-parse every artifact per
+    call; a long-lived scorer keeps them parsed here and reloads only after
+    ``max_age_seconds`` (the runtime artifact cache's own freshness window).
+    ``score_batch`` scores several openings concurrently so their embedding
+    requests overlap and coalesce in the shared embedding gateway.
+    """
+
+    def __init__(self, store: EmbeddingStore | None = None,
+                 max_age_seconds: float | None = None,
+                 workers: int | None = None, refresh: bool = False):
+        self.max_age_seconds = float(
+            max_age_seconds if max_age_seconds is not None
+            else os.environ.get("PROMISE_HOOK_MODEL_TTL_SECONDS", "3600")
+        )
+        self.workers = max(1, int(workers or os.environ.get("PROMISE_HOOK_BATCH_WORKERS", "4")))
+        self.store = store or EmbeddingStore(_embedding_cache_path())
+        self._lock = threading.Lock()
+        self.models: dict = {}
+        self.loaded_at = 0.0
+        self.load_ms = 0.0
+        self.load(refresh)
+
+    def load(self, refresh: bool = False) -> None:
+        started = time.perf_counter()
+        models = {
+            "partition_model": freeze_model_arrays(load_artifact(PARTITION_FILE, refresh)),
+            "opening_model": freeze_model_arrays(load_artifact(OPENING_MODEL_FILE, refresh)),
+            "opening_retention_model": freeze_model_arrays(
+                load_artifact(OPENING_RETENTION_MODEL_FILE, refresh)
+            ),
+            "context_study": _load_context_study(),
+        }
+        self.models = models
+        self.loaded_at = time.time()
+        self.load_ms = round(1000.0 * (time.perf_counter() - started), 3)
+
+    def _current_models(self) -> dict:
+        with self._lock:
+            if time.time() - self.loaded_at >= self.max_age_seconds:
+                self.load()
+            return self.models
+
+    def score(self, request: dict) -> tuple[dict, dict]:
+        """Score one opening request; returns ``(result, timings)``.
+
+        ``request`` is ``{"text", "durationSeconds"}`` for typed text or
+        ``{"text", "tokenClock", "timingSource", "mediaDurationSeconds"}`` for
+        observed timing, the same inputs as the two module-level entry points.
+        """
+        timings: dict = {}
+        started = time.perf_counter()
+        models = self._current_models()
+        text = str(request.get("text") or "")
+        if not normalize_source(text):
+            raise ValueError("type an opening to score")
+        if request.get("tokenClock") is not None:
+            media = request.get("mediaDurationSeconds")
+            result = score_timed_text(
+                text, request["tokenClock"],
+                timing_source=str(request.get("timingSource")
+                                  or "observed source-media caption timestamps"),
+                media_duration_seconds=float(media) if media not in (None, "") else None,
+                store=self.store, timings=timings, **models,
+            )
+        else:
+            duration = request.get("durationSeconds")
+            result = score_text(
+                text,
+                planned_duration_seconds=float(duration) if duration not in (None, "") else None,
+                store=self.store, timings=timings, **models,
+            )
+        timings["totalMs"] = round(1000.0 * (time.perf_counter() - started), 3)
+        return result, timings
+
+    def score_batch(self, requests: list[dict]) -> list[dict]:
+        """``[{"result", "timingsMs"} | {"error"}]`` in request order.
+
+        Identical requests are scored once; one failing opening does not fail
+        the others.
+        """
+        keys = [json.dumps(request, sort_keys=True, default=str) for request in requests]
+        unique = list(dict.fromkeys(keys))
+        by_key = {key: request for key, request in zip(keys, requests)}
+
+        def run(key: str) -> dict:
+            try:
+                result, timings = self.score(by_key[key])
+                return {"result": json_ready(result), "timingsMs": timings}
+            except Exception as exc:
+                return {"error": str(exc)}
+
+        if len(unique) == 1:
+            outcomes = {unique[0]: run(unique[0])}
+        else:
+            with ThreadPoolExecutor(min(self.workers, len(unique))) as pool:
+                outcomes = dict(zip(unique, pool.map(run, unique)))
+        return [outcomes[key] for key in keys]
+
+    def close(self) -> None:
+        self.store.close()
+
+
+class _TaggedLog:
+    """stderr wrapper that prefixes each line written while a request is being
+    scored with ``[id:<request id>] `` so the server relays it to that request
+    alone; lines written outside a single request go out untagged."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.request_id = None
+        self.pending = ""
+        self.lock = threading.Lock()
+
+    def write(self, text: str) -> int:
+        with self.lock:
+            *lines, self.pending = (self.pending + text).split("\n")
+            prefix = f"[id:{self.request_id}] " if self.request_id is not None else ""
+            if lines:
+                self.stream.write("".join(f"{prefix}{line}\n" for line in lines))
+        return len(text)
+
+    def flush(self) -> None:
+        self.stream.flush()
+
+
+def serve(scorer: ResidentScorer, stdin=None, stdout=None, stderr=None) -> None:
+    """JSON-lines loop: ``{"id", "openings": [request, ...]}`` per line in,
+    ``{"id", "results": [...], "timingsMs": {"batchMs"}}`` per line out.
+
+    A line with ``text`` instead of ``openings`` is a batch of one. Lines are
+    read on their own thread; every request waiting when the scorer frees up
+    is scored in ONE ``score_batch`` call (so concurrent requests share its
+    workers and the gateway's coalescing), then answered under its own id.
+    ``{"op": "cancel", "id"}`` drops a request that is still waiting, which
+    is answered ``{"id", "error": "cancelled"}``; one already being scored
+    finishes normally.
+    """
+    import queue
+
+    stdin = stdin or sys.stdin
+    stdout = stdout or sys.stdout
+    log = _TaggedLog(stderr or sys.stderr)
+    saved_stderr, sys.stderr = sys.stderr, log
+    lines: queue.Queue = queue.Queue()
+
+    def read() -> None:
+        for line in stdin:
+            lines.put(line)
+        lines.put(None)
+
+    def reply(message: dict) -> None:
+        stdout.write(json.dumps(message, separators=(",", ":"), allow_nan=False) + "\n")
+        stdout.flush()
+
+    threading.Thread(target=read, name="score-hook-stdin", daemon=True).start()
+    reply({"ready": True, "pid": os.getpid(), "timingsMs": {"loadModels": scorer.load_ms}})
+    try:
+        closed = False
+        while not closed:
+            waiting = [lines.get()]
+            while True:
+                try:
+                    waiting.append(lines.get_nowait())
+                except queue.Empty:
+                    break
+            batch: list[tuple] = []
+            for line in waiting:
+                if line is None:
+                    closed = True
+                    continue
+                if not line.strip():
+                    continue
+                request_id = None
+                try:
+                    request = json.loads(line)
+                    request_id = request.get("id")
+                    if request.get("op") == "cancel":
+                        for entry in [entry for entry in batch if entry[0] == request_id]:
+                            batch.remove(entry)
+                            reply({"id": request_id, "error": "cancelled"})
+                        continue
+                    openings = request.get("openings")
+                    if openings is None:
+                        openings = [request]
+                    if not isinstance(openings, list) or not all(isinstance(row, dict) for row in openings):
+                        raise ValueError("openings must be a list of objects")
+                except Exception as exc:
+                    reply({"id": request_id, "error": f"bad request: {exc}"})
+                    continue
+                batch.append((request_id, openings))
+            if not batch:
+                continue
+            started = time.perf_counter()
+            log.request_id = batch[0][0] if len(batch) == 1 else None
+            try:
+                results = scorer.score_batch([opening for _, openings in batch for opening in openings])
+            finally:
+                log.request_id = None
+            batch_ms = round(1000.0 * (time.perf_counter() - started), 3)
+            offset = 0
+            for request_id, openings in batch:
+                reply({
+                    "id": request_id,
+                    "results": results[offset:offset + len(openings)],
+                    "timingsMs": {"batchMs": batch_ms, "batchRequests": len(batch)},
+                })
+                offset += len(openings)
+    finally:
+        sys.stderr = saved_stderr
 
 
 def main() -> None:
@@ -825,7 +1128,16 @@ def main() -> None:
     parser.add_argument("--duration-seconds", type=float, default=None)
     parser.add_argument("--pretty", action="store_true")
     parser.add_argument("--refresh-model", action="store_true")
+    parser.add_argument("--serve", action="store_true",
+                        help="resident JSON-lines scorer on stdin/stdout")
     args = parser.parse_args()
+    if args.serve:
+        scorer = ResidentScorer(refresh=args.refresh_model)
+        try:
+            serve(scorer)
+        finally:
+            scorer.close()
+        return
     duration = args.duration_seconds
     if args.json_stdin:
         request = json.loads(sys.stdin.read() or "{}")
@@ -29,65 +29,186 @@ def span_index_map(span_start, span_end) -> dict[tuple[int, int], int]:
     return {(int(start), int(end)): index for index, (start, end) in enumerate(zip(span_start, span_end))}
 
 
+def _span_lengths(n: int) -> np.ndarray:
+    index = np.arange(n + 1)
+    return index[None, :] - index[:, None]
+
+
+def _effect_sse(token_effects: np.ndarray) -> np.ndarray:
+    """Within-span sum of squared deviations for every span, for each leading batch entry.
+
+    The arithmetic is the direct per-span form, in the same order: each span's
+    mean is its rows added one at a time from `start` (how a reduction over
+    the rows of token_effects[start:end] adds them) divided by the row count,
+    and the squared deviations are summed over the flattened block. Permuted
+    nulls that tie the observed objective exactly (any permutation within a
+    segment, and always the whole opening) then tie exactly here too, so p, z
+    and the selection match the per-span implementation bit for bit. The
+    running sums and one reused scratch block are the saving.
+    """
+    effects = np.asarray(token_effects, np.float64)
+    lead, (n, dim) = effects.shape[:-2], effects.shape[-2:]
+    flat = effects.reshape((-1, n, dim))
+    sse = np.zeros((len(flat), n + 1, n + 1), np.float64)
+    # One ordering at a time keeps each span's block and its scratch copy in cache.
+    scratch = np.empty(n * dim, np.float64)
+    for row, rows in enumerate(flat):
+        for start in range(n):
+            running = np.cumsum(rows[start:], axis=0)
+            for end in range(start + 2, n + 1):
+                count = end - start
+                deviation = scratch[:count * dim].reshape(count, dim)
+                np.subtract(rows[start:end], running[count - 1] / count, out=deviation)
+                np.square(deviation, out=deviation)
+                sse[row, start, end] = scratch[:count * dim].sum()
+    return sse.reshape(lead + (n + 1, n + 1))
+
+
+def _pair_cohesion(pair_norms: np.ndarray) -> np.ndarray:
+    """Sum of the strict upper triangle of pair_norms[start:end, start:end] for every span.
+
+    Summed in the input dtype over the row-major upper triangle, as the direct
+    form does, for the same reason _effect_sse keeps its order.
+    """
+    pair_norms = np.asarray(pair_norms)
+    lead, n = pair_norms.shape[:-2], pair_norms.shape[-1]
+    cohesion = np.zeros(lead + (n + 1, n + 1), np.float64)
+    for count in range(2, n + 1):
+        rows, columns = np.triu_indices(count, 1)
+        for start in range(n - count + 1):
+            # Gathering under leading axes can lay the pairs out batch-fastest; the
+            # sum must run over each contiguous row to add in the direct order.
+            pairs = np.ascontiguousarray(pair_norms[..., rows + start, columns + start])
+            cohesion[..., start, start + count] = pairs.sum(axis=-1)
+    return cohesion
+
+
+def _effect_sse_closed_form(token_effects: np.ndarray) -> np.ndarray:
+    """Within-span sum of squared deviations for every span, from prefix sums.
+
+    For a span of m rows with sum S and sum of squared norms Q the SSE is
+    Q - |S|^2 / m. Rows are centered on their overall mean first (the SSE is
+    shift invariant), which keeps the prefix sums small and the subtraction
+    well conditioned; |S_end - S_start|^2 is expanded through one Gram matrix
+    of the prefix sums instead of materializing every span difference.
+
+    O(n^2 d) instead of O(n^3 d), but it rounds differently from the direct
+    form: nulls that tie the observed objective exactly can land on either
+    side of it by round-off, which moves p and z. Opt-in only.
+    """
+    effects = np.asarray(token_effects, np.float64)
+    effects = effects - effects.mean(axis=-2, keepdims=True)
+    n = effects.shape[-2]
+    prefix = np.zeros(effects.shape[:-2] + (n + 1, effects.shape[-1]), np.float64)
+    np.cumsum(effects, axis=-2, out=prefix[..., 1:, :])
+    squares = np.zeros(effects.shape[:-2] + (n + 1,), np.float64)
+    np.cumsum(np.square(effects).sum(axis=-1), axis=-1, out=squares[..., 1:])
+    gram = prefix @ np.swapaxes(prefix, -1, -2)
+    diagonal = np.diagonal(gram, axis1=-2, axis2=-1)
+    span_square = diagonal[..., None, :] + diagonal[..., :, None] - 2 * gram
+    lengths = _span_lengths(n)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sse = (squares[..., None, :] - squares[..., :, None]) - span_square / lengths
+    # A single row has no spread; pin it (and round-off below zero) exactly like the direct form.
+    return np.where(lengths > 1, np.maximum(sse, 0.0), 0.0)
+
+
+def _pair_cohesion_closed_form(pair_norms: np.ndarray) -> np.ndarray:
+    """_pair_cohesion from 2-D prefix sums; rounds differently (see _effect_sse_closed_form)."""
+    upper = np.triu(np.asarray(pair_norms, np.float64), 1)
+    n = upper.shape[-1]
+    table = np.zeros(upper.shape[:-2] + (n + 1, n + 1), np.float64)
+    np.cumsum(np.cumsum(upper, axis=-2), axis=-1, out=table[..., 1:, 1:])
+    diagonal = np.diagonal(table, axis1=-2, axis2=-1)
+    cohesion = diagonal[..., None, :] + diagonal[..., :, None] - table - np.swapaxes(table, -1, -2)
+    return np.where(_span_lengths(n) > 1, cohesion, 0.0)
+
+
+def _span_positions(span_start, span_end, n: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(starts, ends, value index) covering every span of an n-token opening; last listing wins."""
+    lookup = span_index_map(span_start, span_end)
+    starts, ends = np.triu_indices(n + 1, 1)
+    index = np.asarray([lookup[(start, end)] for start, end in zip(starts.tolist(), ends.tolist())], int)
+    return starts, ends, index
+
+
 def cost_matrices(token_effects: np.ndarray, pair_norms: np.ndarray,
                   span_start: np.ndarray, span_end: np.ndarray,
-                  span_nonadditive_norm: np.ndarray) -> dict[str, np.ndarray]:
-    n = len(token_effects)
-    lookup = span_index_map(span_start, span_end)
-    costs = {method: np.full((n + 1, n + 1), np.inf, float) for method in METHODS}
-    for start in range(n):
-        for end in range(start + 1, n + 1):
-            block = np.asarray(token_effects[start:end], float)
-            mean = block.mean(axis=0, keepdims=True)
-            costs["effect_sse"][start, end] = float(np.square(block - mean).sum())
-            if end - start <= 1:
-                cohesion = 0.0
-            else:
-                sub = pair_norms[start:end, start:end]
-                cohesion = float(sub[np.triu_indices(end - start, 1)].sum())
-            costs["interaction_cohesion"][start, end] = -cohesion
-            costs["span_nonadditivity"][start, end] = -float(span_nonadditive_norm[lookup[(start, end)]])
-    return costs
+                  span_nonadditive_norm: np.ndarray, closed_form: bool = False) -> dict[str, np.ndarray]:
+    """Span cost tables for every method.
+
+    token_effects (..., n, d), pair_norms (..., n, n) and span_nonadditive_norm
+    (..., spans) may carry the same leading batch axes (stacked null
+    orderings); every table is then (..., n + 1, n + 1). Entries with
+    end <= start are +inf. The direct per-span sums are the default;
+    closed_form=True builds the effect and cohesion tables from prefix sums
+    instead, which is faster for long openings but not bit-identical.
+    """
+    n = np.shape(token_effects)[-2]
+    starts, ends, index = _span_positions(span_start, span_end, n)
+    valid = _span_lengths(n) > 0
+    nonadditive = np.zeros(np.shape(token_effects)[:-2] + (n + 1, n + 1), float)
+    nonadditive[..., starts, ends] = np.asarray(span_nonadditive_norm, float)[..., index]
+    effect_sse = _effect_sse_closed_form if closed_form else _effect_sse
+    pair_cohesion = _pair_cohesion_closed_form if closed_form else _pair_cohesion
+    return {
+        "effect_sse": np.where(valid, effect_sse(token_effects), np.inf),
+        "interaction_cohesion": np.where(valid, -pair_cohesion(pair_norms), np.inf),
+        "span_nonadditivity": np.where(valid, -nonadditive, np.inf),
+    }
 
 
 def optimal_partition(cost: np.ndarray, segment_count: int) -> tuple[float, list[tuple[int, int]]]:
     return optimal_partitions(cost)[int(segment_count)]
 
 
-def optimal_partitions(cost: np.ndarray) -> list[tuple[float, list[tuple[int, int]]] | None]:
-    """Solve every segment count from one shared dynamic-programming lattice."""
-    n = cost.shape[0] - 1
-    dp = np.full((n + 1, n + 1), np.inf, float)
-    prev = np.full((n + 1, n + 1), -1, int)
-    dp[0, 0] = 0.0
-    for groups in range(1, n + 1):
-        for end in range(groups, n + 1):
-            starts = np.arange(groups - 1, end)
-            values = dp[groups - 1, starts] + cost[starts, end]
-            best_index = int(np.argmin(values))
-            dp[groups, end] = float(values[best_index])
-            prev[groups, end] = int(starts[best_index])
-    output = [None]
-    for k in range(1, n + 1):
-        if not np.isfinite(dp[k, n]):
-            output.append((float("inf"), []))
-            continue
-        segments = []
-        end = n
-        for groups in range(k, 0, -1):
-            start = int(prev[groups, end])
-            segments.append((start, end))
-            end = start
-        output.append((float(dp[k, n]), list(reversed(segments))))
-    return output
+def optimal_partitions(cost: np.ndarray) -> list:
+    """Solve every segment count from one shared dynamic-programming lattice.
 
+    A stacked (batch, n + 1, n + 1) cost returns one list per batch entry. Each
+    layer of the lattice is relaxed for every end (and batch entry) at once;
+    ties go to the earliest start, as a left-to-right scan would.
+    """
+    cost = np.asarray(cost, float)
+    if cost.ndim == 3:
+        return _optimal_partitions_batch(cost)
+    return _optimal_partitions_batch(cost[None])[0]
 
-def _permute_inputs(token_effects, pair_norms, permutation):
-    return token_effects[permutation], pair_norms[np.ix_(permutation, permutation)]
+
+def _optimal_partitions_batch(cost: np.ndarray) -> list[list[tuple[float, list[tuple[int, int]]] | None]]:
+    batch, n = cost.shape[0], cost.shape[1] - 1
+    dp = np.full((batch, n + 1, n + 1), np.inf, float)
+    prev = np.full((batch, n + 1, n + 1), -1, int)
+    dp[:, 0, 0] = 0.0
+    lengths = _span_lengths(n)
+    for groups in range(1, n + 1):
+        starts = np.arange(n + 1)
+        usable = (starts[:, None] >= groups - 1) & (lengths > 0)
+        values = np.where(usable, dp[:, groups - 1, :, None] + cost, np.inf)
+        best = np.argmin(values, axis=1)
+        ends = np.arange(groups, n + 1)
+        dp[:, groups, ends] = np.take_along_axis(values, best[:, None, :], axis=1)[:, 0, ends]
+        prev[:, groups, ends] = best[:, ends]
+    output = []
+    for row in range(batch):
+        partitions = [None]
+        for k in range(1, n + 1):
+            if not np.isfinite(dp[row, k, n]):
+                partitions.append((float("inf"), []))
+                continue
+            segments = []
+            end = n
+            for groups in range(k, 0, -1):
+                start = int(prev[row, groups, end])
+                segments.append((start, end))
+                end = start
+            partitions.append((float(dp[row, k, n]), list(reversed(segments))))
+        output.append(partitions)
+    return output
 
 
 def discover_boundaries(arrays: dict, null_repeats: int = 32, bootstrap_repeats: int = 12,
-                        seed: int = 1729) -> dict:
+                        seed: int = 1729, closed_form: bool = False) -> dict:
     token_effects = np.asarray(arrays["token_effects"], np.float32)
     pair_norms = np.asarray(arrays["pair_norms"], np.float32)
     span_start = np.asarray(arrays["span_start"])
@@ -97,10 +218,11 @@ def discover_boundaries(arrays: dict, null_repeats: int = 32, bootstrap_repeats:
     if n < 2:
         return {"n": n, "experiments": [], "boundaries": [], "candidates": []}
 
-    observed_costs = cost_matrices(token_effects, pair_norms, span_start, span_end, nonadd)
+    observed_costs = cost_matrices(token_effects, pair_norms, span_start, span_end, nonadd, closed_form)
     observed = []
+    observed_partitions = {method: optimal_partitions(observed_costs[method]) for method in METHODS}
     for method in METHODS:
-        partitions = optimal_partitions(observed_costs[method])
+        partitions = observed_partitions[method]
         for k in range(1, n + 1):
             objective, segments = partitions[k]
             observed.append({"method": method, "segments": k, "objective": objective,
@@ -111,15 +233,21 @@ def discover_boundaries(arrays: dict, null_repeats: int = 32, bootstrap_repeats:
     null_boundary_counts = np.zeros((null_repeats, n - 1), float)
     null_boundary_by_method = {method: np.zeros((null_repeats, n - 1), float) for method in METHODS}
     null_span_counts = [defaultdict(int) for _ in range(null_repeats)]
+    permutations, shuffled_nonadd = [], []
     for repeat in range(null_repeats):
-        permutation = rng.permutation(n)
-        effects_null, pairs_null = _permute_inputs(token_effects, pair_norms, permutation)
+        permutations.append(rng.permutation(n))
         # Non-additivity values are permuted over the exhaustive span lattice,
         # preserving their marginal distribution while destroying sequence fit.
-        shuffled_nonadd = rng.permutation(nonadd)
-        costs = cost_matrices(effects_null, pairs_null, span_start, span_end, shuffled_nonadd)
+        shuffled_nonadd.append(rng.permutation(nonadd))
+    if null_repeats:
+        # Every permuted ordering is scored as one stacked batch of cost tables.
+        order = np.asarray(permutations)
+        null_costs = cost_matrices(token_effects[order], pair_norms[order[:, :, None], order[:, None, :]],
+                                   span_start, span_end, np.asarray(shuffled_nonadd), closed_form)
+        null_partitions = {method: optimal_partitions(null_costs[method]) for method in METHODS}
+    for repeat in range(null_repeats):
         for method in METHODS:
-            partitions = optimal_partitions(costs[method])
+            partitions = null_partitions[method][repeat]
             for k in range(1, n + 1):
                 value, partition = partitions[k]
                 null_values[(method, k)].append(value)
@@ -210,13 +338,20 @@ def discover_boundaries(arrays: dict, null_repeats: int = 32, bootstrap_repeats:
     bootstrap_agreement = np.zeros(n - 1, float)
     bootstrap_total = np.zeros(n - 1, float)
     target_dim = min(64, token_effects.shape[1])
-    for _ in range(bootstrap_repeats):
-        projection = rng.normal(0, 1 / math.sqrt(target_dim),
-                                size=(token_effects.shape[1], target_dim)).astype(np.float32)
-        projected = token_effects @ projection
-        costs = cost_matrices(projected, pair_norms, span_start, span_end, nonadd)
+    projections = [rng.normal(0, 1 / math.sqrt(target_dim),
+                              size=(token_effects.shape[1], target_dim)).astype(np.float32)
+                   for _ in range(bootstrap_repeats)]
+    if bootstrap_repeats:
+        # Only the effect table depends on the projection; the other methods
+        # re-solve the observed lattice, so their observed partitions stand in.
+        projected = np.stack([token_effects @ projection for projection in projections])
+        effect_sse = _effect_sse_closed_form if closed_form else _effect_sse
+        effect_costs = np.where(_span_lengths(n) > 0, effect_sse(projected), np.inf)
+        bootstrap_partitions = {method: [observed_partitions[method]] * bootstrap_repeats for method in METHODS}
+        bootstrap_partitions["effect_sse"] = optimal_partitions(effect_costs)
+    for repeat in range(bootstrap_repeats):
         for method in METHODS:
-            partitions = optimal_partitions(costs[method])
+            partitions = bootstrap_partitions[method][repeat]
             for k in range(2, n + 1):
                 _, partition = partitions[k]
                 base = next(row["partition"] for row in observed
@@ -281,6 +416,7 @@ def discover_boundaries(arrays: dict, null_repeats: int = 32, bootstrap_repeats:
         "segmentCountsTested": n,
         "nullRepeats": null_repeats,
         "bootstrapRepeats": bootstrap_repeats,
+        "spanCosts": "closed-form" if closed_form else "direct",
         "selectedSegmentation": {
             "selectionRule": "maximum null-standardized objective across every method and segment count",
             "method": selected["method"],
@@ -24,6 +24,9 @@ class ArtifactContractTests(unittest.TestCase):
         self.assertTrue(cache_matches_source(cached, metadata, 32, 12))
         changed = {**metadata, "fingerprint": "fingerprint-two"}
         self.assertFalse(cache_matches_source(cached, changed, 32, 12))
+        # Results without spanCosts came from the direct sums.
+        self.assertFalse(cache_matches_source(cached, metadata, 32, 12, "closed-form"))
+        self.assertTrue(cache_matches_source({**cached, "spanCosts": "closed-form"}, metadata, 32, 12, "closed-form"))
 
 
 if __name__ == "__main__":
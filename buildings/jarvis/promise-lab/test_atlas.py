@@ -1,8 +1,11 @@
+import tempfile
 import unittest
+from unittest import mock
 
 import numpy as np
 
-from atlas import (MatrixSource, cross_group_generality, normalized_mutual_information,
+import atlas
+from atlas import (MatrixSource, cross_group_generality, grow_centers, normalized_mutual_information,
                    representation_matrix, run_cluster_sweep, span_additive_effects,
                    summarize_map_clusters)
 
@@ -64,6 +67,38 @@ class AtlasTests(unittest.TestCase):
         self.assertTrue(all(len(row["labels"]) == len(matrix) for row in result.maps))
         self.assertTrue(all("test-all-spans" not in row["id"] for row in result.experiments))
 
+    def test_pooled_sweep_matches_serial_and_resumes_from_cells(self):
+        rng = np.random.RandomState(23)
+        matrix = np.vstack([rng.normal(loc=center, size=(20, 9)) for center in (-1, 1, 3)]).astype(np.float32)
+        groups = np.asarray([f"hook-{index // 3}" for index in range(len(matrix))])
+        options = dict(dimensions=[2, 3], cluster_counts=[2, 3, 5], seeds=2, fit_sample=48,
+                       eval_sample=30, nuisance={"length": np.tile(np.arange(3), 20),
+                                                 "position": np.tile(np.arange(4), 15)})
+        serial = run_cluster_sweep({"raw": matrix}, groups, **options)
+        temporary = tempfile.TemporaryDirectory()
+        self.addCleanup(temporary.cleanup)
+        cells = temporary.name
+        pooled = run_cluster_sweep({"raw": matrix}, groups, workers=2, cell_dir=cells, **options)
+        self.assertEqual(pooled.experiments, serial.experiments)
+        self.assertEqual(pooled.maps, serial.maps)
+        with mock.patch.object(atlas, "_fit_cell", side_effect=AssertionError("refit")):
+            resumed = run_cluster_sweep({"raw": matrix}, groups, cell_dir=cells, **options)
+        self.assertEqual(resumed.experiments, serial.experiments)
+
+        warm = run_cluster_sweep({"raw": matrix}, groups, warm_start=True, **options)
+        self.assertEqual(len(warm.experiments), len(serial.experiments))
+        self.assertEqual({row["initialization"] for row in warm.experiments if row["clusterCount"] == 2},
+                         {"k-means++"})
+        self.assertEqual({row["initialization"] for row in warm.experiments if row["clusterCount"] == 5},
+                         {"warm-start from k=3 centroids"})
+
+    def test_warm_start_keeps_previous_centroids_and_covers_the_farthest_points(self):
+        points = np.asarray([[0, 0], [0, 1], [10, 0], [10, 1], [5, 20]], np.float32)
+        grown = grow_centers(np.asarray([[0, .5]], np.float32), points, 3)
+        np.testing.assert_array_equal(grown[0], [0, .5])
+        np.testing.assert_array_equal(grown[1], [5, 20])
+        self.assertIn(tuple(grown[2]), {(10, 0), (10, 1)})
+
     def test_unlabeled_diagnostics_are_bounded(self):
         left = np.asarray([0, 0, 1, 1, 2, 2])
         same = np.asarray([0, 0, 1, 1, 2, 2])
@@ -1,42 +1,48 @@
+import base64
+import io
+import sqlite3
+import threading
 import unittest
 from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from tempfile import TemporaryDirectory
+from unittest import mock
 
 import numpy as np
 
-from embedding_store import EmbeddingStore, _retry_delay_seconds
+from PIL import Image
 
+from embedding_store import EmbeddingStore, UsageView, content_address, usage_summary, vector_key
+import embedding_gateway
 
-class FakeResponse:
-    def __init__(self, payload=None, headers=None):
-        self._payload = payload or {}
-        self.headers = headers or {}
 
-    def json(self):
-        return self._payload
+def jpeg_part(color, quality):
+    output = io.BytesIO()
+    Image.new("RGB", (40, 20), color).save(output, format="JPEG", quality=quality)
+    return {"inlineData": {"mimeType": "image/jpeg", "data": base64.b64encode(output.getvalue()).decode()}}
+
+
+def reencode(value):
+    with Image.open(io.BytesIO(value)) as source:
+        output = io.BytesIO()
+        source.convert("RGB").save(output, format="JPEG", quality=90)
+        return output.getvalue()
 
 
 class EmbeddingStoreRetryTest(unittest.TestCase):
     def test_retry_after_header_wins(self):
-        response = FakeResponse(headers={"retry-after": "7.5"})
-        self.assertEqual(_retry_delay_seconds(response, 0), 7.5)
+        self.assertEqual(embedding_gateway.retry_delay_seconds(429, {"retry-after": "7.5"}, {}, 0), 7.5)
 
     def test_google_retry_info_is_parsed(self):
-        response = FakeResponse({
-            "error": {"details": [{"retryDelay": "41.25s"}]},
-        })
-        self.assertEqual(_retry_delay_seconds(response, 0), 41.25)
+        payload = {"error": {"details": [{"retryDelay": "41.25s"}]}}
+        self.assertEqual(embedding_gateway.retry_delay_seconds(429, {}, payload, 0), 41.25)
 
     def test_google_message_delay_is_parsed(self):
-        response = FakeResponse({
-            "error": {"message": "Quota exceeded. Please retry in 19.75s."},
-        })
-        self.assertEqual(_retry_delay_seconds(response, 0), 19.75)
+        payload = {"error": {"message": "Quota exceeded. Please retry in 19.75s."}}
+        self.assertEqual(embedding_gateway.retry_delay_seconds(429, {}, payload, 0), 19.75)
 
     def test_fallback_is_bounded(self):
-        response = FakeResponse()
-        self.assertEqual(_retry_delay_seconds(response, 20), 60.0)
+        self.assertEqual(embedding_gateway.retry_delay_seconds(503, {}, {}, 20), 60.0)
 
     def test_parallel_cached_reads_share_the_connection_safely(self):
         with TemporaryDirectory() as directory:
@@ -60,5 +66,99 @@ class EmbeddingStoreRetryTest(unittest.TestCase):
                 store.close()
 
 
+class MultimodalCacheTest(unittest.TestCase):
+    def test_text_part_shares_the_text_cache_key(self):
+        key, text, sent = content_address([{"text": "a hook"}], dimensions=4)
+        self.assertEqual(key, vector_key("a hook", dimensions=4))
+        self.assertEqual((text, sent), ("a hook", [{"text": "a hook"}]))
+
+    def test_image_keys_follow_canonical_bytes_and_send_them(self):
+        low, high = jpeg_part("red", 40), jpeg_part("red", 95)
+        self.assertNotEqual(content_address([low])[0], content_address([high])[0])
+        key_low, _, sent = content_address([low, {"text": "t"}], canonicalize=reencode)
+        canonical = reencode(base64.b64decode(low["inlineData"]["data"]))
+        self.assertEqual(base64.b64decode(sent[0]["inlineData"]["data"]), canonical)
+        self.assertEqual(key_low, content_address([{"inlineData": {
+            "mimeType": "image/jpeg", "data": base64.b64encode(canonical).decode(),
+        }}, {"text": "t"}])[0])
+        self.assertNotEqual(key_low, content_address([low])[0])
+        # Without a canonicalizer (raw_embed's library montages) the original bytes are sent.
+        self.assertEqual(content_address([low])[2], [low])
+
+    def test_bulk_read_and_lru_eviction(self):
+        with TemporaryDirectory() as directory:
+            store = EmbeddingStore(Path(directory) / "vectors.sqlite3", dimensions=4, max_bytes=3 * 16)
+            try:
+                contents = [[jpeg_part(color, 80), {"text": color}] for color in ("red", "green", "blue")]
+                store.put_many(contents, [np.full(4, index, np.float32) for index in range(3)])
+                self.assertEqual(store.get_many([contents[0]])[0].tolist(), [0.0] * 4)
+                self.assertEqual(store.get_many([contents[2]])[0].tolist(), [2.0] * 4)
+                with mock.patch.object(store, "_evict", wraps=store._evict) as evict:
+                    store.put_many([[{"text": "fourth"}]], [np.full(4, 3, np.float32)])
+                    # Over 3 rows: trimmed to the low-water mark (2), least recently read first.
+                    self.assertEqual(store.count(), 2)
+                    found = store.get_many(contents + [[{"text": "fourth"}]])
+                    self.assertEqual([vec is None for vec in found], [True, True, False, False])
+                    store.put_many([[{"text": "fifth"}]], [np.full(4, 4, np.float32)])
+                    # Back under the cap without re-counting the table.
+                    self.assertEqual(evict.call_count, 1)
+                self.assertEqual(store.count(), 3)
+                self.assertEqual(store.embed_contents([contents[2]])[0].tolist(), [2.0] * 4)
+            finally:
+                store.close()
+
+
+class SharedSpanStoreTest(unittest.TestCase):
+    def test_migration_imports_legacy_caches_and_lookup_is_by_hash(self):
+        with TemporaryDirectory() as directory:
+            legacy = Path(directory) / "video.sqlite3"
+            old = EmbeddingStore(legacy, dimensions=4)
+            old._save(["a", "b"], [np.full(4, 1, np.float32), np.full(4, 2, np.float32)])
+            old.close()
+            with sqlite3.connect(legacy) as db:
+                db.execute("INSERT INTO vectors(key,model,dimensions,text,vector,created_at)"
+                           " VALUES('other','other-model',4,'x',?,0)", (np.zeros(4, np.float32).tobytes(),))
+            store = EmbeddingStore(Path(directory) / "shared.sqlite3", dimensions=4)
+            try:
+                store._save(["a"], [np.full(4, 9, np.float32)])
+                self.assertEqual(store.import_sqlite(legacy), 1)
+                self.assertEqual(store.import_sqlite(legacy), 0)
+                found = store.get_by_keys([vector_key("a", dimensions=4), vector_key("b", dimensions=4), "nope"])
+                self.assertEqual({key: vec[0] for key, vec in found.items()},
+                                 {vector_key("a", dimensions=4): 9.0, vector_key("b", dimensions=4): 2.0})
+            finally:
+                store.close()
+
+    def test_concurrent_callers_embed_each_new_text_once(self):
+        with TemporaryDirectory() as directory:
+            store = EmbeddingStore(Path(directory) / "shared.sqlite3", dimensions=4, batch_size=2)
+            store._save(["cached"], [np.zeros(4, np.float32)])
+            posted = []
+            release = threading.Event()
+
+            def post(texts):
+                posted.extend(texts)
+                release.wait(5)
+                return [np.full(4, len(text), np.float32) for text in texts]
+
+            store._post_batch = post
+            views = [UsageView(store) for _ in range(4)]
+            try:
+                with ThreadPoolExecutor(max_workers=4) as pool:
+                    jobs = [pool.submit(view.embed_many, ["cached", "new one", "new two", ""])
+                            for view in views]
+                    release.set()
+                    results = [job.result() for job in jobs]
+                self.assertEqual(sorted(posted), ["new one", "new two"])
+                self.assertTrue(all(result["new two"][0] == 7 for result in results))
+                self.assertEqual(sum(view.usage["embedded"] for view in views), 2)
+                self.assertTrue(all(view.usage["lookups"] == 3 for view in views))
+                summary = usage_summary(store.usage)
+                self.assertEqual((summary["lookups"], summary["embedded"]), (12, 2))
+                self.assertAlmostEqual(summary["hitRate"], 10 / 12)
+            finally:
+                store.close()
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -1,16 +1,25 @@
+import copy
+import io
+import json
 import subprocess
 import sys
+import threading
 import unittest
+import unittest.mock
 from pathlib import Path
 
 import numpy as np
 
 from opening_predictor import temporal_attribution
+from embedding_store import json_ready
 from score_hook import (
+    ResidentScorer,
     _typed_token_clock,
     _validated_token_clock,
     _variable_curve_payload,
     _variable_prediction_scope,
+    freeze_model_arrays,
+    serve,
 )
 from sequence import tokenize
 
@@ -172,5 +181,105 @@ print(score_hook.PREDICTOR_VERSION)
         )
 
 
+class RecordingScorer(ResidentScorer):
+    """Resident scorer with the model load and the scoring pipeline stubbed out."""
+
+    def load(self, refresh=False):
+        self.models, self.loaded_at, self.load_ms = {}, float("inf"), 1.0
+        self.calls = []
+
+    def score(self, request):
+        self.calls.append(request["text"])
+        if request["text"] == "bad":
+            raise ValueError("an opening needs at least one lexical atom")
+        return {"id": request["text"], "value": np.float32(0.5)}, {"totalMs": 1.0}
+
+
+class ResidentScorerTest(unittest.TestCase):
+    def test_frozen_arrays_leave_predictions_and_json_unchanged(self):
+        family = {
+            "timeZeroMean": 100.0,
+            "temporalModels": [temporal_row(second) for second in range(1, 4)],
+            "stageOrder": list(STAGES),
+            "selectedStage": "relationships",
+        }
+        for row in family["temporalModels"]:
+            for stage in row["stages"].values():
+                stage["model"]["coefficient"] = [0.1, -0.3]
+        model = {"analysisHorizonSeconds": 3.0, "families": {"entryIndexed": family}}
+        frozen = freeze_model_arrays(copy.deepcopy(model))
+        coefficient = frozen["families"]["entryIndexed"]["temporalModels"][0]["stages"]["timing"]["model"]["coefficient"]
+        self.assertIsInstance(coefficient, np.ndarray)
+        self.assertFalse(coefficient.flags.writeable)
+        features = {
+            float(second): {stage: np.asarray([0.6, 0.8], np.float32) for stage in STAGES}
+            for second in (1.0, 2.0, 2.5, 3.0)
+        }
+        self.assertEqual(
+            _variable_curve_payload(features, frozen, 2.5),
+            _variable_curve_payload(features, model, 2.5),
+        )
+        self.assertEqual(json.dumps(json_ready(frozen)), json.dumps(model))
+
+    def test_serve_batches_openings_and_isolates_failures(self):
+        scorer = RecordingScorer(store=unittest.mock.Mock(), workers=2)
+        lines = "\n".join([
+            json.dumps({"id": 1, "openings": [{"text": "a"}, {"text": "bad"}, {"text": "a"}]}),
+            json.dumps({"id": 2, "text": "b"}),
+            "{not json",
+        ]) + "\n"
+        output = io.StringIO()
+        serve(scorer, io.StringIO(lines), output)
+        ready, *replies = [json.loads(line) for line in output.getvalue().splitlines()]
+        first, second, broken = (next(reply for reply in replies if reply["id"] == key) for key in (1, 2, None))
+        self.assertTrue(ready["ready"])
+        self.assertEqual([row.get("result", {}).get("id") for row in first["results"]], ["a", None, "a"])
+        self.assertIn("lexical atom", first["results"][1]["error"])
+        self.assertEqual(first["results"][0]["result"]["value"], 0.5)
+        self.assertIn("batchMs", first["timingsMs"])
+        self.assertEqual(second["results"][0]["result"]["id"], "b")
+        self.assertTrue(broken["error"].startswith("bad request"))
+        self.assertEqual(sorted(scorer.calls), ["a", "b", "bad"])
+
+    def test_serve_coalesces_waiting_requests_and_drops_cancelled_ones(self):
+        scorer = RecordingScorer(store=unittest.mock.Mock(), workers=2)
+        batches = []
+        score, score_batch = scorer.score, scorer.score_batch
+        started, released = threading.Event(), threading.Event()
+
+        def slow_score(request):
+            print(f"scoring {request['text']}", file=sys.stderr)
+            if request["text"] == "slow":
+                started.set()
+                released.wait(5)
+            return score(request)
+
+        scorer.score = slow_score
+        scorer.score_batch = lambda requests: batches.append(len(requests)) or score_batch(requests)
+
+        def stdin():
+            yield json.dumps({"id": "job-0", "text": "slow"}) + "\n"
+            started.wait(5)
+            # everything below queues up while job-0 is being scored
+            yield json.dumps({"id": "job-1", "openings": [{"text": "a"}]}) + "\n"
+            yield json.dumps({"id": "job-2", "openings": [{"text": "b"}, {"text": "c"}]}) + "\n"
+            yield json.dumps({"id": "job-3", "openings": [{"text": "d"}]}) + "\n"
+            yield json.dumps({"op": "cancel", "id": "job-3"}) + "\n"
+            released.set()
+
+        output, log = io.StringIO(), io.StringIO()
+        serve(scorer, stdin(), output, log)
+        _, *replies = [json.loads(line) for line in output.getvalue().splitlines()]
+        by_id = {reply["id"]: reply for reply in replies}
+        self.assertEqual(batches, [1, 3])
+        self.assertEqual(by_id["job-3"], {"id": "job-3", "error": "cancelled"})
+        self.assertEqual([row["result"]["id"] for row in by_id["job-2"]["results"]], ["b", "c"])
+        self.assertEqual([row["result"]["id"] for row in by_id["job-1"]["results"]], ["a"])
+        self.assertEqual(by_id["job-1"]["timingsMs"]["batchRequests"], 2)
+        self.assertNotIn("d", scorer.calls)
+        # a lone request's log lines carry its id; a coalesced batch's stay untagged
+        self.assertIn("[id:job-0] scoring slow", log.getvalue().splitlines())
+        self.assertIn("scoring a", log.getvalue().splitlines())
+
 if __name__ == "__main__":
     unittest.main()
@@ -3,7 +3,7 @@ from itertools import combinations
 
 import numpy as np
 
-from segmentation import discover_boundaries, optimal_partitions
+from segmentation import cost_matrices, discover_boundaries, optimal_partitions
 
 
 class SegmentationTests(unittest.TestCase):
@@ -25,6 +25,105 @@ class SegmentationTests(unittest.TestCase):
             self.assertAlmostEqual(solved[k][0], expected[0])
             self.assertEqual(solved[k][1], expected[1])
 
+    def test_batched_costs_equal_direct_span_sums(self):
+        rng = np.random.RandomState(5)
+        n = 9
+        token_effects = rng.normal(size=(3, n, 12))
+        pair = rng.uniform(size=(3, n, n))
+        spans = [(a, b) for a in range(n) for b in range(a + 1, n + 1)]
+        rng.shuffle(spans)
+        starts, ends = map(np.asarray, zip(*spans))
+        nonadd = rng.uniform(size=(3, len(spans)))
+        stacked = cost_matrices(token_effects, pair, starts, ends, nonadd)
+        for row in range(3):
+            single = cost_matrices(token_effects[row], pair[row], starts, ends, nonadd[row])
+            for (start, end), value in zip(spans, nonadd[row]):
+                block = token_effects[row, start:end]
+                sub = pair[row, start:end, start:end]
+                expected = {
+                    "effect_sse": np.square(block - block.mean(axis=0)).sum(),
+                    "interaction_cohesion": -sub[np.triu_indices(end - start, 1)].sum(),
+                    "span_nonadditivity": -value,
+                }
+                for method, cost in expected.items():
+                    self.assertEqual(stacked[method][row, start, end], cost)
+                    self.assertEqual(single[method][start, end], stacked[method][row, start, end])
+            self.assertTrue(np.isinf(stacked["effect_sse"][row][np.tril_indices(n + 1)]).all())
+            batched = optimal_partitions(stacked["effect_sse"])[row]
+            self.assertEqual(batched, optimal_partitions(single["effect_sse"]))
+        with self.assertRaises(KeyError):
+            cost_matrices(token_effects[0], pair[0], starts[1:], ends[1:], nonadd[0, 1:])
+
+    def test_closed_form_costs_match_direct_span_sums(self):
+        rng = np.random.RandomState(5)
+        n = 9
+        token_effects = rng.normal(size=(3, n, 12))
+        pair = rng.uniform(size=(3, n, n))
+        spans = [(a, b) for a in range(n) for b in range(a + 1, n + 1)]
+        rng.shuffle(spans)
+        starts, ends = map(np.asarray, zip(*spans))
+        nonadd = rng.uniform(size=(3, len(spans)))
+        stacked = cost_matrices(token_effects, pair, starts, ends, nonadd, closed_form=True)
+        for row in range(3):
+            single = cost_matrices(token_effects[row], pair[row], starts, ends, nonadd[row], closed_form=True)
+            for (start, end), value in zip(spans, nonadd[row]):
+                block = token_effects[row, start:end]
+                sub = pair[row, start:end, start:end]
+                expected = {
+                    "effect_sse": np.square(block - block.mean(axis=0)).sum(),
+                    "interaction_cohesion": -sub[np.triu_indices(end - start, 1)].sum(),
+                    "span_nonadditivity": -value,
+                }
+                for method, cost in expected.items():
+                    self.assertAlmostEqual(stacked[method][row, start, end], cost, places=10)
+                    self.assertEqual(single[method][start, end], stacked[method][row, start, end])
+            self.assertTrue(np.isinf(stacked["effect_sse"][row][np.tril_indices(n + 1)]).all())
+            batched = optimal_partitions(stacked["effect_sse"])[row]
+            self.assertEqual(batched, optimal_partitions(single["effect_sse"]))
+
+    def test_statistics_match_the_per_span_baseline(self):
+        # Recorded from the per-span, per-null implementation. Whole-opening
+        # objectives tie every null up to summation order, so p and z there
+        # only reproduce if every span is summed in the original order.
+        rng = np.random.RandomState(23)
+        n, dim = 7, 24
+        token_effects = rng.normal(size=(n, dim)).astype(np.float32)
+        token_effects[3:] += 1.5
+        pair = rng.uniform(.1, .9, size=(n, n)).astype(np.float32)
+        pair = (pair + pair.T) / 2
+        np.fill_diagonal(pair, 0)
+        starts, ends = zip(*[(a, b) for a in range(n) for b in range(a + 1, n + 1)])
+        result = discover_boundaries({
+            "token_effects": token_effects,
+            "pair_norms": pair,
+            "span_start": np.asarray(starts),
+            "span_end": np.asarray(ends),
+            "span_nonadditive_norm": rng.uniform(size=len(starts)),
+        }, null_repeats=16, bootstrap_repeats=3, seed=11)
+        self.assertEqual(result["spanCosts"], "direct")
+        selected = result["selectedSegmentation"]
+        self.assertEqual((selected["method"], selected["segmentCount"], selected["partition"]),
+                         ("effect_sse", 2, [[0, 3], [3, 7]]))
+        self.assertEqual((selected["z"], selected["selectionScore"], selected["experimentP"], selected["searchWideP"]),
+                         (2.835583659740094, 0.9425651869152485, 0.11764705882352941, 0.47058823529411764))
+        rows = {(row["method"], row["segments"]): row for row in result["experiments"]}
+        expected = {
+            ("effect_sse", 1): (213.6600052364915, 213.6600052364915, 1.0048591735576161e-14, 1.0, 0.0),
+            ("effect_sse", 3): (86.02313683637043, 113.33812617120083, 19.342393033062308,
+                                0.17647058823529413, 1.4121825198530609),
+            ("interaction_cohesion", 1): (-11.117101669311523, -11.117101430892944, 4.1295309247228556e-07,
+                                          0.7647058823529411, 0.5759555452953278),
+            ("interaction_cohesion", 4): (-3.5835211277008057, -3.377737909555435, 0.18630107796850354,
+                                          0.11764705882352941, 1.1045734103352167),
+            ("span_nonadditivity", 6): (-2.7736823457445845, -3.2652349585306455, 0.38919309618214354,
+                                        0.8235294117647058, -1.2630044477793316),
+        }
+        for key, values in expected.items():
+            row = rows[key]
+            self.assertEqual((row["objective"], row["nullMean"], row["nullStd"], row["p"], row["z"]), values, key)
+        self.assertEqual([row["bootstrapAgreement"] for row in result["boundaries"]],
+                         [1.0, 0.9074074074074074, 1.0, 0.9629629629629629, 0.9814814814814815, 0.9259259259259259])
+
     def test_planted_interaction_break_is_visible_without_text_rules(self):
         rng = np.random.RandomState(4)
         n, dim = 8, 20
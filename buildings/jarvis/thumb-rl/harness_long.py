@@ -2,11 +2,17 @@
 percentile) -> R2. ONE thumbnail per candidate (no montage). Reward = percentile of the thumbnail's
 Gemini visual embedding projected onto the FROZEN ctrviews blend direction, read off the curated-set
 score ladder (scorer_visual.npz). Mirrors the shorts harness.py structure/idioms."""
-import os, io, json, time, base64, random, threading, re, urllib.request, urllib.error
+import os, io, json, time, base64, random, threading, re, urllib.request, urllib.error, sys
 from pathlib import Path
 from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 import boto3
+# Repo-root modules: scp'd next to this file on the box (see README); in a checkout, at the repo root.
+try:
+    import embedding_gateway, knn_density
+except ModuleNotFoundError:
+    sys.path.append(str(Path(__file__).resolve().parents[3]))
+    import embedding_gateway, knn_density
 
 HERE = "/home/ubuntu/thumbrl"
 def load_env():
@@ -34,27 +40,19 @@ def write_status(state, note=""):
     except Exception:
         pass
 
-EMB_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-embedding-2:embedContent"
+# Every embed (images, idea/prompt texts) goes through the shared gateway: concurrent calls from the
+# worker threads coalesce into batchEmbedContents, and every process on the box paces against one
+# quota bucket. `body` is an embedContent request body, as the callers build it.
 def _embed_call(body, tries):
-    last = ""
-    for a in range(tries):
-        try:
-            req = urllib.request.Request(EMB_URL, data=body, method="POST",
-                headers={"Content-Type": "application/json", "x-goog-api-key": GEMINI})
-            with urllib.request.urlopen(req, timeout=60) as r:
-                return np.array(json.loads(r.read())["embedding"]["values"], np.float32)
-        except urllib.error.HTTPError as e:
-            try: last = e.read().decode()[:300]
-            except Exception: last = "HTTP %s" % e.code
-            if "depleted" in last or "RESOURCE_EXHAUSTED" in last:   # credits gone — no point retrying
-                raise GeminiHalt("Gemini credits depleted: " + last[:120])
-            if a < tries - 1: time.sleep(1.5 * (a + 1)); continue
-        except GeminiHalt:
-            raise
-        except Exception as e:
-            last = str(e)[:120]
-            if a < tries - 1: time.sleep(1.5 * (a + 1)); continue
-    raise GeminiHalt("Gemini embed failed after %d tries: %s" % (tries, last))   # LOUD, never a silent None
+    request = json.loads(body)
+    try:
+        return embedding_gateway.embed(request["content"]["parts"], GEMINI,
+                                       dimensions=request.get("outputDimensionality", 1536), tries=tries)
+    except embedding_gateway.EmbeddingGatewayError as e:
+        last = (e.detail or str(e))[:300]
+        if "depleted" in last:   # credits gone
+            raise GeminiHalt("Gemini credits depleted: " + last[:120])
+        raise GeminiHalt("Gemini embed failed after %d tries: %s" % (tries, last[:120]))   # LOUD, never a silent None
 
 def embed_image(jpg_bytes, tries=6):
     b64 = base64.b64encode(jpg_bytes).decode()
@@ -184,39 +182,55 @@ def _load_map():
         _XY[0] = np.array([id2xy.get(rid, (np.nan, np.nan)) for rid in _RIDS[0]], float)
         _MAP[0] = True
 
+BATCH_ROWS = 256  # candidate (or probe) rows per similarity GEMM against the real manifold
 DENSITY_FLOOR = [None]  # real-real nn_cos p10 — below this a thumbnail is off the real-thumbnail manifold
 def _density_floor():
     if DENSITY_FLOOR[0] is None:
         V = real_vecs(); rng = np.random.default_rng(0)
         idx = rng.choice(len(V), size=min(400, len(V)), replace=False)
         floors = []
-        for i in idx:
-            sims = V @ V[i]; sims[i] = -1
-            floors.append(float(sims.max()))
+        for s in range(0, len(idx), BATCH_ROWS):
+            blk = idx[s:s + BATCH_ROWS]
+            sims = V[blk] @ V.T; sims[np.arange(len(blk)), blk] = -1
+            floors.extend(float(m) for m in sims.max(axis=1))
         DENSITY_FLOOR[0] = float(np.percentile(floors, 10))
     return DENSITY_FLOOR[0]
 
+def score_thumb_batch(embs):
+    """score_thumb for a whole best-of-N group: one blend projection + one blocked top-12 pass
+    (knn_density.top_similarities) against the real manifold instead of a full argsort per thumbnail."""
+    if not len(embs): return []
+    sc = scorer()
+    E = np.asarray(embs, np.float32)
+    En = E / (np.linalg.norm(E, axis=1, keepdims=True) + 1e-8)
+    projs = En @ sc["blend"]
+    pctiles = np.searchsorted(sc["ladder"], projs) / len(sc["ladder"])
+    _load_map()
+    tsims, tops, _ = knn_density.top_similarities(En, real_vecs(), 12, query_block=BATCH_ROWS)
+    out = []
+    for pctile, proj, top, ts in zip(pctiles, projs, tops, tsims):
+        nbr = [[_RIDS[0][i], round(float(c), 4)] for i, c in zip(top, ts)]
+        xy = _XY[0][top[::-1]]; good = ~np.isnan(xy[:, 0])
+        out.append({"pctile": round(float(pctile), 4), "proj": round(float(proj), 4), "nn_cos": float(ts[0]),
+                    "x": round(float(np.mean(xy[good, 0])), 1) if good.any() else 0.0,
+                    "y": round(float(np.mean(xy[good, 1])), 1) if good.any() else 0.0, "nbr": nbr})
+    return out
+
 def score_thumb(emb):
     """Reward axis = ctrviews (CTR+views joint). Score = percentile of the thumbnail's projection onto
     the frozen blend direction, read off the curated-set ladder. Plus nn_cos density + map neighbors."""
-    sc = scorer()
-    en = emb / (np.linalg.norm(emb) + 1e-8)
-    proj = float(en @ sc["blend"])
-    pctile = float(np.searchsorted(sc["ladder"], proj) / len(sc["ladder"]))
-    _load_map()
-    sims = real_vecs() @ en
-    order = np.argsort(sims); top = order[-12:][::-1]
-    nbr = [[_RIDS[0][i], round(float(sims[i]), 4)] for i in top]
-    xy = _XY[0][order[-12:]]; good = ~np.isnan(xy[:, 0])
-    return {"pctile": round(pctile, 4), "proj": round(proj, 4), "nn_cos": float(sims.max()),
-            "x": round(float(np.mean(xy[good, 0])), 1) if good.any() else 0.0,
-            "y": round(float(np.mean(xy[good, 1])), 1) if good.any() else 0.0, "nbr": nbr}
+    return score_thumb_batch([emb])[0]
+
+def render_embed(prompt):
+    """Render ONE thumbnail and embed it -> (jpg_bytes, embedding); either may be None.
+    Harvest loops run this per attempt in threads, then score the group with one score_thumb_batch."""
+    jpg = flux_schnell(prompt)
+    if jpg is None: return None, None
+    return jpg, embed_image(jpg)
 
 def render_score(prompt):
     """Render ONE thumbnail, embed, score. Returns (jpg_bytes, embedding, score_dict) — any may be None."""
-    jpg = flux_schnell(prompt)
-    if jpg is None: return None, None, None
-    emb = embed_image(jpg)
+    jpg, emb = render_embed(prompt)
     if emb is None: return jpg, None, None
     return jpg, emb, score_thumb(emb)
 
@@ -96,16 +96,23 @@ def gen_group(title, n):
             rows.append({"reasoning": "", "prompt": p, "completion": o.outputs[0].text})
     return rows
 
-def score_attempt(att, title_vec):
+def render_attempt(att, title_vec):
     if not att.get("prompt"):
         return None
-    jpg, emb, sc = H.render_score(att["prompt"])
-    if sc is None:
+    jpg, emb = H.render_embed(att["prompt"])
+    if emb is None:
         return None
     rel, cap = REL.relevance_emb(emb, title_vec)
-    reward = REL.gated_reward(sc["pctile"], rel, sc["nn_cos"])
-    return {**att, "jpg": jpg, "pctile": sc["pctile"], "nn_cos": sc["nn_cos"], "x": sc["x"], "y": sc["y"],
-            "nbr": sc["nbr"], "relevance": rel, "caption": cap, "reward": reward}
+    return {**att, "jpg": jpg, "emb": emb, "relevance": rel, "caption": cap}
+
+def score_attempts(rendered):
+    """Score every rendered attempt of a request with one batched similarity pass."""
+    out = []
+    for r, sc in zip(rendered, H.score_thumb_batch([r.pop("emb") for r in rendered])):
+        reward = REL.gated_reward(sc["pctile"], r["relevance"], sc["nn_cos"])
+        out.append({**r, "pctile": sc["pctile"], "nn_cos": sc["nn_cos"], "x": sc["x"], "y": sc["y"],
+                    "nbr": sc["nbr"], "reward": reward})
+    return out
 
 def status(rid, **kw):
     H.s3.put_object(Bucket=H.BUCKET, Key="longform/guesses/demo/status/%s.json" % rid,
@@ -117,11 +124,12 @@ def process_request(rid, title, count, invented=False):
     group = gen_group(title, count)
     status(rid, stage="rendering", title=title, note="rendering and scoring thumbnails", n=len(group), done=0)
     with ThreadPoolExecutor(max_workers=8) as ex:
-        scored = []
-        for i, r in enumerate(ex.map(lambda a: score_attempt(a, title_vec), group)):
+        rendered = []
+        for i, r in enumerate(ex.map(lambda a: render_attempt(a, title_vec), group)):
             if r:
-                scored.append(r)
+                rendered.append(r)
             status(rid, stage="rendering", title=title, note="rendering and scoring thumbnails", n=len(group), done=i + 1)
+    scored = score_attempts(rendered)
     if not scored:
         H.s3.put_object(Bucket=H.BUCKET, Key="longform/guesses/demo/groups/%s.json" % rid,
                         Body=json.dumps({"input_id": rid, "title": title, "attempts": [], "done": True,
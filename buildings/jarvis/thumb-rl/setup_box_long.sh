@@ -5,7 +5,7 @@ echo "=== venv + deps ==="
 python3 -m venv venv
 venv/bin/pip install -q --upgrade pip
 venv/bin/pip install -q --index-url https://download.pytorch.org/whl/cu124 torch   # CUDA 12.x to match Lambda's driver (default pip grabs cu130 → cuda=False)
-venv/bin/pip install -q "numpy<2.3" "transformers==4.53.2" peft "trl==0.19.1" bitsandbytes accelerate datasets boto3 pillow hf_transfer huggingface_hub scipy scikit-learn joblib
+venv/bin/pip install -q "numpy<2.3" "transformers==4.53.2" peft "trl==0.19.1" bitsandbytes accelerate datasets boto3 pillow hf_transfer huggingface_hub scipy scikit-learn joblib requests
 venv/bin/pip install -q "vllm==0.9.2"                     # fast MoE inference (installs its own torch cu126 — fine)
 venv/bin/pip install -q --no-deps "trl==0.19.1" "transformers==4.53.2"   # re-pin after vllm's resolver
 echo DEPS_DONE
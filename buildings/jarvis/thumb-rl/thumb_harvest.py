@@ -95,14 +95,21 @@ def gen_batch(titles_list, temp=1.05, n=None):
 def gen_group(title, n=G, temp=1.05):
     return gen_batch([title], temp)[0]
 
-def score_attempt(att, title_vec):
+def render_attempt(att, title_vec):
     if not att["prompt"]: return None
-    jpg, emb, sc = H.render_score(att["prompt"])
-    if sc is None: return None
+    jpg, emb = H.render_embed(att["prompt"])
+    if emb is None: return None
     rel, cap = REL.relevance_emb(emb, title_vec)   # caption-free leash: direct image↔title cosine in the joint space
-    reward = REL.gated_reward(sc["pctile"], rel, sc["nn_cos"])
-    return {**att, "jpg": jpg, "pctile": sc["pctile"], "nn_cos": sc["nn_cos"],
-            "x": sc["x"], "y": sc["y"], "nbr": sc["nbr"], "relevance": rel, "caption": cap, "reward": reward}
+    return {**att, "jpg": jpg, "emb": emb, "relevance": rel, "caption": cap}
+
+def score_attempts(rendered):
+    """Score the rendered group in one batch (one GEMM against the real manifold, not one argsort per thumbnail)."""
+    out = []
+    for r, sc in zip(rendered, H.score_thumb_batch([r.pop("emb") for r in rendered])):
+        reward = REL.gated_reward(sc["pctile"], r["relevance"], sc["nn_cos"])
+        out.append({**r, "pctile": sc["pctile"], "nn_cos": sc["nn_cos"],
+                    "x": sc["x"], "y": sc["y"], "nbr": sc["nbr"], "reward": reward})
+    return out
 
 # load + dedup titles so inputs are distinct
 titles = []
@@ -150,7 +157,8 @@ def process_input(item, iid, group=None, run=RUN, gkey=None):
     title_vec = REL.embed_text(title)
     if group is None: group = gen_group(title)
     with ThreadPoolExecutor(max_workers=8) as ex:
-        scored = [r for r in ex.map(lambda a: score_attempt(a, title_vec), group) if r]
+        rendered = [r for r in ex.map(lambda a: render_attempt(a, title_vec), group) if r]
+    scored = score_attempts(rendered)
     if len(scored) < 2: return False
     rewards = np.array([s["reward"] for s in scored], float)
     base = float(rewards.mean()); scored.sort(key=lambda s: -s["reward"])
@@ -0,0 +1,301 @@
+"""Revision-pinned local snapshots of the raw/ corpus channels for analysis scripts.
+
+Every offline analysis (indicators, fusion features, the novelty sweeps) used to
+`np.load(io.BytesIO(...))` the whole `raw/<chan>/embeddings.npz` (~380MB
+compressed for visual/together) into RAM, normalize a private copy of the
+vectors, and rebuild id -> row dicts and cross-channel alignments with Python
+loops. open_channel() replaces that with one local copy per archive revision:
+
+* the revision is the segmented archive's shard hashes when the channel has
+  been segmented (the archive raw_embed writes checkpoints to), else the
+  legacy npz ETag, so a rerun against an unchanged corpus downloads nothing;
+* `unit.npy` holds the row-normalized float32 vectors, written once by
+  streaming shard by shard (or npz chunk by chunk) and opened as a read-only
+  mmap, so concurrent scripts share one page-cache copy;
+* each metadata column is its own .npy (strings as fixed-width unicode, never
+  pickles), plus the id sort order used for vectorized lookups; a column with
+  nulls also stores a `<name>.null.npy` mask and reads back as a masked array;
+* alignment() maps another channel's (or a map.json's) ids onto a snapshot's
+  rows with one searchsorted, and caches the index array on disk keyed by both
+  revisions.
+
+Snapshots are built in a scratch directory and renamed into place with the
+marker written last, so an interrupted build is never mistaken for a cache.
+A Snapshot opens all of its files when it is constructed, and a new build only
+prunes revisions beyond the KEEP_REVISIONS most recent, so a script still
+holding an older revision keeps reading it.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import zipfile
+
+import numpy as np
+
+import embedding_archive
+
+
+SCHEMA = 'corpus-snapshot-v1'
+CHUNK_ROWS = 4096
+EPSILON = 1e-9
+MARKER = 'snapshot.json'
+KEEP_REVISIONS = 3
+CACHE_DIR = os.environ.get('CORPUS_SNAPSHOT_CACHE') or os.path.join(
+    tempfile.gettempdir(), 'corpus-snapshots')
+# Columns older archives did not write yet, with the value their readers assumed.
+COLUMN_DEFAULTS = {'mine': False, 'silent': False, 'txt': ''}
+
+_OPEN = {}
+
+
+def _missing(error):
+    response = getattr(error, 'response', None) or {}
+    status = (response.get('ResponseMetadata') or {}).get('HTTPStatusCode')
+    return status == 404 or (response.get('Error') or {}).get('Code') in ('NoSuchKey', '404', 'NotFound')
+
+
+def _getter(s3, bucket):
+    def get(key):
+        try:
+            return s3.get_object(Bucket=bucket, Key=key)['Body'].read()
+        except Exception as error:
+            if _missing(error):
+                return None
+            raise
+    return get
+
+
+def _unit(block):
+    block = np.asarray(block, np.float32)
+    return block / (np.linalg.norm(block, axis=1, keepdims=True) + EPSILON)
+
+
+def _safe(revision):
+    return ''.join(char if char.isalnum() or char in '-_' else '_' for char in revision)
+
+
+def _save(path, array):
+    tmp = f'{path}.tmp{os.getpid()}.npy'
+    np.save(tmp, array, allow_pickle=False)
+    os.replace(tmp, path)
+
+
+def _column(values):
+    """(values without pickles, null mask or None): nulls keep their own mask, never a 'None' string."""
+    values = np.asarray(values)
+    if values.dtype != object:
+        return values, None
+    null = np.asarray([value is None for value in values], bool)
+    present = [value for value in values if value is not None]
+    if present and all(isinstance(value, (bool, np.bool_)) for value in present):
+        dense = np.asarray([bool(value) if value is not None else False for value in values], bool)
+    elif present and all(isinstance(value, (int, float, np.integer, np.floating)) for value in present):
+        dense = np.asarray([float(value) if value is not None else np.nan for value in values], float)
+    else:
+        dense = np.asarray([str(value) if value is not None else '' for value in values], dtype=str)
+    return dense, null if null.any() else None
+
+
+def channel_revision(s3, bucket, chan):
+    """(revision, segments manifest or None) of `raw/<chan>`'s current embeddings."""
+    manifest = embedding_archive.load_manifest(_getter(s3, bucket), f'raw/{chan}/segments')
+    if manifest:
+        digest = hashlib.sha256()
+        for entry in manifest['shards']:
+            digest.update(f'{entry["vecs"]["sha256"]}:{entry["meta"]["sha256"]};'.encode())
+        return f'segments-{manifest["dtype"]}-{digest.hexdigest()[:32]}', manifest
+    try:
+        head = s3.head_object(Bucket=bucket, Key=f'raw/{chan}/embeddings.npz')
+    except Exception as error:
+        if _missing(error):
+            raise RuntimeError(f'raw/{chan} has no embedding archive') from error
+        raise
+    return f'npz-{head["ETag"].strip(chr(34))}', None
+
+
+def _build_from_segments(s3, bucket, manifest, folder):
+    get = _getter(s3, bucket)
+    shards = embedding_archive.CACHE_DIR
+    embedding_archive.write_unit_matrix(manifest, get, os.path.join(folder, 'unit.npy'), shards)
+    columns = embedding_archive.read_columns(manifest, get, shards)
+    columns['ids'] = np.asarray(embedding_archive.read_ids(manifest, get, shards), dtype=str)
+    return columns
+
+
+def _build_from_npz(s3, bucket, chan, revision, folder):
+    archive = os.path.join(folder, 'embeddings.npz')
+    s3.download_file(bucket, f'raw/{chan}/embeddings.npz', archive)
+    head = s3.head_object(Bucket=bucket, Key=f'raw/{chan}/embeddings.npz')
+    if f'npz-{head["ETag"].strip(chr(34))}' != revision:
+        raise RuntimeError(f'raw/{chan}/embeddings.npz changed while it was being snapshotted')
+    raw = os.path.join(folder, 'vecs-raw.npy')
+    with zipfile.ZipFile(archive) as zipped:
+        member = next((name for name in zipped.namelist() if name.endswith('vecs.npy')), None)
+        if member is None:
+            raise RuntimeError(f'raw/{chan}/embeddings.npz has no vecs')
+        with zipped.open(member) as source, open(raw, 'wb') as target:
+            shutil.copyfileobj(source, target, 1024 * 1024)
+    vecs = np.load(raw, mmap_mode='r')
+    unit = np.lib.format.open_memmap(
+        os.path.join(folder, 'unit.npy'), mode='w+', dtype=np.float32, shape=(len(vecs), vecs.shape[1]))
+    for start in range(0, len(vecs), CHUNK_ROWS):
+        unit[start:start + CHUNK_ROWS] = _unit(vecs[start:start + CHUNK_ROWS])
+    unit.flush()
+    del unit, vecs
+    with np.load(archive, allow_pickle=True) as npz:
+        columns = {name: npz[name] for name in npz.files if name != 'vecs'}
+    os.remove(raw)
+    os.remove(archive)
+    return columns
+
+
+def _build(s3, bucket, chan, revision, manifest, path):
+    folder = f'{path}.tmp{os.getpid()}'
+    shutil.rmtree(folder, ignore_errors=True)
+    os.makedirs(folder)
+    try:
+        if manifest:
+            columns = _build_from_segments(s3, bucket, manifest, folder)
+        else:
+            columns = _build_from_npz(s3, bucket, chan, revision, folder)
+        rows = len(np.load(os.path.join(folder, 'unit.npy'), mmap_mode='r'))
+        names, nullable = [], []
+        for name, values in columns.items():
+            values, null = _column(values)
+            if len(values) != rows:
+                raise RuntimeError(f'raw/{chan} column {name} has {len(values)} rows for {rows} vectors')
+            _save(os.path.join(folder, f'{name}.npy'), values)
+            names.append(name)
+            if null is not None:
+                _save(os.path.join(folder, f'{name}.null.npy'), null)
+                nullable.append(name)
+        if 'ids' in nullable:
+            raise RuntimeError(f'raw/{chan} has rows without an id')
+        _save(os.path.join(folder, 'order.npy'), np.argsort(_column(columns['ids'])[0], kind='stable'))
+        with open(os.path.join(folder, MARKER), 'w') as handle:
+            json.dump({'schema': SCHEMA, 'chan': chan, 'revision': revision, 'rows': rows,
+                       'columns': sorted(names), 'nullable': sorted(nullable)}, handle)
+        try:
+            os.replace(folder, path)
+        except OSError:
+            # Another process finished the same revision first; both copies are identical.
+            if not os.path.exists(os.path.join(path, MARKER)):
+                raise
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+    # Keep the few most recent revisions: another script may still hold an older
+    # Snapshot, and its files are open already, so even a pruned one stays readable.
+    parent = os.path.dirname(path)
+    siblings = [os.path.join(parent, name) for name in os.listdir(parent)
+                if name != os.path.basename(path) and '.tmp' not in name]
+    for stale in sorted(siblings, key=os.path.getmtime, reverse=True)[KEEP_REVISIONS - 1:]:
+        shutil.rmtree(stale, ignore_errors=True)
+
+
+class Snapshot:
+    """One channel at one revision: unit vectors, ids and columns, all local."""
+
+    def __init__(self, path):
+        with open(os.path.join(path, MARKER)) as handle:
+            self.manifest = json.load(handle)
+        if self.manifest.get('schema') != SCHEMA:
+            raise RuntimeError(f'unsupported corpus snapshot schema {self.manifest.get("schema")!r}')
+        self.path = path
+        self.chan = self.manifest['chan']
+        self.revision = self.manifest['revision']
+        # Every file is opened now: a later build may prune this revision's directory.
+        self.vecs = np.load(os.path.join(path, 'unit.npy'), mmap_mode='r')
+        self.ids = np.load(os.path.join(path, 'ids.npy'))
+        self._order = np.load(os.path.join(path, 'order.npy'))
+        self._columns = {}
+        for name in self.manifest['columns']:
+            values = np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r')
+            if name in self.manifest.get('nullable', ()):
+                values = np.ma.masked_array(values, np.load(os.path.join(path, f'{name}.null.npy')))
+            self._columns[name] = values
+        self._positions = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    def column(self, name, default=None):
+        """A metadata column (read-only mmap, masked where null); a missing column is `default` (or its legacy default) per row."""
+        if name in self._columns:
+            return self._columns[name]
+        default = COLUMN_DEFAULTS.get(name) if default is None else default
+        if default is None:
+            raise RuntimeError(f'raw/{self.chan} snapshot has no {name} column')
+        return np.full(len(self), default)
+
+    def positions(self):
+        """{id: row}, the dict the scripts used to build (last row wins for repeated ids)."""
+        if self._positions is None:
+            self._positions = {vid: row for row, vid in enumerate(self.ids.tolist())}
+        return self._positions
+
+    def rows(self, ids):
+        """Row of each id in `ids`, -1 where the snapshot does not have it."""
+        ids = np.asarray([str(vid) for vid in ids], dtype=str)
+        if not len(ids) or not len(self):
+            return np.full(len(ids), -1, np.int64)
+        ordered = self.ids[self._order]
+        # The right-most match is the last row with that id, like the dicts it replaces.
+        at = np.searchsorted(ordered, ids, side='right') - 1
+        found = (at >= 0) & (ordered[np.maximum(at, 0)] == ids)
+        return np.where(found, self._order[np.maximum(at, 0)], -1).astype(np.int64)
+
+
+def open_channel(s3, bucket, chan, cache_dir=CACHE_DIR):
+    """The local snapshot of `raw/<chan>` at its current revision, built on first use."""
+    revision, manifest = channel_revision(s3, bucket, chan)
+    key = (bucket, chan, revision)
+    if key not in _OPEN:
+        path = os.path.join(cache_dir, _safe(bucket), _safe(chan), _safe(revision))
+        if not os.path.exists(os.path.join(path, MARKER)):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            _build(s3, bucket, chan, revision, manifest, path)
+        _OPEN[key] = Snapshot(path)
+    return _OPEN[key]
+
+
+def read_map(s3, bucket, chan):
+    """(`raw/<chan>/map.json`, its ETag): the ETag pins map alignments."""
+    response = s3.get_object(Bucket=bucket, Key=f'raw/{chan}/map.json')
+    return json.loads(response['Body'].read()), response['ETag'].strip('"')
+
+
+def alignment(source, target, target_revision=None, cache_dir=CACHE_DIR):
+    """Row of `source` for every id of `target` (a Snapshot or an id sequence), -1 where missing.
+
+    With a Snapshot target, or a `target_revision` for a plain id list (a map's
+    ETag), the index array is cached on disk for that pair of revisions.
+    """
+    if isinstance(target, Snapshot):
+        target_ids, target_revision = target.ids, target.revision
+    else:
+        target_ids = target
+    path = None
+    if target_revision:
+        digest = hashlib.sha256(f'{source.chan}|{source.revision}|{target_revision}'.encode()).hexdigest()[:32]
+        path = os.path.join(cache_dir, 'alignments', f'{digest}.npy')
+        if os.path.exists(path):
+            rows = np.load(path)
+            if len(rows) == len(target_ids):
+                return rows
+    rows = source.rows(target_ids)
+    if path:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        _save(path, rows)
+    return rows
+
+
+def aligned(source, target, target_revision=None, cache_dir=CACHE_DIR):
+    """(`source` unit vectors in `target` row order with NaN rows where missing, have-mask)."""
+    rows = alignment(source, target, target_revision, cache_dir)
+    have = rows >= 0
+    matrix = np.full((len(rows), source.vecs.shape[1]), np.nan, np.float32)
+    matrix[have] = source.vecs[rows[have]]
+    return matrix, have
@@ -1,5 +1,6 @@
 """Deterministic serving math for the governed creator keep coordinate."""
 
+import hashlib
 import io
 import json
 
@@ -22,6 +23,13 @@ FEATURE_NAMES = (
     'krrTogether',
     'krrVisual',
 )
+KRR_ALPHA = 0.1
+KRR_MODALITIES = ('together', 'visual')
+KRR_DUAL_MEMBERS = tuple(
+    f'profile_krr_{modality}_{part}'
+    for modality in KRR_MODALITIES
+    for part in ('mean', 'dual')
+)
 
 
 def _normalized(vector):
@@ -38,7 +46,7 @@ def load_serving_state(value):
         raise RuntimeError('creator-adaptive serving coordinate is incompatible')
     if tuple(metadata.get('featureNames') or ()) != FEATURE_NAMES:
         raise RuntimeError('creator-adaptive serving feature order is incompatible')
-    return {
+    state = {
         'metadata': metadata,
         'reference_centered_visual': np.asarray(
             archive['reference_centered_visual'],
@@ -91,6 +99,8 @@ def load_serving_state(value):
             dtype=np.float64,
         ),
     }
+    state.update(_profile_kernel_ridge_state(archive, metadata, state))
+    return state
 
 
 def _weighted_knn(similarity, targets, neighbors):
@@ -103,7 +113,7 @@ def _weighted_knn(similarity, targets, neighbors):
     return float(np.sum(weights * targets[local]) / (np.sum(weights) + EPSILON))
 
 
-def _kernel_ridge(train_vectors, outcomes, query, alpha=0.1):
+def _kernel_ridge_dual(train_vectors, outcomes, alpha=KRR_ALPHA):
     gram = train_vectors @ train_vectors.T
     train_mean = float(np.mean(outcomes))
     centered = outcomes - train_mean
@@ -112,7 +122,72 @@ def _kernel_ridge(train_vectors, outcomes, query, alpha=0.1):
         weights = np.linalg.solve(system, centered)
     except np.linalg.LinAlgError:
         weights = np.linalg.lstsq(system, centered, rcond=None)[0]
-    return float(train_mean + (query @ train_vectors.T) @ weights)
+    return train_mean, weights
+
+
+def profile_kernel_ridge_duals(profile_vectors, profile_outcomes, profile_counts):
+    """Per-profile kernel-ridge means and zero-padded dual coefficients.
+
+    The profile histories are frozen in the serving archive, so the solve
+    against their Gram matrix is done once here instead of on every score.
+    """
+    vectors = np.asarray(profile_vectors, dtype=np.float64)
+    outcomes = np.asarray(profile_outcomes, dtype=np.float64)
+    means = np.zeros(len(profile_counts), dtype=np.float64)
+    duals = np.zeros(outcomes.shape, dtype=np.float64)
+    for index, count in enumerate(int(value) for value in profile_counts):
+        if count:
+            means[index], duals[index, :count] = _kernel_ridge_dual(
+                vectors[index, :count],
+                outcomes[index, :count],
+            )
+    return means, duals
+
+
+def kernel_ridge_dual_sha256(arrays):
+    digest = hashlib.sha256()
+    for name in KRR_DUAL_MEMBERS:
+        value = np.ascontiguousarray(arrays[name], dtype='<f8')
+        digest.update(name.encode('ascii'))
+        digest.update(repr(value.shape).encode('ascii'))
+        digest.update(value.tobytes())
+    return digest.hexdigest()
+
+
+def _profile_kernel_ridge_state(archive, metadata, state):
+    members = set(archive.files)
+    if members.issuperset(KRR_DUAL_MEMBERS):
+        arrays = {
+            name: np.asarray(archive[name], dtype=np.float64)
+            for name in KRR_DUAL_MEMBERS
+        }
+        if kernel_ridge_dual_sha256(arrays) != (
+            (metadata.get('krrDual') or {}).get('sha256')
+        ):
+            raise RuntimeError(
+                'creator-adaptive serving dual coefficients failed hash verification'
+            )
+    elif members.intersection(KRR_DUAL_MEMBERS):
+        raise RuntimeError('creator-adaptive serving dual state is incomplete')
+    else:
+        # Archives published before the dual state was stored.
+        arrays = {}
+        for modality in KRR_MODALITIES:
+            (
+                arrays[f'profile_krr_{modality}_mean'],
+                arrays[f'profile_krr_{modality}_dual'],
+            ) = profile_kernel_ridge_duals(
+                state[f'profile_{modality}'],
+                state['profile_outcomes'],
+                state['profile_counts'],
+            )
+    for modality in KRR_MODALITIES:
+        dual = arrays[f'profile_krr_{modality}_dual']
+        if dual.shape != state['profile_outcomes'].shape:
+            raise RuntimeError(
+                'creator-adaptive serving dual coefficients do not match profile histories'
+            )
+    return arrays
 
 
 def score_creator_adaptive_keep(state, visual, together, profile):
@@ -157,7 +232,6 @@ def score_creator_adaptive_keep(state, visual, together, profile):
 
     history_visual = state['profile_visual'][profile_index, :count]
     history_together = state['profile_together'][profile_index, :count]
-    history_outcomes = state['profile_outcomes'][profile_index, :count]
     features = np.asarray([
         pooled(together_similarity, 12),
         pooled(together_similarity, 24),
@@ -165,15 +239,15 @@ def score_creator_adaptive_keep(state, visual, together, profile):
         pooled(combined_similarity, 12),
         pooled(visual_similarity, 12),
         pooled(visual_similarity, 24),
-        _kernel_ridge(
-            history_together,
-            history_outcomes,
-            together_query,
+        float(
+            state['profile_krr_together_mean'][profile_index]
+            + (together_query @ history_together.T)
+            @ state['profile_krr_together_dual'][profile_index, :count]
         ),
-        _kernel_ridge(
-            history_visual,
-            history_outcomes,
-            visual_query,
+        float(
+            state['profile_krr_visual_mean'][profile_index]
+            + (visual_query @ history_visual.T)
+            @ state['profile_krr_visual_dual'][profile_index, :count]
         ),
     ], dtype=np.float64)
     residual_features = features - baseline
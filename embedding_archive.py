@@ -0,0 +1,286 @@
+"""Segmented, append-only embedding archive for the raw/ corpus channels.
+
+`raw/<chan>/embeddings.npz` is one compressed zip of the whole channel
+(~380MB for visual/together), so every embed checkpoint re-uploaded all of it
+and every scorer warm had to range-parse its central directory to stream out a
+single member. This archive stores the same rows as shards under
+`raw/<chan>/segments/`:
+
+* `vecs-<sha>.npy`  one fixed-dtype (float32, or float16 to halve transfer)
+  matrix per shard, uncompressed so a local copy is mmapped as is;
+* `meta-<sha>.npz`  that shard's row metadata (ids, views, outlier, subs,
+  title, txt, mine, silent — whatever columns the writer keeps);
+* `ids-<sha>.json`  that shard's ids alone, for readers that need only ids
+  and vectors;
+* `manifest.json`   each shard's keys, row count and sha256 in row order,
+  written last. The manifest ETag is the revision a scorer pins. It holds no
+  ids itself, so a checkpoint's manifest stays a few KB however many rows
+  the channel has (v1 manifests, which listed every id, still load).
+
+Shard keys are content addressed, so an unchanged shard is never uploaded
+twice and a reader caches it on disk across manifest revisions: a checkpoint
+uploads only the rows embedded since the previous one, and a warm after a
+checkpoint downloads only those. Small tail shards are folded into one full
+shard once they add up to SHARD_ROWS, which keeps the shard count bounded.
+Shards a new manifest stops referencing (folded tails, rewritten shards) are
+deleted from the bucket when the writer passes `delete`, and dropped from the
+local cache the next time a reader opens that channel's vectors.
+"""
+
+import hashlib
+import io
+import json
+import os
+import re
+import tempfile
+
+import numpy as np
+
+
+SCHEMA = 'embedding-archive-v2'
+READABLE_SCHEMAS = ('embedding-archive-v1', SCHEMA)
+SHARD_ROWS = 8192
+CHUNK_ROWS = 4096
+EPSILON = 1e-9
+DTYPES = ('float32', 'float16')
+CACHE_DIR = os.environ.get('EMBEDDING_ARCHIVE_CACHE') or os.path.join(
+    tempfile.gettempdir(), 'embedding-archive-shards')
+SHARD_FILE = re.compile(r'(vecs|meta|ids)-[0-9a-f]{32}\.(npy|npz|json)$')
+
+
+def manifest_key(prefix):
+    return f'{prefix}/manifest.json'
+
+
+def _npy_bytes(array):
+    output = io.BytesIO()
+    np.save(output, array, allow_pickle=False)
+    return output.getvalue()
+
+
+def _meta_bytes(columns):
+    output = io.BytesIO()
+    np.savez_compressed(output, **columns)
+    return output.getvalue()
+
+
+def _ids_bytes(ids):
+    return json.dumps(list(ids), separators=(',', ':')).encode()
+
+
+def _keys(manifest):
+    return {entry[kind]['key'] for entry in manifest.get('shards') or [] for kind in ('vecs', 'meta', 'ids')
+            if kind in entry}
+
+
+def _ref(prefix, kind, payload, suffix, content_type, put, known):
+    digest = hashlib.sha256(payload).hexdigest()
+    key = f'{prefix}/{kind}-{digest[:32]}.{suffix}'
+    if key not in known:
+        put(key, payload, content_type)
+        known.add(key)
+    return {'key': key, 'sha256': digest, 'bytes': len(payload)}
+
+
+def _columns(arrays, start, stop, column_dtypes):
+    return {
+        name: np.asarray(values[start:stop], dtype=column_dtypes.get(name))
+        for name, values in arrays.items() if name != 'vecs'
+    }
+
+
+def _shard(prefix, arrays, ids, start, stop, dtype, column_dtypes, put, known):
+    vecs = np.asarray(arrays['vecs'][start:stop], np.float32).astype(dtype, copy=False)
+    return {
+        'rows': int(stop - start),
+        'vecs': _ref(prefix, 'vecs', _npy_bytes(np.ascontiguousarray(vecs)), 'npy',
+                     'application/octet-stream', put, known),
+        'meta': _ref(prefix, 'meta', _meta_bytes(_columns(arrays, start, stop, column_dtypes)), 'npz',
+                     'application/octet-stream', put, known),
+        'ids': _ref(prefix, 'ids', _ids_bytes(ids[start:stop]), 'json', 'application/json', put, known),
+    }
+
+
+def _saved_prefix(previous, ids):
+    """Rows of `previous` that are still the first rows of `ids`, or None if they are not."""
+    if 'ids' in previous:  # v1 manifest
+        saved = previous['ids']
+        return len(saved) if ids[:len(saved)] == saved else None
+    start = 0
+    for entry in previous['shards']:
+        stop = start + entry['rows']
+        if stop > len(ids) or hashlib.sha256(_ids_bytes(ids[start:stop])).hexdigest() != entry['ids']['sha256']:
+            return None
+        start = stop
+    return start
+
+
+def save(prefix, arrays, put, previous=None, dtype='float32', rewrite=False, column_dtypes=None, delete=None):
+    """Persist `arrays` (full channel columns, `ids` and `vecs` required) and return the manifest.
+
+    Columns may be plain lists; only the rows being written are converted,
+    using `column_dtypes` where given. When `previous` is the last manifest
+    this writer saved and its ids are still a prefix of `arrays['ids']`, only
+    the new rows are written (plus a fold of small tail shards). Otherwise, or
+    with rewrite=True after editing rows that were already saved, the channel
+    is re-sharded, still skipping every shard whose bytes are unchanged.
+    With `delete`, shards of `previous` the new manifest no longer references
+    are deleted once that manifest is written.
+    """
+    if dtype not in DTYPES:
+        raise ValueError(f'unsupported archive dtype {dtype!r}')
+    ids = [str(value) for value in arrays['ids']]
+    if len(arrays['vecs']) != len(ids):
+        raise ValueError(f'{len(arrays["vecs"])} vectors for {len(ids)} ids')
+    known = _keys(previous) if previous else set()
+    shards, start = [], 0
+    if previous:
+        saved = None if rewrite or previous.get('dtype') != dtype else _saved_prefix(previous, ids)
+        if saved is not None:
+            shards, start = [dict(entry) for entry in previous['shards']], saved
+            offset = 0
+            for entry in shards:
+                # Shards carried over from a v1 manifest get their ids object now.
+                if 'ids' not in entry:
+                    entry['ids'] = _ref(prefix, 'ids', _ids_bytes(ids[offset:offset + entry['rows']]), 'json',
+                                        'application/json', put, known)
+                offset += entry['rows']
+            # Fold the open tail once it fills a full shard.
+            tail = 0
+            while tail < len(shards) and shards[-1 - tail]['rows'] < SHARD_ROWS:
+                tail += 1
+            pending = sum(entry['rows'] for entry in shards[len(shards) - tail:]) + len(ids) - start
+            if tail > 1 and pending >= SHARD_ROWS:
+                start -= sum(entry['rows'] for entry in shards[len(shards) - tail:])
+                shards = shards[:len(shards) - tail]
+    if start < len(ids):
+        for stop in list(range(start + SHARD_ROWS, len(ids), SHARD_ROWS)) + [len(ids)]:
+            shards.append(_shard(prefix, arrays, ids, start, stop, dtype, column_dtypes or {}, put, known))
+            start = stop
+    manifest = {
+        'schema': SCHEMA,
+        'dtype': dtype,
+        'dimensions': int(np.asarray(arrays['vecs'][0]).shape[-1]) if ids else 0,
+        'rows': len(ids),
+        'shards': shards,
+    }
+    put(manifest_key(prefix), json.dumps(manifest, separators=(',', ':')).encode(), 'application/json')
+    if delete and previous:
+        for key in sorted(_keys(previous) - _keys(manifest)):
+            delete(key)
+    return manifest
+
+
+def load_manifest(get, prefix):
+    """The archive manifest, or None when the channel has not been segmented yet."""
+    payload = get(manifest_key(prefix))
+    if not payload:
+        return None
+    manifest = json.loads(payload)
+    if manifest.get('schema') not in READABLE_SCHEMAS:
+        raise RuntimeError(f'unsupported embedding archive schema {manifest.get("schema")!r}')
+    rows = sum(entry['rows'] for entry in manifest['shards'])
+    if rows != manifest['rows'] or ('ids' in manifest and len(manifest['ids']) != rows):
+        raise RuntimeError('embedding archive manifest row counts disagree')
+    return manifest
+
+
+def _local(get, entry, kind, cache_dir):
+    """Path of one shard file on local disk, fetched and sha-verified on first use."""
+    ref = entry[kind]
+    path = os.path.join(cache_dir, ref['key'])
+    if os.path.exists(path):
+        return path
+    payload = get(ref['key'])
+    if payload is None:
+        raise RuntimeError(f'embedding archive shard is missing: {ref["key"]}')
+    if hashlib.sha256(payload).hexdigest() != ref['sha256']:
+        raise RuntimeError(f'embedding archive shard failed hash verification: {ref["key"]}')
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f'{path}.tmp{os.getpid()}'
+    with open(tmp, 'wb') as handle:
+        handle.write(payload)
+    os.replace(tmp, path)
+    return path
+
+
+def prune_cache(manifest, cache_dir=CACHE_DIR):
+    """Remove cached shard files of this manifest's channel that it no longer lists.
+
+    Each channel caches under its own key prefix, so other channels' shards are
+    left alone; shard files at the top of `cache_dir` (the old flat layout) go too.
+    """
+    keys = _keys(manifest)
+    folders = {os.path.join(cache_dir, os.path.dirname(key)) for key in keys} | {cache_dir}
+    for folder in folders:
+        try:
+            names = os.listdir(folder)
+        except FileNotFoundError:
+            continue
+        for name in names:
+            path = os.path.join(folder, name)
+            if SHARD_FILE.match(name) and os.path.relpath(path, cache_dir) not in keys:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+
+def shard_vectors(manifest, get, cache_dir=CACHE_DIR):
+    """Read-only mmaps of every vector shard, in row order (pruning the channel's stale cache)."""
+    vectors = [np.load(_local(get, entry, 'vecs', cache_dir), mmap_mode='r') for entry in manifest['shards']]
+    prune_cache(manifest, cache_dir)
+    return vectors
+
+
+def read_ids(manifest, get, cache_dir=CACHE_DIR):
+    """Every row's id in row order, from the per-shard id lists (or a v1 manifest's own list)."""
+    if 'ids' in manifest:
+        return list(manifest['ids'])
+    ids = []
+    for entry in manifest['shards']:
+        with open(_local(get, entry, 'ids', cache_dir), 'rb') as handle:
+            shard_ids = json.load(handle)
+        if len(shard_ids) != entry['rows']:
+            raise RuntimeError(f'embedding archive id list has {len(shard_ids)} ids for {entry["rows"]} rows')
+        ids.extend(shard_ids)
+    return ids
+
+
+def read_columns(manifest, get, cache_dir=CACHE_DIR):
+    """Every metadata column (everything but `vecs`) concatenated in row order."""
+    parts = {}
+    for entry in manifest['shards']:
+        with np.load(_local(get, entry, 'meta', cache_dir), allow_pickle=True) as meta:
+            for name in meta.files:
+                parts.setdefault(name, []).append(meta[name])
+    return {name: np.concatenate(values) for name, values in parts.items()}
+
+
+def read(manifest, get, cache_dir=CACHE_DIR):
+    """Every column concatenated in row order, `vecs` as one float32 matrix."""
+    out = {'vecs': np.concatenate([np.asarray(part, np.float32) for part in shard_vectors(manifest, get, cache_dir)])
+           if manifest['shards'] else np.zeros((0, manifest.get('dimensions') or 0), np.float32)}
+    out.update(read_columns(manifest, get, cache_dir))
+    return out
+
+
+def write_unit_matrix(manifest, get, path, cache_dir=CACHE_DIR):
+    """Stream every shard into one row-normalized float32 .npy at `path` (atomic)."""
+    tmp = f'{path}.tmp{os.getpid()}'
+    try:
+        matrix = np.lib.format.open_memmap(
+            tmp, mode='w+', dtype=np.float32, shape=(manifest['rows'], manifest['dimensions']))
+        row = 0
+        for shard in shard_vectors(manifest, get, cache_dir):
+            for start in range(0, len(shard), CHUNK_ROWS):
+                block = np.asarray(shard[start:start + CHUNK_ROWS], np.float32)
+                matrix[row:row + len(block)] = block / (np.linalg.norm(block, axis=1, keepdims=True) + EPSILON)
+                row += len(block)
+        matrix.flush()
+        del matrix
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return path
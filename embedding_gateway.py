@@ -0,0 +1,503 @@
+"""Shared Gemini embedding gateway: batching, in-flight dedupe, one quota.
+
+Every embedding caller on the box (raw/ and raw-long/ builds, the upload
+scorer, the long-form scorer, the RL harnesses, promise-lab and the
+operations build) talks to the same `gemini-embedding-2` endpoint. This
+module is the one client they share:
+
+* single `embed()` calls made concurrently in a process are coalesced into
+  `batchEmbedContents` requests (up to MAX_BATCH contents and MAX_BATCH_BYTES
+  of request body, BATCH_WINDOW_MS of linger), sent over one pooled HTTP
+  session;
+* identical content already in flight (same parts, model and width, by
+  sha256) is awaited, not re-sent;
+* every batch first reserves its contents from a token bucket kept in one
+  flock'd file, so all processes together stay under the project RPM, and a
+  429 pauses that shared bucket for everyone in its lane. Interactive callers
+  (an upload or long-form score someone is waiting on) use their own lane:
+  a reserved INTERACTIVE_RPM slice of the quota with its own bucket, batches
+  and send slots, so a bulk backfill's 429 pause never stalls them;
+* retryable failures (408/429/5xx/network) are retried per content with
+  Retry-After / retryDelay honored up to MAX_RETRY_DELAY; anything else fails
+  immediately with an EmbeddingGatewayError carrying the HTTP status. A
+  merged batch that gets such an error is split in halves and resent until
+  the bad content is alone, so it fails only its own callers. A call
+  made with a `deadline` never waits past it; the deadline is that caller's
+  own, so callers deduplicated onto the same content keep waiting, and the
+  request is dropped only once none of them remains.
+
+`stats()` reports throughput, batch sizes, dedupe hits, retries and
+round-trip latency. Set GEMINI_API_ROOT to point the gateway at a local
+stub server.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import struct
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX dev boxes share in-process only
+    fcntl = None
+
+
+API_ROOT = os.environ.get('GEMINI_API_ROOT', 'https://generativelanguage.googleapis.com/v1beta')
+MODEL = 'gemini-embedding-2'
+DIMENSIONS = 1536
+MAX_BATCH = int(os.environ.get('GEMINI_EMBED_MAX_BATCH', '100'))
+# batchEmbedContents rejects request bodies past ~20MB; inline montages are ~100-300KB each.
+MAX_BATCH_BYTES = int(os.environ.get('GEMINI_EMBED_MAX_BATCH_BYTES', str(16 * 1024 * 1024)))
+BATCH_WINDOW_MS = float(os.environ.get('GEMINI_EMBED_BATCH_WINDOW_MS', '15'))
+CONCURRENCY = int(os.environ.get('GEMINI_EMBED_CONCURRENCY', '8'))
+QUOTA_RPM = float(os.environ.get('GEMINI_EMBED_RPM') or os.environ.get('PROMISE_LAB_EMBED_RPM') or '4500')
+QUOTA_PATH = os.environ.get('GEMINI_EMBED_QUOTA_FILE') or os.path.join(
+    tempfile.gettempdir(), 'gemini-embed-quota.bucket')
+# Slice of QUOTA_RPM held back for interactive callers; bulk callers get the rest.
+INTERACTIVE_RPM = float(os.environ.get('GEMINI_EMBED_INTERACTIVE_RPM') or '300')
+BULK, INTERACTIVE = 'bulk', 'interactive'
+MAX_RETRY_DELAY = float(os.environ.get('GEMINI_EMBED_MAX_RETRY_DELAY') or '60')
+RETRYABLE_STATUSES = (408, 429, 500, 502, 503, 504)
+LATENCY_WINDOW = 2048
+_BUCKET = struct.Struct('<ddd')  # tokens, updated_at, blocked_until
+
+
+class EmbeddingGatewayError(RuntimeError):
+    def __init__(self, message, status=0, retryable=True, detail=''):
+        super().__init__(message)
+        self.status = self.code = int(status or 0)
+        self.retryable = bool(retryable)
+        self.detail = detail
+
+
+def content_key(parts, model=MODEL, dimensions=DIMENSIONS):
+    payload = json.dumps([model, int(dimensions), parts], sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _duration_seconds(value):
+    match = re.search(r'([0-9]+(?:\.[0-9]+)?)\s*([sm]?)', str(value or ''), re.I)
+    if not match:
+        return None
+    return float(match.group(1)) * (60.0 if match.group(2).lower() == 'm' else 1.0)
+
+
+def _requested_delay(headers, payload):
+    header = _duration_seconds((headers or {}).get('retry-after'))
+    if header is not None:
+        return header
+    error = (payload.get('error') or {}) if isinstance(payload, dict) else {}
+    for detail in error.get('details') or []:
+        if isinstance(detail, dict) and detail.get('retryDelay') is not None:
+            parsed = _duration_seconds(detail.get('retryDelay'))
+            if parsed is not None:
+                return parsed
+    match = re.search(r'retry\s+in\s+([0-9]+(?:\.[0-9]+)?)\s*s', str(error.get('message') or ''), re.I)
+    return float(match.group(1)) if match else None
+
+
+def retry_delay_seconds(status, headers, payload, attempt, cap=MAX_RETRY_DELAY):
+    """Server-requested delay (Retry-After, RetryInfo, 'retry in Ns'), else backoff; at most `cap`."""
+    requested = _requested_delay(headers, payload)
+    delay = requested if requested is not None else 1.5 * (2 ** max(0, int(attempt)))
+    return min(float(cap), max(0.25, delay))
+
+
+class QuotaBucket:
+    """Token bucket shared by every process through one flock'd state file.
+
+    reserve(n) takes n tokens immediately (the balance may go negative) and
+    returns how long the caller must wait for them, so concurrent batches are
+    spaced out rather than spinning on the lock.
+    """
+
+    def __init__(self, path=QUOTA_PATH, rpm=QUOTA_RPM, burst_seconds=1.0):
+        self.path = path
+        self.rate = max(1.0, float(rpm)) / 60.0
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self._lock = threading.Lock()
+
+    def _update(self, change):
+        with self._lock:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(self.path, 'a+b') as handle:
+                if fcntl is not None:
+                    fcntl.flock(handle, fcntl.LOCK_EX)
+                try:
+                    handle.seek(0)
+                    raw = handle.read(_BUCKET.size)
+                    now = time.time()
+                    tokens, updated, blocked = (
+                        _BUCKET.unpack(raw) if len(raw) == _BUCKET.size else (self.capacity, now, 0.0))
+                    tokens = min(self.capacity, tokens + max(0.0, now - updated) * self.rate)
+                    tokens, blocked, result = change(tokens, blocked, now)
+                    handle.seek(0)
+                    handle.truncate()
+                    handle.write(_BUCKET.pack(tokens, now, blocked))
+                    handle.flush()
+                    return result
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def reserve(self, count):
+        def take(tokens, blocked, now):
+            tokens -= count
+            wait = max(blocked - now, -tokens / self.rate if tokens < 0 else 0.0)
+            return tokens, blocked, wait
+        return self._update(take)
+
+    def defer(self, seconds):
+        """Pause every process's sends for `seconds` (after a 429)."""
+        return self._update(lambda tokens, blocked, now: (
+            tokens, max(blocked, now + max(0.25, float(seconds))), None))
+
+
+class _Waiter:
+    __slots__ = ('tries', 'timeout', 'deadline', 'on_retry')
+
+    def __init__(self, tries, timeout, deadline, on_retry):
+        self.tries = max(1, int(tries))
+        self.timeout = float(timeout)
+        self.deadline = deadline  # time.monotonic() by which this caller gives up, or None
+        self.on_retry = on_retry
+
+
+class _Pending:
+    """One in-flight content and the callers awaiting it.
+
+    Its retry budget, HTTP timeout and deadline are the most generous of the
+    callers still waiting, so a short-deadline caller never shortens the call
+    for one that joined it through dedupe.
+    """
+
+    __slots__ = ('key', 'parts', 'size', 'future', 'attempts', 'waiters')
+
+    def __init__(self, key, parts, future):
+        self.key = key
+        self.parts = parts
+        self.size = len(json.dumps(parts, separators=(',', ':')))
+        self.future = future
+        self.attempts = 0
+        self.waiters = []
+
+    @property
+    def tries(self):
+        return max((waiter.tries for waiter in self.waiters), default=1)
+
+    @property
+    def timeout(self):
+        return max((waiter.timeout for waiter in self.waiters), default=0.1)
+
+    @property
+    def deadline(self):
+        deadlines = [waiter.deadline for waiter in self.waiters]
+        return None if not deadlines or None in deadlines else max(deadlines)
+
+    def remaining(self):
+        deadline = self.deadline
+        return None if deadline is None else deadline - time.monotonic()
+
+    def http_timeout(self):
+        remaining = self.remaining()
+        return self.timeout if remaining is None else max(0.1, min(self.timeout, remaining))
+
+
+class EmbeddingGateway:
+    """asyncio client; bind it to one event loop (see shared_gateway for threads)."""
+
+    def __init__(self, api_key, api_root=None, max_batch=MAX_BATCH, window_ms=BATCH_WINDOW_MS,
+                 concurrency=CONCURRENCY, quota=None, interactive_quota=None, max_batch_bytes=MAX_BATCH_BYTES):
+        self.api_key = api_key or ''
+        self.api_root = (api_root or API_ROOT).rstrip('/')
+        self.max_batch = max(1, int(max_batch))
+        self.max_batch_bytes = max(1, int(max_batch_bytes))
+        self.window = max(0.0, float(window_ms)) / 1000.0
+        self.concurrency = max(1, int(concurrency))
+        self.quotas = {
+            BULK: quota if quota is not None else QuotaBucket(rpm=max(1.0, QUOTA_RPM - INTERACTIVE_RPM)),
+            INTERACTIVE: interactive_quota if interactive_quota is not None else QuotaBucket(
+                f'{QUOTA_PATH}.{INTERACTIVE}', rpm=INTERACTIVE_RPM),
+        }
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.concurrency)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self._http = ThreadPoolExecutor(self.concurrency, thread_name_prefix='gemini-embed')
+        self._inflight = {}
+        self._queues = {}
+        self._timers = {}
+        self._slots = {}
+        self._started = time.monotonic()
+        self._latency = deque(maxlen=LATENCY_WINDOW)
+        self.counters = {
+            'requests': 0, 'deduplicated': 0, 'batches': 0, 'embedded': 0,
+            'retries': 0, 'failures': 0, 'deadlineFailures': 0, 'splits': 0, 'quotaWaitSeconds': 0.0,
+        }
+
+    # -- public API ---------------------------------------------------------
+    async def embed(self, parts, dimensions=DIMENSIONS, model=MODEL, tries=4, timeout=60, on_retry=None,
+                    deadline=None, lane=BULK):
+        """float32 vector for one content (list of Gemini parts).
+
+        `timeout` bounds each HTTP attempt; `deadline` (seconds) bounds the
+        whole call, retries and quota waits included. `lane` is BULK or
+        INTERACTIVE. `on_retry(event)` hears about retried attempts of this
+        content as {status, message, delay, attempt}.
+        """
+        if not self.api_key:
+            raise EmbeddingGatewayError('GEMINI_API_KEY is not configured', retryable=False)
+        if lane not in self.quotas:
+            raise EmbeddingGatewayError(f'unknown embedding lane {lane!r}', retryable=False)
+        self.counters['requests'] += 1
+        key = (lane, content_key(parts, model, dimensions))
+        pending = self._inflight.get(key)
+        waiter = _Waiter(tries, timeout, None if deadline is None else time.monotonic() + float(deadline),
+                         on_retry)
+        if pending is not None:
+            self.counters['deduplicated'] += 1
+            pending.waiters.append(waiter)
+        else:
+            pending = _Pending(key, parts, asyncio.get_running_loop().create_future())
+            pending.waiters.append(waiter)
+            self._inflight[key] = pending
+            pending.future.add_done_callback(lambda _, key=key: self._inflight.pop(key, None))
+            self._enqueue((model, int(dimensions), lane), pending)
+        future = pending.future
+        try:
+            if deadline is None:
+                return (await asyncio.shield(future)).copy()
+            return (await asyncio.wait_for(asyncio.shield(future), float(deadline))).copy()
+        except asyncio.TimeoutError:
+            # Only this caller gives up; others deduplicated onto the content keep waiting.
+            self.counters['deadlineFailures'] += 1
+            raise EmbeddingGatewayError(
+                f'Gemini embedding exceeded its {float(deadline):g}s deadline') from None
+        finally:
+            pending.waiters.remove(waiter)
+            if not pending.waiters and not future.done():
+                # Nobody is left to receive it; _send skips it from now on.
+                future.cancel()
+
+    async def embed_many(self, contents, dimensions=DIMENSIONS, model=MODEL, tries=4, timeout=60,
+                         on_retry=None, deadline=None, lane=BULK):
+        return list(await asyncio.gather(*[
+            self.embed(parts, dimensions, model, tries, timeout, on_retry, deadline, lane) for parts in contents
+        ]))
+
+    def stats(self):
+        latency = np.asarray(self._latency, float) * 1000.0
+        elapsed = max(1e-9, time.monotonic() - self._started)
+        batches = self.counters['batches']
+        return {
+            **self.counters,
+            'inFlight': len(self._inflight),
+            'meanBatchSize': self.counters['embedded'] / batches if batches else 0.0,
+            'throughputPerSecond': self.counters['embedded'] / elapsed,
+            'latencyMs': {
+                'mean': float(latency.mean()) if latency.size else None,
+                'p50': float(np.percentile(latency, 50)) if latency.size else None,
+                'p95': float(np.percentile(latency, 95)) if latency.size else None,
+                'max': float(latency.max()) if latency.size else None,
+            },
+        }
+
+    def close(self):
+        self._http.shutdown(wait=False)
+        self.session.close()
+
+    # -- batching -----------------------------------------------------------
+    def _enqueue(self, group, pending):
+        queue = self._queues.setdefault(group, [])
+        queue.append(pending)
+        if len(queue) >= self.max_batch or sum(p.size for p in queue) >= self.max_batch_bytes:
+            self._flush(group)
+        elif group not in self._timers:
+            loop = asyncio.get_running_loop()
+            self._timers[group] = loop.call_later(self.window, self._flush, group)
+
+    def _flush(self, group):
+        timer = self._timers.pop(group, None)
+        if timer is not None:
+            timer.cancel()
+        queue = self._queues.get(group) or []
+        while queue:
+            # At most max_batch contents and max_batch_bytes of parts; an oversized content goes alone.
+            count, size = 1, queue[0].size
+            while count < min(len(queue), self.max_batch) and size + queue[count].size <= self.max_batch_bytes:
+                size += queue[count].size
+                count += 1
+            batch, queue[:] = queue[:count], queue[count:]
+            asyncio.ensure_future(self._send(group, batch))
+
+    def _requeue(self, group, batch):
+        for pending in batch:
+            self._enqueue(group, pending)
+
+    # -- transport ----------------------------------------------------------
+    def _post(self, model, dimensions, batch):
+        body = {'requests': [
+            {
+                'model': f'models/{model}',
+                'content': {'parts': pending.parts},
+                'outputDimensionality': dimensions,
+            }
+            for pending in batch
+        ]}
+        response = self.session.post(
+            f'{self.api_root}/models/{model}:batchEmbedContents',
+            headers={'Content-Type': 'application/json', 'x-goog-api-key': self.api_key},
+            json=body,
+            timeout=max(pending.http_timeout() for pending in batch),
+        )
+        try:
+            payload = response.json()
+        except ValueError:
+            payload = {}
+        return response.status_code, dict(response.headers), payload, response.text[:300]
+
+    async def _send(self, group, batch):
+        model, dimensions, lane = group
+        quota = self.quotas[lane]
+        loop = asyncio.get_running_loop()
+        if lane not in self._slots:
+            self._slots[lane] = asyncio.Semaphore(self.concurrency)
+        async with self._slots[lane]:
+            batch = [pending for pending in batch if not pending.future.done()]
+            if not batch:
+                return
+            wait = await loop.run_in_executor(self._http, quota.reserve, len(batch))
+            if wait > 0:
+                self.counters['quotaWaitSeconds'] += wait
+                await asyncio.sleep(wait)
+                batch = [pending for pending in batch if not pending.future.done()]
+                if not batch:
+                    return
+            started = time.monotonic()
+            try:
+                status, headers, payload, text = await loop.run_in_executor(
+                    self._http, self._post, model, dimensions, batch)
+            except requests.RequestException as exc:
+                status, headers, payload, text = 0, {}, {}, f'{type(exc).__name__}: {str(exc)[:220]}'
+            self._latency.append(time.monotonic() - started)
+        self.counters['batches'] += 1
+
+        if status == 200:
+            vectors = [np.asarray(item.get('values') or [], np.float32)
+                       for item in (payload.get('embeddings') or [])]
+            if len(vectors) == len(batch) and all(v.size == dimensions for v in vectors):
+                self.counters['embedded'] += len(batch)
+                for pending, vector in zip(batch, vectors):
+                    if not pending.future.done():
+                        pending.future.set_result(vector)
+                return
+            status, text = 0, 'Gemini batch response shape did not match the request'
+
+        detail = str(((payload.get('error') or {}).get('message') if isinstance(payload, dict) else '') or text)[:240]
+        message = f'Gemini embedding HTTP {status}: {detail}' if status else detail
+        retryable = status == 0 or status in RETRYABLE_STATUSES
+        if not retryable and len(batch) > 1:
+            # The error may belong to one content only: bisect so the others still embed.
+            self.counters['splits'] += 1
+            middle = len(batch) // 2
+            await asyncio.gather(self._send(group, batch[:middle]), self._send(group, batch[middle:]))
+            return
+        attempt = max(pending.attempts for pending in batch)
+        delay = retry_delay_seconds(status, {k.lower(): v for k, v in headers.items()}, payload, attempt)
+        if status == 429:
+            # Pause this lane's shared bucket for every process, even if no one here retries.
+            await loop.run_in_executor(self._http, quota.defer, delay)
+        retry = []
+        for pending in batch:
+            pending.attempts += 1
+            remaining = pending.remaining()
+            if pending.future.done():
+                continue
+            if retryable and pending.attempts < pending.tries and (remaining is None or delay < remaining):
+                retry.append(pending)
+                continue
+            self.counters['failures'] += 1
+            failure = message
+            if retryable and pending.attempts < pending.tries:
+                # Fail now rather than sleep through the caller's deadline.
+                self.counters['deadlineFailures'] += 1
+                failure = f'{message} (retry in {delay:.1f}s would pass the deadline)'
+            pending.future.set_exception(EmbeddingGatewayError(failure, status, retryable, detail))
+        if not retry:
+            return
+        self.counters['retries'] += len(retry)
+        notified = set()
+        for pending in retry:
+            for waiter in list(pending.waiters):
+                if waiter.on_retry is None or id(waiter.on_retry) in notified:
+                    continue
+                notified.add(id(waiter.on_retry))
+                try:
+                    waiter.on_retry({'status': status, 'message': message, 'delay': delay,
+                                     'attempt': pending.attempts})
+                except Exception:
+                    pass
+        if status == 429:
+            # The paused bucket holds the requeued batch back; requeue right away.
+            self._requeue(group, retry)
+        else:
+            loop.call_later(delay, self._requeue, group, retry)
+
+
+# -- process-wide blocking facade -------------------------------------------
+_SHARED = {}
+_SHARED_LOCK = threading.Lock()
+
+
+def shared_gateway(api_key, api_root=None):
+    """(gateway, loop) on a daemon event-loop thread, one per key per process.
+
+    Threads calling embed() below all land on this loop, which is what lets
+    their single requests coalesce into batches.
+    """
+    ident = (api_key or '', (api_root or API_ROOT).rstrip('/'))
+    with _SHARED_LOCK:
+        if ident not in _SHARED:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name='gemini-embed-loop', daemon=True).start()
+            gateway = EmbeddingGateway(api_key, api_root)
+            _SHARED[ident] = (gateway, loop)
+        return _SHARED[ident]
+
+
+def _run(api_key, api_root, method, *args):
+    gateway, loop = shared_gateway(api_key, api_root)
+    return asyncio.run_coroutine_threadsafe(getattr(gateway, method)(*args), loop).result()
+
+
+def embed(parts, api_key, dimensions=DIMENSIONS, model=MODEL, tries=4, timeout=60, on_retry=None,
+          api_root=None, deadline=None, lane=BULK):
+    """Blocking single embed through the shared gateway; raises EmbeddingGatewayError."""
+    return _run(api_key, api_root, 'embed', parts, dimensions, model, tries, timeout, on_retry, deadline, lane)
+
+
+def embed_many(contents, api_key, dimensions=DIMENSIONS, model=MODEL, tries=4, timeout=60,
+               on_retry=None, api_root=None, deadline=None, lane=BULK):
+    """Blocking embeds for many contents, in order, batched together."""
+    return _run(api_key, api_root, 'embed_many', list(contents), dimensions, model, tries, timeout,
+                on_retry, deadline, lane)
+
+
+def stats(api_key, api_root=None):
+    gateway, loop = shared_gateway(api_key, api_root)
+    return asyncio.run_coroutine_threadsafe(_async_stats(gateway), loop).result()
+
+
+async def _async_stats(gateway):
+    return gateway.stats()
@@ -17,7 +17,7 @@ Prints a table. Does NOT write anything — decide from the numbers, then I wire
 winner into add_steered_proj.py + upload scoring.
 Run: python3 experiment_transforms.py
 """
-import os, io, json
+import os, json
 import numpy as np, boto3
 from scipy.stats import spearmanr, rankdata
 from sklearn.cross_decomposition import PLSRegression
@@ -28,6 +28,8 @@ from sklearn.neighbors import KNeighborsRegressor
 from sklearn.decomposition import PCA
 from sklearn.model_selection import KFold
 
+import corpus_snapshot
+
 HERE = os.path.dirname(os.path.abspath(__file__))
 def env(k):
     v = os.environ.get(k)
@@ -37,14 +39,12 @@ def env(k):
 BUCKET = env('R2_BUCKET_NAME') or 'business-world-videos'
 s3 = boto3.client('s3', endpoint_url=f"https://{env('R2_ACCOUNT_ID')}.r2.cloudflarestorage.com",
                   aws_access_key_id=env('R2_ACCESS_KEY_ID'), aws_secret_access_key=env('R2_SECRET_ACCESS_KEY'), region_name='auto')
-def r2_get(k): return s3.get_object(Bucket=BUCKET, Key=k)['Body'].read()
-def norm(X): return X / (np.linalg.norm(X, axis=1, keepdims=True) + 1e-9)
 
 CH = 'together'
-z = np.load(io.BytesIO(r2_get(f'raw/{CH}/embeddings.npz')), allow_pickle=True)
-ids = [str(x) for x in z['ids']]; V = norm(np.asarray(z['vecs'], np.float32))
-views = np.asarray(z['views'], float)
-mp = json.loads(r2_get(f'raw/{CH}/map.json')); mids = [str(x) for x in mp['id']]
+snap = corpus_snapshot.open_channel(s3, BUCKET, CH)
+ids = snap.ids.tolist(); V = snap.vecs
+views = np.asarray(snap.column('views'), float)
+mp, _ = corpus_snapshot.read_map(s3, BUCKET, CH); mids = [str(x) for x in mp['id']]
 print(f'{CH}: {len(ids)} embeddings, {len(mids)} map points\n')
 
 # ---------- A) VIEW TRANSFORM ----------
@@ -15,10 +15,12 @@ Run: python3 fusion_features.py
 """
 import os, io, json, datetime
 import numpy as np, boto3
-from sklearn.neighbors import NearestNeighbors
 from sklearn.cluster import MiniBatchKMeans
 from sklearn.cross_decomposition import CCA
 
+import corpus_snapshot
+import knn_graph
+
 HERE = os.path.dirname(os.path.abspath(__file__))
 def env(k):
     v = os.environ.get(k)
@@ -33,36 +35,17 @@ def r2_get(k):
     except Exception: return None
 def r2_put(k, d, ct): s3.put_object(Bucket=BUCKET, Key=k, Body=d, ContentType=ct)
 
-def load_chan(c):
-    buf = r2_get(f'raw/{c}/embeddings.npz')
-    z = np.load(io.BytesIO(buf), allow_pickle=True)
-    return {
-        'ids': [str(x) for x in z['ids']], 'vecs': np.asarray(z['vecs'], np.float32),
-        'views': np.asarray(z['views'], float), 'outlier': np.asarray(z['outlier'], float),
-        'subs': np.asarray(z['subs'], float), 'title': [str(t) for t in z['title']],
-        'mine': np.asarray(z['mine'], bool) if 'mine' in z.files else np.zeros(len(z['ids']), bool),
-        'silent': np.asarray(z['silent'], bool) if 'silent' in z.files else np.zeros(len(z['ids']), bool),
-    }
-
 print('loading embeddings…', flush=True)
-VIS = load_chan('visual'); TXT = load_chan('text'); TOG = load_chan('together')
-ids = VIS['ids']; N = len(ids); idpos = {v: i for i, v in enumerate(ids)}
-print(f'master (visual) N={N}; text={len(TXT["ids"])}; together={len(TOG["ids"])}', flush=True)
+VIS, TXT, TOG = (corpus_snapshot.open_channel(s3, BUCKET, c) for c in ('visual', 'text', 'together'))
+ids = VIS.ids.tolist(); N = len(ids); idpos = VIS.positions()
+print(f'master (visual) N={N}; text={len(TXT)}; together={len(TOG)}', flush=True)
 
 def norm(X):
     return X / (np.linalg.norm(X, axis=1, keepdims=True) + 1e-9)
-VX = norm(VIS['vecs'])
+VX = VIS.vecs
 # align text/together vecs onto the master order (NaN rows where missing)
-def aligned(ch):
-    M = np.full((N, ch['vecs'].shape[1]), np.nan, np.float32)
-    pos = {v: i for i, v in enumerate(ch['ids'])}
-    have = np.zeros(N, bool)
-    for vid, j in pos.items():
-        i = idpos.get(vid)
-        if i is not None: M[i] = ch['vecs'][j]; have[i] = True
-    return M, have
-TXraw, has_txt = aligned(TXT)
-TGraw, has_tog = aligned(TOG)
+TXraw, has_txt = corpus_snapshot.aligned(TXT, VIS)
+TGraw, has_tog = corpus_snapshot.aligned(TOG, VIS)
 TX = norm(np.nan_to_num(TXraw)); TX[~has_txt] = np.nan
 TG = norm(np.nan_to_num(TGraw)); TG[~has_tog] = np.nan
 
@@ -83,8 +66,9 @@ for v in db.get('videos', {}).values():
     if v.get('durationSec'): dur[i] = float(v['durationSec'])
 # owned-set videos aren't in library db — fill their age/dur as NaN (fine; HGB handles)
 
-views = VIS['views']; subs = VIS['subs']; outlier = VIS['outlier']
-mine = VIS['mine']; silent = VIS['silent']
+views = np.asarray(VIS.column('views'), float); subs = np.asarray(VIS.column('subs'), float)
+outlier = np.asarray(VIS.column('outlier'), float)
+mine = np.asarray(VIS.column('mine'), bool); silent = np.asarray(VIS.column('silent'), bool)
 
 # month index for temporal novelty
 month = np.full(N, -1, int)
@@ -95,18 +79,17 @@ for v in db.get('videos', {}).values():
     if len(ud) == 8 and ud.isdigit(): month[i] = int(ud[:4]) * 12 + int(ud[4:6])
 
 # ---------- novelty features per modality ----------
-def novelty_block(Xn, valid, label):
+def novelty_block(Xn, valid, label, graph, rows):
     """global (mean cos-dist to k-NN), niche (dist to own kmeans centroid),
-    temporal (cos-dist to centroid of strictly-earlier videos)."""
+    temporal (cos-dist to centroid of strictly-earlier videos). graph = the channel's
+    knn_graph, rows = each master row's row in it (neighbours only among the valid ones)."""
     out = {f'{label}_glob_nov': np.full(N, np.nan), f'{label}_niche_nov': np.full(N, np.nan),
            f'{label}_temporal_nov': np.full(N, np.nan)}
     idx = np.where(valid)[0]
     if len(idx) < 50: return out
     Xv = Xn[idx]
-    k = min(21, len(idx))
-    nn = NearestNeighbors(n_neighbors=k, metric='cosine').fit(Xv)
-    dist, _ = nn.kneighbors(Xv)
-    out[f'{label}_glob_nov'][idx] = dist[:, 1:].mean(1)        # exclude self (col 0)
+    sel = rows[idx]; sims = graph.row_neighbors(sel, 21, within=sel)[0]
+    out[f'{label}_glob_nov'][idx] = 1 - sims[:, 1:].mean(1)    # exclude self (col 0)
     K = min(25, max(2, len(idx) // 200))
     km = MiniBatchKMeans(K, random_state=0, n_init=3, batch_size=1024).fit(Xv)
     cen = norm(km.cluster_centers_); lab = km.labels_
@@ -122,9 +105,9 @@ def novelty_block(Xn, valid, label):
     return out
 
 print('novelty: visual…', flush=True); F = {}
-F.update(novelty_block(VX, np.ones(N, bool), 'vis'))
-print('novelty: text…', flush=True); F.update(novelty_block(np.nan_to_num(TX), has_txt, 'txt'))
-print('novelty: together…', flush=True); F.update(novelty_block(np.nan_to_num(TG), has_tog, 'tog'))
+F.update(novelty_block(VX, np.ones(N, bool), 'vis', knn_graph.open_graph(VIS), np.arange(N)))
+print('novelty: text…', flush=True); F.update(novelty_block(np.nan_to_num(TX), has_txt, 'txt', knn_graph.open_graph(TXT), corpus_snapshot.alignment(TXT, VIS)))
+print('novelty: together…', flush=True); F.update(novelty_block(np.nan_to_num(TG), has_tog, 'tog', knn_graph.open_graph(TOG), corpus_snapshot.alignment(TOG, VIS)))
 
 # ---------- cross-modal: coherence, combinatorial, CCA alignment ----------
 print('cross-modal…', flush=True)
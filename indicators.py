@@ -24,6 +24,8 @@ from sklearn.model_selection import KFold
 from sklearn.metrics import roc_auc_score
 from scipy.stats import spearmanr
 
+import corpus_snapshot
+
 HERE = os.path.dirname(os.path.abspath(__file__))
 def env(k):
     v = os.environ.get(k)
@@ -37,26 +39,16 @@ def r2_get(k):
     try: return s3.get_object(Bucket=BUCKET, Key=k)['Body'].read()
     except Exception: return None
 def r2_put(k, d, ct): s3.put_object(Bucket=BUCKET, Key=k, Body=d, ContentType=ct)
-def norm(X): return X / (np.linalg.norm(X, axis=1, keepdims=True) + 1e-9)
 RNG = np.random.RandomState(0); kf = KFold(5, shuffle=True, random_state=0)
 
 # ---- load corpus: embeddings, novelty, metadata, owned retention ----
 print('loading…', flush=True)
-EMB = {}
-for sk, ck in [('visual', 'visual'), ('text', 'text'), ('together', 'together')]:
-    z = np.load(io.BytesIO(r2_get(f'raw/{ck}/embeddings.npz')), allow_pickle=True)
-    EMB[sk] = {'ids': [str(x) for x in z['ids']], 'V': norm(np.asarray(z['vecs'], np.float32))}
-    if sk == 'visual':
-        ids = EMB['visual']['ids']; N = len(ids); idpos = {v: i for i, v in enumerate(ids)}
-        views = np.asarray(z['views'], float); subs = np.asarray(z['subs'], float)
-        mine = np.asarray(z['mine'], bool) if 'mine' in z.files else np.zeros(N, bool)
-def aligned(sk):
-    M = np.full((N, EMB[sk]['V'].shape[1]), np.nan, np.float32); have = np.zeros(N, bool)
-    for j, vid in enumerate(EMB[sk]['ids']):
-        i = idpos.get(vid)
-        if i is not None: M[i] = EMB[sk]['V'][j]; have[i] = True
-    return M, have
-MOD = {'visual': (EMB['visual']['V'], np.ones(N, bool)), 'text': aligned('text'), 'together': aligned('together')}
+SNAP = {sk: corpus_snapshot.open_channel(s3, BUCKET, sk) for sk in ('visual', 'text', 'together')}
+VIS = SNAP['visual']; ids = VIS.ids.tolist(); N = len(ids); idpos = VIS.positions()
+views = np.asarray(VIS.column('views'), float); subs = np.asarray(VIS.column('subs'), float)
+mine = np.asarray(VIS.column('mine'), bool)
+MOD = {'visual': (VIS.vecs, np.ones(N, bool)), 'text': corpus_snapshot.aligned(SNAP['text'], VIS),
+       'together': corpus_snapshot.aligned(SNAP['together'], VIS)}
 # novelty (single source)
 nz = np.load(io.BytesIO(r2_get('raw/principles/novelty.npz')), allow_pickle=True)
 nX = np.asarray(nz['X'], float); nnames = [str(x) for x in nz['names']]; nids = [str(x) for x in nz['ids']]; npos = {v: i for i, v in enumerate(nids)}
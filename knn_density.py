@@ -0,0 +1,74 @@
+"""Blocked exact top-k similarity for corpus-wide kNN density.
+
+The novelty sweeps need, for every query row, its k most similar corpus rows
+and its mean similarity to the whole corpus. Materializing the query x corpus
+similarity matrix (and sorting it) is ~17GB for the ~66k-video corpus against
+itself, far past the 2GB box. top_similarities() computes the same numbers
+tile by tile: each (queries x corpus rows) tile is reduced to its own top k
+with argpartition and merged into a running (queries x k) best, and the tile's
+row sums feed the mean. Memory is O(n*k) plus one tile; results are exact, only
+floating-point summation order differs from the full-matrix version.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+
+QUERY_BLOCK = 1024
+CORPUS_BLOCK = 8192
+
+
+def _block_top(queries, corpus, k, corpus_block):
+    count = len(queries)
+    best_sims = np.zeros((count, 0), np.float32)
+    best_rows = np.zeros((count, 0), np.int64)
+    totals = np.zeros(count, np.float64)
+    for start in range(0, len(corpus), corpus_block):
+        block = np.asarray(corpus[start:start + corpus_block], np.float32)
+        sims = queries @ block.T
+        totals += sims.sum(axis=1, dtype=np.float64)
+        keep = min(k, sims.shape[1])
+        part = np.argpartition(-sims, keep - 1, axis=1)[:, :keep]
+        sims = np.concatenate([best_sims, np.take_along_axis(sims, part, axis=1)], axis=1)
+        rows = np.concatenate([best_rows, part + start], axis=1)
+        keep = min(k, sims.shape[1])
+        part = np.argpartition(-sims, keep - 1, axis=1)[:, :keep]
+        best_sims = np.take_along_axis(sims, part, axis=1)
+        best_rows = np.take_along_axis(rows, part, axis=1)
+    order = np.argsort(-best_sims, axis=1, kind='stable')
+    return (
+        np.take_along_axis(best_sims, order, axis=1),
+        np.take_along_axis(best_rows, order, axis=1),
+        totals / max(1, len(corpus)),
+    )
+
+
+def top_similarities(queries, corpus, k, query_block=QUERY_BLOCK, corpus_block=CORPUS_BLOCK, workers=None):
+    """Exact k largest dot products of each query row against `corpus`.
+
+    Returns (sims (n, k) descending, corpus row indices (n, k), mean similarity
+    to every corpus row (n,)). Rows must already be unit-normalized for these to
+    be cosines. A query that is itself in the corpus finds itself first, so
+    callers that exclude self ask for k + 1 and drop column 0. `corpus` may be
+    an mmap; query blocks run on `workers` threads (matmul releases the GIL).
+    """
+    queries = np.asarray(queries, np.float32)
+    k = min(int(k), len(corpus))
+    if k <= 0 or not len(queries):
+        return (np.zeros((len(queries), max(k, 0)), np.float32),
+                np.zeros((len(queries), max(k, 0)), np.int64),
+                np.zeros(len(queries), np.float64))
+    starts = range(0, len(queries), query_block)
+    workers = workers or min(4, os.cpu_count() or 1)
+
+    def run(start):
+        return _block_top(queries[start:start + query_block], corpus, k, corpus_block)
+
+    if workers > 1 and len(starts) > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            parts = list(executor.map(run, starts))
+    else:
+        parts = [run(start) for start in starts]
+    return tuple(np.concatenate(columns) for columns in zip(*parts))
@@ -0,0 +1,244 @@
+"""Revision-pinned exact top-k neighbor graph over a corpus embedding matrix.
+
+novelty_field, novelty_quantify, fusion_features and the principles-lab
+semantic families each used to find nearest neighbors over the same
+visual/text/together matrices on their own: an O(N^2) pass (or an HNSW build)
+per script, per run. This module computes each row's exact top NEIGHBORS once
+per archive revision (the npz ETag or segment hashes corpus_snapshot pins) and
+persists it compactly:
+
+* `rows.npy` (int32) and `sims.npy` (float16), one row per matrix row, best
+  first, the row itself included (it ranks first);
+* `manifest.json` with the provenance: archive, revision, row count and
+  dimension, a digest of the ids, the neighbor count and the build stats.
+
+The build goes through novelty_state.neighbor_lists, so the next revision
+only queries the rows that changed. Slicing with neighbors() takes any id set
+and optionally restricts the neighbors to the members of another. The
+reported cosines are recomputed from the matrix in full precision; float16
+only stores the graph. A row whose stored list cannot supply k neighbors
+(k above NEIGHBORS, or too few stored neighbors inside the restriction) is
+answered by an exact scan, so every slice equals a fresh exact kNN.
+
+Each archive keeps its KEEP_REVISIONS newest revisions. A frozen analysis
+builds its graph under its own archive name (its own novelty state too) and
+with pin=True, which pruning never removes.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+import corpus_snapshot
+import knn_density
+import novelty_state
+
+
+SCHEMA = 'knn-graph-v1'
+NEIGHBORS = 64
+GATHER_ROWS = 128
+KEEP_REVISIONS = 3
+CACHE_DIR = os.environ.get('KNN_GRAPH_CACHE') or os.path.join(corpus_snapshot.CACHE_DIR, 'knn-graphs')
+
+
+def _safe(name):
+    return ''.join(char if char.isalnum() or char in '-_' else '_' for char in name)
+
+
+def _ids_digest(ids):
+    digest = hashlib.sha256()
+    for vid in ids:
+        digest.update(f'{vid}\0'.encode())
+    return digest.hexdigest()
+
+
+def graph_directory(archive, revision, cache_dir=CACHE_DIR):
+    """Where the graph of `archive` (e.g. 'raw/together') at `revision` lives."""
+    return os.path.join(cache_dir, _safe(archive), _safe(revision))
+
+
+class KnnGraph:
+    """Stored top-k lists over a row matrix plus exact rescoring from that same matrix."""
+
+    def __init__(self, vectors, ids, rows, sims, manifest):
+        self.vectors = vectors
+        self.ids = np.asarray([str(vid) for vid in ids], dtype=str)
+        self.graph_rows = rows
+        self.graph_sims = sims
+        self.manifest = manifest
+        self._order = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    def rows(self, ids):
+        """Row of each id (the last row of a repeated id); RuntimeError for ids the graph lacks."""
+        ids = np.asarray([str(vid) for vid in ids], dtype=str)
+        if self._order is None:
+            self._order = np.argsort(self.ids, kind='stable')
+        ordered = self.ids[self._order]
+        at = np.searchsorted(ordered, ids, side='right') - 1
+        found = (at >= 0) & (ordered[np.maximum(at, 0)] == ids)
+        if not found.all():
+            raise RuntimeError(f'{self.manifest["archive"]} graph has no row for {ids[~found][:5].tolist()}')
+        return self._order[at].astype(np.int64)
+
+    def _rescore(self, queries, rows):
+        sims = np.empty(rows.shape, np.float32)
+        for start in range(0, len(queries), GATHER_ROWS):
+            query = np.asarray(self.vectors[queries[start:start + GATHER_ROWS]], np.float32)
+            block = rows[start:start + GATHER_ROWS]
+            flat = np.asarray(self.vectors[block.ravel()], np.float32).reshape(*block.shape, -1)
+            sims[start:start + len(block)] = np.einsum('id,ikd->ik', query, flat)
+        order = np.argsort(-sims, axis=1, kind='stable')
+        return np.take_along_axis(sims, order, axis=1), np.take_along_axis(rows, order, axis=1)
+
+    def row_neighbors(self, rows, k, within=None):
+        """(cosines (n, k) descending, rows (n, k)) of each row's exact k nearest rows.
+
+        With `within` (rows), only those rows count as neighbors; k is clamped
+        to the candidates, as in knn_density.top_similarities.
+        """
+        rows = np.asarray(rows, np.int64)
+        stored = self.graph_rows.shape[1]
+        members = None
+        if within is not None:
+            members = np.zeros(len(self), bool)
+            members[np.asarray(within, np.int64)] = True
+        k = min(int(k), len(self) if members is None else int(members.sum()))
+        out = np.zeros((len(rows), k), np.int64)
+        short = np.ones(len(rows), bool)
+        if k <= stored:
+            lists = np.asarray(self.graph_rows[rows], np.int64)
+            keep = np.ones(lists.shape, bool) if members is None else members[lists]
+            # A complete stored list (every row) can always supply k.
+            short = keep.sum(axis=1) < k if stored < len(self) else np.zeros(len(rows), bool)
+            ranks = np.cumsum(keep, axis=1) - 1
+            chosen = keep & (ranks < k)
+            picked = np.where(~short)[0]
+            if len(picked):
+                out[picked] = lists[picked][chosen[picked]].reshape(len(picked), k)
+        sims = np.zeros(out.shape, np.float32)
+        done = np.where(~short)[0]
+        if len(done):
+            sims[done], out[done] = self._rescore(rows[done], out[done])
+        scan = np.where(short)[0]
+        if len(scan):
+            queries = self.vectors[rows[scan]]
+            if members is None:
+                sims[scan], out[scan], _ = knn_density.top_similarities(queries, self.vectors, k)
+            else:
+                candidates = np.where(members)[0]
+                top_sims, top_rows, _ = knn_density.top_similarities(queries, self.vectors[candidates], k)
+                sims[scan], out[scan] = top_sims, candidates[top_rows]
+        return sims, out
+
+    def neighbors(self, ids, k, within=None):
+        """(cosines (n, k), neighbor ids (n, k)) for `ids`, optionally restricted to the ids in `within`."""
+        within = None if within is None else self.rows(within)
+        sims, rows = self.row_neighbors(self.rows(ids), k, within)
+        return sims, self.ids[rows]
+
+    def summary(self):
+        return {key: self.manifest.get(key) for key in ('schema', 'archive', 'revision', 'rows', 'neighbors', 'build')}
+
+
+def _revision_matches(manifest, vectors, ids, revision, k):
+    return bool(
+        manifest.get('schema') == SCHEMA
+        and manifest.get('revision') == revision
+        and manifest.get('rows') == len(vectors)
+        and manifest.get('dim') == int(vectors.shape[1])
+        and manifest.get('neighbors') >= min(k, len(vectors))
+        and manifest.get('idsSha256') == _ids_digest(ids)
+    )
+
+
+def _pinned(directory):
+    try:
+        with open(os.path.join(directory, 'manifest.json'), encoding='utf8') as handle:
+            return bool(json.load(handle).get('pinned'))
+    except (OSError, ValueError):
+        return False
+
+
+def load(vectors, ids, directory, revision, k=NEIGHBORS):
+    """Open a persisted graph, or None when it is absent, shallower than k, or for other rows."""
+    try:
+        with open(os.path.join(directory, 'manifest.json'), encoding='utf8') as handle:
+            manifest = json.load(handle)
+    except (OSError, ValueError):
+        return None
+    if not _revision_matches(manifest, vectors, ids, revision, k):
+        return None
+    return KnnGraph(
+        vectors,
+        ids,
+        np.load(os.path.join(directory, 'rows.npy'), mmap_mode='r'),
+        np.load(os.path.join(directory, 'sims.npy'), mmap_mode='r'),
+        manifest,
+    )
+
+
+def build(vectors, ids, directory, revision, archive, k=NEIGHBORS, provenance=None, pin=False):
+    """Compute and atomically persist the exact top-k graph of unit rows `vectors`.
+
+    A pinned graph is never pruned by newer revisions of its archive.
+    """
+    started = time.time()
+    k = min(int(k), len(vectors))
+    sims, rows, stats = novelty_state.neighbor_lists(
+        f'knn-graph-{_safe(archive)}', ids, vectors, k, cache_dir=novelty_state.CACHE_DIR)
+    rows, sims = rows.astype(np.int32), sims.astype(np.float16)
+    manifest = {
+        'schema': SCHEMA,
+        'archive': archive,
+        'revision': revision,
+        'rows': len(vectors),
+        'dim': int(vectors.shape[1]),
+        'neighbors': k,
+        'idsSha256': _ids_digest(ids),
+        'metric': 'cosine of unit rows, self included, best first',
+        'dtypes': {'rows': 'int32', 'sims': 'float16'},
+        'build': dict(stats, seconds=round(time.time() - started, 2)),
+        'provenance': provenance or {},
+        'pinned': bool(pin),
+    }
+    parent = os.path.dirname(os.path.abspath(directory))
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=os.path.basename(directory) + '.build', dir=parent)
+    try:
+        np.save(os.path.join(staging, 'rows.npy'), rows)
+        np.save(os.path.join(staging, 'sims.npy'), sims)
+        with open(os.path.join(staging, 'manifest.json'), 'w', encoding='utf8') as handle:
+            json.dump(manifest, handle, sort_keys=True, separators=(',', ':'))
+        shutil.rmtree(directory, ignore_errors=True)
+        os.replace(staging, directory)
+    except OSError:
+        # A concurrent builder for the same revision won the rename; its graph is identical.
+        shutil.rmtree(staging, ignore_errors=True)
+    # Keep the few most recent revisions, plus any a frozen analysis pinned.
+    siblings = [os.path.join(parent, name) for name in os.listdir(parent) if '.build' not in name]
+    siblings = [path for path in siblings if not _pinned(path)]
+    for stale in sorted(siblings, key=os.path.getmtime, reverse=True)[KEEP_REVISIONS:]:
+        shutil.rmtree(stale, ignore_errors=True)
+    return KnnGraph(vectors, ids, rows, sims, manifest)
+
+
+def load_or_build(vectors, ids, archive, revision, k=NEIGHBORS, provenance=None, cache_dir=CACHE_DIR, pin=False):
+    directory = graph_directory(archive, revision, cache_dir)
+    graph = load(vectors, ids, directory, revision, k)
+    if graph is None:
+        graph = build(vectors, ids, directory, revision, archive, k, provenance, pin)
+    return graph
+
+
+def open_graph(snapshot, k=NEIGHBORS, cache_dir=CACHE_DIR):
+    """The graph of a corpus_snapshot.Snapshot's channel at its pinned revision."""
+    return load_or_build(snapshot.vecs, snapshot.ids, f'raw/{snapshot.chan}', snapshot.revision, k,
+                         {'snapshotSchema': snapshot.manifest.get('schema')}, cache_dir)
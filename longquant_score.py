@@ -24,19 +24,17 @@ import json
 import os
 import re
 import shutil
+import sys
 import tempfile
 import time
-import urllib.request
 import zipfile
 import platform
 
 import boto3
 import numpy as np
 
-try:
-    import requests
-except Exception:
-    requests = None
+import embedding_gateway
+import neighbor_index
 
 HERE = os.path.dirname(os.path.abspath(__file__))
 COORDINATE_GOVERNANCE_PATH = os.path.join(
@@ -54,7 +52,6 @@ COORDINATE_GOVERNANCE_SHA256 = hashlib.sha256(
     COORDINATE_GOVERNANCE_BYTES
 ).hexdigest()
 DIM = 1536
-EMB_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-embedding-2:embedContent"
 CHANS = ("visual", "text", "together")
 LONG_GROUPS = tuple(COORDINATE_GOVERNANCE["expansions"]["longGroups"])
 LONG_METRICS = tuple(
@@ -307,34 +304,12 @@ def scorer_runtime_revision():
 def embed(parts, tries=4):
     if not KEY:
         raise RuntimeError("GEMINI_API_KEY not set")
-    body = {"content": {"parts": parts}, "outputDimensionality": DIM}
-    last = ""
-    for a in range(tries):
-        try:
-            if requests is not None:
-                r = requests.post(
-                    EMB_URL,
-                    headers={"Content-Type": "application/json", "x-goog-api-key": KEY},
-                    json=body,
-                    timeout=35,
-                )
-                if r.ok:
-                    return np.asarray(r.json()["embedding"]["values"], np.float32)
-                last = f"http {r.status_code}: {r.text[:120]}"
-            else:
-                req = urllib.request.Request(
-                    EMB_URL,
-                    data=json.dumps(body).encode(),
-                    method="POST",
-                    headers={"Content-Type": "application/json", "x-goog-api-key": KEY},
-                )
-                with urllib.request.urlopen(req, timeout=35) as r:
-                    return np.asarray(json.loads(r.read())["embedding"]["values"], np.float32)
-        except Exception as e:
-            last = str(e)[:160]
-        if a < tries - 1:
-            time.sleep(1.2 * (a + 1))
-    raise RuntimeError("Gemini embed failed: " + last)
+    try:
+        # Someone is waiting on this score: interactive lane, and the old client's ~150s worst case as a deadline.
+        return embedding_gateway.embed(parts, KEY, DIM, tries=tries, timeout=35, deadline=150,
+                                       lane=embedding_gateway.INTERACTIVE)
+    except embedding_gateway.EmbeddingGatewayError as e:
+        raise RuntimeError("Gemini embed failed: " + str(e)[:160]) from e
 
 
 def img_part(b64):
@@ -647,6 +622,35 @@ def wavg(vals, idx, w):
     return float(np.average(arr, weights=np.asarray(ww) + 1e-9))
 
 
+def neighbor_search_index(chan, V, archive_revision):
+    """IVF neighbor index pinned to the archive ETag, or None for the exact scan.
+
+    raw-long archives store raw vectors, so the index normalizes rows itself and
+    reranks probed candidates by their exact cosine.
+    """
+    etag = archive_revision.get("etag")
+    if not etag or os.environ.get("LONGQUANT_EXACT_NEIGHBORS") == "1":
+        return None
+    directory = os.path.join(
+        tempfile.gettempdir(),
+        f"rawlong_{chan}_{cache_tag(etag)}_ivf",
+    )
+    try:
+        return neighbor_index.load_or_build(
+            V,
+            directory,
+            {"key": f"raw-long/{chan}/embeddings.npz", "etag": etag},
+            normalize=True,
+        )
+    except Exception as error:
+        print(
+            f"[longquant] {chan}: neighbor index unavailable "
+            f"({type(error).__name__}: {str(error)[:120]}); exact scan",
+            file=sys.stderr,
+        )
+        return None
+
+
 def top_neighbors(chan, q, k=24):
     arrays, archive_revision = cache_arrays_with_revision(chan, ("vecs", "ids"))
     V = arrays["vecs"]
@@ -656,23 +660,22 @@ def top_neighbors(chan, q, k=24):
     ]
     if V is None or not len(V):
         return None, None, None, None
-    q = norm(q).astype(np.float32)
-    sims = np.empty(len(V), np.float32)
-    step = max(256, int(os.environ.get("LONGQUANT_SCORE_CHUNK", "2048") or "2048"))
-    for i in range(0, len(V), step):
-        B = np.asarray(V[i:i + step], np.float32)
-        sims[i:i + len(B)] = (B @ q) / (np.linalg.norm(B, axis=1) + 1e-9)
-    kk = min(k, len(V))
-    part = np.argpartition(-sims, kk - 1)[:kk]
-    order = part[np.argsort(-sims[part])]
-    weights = np.maximum(sims[order], 0) ** 8 + 1e-6
+    index = neighbor_search_index(chan, V, archive_revision)
+    if index is not None:
+        order, sims = index.search(q, k)
+        search = index.summary()
+    else:
+        order, sims = neighbor_index.exact_top(V, q, k, normalize=True)
+        search = {"schema": "exact-scan", "rows": len(V)}
+    weights = np.maximum(sims, 0) ** 8 + 1e-6
     archive_revision = {
         **archive_revision,
+        "neighbor_search": search,
         "_video_ids": ids,
     }
     return (
         order,
-        sims[order],
+        sims,
         weights,
         [ids[int(index)] for index in order],
         archive_revision,
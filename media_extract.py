@@ -0,0 +1,110 @@
+"""Single-decode extraction of a video's opening for the raw/ scorers.
+
+The five-frame montage, the 16 kHz mono transcript audio and the container
+duration used to take two or three ffmpeg processes plus an ffprobe per video,
+each decoding the same opening again. extract_opening() runs one ffmpeg with two
+outputs instead:
+
+* the montage output keeps the exact filter graph, frame limit and encoder
+  defaults of the single-output command, so its JPEG bytes are unchanged;
+* the audio output is the same `-vn -ar 16000 -ac 1` WAV;
+* the duration is read from the input banner ffmpeg prints while opening the
+  file (centisecond precision, the banner's resolution). raw_upload still
+  ffprobes the duration it scores with, since that value is part of its
+  replay keys.
+
+A source without an audio track makes the two-output command fail before it
+writes anything; that case (and only that case) reruns the montage-only command.
+
+canonicalize_montage_bytes() is the one JPEG contract both embedding producers
+(raw_embed and raw_upload) send and cache montages under, so the same montage
+always has the same bytes, key and vector.
+"""
+
+import io
+import os
+import re
+import subprocess
+
+from PIL import Image
+
+
+MONTAGE_FILTER = 'fps=1,scale=320:-1,tile=5x1'
+OPENING_SECONDS = 5
+SAMPLE_RATE = 16000
+CANONICAL_MONTAGE_WIDTH = 1600
+CANONICAL_MONTAGE_HEIGHT = 568
+CANONICAL_MONTAGE_QUALITY = 90
+_BANNER_DURATION = re.compile(r'Duration: (\d+):(\d{2}):(\d{2}(?:\.\d+)?)')
+
+
+def banner_duration(stderr):
+    """Container duration in seconds from ffmpeg's input banner, or None."""
+    match = _BANNER_DURATION.search(stderr or '')
+    if not match:
+        return None
+    seconds = int(match.group(1)) * 3600 + int(match.group(2)) * 60 + float(match.group(3))
+    return seconds if seconds > 0 else None
+
+
+def _ffmpeg(args, timeout):
+    return subprocess.run(
+        ['ffmpeg', '-nostdin', '-hide_banner', '-nostats', '-loglevel', 'info'] + args,
+        capture_output=True, text=True, errors='replace', timeout=timeout,
+    )
+
+
+def extract_opening(src, folder, seconds=OPENING_SECONDS, trim='input', timeout=90):
+    """(montage path, wav path, duration seconds) for the opening of `src`; each is None when missing.
+
+    `trim` says where `-t seconds` goes, as the separate commands did: 'input'
+    limits how much of the source is read, 'output' cuts each output (the form
+    used for presigned-URL streams). Files are written into `folder`.
+    """
+    mon, wav = os.path.join(folder, 'm.jpg'), os.path.join(folder, 'a.wav')
+    clip = ['-t', str(seconds)]
+    source = clip + ['-i', src] if trim == 'input' else ['-i', src]
+    each = [] if trim == 'input' else clip
+    montage = each + ['-vf', MONTAGE_FILTER, '-frames:v', '1', mon]
+    audio = each + ['-vn', '-ar', str(SAMPLE_RATE), '-ac', '1', wav]
+    result = _ffmpeg(source + montage + audio, timeout)
+    duration = banner_duration(result.stderr)
+    if not os.path.exists(mon):
+        for path in (mon, wav):
+            if os.path.exists(path):
+                os.remove(path)
+        result = _ffmpeg(source + montage, timeout)
+        duration = duration or banner_duration(result.stderr)
+    return (
+        mon if os.path.exists(mon) else None,
+        wav if os.path.exists(wav) else None,
+        duration,
+    )
+
+
+def canonicalize_montage_bytes(value):
+    """Give every source path the exact same pixel geometry and JPEG encoder contract."""
+    try:
+        with Image.open(io.BytesIO(value)) as source:
+            if (
+                source.format == 'JPEG'
+                and source.size
+                == (CANONICAL_MONTAGE_WIDTH, CANONICAL_MONTAGE_HEIGHT)
+            ):
+                return bytes(value)
+            image = source.convert('RGB').resize(
+                (CANONICAL_MONTAGE_WIDTH, CANONICAL_MONTAGE_HEIGHT),
+                Image.Resampling.LANCZOS,
+            )
+            output = io.BytesIO()
+            image.save(
+                output,
+                format='JPEG',
+                quality=CANONICAL_MONTAGE_QUALITY,
+                subsampling=2,
+                optimize=False,
+                progressive=False,
+            )
+            return output.getvalue()
+    except Exception as error:
+        raise RuntimeError(f'could not canonicalize the five-frame montage: {error}') from error
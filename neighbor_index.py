@@ -0,0 +1,312 @@
+"""Revision-pinned IVF neighbor index over a frozen embedding matrix.
+
+The Shorts (raw/) and long-form (raw-long/) scorers place an upload among its
+nearest corpus videos. A full scan pages the whole ~66k x 1536 matrix through
+RAM for every channel on every upload, which is what keeps the 2GB deploy box
+near its ceiling. This index partitions the rows into coarse cosine cells
+once per archive ETag, probes only the few cells nearest the query, and then
+reranks those candidate rows with their exact full-precision cosine read from
+the same mmap, so the reported similarities are never approximations.
+
+Each build audits recall against the exact scan on seeded held-out probes and
+widens the probe count until the mean recall clears RECALL_FLOOR (probing
+every cell is the exact scan, so the floor is always reachable). The floor is
+on the mean so one hard query cannot push the probe count toward a full scan;
+the worst query's recall is still recorded. A corpus row used as its own
+query always lands in its own cell and finds itself, which flatters recall,
+so each probe is a corpus row nudged by seeded noise (AUDIT_NOISE, relative to
+the unit row) and its source row is dropped from both the exact and the probed
+neighbours, the way an upload that is not in the corpus is searched. The exact
+neighbours are computed once per build and reused for every probe count
+tried. The audit lands in the manifest next to the pinned revision it was
+measured on.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+
+SCHEMA = 'embedding-neighbor-index-v2'
+EPSILON = 1e-9
+CHUNK_ROWS = 4096
+TRAINING_ROWS = 16384
+TRAINING_ITERATIONS = 8
+AUDIT_PROBES = 64
+AUDIT_NEIGHBORS = 24
+AUDIT_NOISE = 0.35
+RECALL_FLOOR = 0.995
+SEED = 1729
+
+
+def _unit(rows):
+    rows = np.asarray(rows, np.float32)
+    return rows / (np.linalg.norm(rows, axis=-1, keepdims=True) + EPSILON)
+
+
+def _chunk_similarities(vectors, queries, normalize):
+    """Yield (start, sims[rows, queries]) for the matrix, one chunk at a time."""
+    for start in range(0, len(vectors), CHUNK_ROWS):
+        block = np.asarray(vectors[start:start + CHUNK_ROWS], np.float32)
+        sims = block @ queries.T
+        if normalize:
+            sims /= np.linalg.norm(block, axis=1, keepdims=True) + EPSILON
+        yield start, sims
+
+
+def _top(sims, k):
+    k = min(int(k), len(sims))
+    if k <= 0:
+        return np.zeros(0, np.int64)
+    part = np.argpartition(-sims, k - 1)[:k]
+    return part[np.argsort(-sims[part])]
+
+
+def exact_top(vectors, query, k, normalize=False):
+    """Full chunked scan: (row indices, cosine) of the k most similar rows.
+
+    `normalize=True` divides each row by its own norm, for archives that store
+    raw (not unit) vectors.
+    """
+    query = _unit(query).reshape(1, -1)
+    sims = np.empty(len(vectors), np.float32)
+    for start, block in _chunk_similarities(vectors, query, normalize):
+        sims[start:start + len(block)] = block[:, 0]
+    order = _top(sims, k)
+    return order, sims[order]
+
+
+def _exact_top_batch(vectors, queries, k, normalize=False):
+    """Exact top-k row indices for several queries in one pass over the matrix."""
+    best_rows = np.zeros((len(queries), 0), np.int64)
+    best_sims = np.zeros((len(queries), 0), np.float32)
+    for start, block in _chunk_similarities(vectors, queries, normalize):
+        rows = np.concatenate([
+            best_rows,
+            np.broadcast_to(
+                np.arange(start, start + len(block)),
+                (len(queries), len(block)),
+            ),
+        ], axis=1)
+        sims = np.concatenate([best_sims, block.T], axis=1)
+        keep = min(k, sims.shape[1])
+        part = np.argpartition(-sims, keep - 1, axis=1)[:, :keep]
+        best_rows = np.take_along_axis(rows, part, axis=1)
+        best_sims = np.take_along_axis(sims, part, axis=1)
+    return best_rows
+
+
+def _train_centroids(vectors, lists, normalize, seed):
+    """Spherical k-means on a seeded row sample; deterministic per revision."""
+    rng = np.random.RandomState(seed)
+    sample_rows = np.sort(rng.choice(
+        len(vectors),
+        min(len(vectors), max(TRAINING_ROWS, lists * 8)),
+        replace=False,
+    ))
+    sample = _unit(vectors[sample_rows]) if normalize else np.asarray(
+        vectors[sample_rows],
+        np.float32,
+    )
+    centroids = sample[rng.choice(len(sample), lists, replace=False)].copy()
+    for _ in range(TRAINING_ITERATIONS):
+        labels = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, sample)
+        counts = np.bincount(labels, minlength=lists)
+        empty = counts == 0
+        if empty.any():
+            # Re-seed empty cells on the rows worst served by their centroid.
+            fit = np.einsum('ij,ij->i', sample, centroids[labels])
+            sums[empty] = sample[np.argsort(fit)[:int(empty.sum())]]
+        centroids = _unit(sums)
+    return centroids
+
+
+def _assign(vectors, centroids, normalize):
+    labels = np.empty(len(vectors), np.int32)
+    for start in range(0, len(vectors), CHUNK_ROWS):
+        block = np.asarray(vectors[start:start + CHUNK_ROWS], np.float32)
+        if normalize:
+            block = _unit(block)
+        labels[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return labels
+
+
+def _without(found, row, k):
+    """The first k of `found` once the audit's source row is dropped."""
+    return found[found != row][:k]
+
+
+class NeighborIndex:
+    """Coarse cells over a row matrix plus exact rerank from that same matrix."""
+
+    def __init__(self, vectors, centroids, order, offsets, manifest, normalize=False):
+        self.vectors = vectors
+        self.centroids = np.asarray(centroids, np.float32)
+        self.order = np.asarray(order, np.int32)
+        self.offsets = np.asarray(offsets, np.int64)
+        self.manifest = manifest
+        self.normalize = bool(normalize)
+        self.probes = int(manifest.get('probes') or len(self.centroids))
+
+    def _candidates(self, query, probes):
+        cells = _top(self.centroids @ query, probes)
+        candidates = np.concatenate([
+            self.order[self.offsets[cell]:self.offsets[cell + 1]]
+            for cell in cells
+        ])
+        # Ascending row order keeps the mmap gather sequential on disk.
+        return np.sort(candidates)
+
+    def search(self, query, k, probes=None):
+        """(row indices, exact cosine) of the k nearest rows, best first."""
+        query = _unit(query).reshape(-1)
+        candidates = self._candidates(query, probes or self.probes)
+        if len(candidates) < min(k, len(self.vectors)):
+            return exact_top(self.vectors, query, k, self.normalize)
+        rows = np.asarray(self.vectors[candidates], np.float32)
+        sims = rows @ query
+        if self.normalize:
+            sims /= np.linalg.norm(rows, axis=1) + EPSILON
+        top = _top(sims, k)
+        return candidates[top].astype(np.int64), sims[top]
+
+    def audit_sample(self, k=AUDIT_NEIGHBORS, probes=AUDIT_PROBES, seed=SEED):
+        """(source rows, perturbed queries, exact top-k rows without the source) for the audit."""
+        rng = np.random.RandomState(seed)
+        rows = np.sort(rng.choice(len(self.vectors), min(probes, len(self.vectors)), replace=False))
+        noise = _unit(rng.normal(size=(len(rows), self.vectors.shape[1])))
+        queries = _unit(_unit(self.vectors[rows]) + AUDIT_NOISE * noise)
+        exact = []
+        for row, query, found in zip(rows, queries, _exact_top_batch(self.vectors, queries, k + 1, self.normalize)):
+            # The batch scan leaves each top set unordered; rank it before trimming to k.
+            found = np.sort(found)
+            candidates = np.asarray(self.vectors[found], np.float32)
+            sims = candidates @ query
+            if self.normalize:
+                sims /= np.linalg.norm(candidates, axis=1) + EPSILON
+            exact.append(_without(found[np.argsort(-sims)], row, k))
+        return rows, queries, exact
+
+    def audit_recall(self, k=AUDIT_NEIGHBORS, probes=AUDIT_PROBES, seed=SEED, sample=None):
+        """Recall@k of the probed search against the exact scan, per probe count.
+
+        `sample` is an audit_sample() result to reuse across probe counts.
+        """
+        rows, queries, exact = sample if sample is not None else self.audit_sample(k, probes, seed)
+        recalls = []
+        for row, query, truth in zip(rows, queries, exact):
+            found, _ = self.search(query, k + 1)
+            found = _without(found, row, k)
+            recalls.append(len(set(found.tolist()) & set(truth.tolist())) / len(truth))
+        return {
+            'probes': len(recalls),
+            'neighbors': int(k),
+            'noise': AUDIT_NOISE,
+            'cellsProbed': self.probes,
+            'meanRecall': float(np.mean(recalls)),
+            'minimumRecall': float(np.min(recalls)),
+        }
+
+    def summary(self):
+        return {
+            'schema': SCHEMA,
+            'revision': self.manifest.get('revision'),
+            'rows': self.manifest.get('rows'),
+            'lists': self.manifest.get('lists'),
+            'probes': self.probes,
+            'recall': self.manifest.get('recall'),
+            'rerank': 'exact cosine over probed cells',
+        }
+
+
+def _revision_matches(manifest, vectors, revision):
+    return bool(
+        manifest.get('schema') == SCHEMA
+        and manifest.get('revision') == revision
+        and manifest.get('rows') == len(vectors)
+        and manifest.get('dim') == int(vectors.shape[1])
+    )
+
+
+def load(vectors, directory, revision, normalize=False):
+    """Open a persisted index, or None when it is absent or for another revision."""
+    try:
+        with open(os.path.join(directory, 'manifest.json'), encoding='utf8') as handle:
+            manifest = json.load(handle)
+    except (OSError, ValueError):
+        return None
+    if not _revision_matches(manifest, vectors, revision):
+        return None
+    if bool(manifest.get('normalize')) != bool(normalize):
+        return None
+    return NeighborIndex(
+        vectors,
+        np.load(os.path.join(directory, 'centroids.npy')),
+        np.load(os.path.join(directory, 'order.npy'), mmap_mode='r'),
+        np.load(os.path.join(directory, 'offsets.npy')),
+        manifest,
+        normalize,
+    )
+
+
+def build(vectors, directory, revision, normalize=False, lists=None, seed=SEED):
+    """Fit, audit and atomically persist the index for one pinned revision."""
+    started = time.time()
+    rows = len(vectors)
+    lists = int(lists or max(1, min(rows // 32, int(4 * np.sqrt(rows)))))
+    centroids = _train_centroids(vectors, lists, normalize, seed)
+    labels = _assign(vectors, centroids, normalize)
+    order = np.argsort(labels, kind='stable').astype(np.int32)
+    offsets = np.concatenate([[0], np.cumsum(np.bincount(labels, minlength=lists))]).astype(np.int64)
+    manifest = {
+        'schema': SCHEMA,
+        'revision': revision,
+        'rows': rows,
+        'dim': int(vectors.shape[1]),
+        'lists': lists,
+        'normalize': bool(normalize),
+        'seed': seed,
+    }
+    index = NeighborIndex(vectors, centroids, order, offsets, manifest, normalize)
+    index.probes = min(lists, max(1, lists // 32))
+    sample = index.audit_sample(seed=seed)
+    while True:
+        recall = index.audit_recall(sample=sample)
+        if recall['meanRecall'] >= RECALL_FLOOR or index.probes >= lists:
+            break
+        index.probes = min(lists, index.probes * 2)
+    manifest.update({
+        'probes': index.probes,
+        'recall': recall,
+        'recallFloor': RECALL_FLOOR,
+        'buildSeconds': round(time.time() - started, 2),
+    })
+    parent = os.path.dirname(os.path.abspath(directory))
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=os.path.basename(directory) + '.build', dir=parent)
+    try:
+        np.save(os.path.join(staging, 'centroids.npy'), centroids)
+        np.save(os.path.join(staging, 'order.npy'), order)
+        np.save(os.path.join(staging, 'offsets.npy'), offsets)
+        with open(os.path.join(staging, 'manifest.json'), 'w', encoding='utf8') as handle:
+            json.dump(manifest, handle, sort_keys=True, separators=(',', ':'))
+        shutil.rmtree(directory, ignore_errors=True)
+        os.replace(staging, directory)
+    except OSError:
+        # A concurrent builder for the same revision won the rename; its
+        # index is equivalent (seeded fit over identical rows).
+        shutil.rmtree(staging, ignore_errors=True)
+    return index
+
+
+def load_or_build(vectors, directory, revision, normalize=False, **options):
+    index = load(vectors, directory, revision, normalize)
+    if index is None:
+        index = build(vectors, directory, revision, normalize, **options)
+    return index
@@ -6,10 +6,11 @@ the quantification (not one fixed colouring). Definitions identical to novelty_q
 Writes novelty_field.json: { modality: { method: [novelty per corpus video, map order] } }
 plus the exact formula + held-out keep/ret5 ρ per (modality,method) from the sweep.
 """
-import io, json, numpy as np, boto3, warnings, os; warnings.filterwarnings('ignore')
-from sklearn.neighbors import NearestNeighbors
+import json, numpy as np, boto3, warnings, os; warnings.filterwarnings('ignore')
 from sklearn.cluster import MiniBatchKMeans
 from sklearn.decomposition import PCA
+import corpus_snapshot
+import knn_graph
 HERE = os.path.dirname(os.path.abspath(__file__))
 def env(k):
     for ln in open(HERE + '/.env'):
@@ -34,12 +35,13 @@ FORMULAS = {
     'mode': 'novelty = 1 − cos(e, densest corpus exemplar). Distance from the single most-typical hook.',
 }
 
-def field(Xv):
-    """per-video novelty (n,) for each method + the reference geometry (kmeans labels, mode index)."""
+def field(Xv, sims):
+    """per-video novelty (n,) for each method + the reference geometry (kmeans labels, mode index).
+    sims = each row's cosine to itself + its 50 NN among the rows (a knn_graph slice)."""
     out = {}; aux = {'labels': {}}
     mu = Xv.mean(0); mu = mu / (np.linalg.norm(mu) + 1e-9)
     out['mean'] = 1 - Xv @ mu
-    nn = NearestNeighbors(n_neighbors=51, metric='cosine').fit(Xv); dist, _ = nn.kneighbors(Xv)
+    dist = 1 - sims                                      # cosine distance to self + 50 NN, ascending
     for k in [5, 15, 50]: out[f'knn{k}'] = dist[:, 1:k + 1].mean(1)
     for K in [8, 25, 80]:
         km = MiniBatchKMeans(K, random_state=0, n_init=3, batch_size=1024).fit(Xv)
@@ -60,14 +62,11 @@ for r in SW['results']: stat[(r['modality'], r['method'])] = {'keep': r['keep_li
 MODK = {'visual': 'visual', 'text': 'text', 'whole': 'together'}
 field_out = {}
 for mk, ck in MODK.items():
-    z = np.load(io.BytesIO(g(f'raw/{ck}/embeddings.npz')), allow_pickle=True)
-    ids = [str(x) for x in z['ids']]; X = norm(np.asarray(z['vecs'], np.float32)); epos = {v: i for i, v in enumerate(ids)}
-    mp = json.loads(g(f'raw/{ck}/map.json')); mids = [str(x) for x in mp['id']]
-    Xm = np.zeros((len(mids), X.shape[1]), np.float32); mask = np.zeros(len(mids), bool)
-    for i, vid in enumerate(mids):
-        j = epos.get(vid)
-        if j is not None: Xm[i] = X[j]; mask[i] = True
-    F, aux = field(Xm[mask])
+    snap = corpus_snapshot.open_channel(s3, 'business-world-videos', ck)
+    mp, map_etag = corpus_snapshot.read_map(s3, 'business-world-videos', ck); mids = [str(x) for x in mp['id']]
+    rows = corpus_snapshot.alignment(snap, mids, map_etag); mask = rows >= 0
+    sel = rows[mask]; sims = knn_graph.open_graph(snap).row_neighbors(sel, 51, within=sel)[0]
+    F, aux = field(np.asarray(snap.vecs[sel]), sims)
     # reference geometry in the map's UMAP coords (grid 0-1000) so the UI can DRAW what each
     # method measures distance FROM: mean=centre · mode=the densest exemplar · niche=K centroids.
     ux = np.array(mp['proj']['umap']['x'], float); uy = np.array(mp['proj']['umap']['y'], float)
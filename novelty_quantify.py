@@ -14,12 +14,14 @@ Quantifications (all = "how far from the dense centre", measured differently):
   lowdensity  1 - mean similarity to the whole corpus (global density)
   mode        distance to the single densest corpus point (the most-typical exemplar)
 """
-import io, json, numpy as np, boto3, warnings; warnings.filterwarnings('ignore')
+import json, numpy as np, boto3, warnings; warnings.filterwarnings('ignore')
 from sklearn.cluster import MiniBatchKMeans
 from sklearn.decomposition import PCA
 from sklearn.linear_model import LinearRegression
 from scipy.stats import spearmanr
 import os
+import corpus_snapshot
+import knn_graph
 HERE = os.path.dirname(os.path.abspath(__file__))
 def env(k):
     for ln in open(HERE + '/.env'):
@@ -34,14 +36,15 @@ rt = json.loads(open(HERE + '/buildings/jarvis/retention-study/retention_table.j
 KEEP = {str(v['id']): float(v['keep_rate']) for v in rt['videos'] if v.get('keep_rate') is not None}
 RET5 = {str(v['id']): float(v['ret5']) for v in rt['videos'] if v.get('ret5') is not None}
 
-def quantify(Eo, Ec):
-    """Eo = owned (n,d) normalised, Ec = corpus (N,d) normalised. Returns {name: novelty[n]}."""
+def quantify(Eo, Ec, graph, own_rows):
+    """Eo = owned (n,d) normalised, Ec = corpus (N,d) normalised, own_rows = Eo's rows of Ec and
+    graph its knn_graph (so no N×N pass here). Returns {name: novelty[n]}."""
     out = {}
     mu = Ec.mean(0); mu = mu / (np.linalg.norm(mu) + 1e-9)
     out['mean'] = 1 - Eo @ mu
-    sims = Eo @ Ec.T                                   # (n, N) cosine sim
-    ssrt = np.sort(sims, axis=1)
-    for k in [5, 15, 50]: out[f'knn{k}'] = 1 - ssrt[:, -k - 1:-1].mean(1)   # excl self (the max)
+    top = graph.row_neighbors(own_rows, 51)[0]                    # (n, 51) cosine sims, descending
+    mean_sim = Eo @ Ec.mean(0, dtype=np.float64)                  # mean cos to every corpus row = cos·(mean row)
+    for k in [5, 15, 50]: out[f'knn{k}'] = 1 - top[:, 1:k + 1].mean(1)      # excl self (the max)
     for K in [8, 25, 80]:
         cen = norm(MiniBatchKMeans(K, random_state=0, n_init=3, batch_size=1024).fit(Ec).cluster_centers_)
         out[f'niche{K}'] = 1 - (Eo @ cen.T).max(1)
@@ -49,9 +52,9 @@ def quantify(Eo, Ec):
     for n in [10, 50]:
         p = PCA(n, random_state=0).fit(Ec); rec = p.inverse_transform(p.transform(Eo))
         out[f'pcaresid{n}'] = rn(Eo - rec) / (rn(Eo) + 1e-9)
-    out['lowdensity'] = 1 - sims.mean(1)
-    # densest corpus point = highest mean-sim-to-its-15-NN; distance to it
-    sc = np.sort(Ec @ Ec.T, axis=1)[:, -16:-1].mean(1); mode = Ec[int(np.argmax(sc))]
+    out['lowdensity'] = 1 - mean_sim
+    # densest corpus point = highest mean-sim-to-its-15-NN; distance to it (from the shared kNN graph)
+    sc = graph.row_neighbors(np.arange(len(Ec)), 16)[0][:, 1:].mean(1); mode = Ec[int(np.argmax(sc))]
     out['mode'] = 1 - Eo @ mode
     return out
 
@@ -78,19 +81,16 @@ def curve(x, y, nb=8):
         pts.append({'x': round(float(x[sl].mean()), 4), 'y': round(float(y[sl].mean()), 2), 'n': len(sl)})
     return pts
 
-EMB = {}
-for ck in ['visual', 'text', 'together']:
-    z = np.load(io.BytesIO(g(f'raw/{ck}/embeddings.npz')), allow_pickle=True)
-    EMB[ck] = ([str(x) for x in z['ids']], norm(np.asarray(z['vecs'], np.float32)))
+EMB = {ck: corpus_snapshot.open_channel(s3, 'business-world-videos', ck) for ck in ['visual', 'text', 'together']}
 
 results = []
 print(f'{"modality":<9}{"method":<12}{"keep ρ":>8}{"hump?":>7}{"ret5 ρ":>9}')
 for ck in ['visual', 'text', 'together']:
-    ids, X = EMB[ck]; pos = {v: i for i, v in enumerate(ids)}
+    X = EMB[ck].vecs; pos = EMB[ck].positions()
     own = [v for v in KEEP if v in RET5 and v in pos]
-    Eo = X[[pos[v] for v in own]]
+    own_rows = np.array([pos[v] for v in own], dtype=np.int64); Eo = np.asarray(X[own_rows])
     yk = np.array([KEEP[v] for v in own]); yr = np.array([RET5[v] for v in own])
-    Q = quantify(Eo, X)
+    Q = quantify(Eo, X, knn_graph.open_graph(EMB[ck]), own_rows)
     for name, nov in Q.items():
         lk, gk, ck2 = holdout(nov, yk); lr, gr, cr = holdout(nov, yr)
         hump = (gk > 0.003 and ck2 > 0.6)
@@ -101,7 +101,7 @@ for ck in ['visual', 'text', 'together']:
         print(f'{ck:<9}{name:<12}{lk:>+8.3f}{("  U " if hump else "   ·"):>7}{lr:>+9.3f}')
 
 results.sort(key=lambda d: -abs(d['keep_lin']))
-out = {'n': len(EMB['together'][0]), 'splits': 40, 'results': results,
+out = {'n': len(EMB['together']), 'splits': 40, 'results': results,
        'best_keep': results[0], 'note': 'sweep of novelty quantifications; hump=inverted-U held-out (quad gain + concave)'}
 open(HERE + '/buildings/jarvis/retention-study/principles/novelty_quantify.json', 'w').write(json.dumps(out))
 s3.put_object(Bucket='business-world-videos', Key='raw/principles/novelty_quantify.json', Body=json.dumps(out).encode(), ContentType='application/json')
@@ -0,0 +1,289 @@
+"""Incremental kNN lists and drift-gated model refits for the novelty scripts.
+
+principles_novelty.py and save_novelty_models.py used to redo all of their
+work on every run: an all-pairs kNN pass per modality and fresh KMeans and PCA
+fits, even when the nightly corpus growth was a few hundred rows out of ~66k.
+This module keeps the previous revision's results next to the corpus
+snapshots and updates them in proportion to the delta:
+
+* neighbor_lists() stores each row's exact top-k (cosine, row) list keyed by
+  video id and a digest of its vector. On the next revision, rows with the
+  same id and vector keep their lists. New or changed rows are queried against
+  the whole corpus. Kept rows only see the new rows as candidates, merged into
+  their lists. A kept row that lost a neighbor is recomputed in full. The
+  result is the exact top-k a full rebuild finds (up to GEMM round-off and tie
+  order), and verify_neighbors() checks that.
+* kmeans_centers() and pca_basis() keep the last fitted model with the cost it
+  had on its training rows (mean squared distance to the nearest centre, share
+  of variance left in the residual). The kept model is scored on the current
+  rows, and it is refit once that cost has drifted by more than
+  DRIFT_THRESHOLD relative to the fit, or when its shape no longer matches.
+  Scoring is one pass over the rows, so it is cheap next to a refit. The cost
+  only compares the model with itself, so slow change that a fresh fit would
+  capture never trips it: a model is also refit after REFIT_EVERY runs, or
+  once the rows have grown by REFIT_GROWTH over the rows it was fitted on.
+  full_rebuild_gap() measures how much a kept model loses to a fresh fit.
+
+State lives under the corpus snapshot cache (CORPUS_SNAPSHOT_CACHE) unless
+NOVELTY_STATE_CACHE says otherwise. State files are written to a scratch name
+and renamed into place, so an interrupted run leaves the previous state, and
+a missing or incompatible state simply means a full rebuild.
+"""
+
+import hashlib
+import os
+
+import numpy as np
+
+import corpus_snapshot
+import knn_density
+
+
+SCHEMA = 'novelty-state-v1'
+CHUNK_ROWS = 4096
+EPSILON = 1e-12
+CACHE_DIR = os.environ.get('NOVELTY_STATE_CACHE') or os.path.join(corpus_snapshot.CACHE_DIR, 'novelty-state')
+DRIFT_THRESHOLD = float(os.environ.get('NOVELTY_DRIFT_THRESHOLD') or 0.02)
+# A kept model is refit on its REFIT_EVERY-th run, or once the rows outgrow its fit by this share.
+REFIT_EVERY = int(os.environ.get('NOVELTY_REFIT_EVERY') or 8)
+REFIT_GROWTH = float(os.environ.get('NOVELTY_REFIT_GROWTH') or 0.1)
+# Past this share of rows to requery, one full pass is cheaper than the bookkeeping.
+REBUILD_FRACTION = 0.5
+VERIFY_ATOL = 1e-5
+
+
+def _path(cache_dir, name):
+    return os.path.join(cache_dir, f'{name}.npz')
+
+
+def _load(path):
+    try:
+        with np.load(path, allow_pickle=False) as npz:
+            state = {name: npz[name] for name in npz.files}
+    except (OSError, ValueError):
+        return None
+    return state if str(state.get('schema')) == SCHEMA else None
+
+
+def _store(path, **arrays):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f'{path}.tmp{os.getpid()}'
+    with open(tmp, 'wb') as handle:
+        np.savez(handle, schema=np.asarray(SCHEMA), **arrays)
+    os.replace(tmp, path)
+
+
+def row_digests(vecs):
+    """64-bit digest of every row's float32 bytes; a changed vector changes its digest."""
+    digests = []
+    for start in range(0, len(vecs), CHUNK_ROWS):
+        block = np.ascontiguousarray(vecs[start:start + CHUNK_ROWS], np.float32)
+        digests.extend(hashlib.blake2b(row, digest_size=8).digest() for row in block)
+    return np.frombuffer(b''.join(digests), '<u8').copy()
+
+
+def _carried(old_ids, old_digests, ids, digests):
+    """Row in the new revision of every old row whose id and vector are unchanged, else -1.
+
+    Ids that occur more than once in either revision are never carried.
+    """
+    carried = np.full(len(old_ids), -1, np.int64)
+    if not len(old_ids) or not len(ids):
+        return carried
+    unique, first, counts = np.unique(ids, return_index=True, return_counts=True)
+    at = np.minimum(np.searchsorted(unique, old_ids), len(unique) - 1)
+    _, inverse, old_counts = np.unique(old_ids, return_inverse=True, return_counts=True)
+    rows = first[at]
+    found = (unique[at] == old_ids) & (counts[at] == 1) & (old_counts[inverse] == 1)
+    found &= digests[rows] == old_digests
+    carried[found] = rows[found]
+    return carried
+
+
+def _merge(sims, rows, extra_sims, extra_rows, k):
+    sims = np.concatenate([sims, extra_sims], axis=1)
+    rows = np.concatenate([rows, extra_rows], axis=1)
+    order = np.argsort(-sims, axis=1, kind='stable')[:, :k]
+    return np.take_along_axis(sims, order, axis=1), np.take_along_axis(rows, order, axis=1)
+
+
+def _update(state, ids, digests, vecs, k):
+    n = len(ids)
+    carried = _carried(state['ids'], state['digests'], ids, digests)
+    source = np.where(carried >= 0)[0]
+    target = carried[source]
+    sims = np.zeros((n, k), np.float32)
+    rows = np.full((n, k), -1, np.int64)
+    sims[target] = state['sims'][source]
+    rows[target] = carried[state['rows'][source]]
+    kept = np.zeros(n, bool)
+    kept[target] = True
+    added = np.where(~kept)[0]
+    # A kept row that lost a neighbor may now rank any row k-th: requery it in full.
+    lost = kept & (rows < 0).any(axis=1)
+    requery = np.where(~kept | lost)[0]
+    if len(requery) > REBUILD_FRACTION * n:
+        return None
+    stats = {'mode': 'incremental', 'rows': n, 'added': len(added), 'removed': len(state['ids']) - len(source),
+             'requeried': len(requery), 'repaired': 0}
+    if len(requery):
+        sims[requery], rows[requery] = knn_density.top_similarities(vecs[requery], vecs, k)[:2]
+    clean = np.where(kept & ~lost)[0]
+    if len(clean) and len(added):
+        extra_sims, extra_rows, _ = knn_density.top_similarities(vecs[clean], vecs[added], k)
+        stats['repaired'] = int((extra_sims[:, 0] > sims[clean, -1]).sum())
+        sims[clean], rows[clean] = _merge(sims[clean], rows[clean], extra_sims, added[extra_rows], k)
+    return sims, rows, stats
+
+
+def neighbor_lists(name, ids, vecs, k, cache_dir=CACHE_DIR, incremental=True):
+    """(sims (n, k) descending, rows (n, k), stats): every row's exact top k among all rows of `vecs`.
+
+    Rows must be unit-normalized, and each finds itself (or an identical row)
+    first, as with knn_density.top_similarities. `ids` names the rows so the
+    lists stored under `name` can be carried to the next revision; with
+    `incremental` off, or without a usable prior state, every list is rebuilt.
+    """
+    ids = np.asarray([str(vid) for vid in ids], dtype=str)
+    if len(ids) != len(vecs):
+        raise RuntimeError(f'{name}: {len(ids)} ids for {len(vecs)} vectors')
+    vecs = np.asarray(vecs, np.float32)
+    digests = row_digests(vecs)
+    k = min(int(k), len(ids))
+    path = _path(cache_dir, name)
+    state = _load(path) if incremental else None
+    result = None
+    if state is not None and state['sims'].shape[1] == k:
+        result = _update(state, ids, digests, vecs, k)
+    if result is None:
+        sims, rows, _ = knn_density.top_similarities(vecs, vecs, k)
+        result = sims, rows, {'mode': 'full', 'rows': len(ids), 'added': len(ids), 'removed': 0,
+                              'requeried': len(ids), 'repaired': 0}
+    sims, rows, stats = result
+    _store(path, ids=ids, digests=digests, sims=sims.astype(np.float32), rows=rows.astype(np.int64))
+    return sims, rows, stats
+
+
+def verify_neighbors(vecs, sims, atol=VERIFY_ATOL):
+    """Largest gap between `sims` and a full rebuild's top-k; raises RuntimeError past `atol`.
+
+    Similarities are compared rather than rows, since tied neighbors may be
+    listed in either order.
+    """
+    full = knn_density.top_similarities(np.asarray(vecs, np.float32), vecs, sims.shape[1])[0]
+    gap = float(np.abs(full - sims).max()) if sims.size else 0.0
+    if gap > atol:
+        raise RuntimeError(f'incremental kNN lists are {gap:.2e} away from a full rebuild')
+    return gap
+
+
+def kmeans_cost(X, centers):
+    """(mean squared distance of the rows of X to their nearest centre, nearest-centre labels)."""
+    centers = np.asarray(centers, np.float32)
+    squared = (centers.astype(np.float64) ** 2).sum(axis=1)
+    labels = np.empty(len(X), np.int64)
+    total = 0.0
+    for start in range(0, len(X), CHUNK_ROWS):
+        block = np.asarray(X[start:start + CHUNK_ROWS], np.float32)
+        dist = squared - 2 * (block @ centers.T).astype(np.float64)
+        labels[start:start + len(block)] = np.argmin(dist, axis=1)
+        nearest = dist.min(axis=1) + (block.astype(np.float64) ** 2).sum(axis=1)
+        total += float(np.clip(nearest, 0, None).sum())
+    return total / max(1, len(X)), labels
+
+
+def pca_cost(X, components, mean):
+    """Share of the variance of X around `mean` left in the residual of the basis."""
+    components = np.asarray(components, np.float64)
+    residual = total = 0.0
+    for start in range(0, len(X), CHUNK_ROWS):
+        block = np.asarray(X[start:start + CHUNK_ROWS], np.float64) - mean
+        energy = float((block ** 2).sum())
+        total += energy
+        residual += energy - float(((block @ components.T) ** 2).sum())
+    return max(residual, 0.0) / max(total, EPSILON)
+
+
+def _drift(cost, fitted):
+    return cost / max(float(fitted), EPSILON) - 1
+
+
+def _stale(state, rows):
+    """Why a stored model is refit regardless of its cost ('age' or 'growth'), else None."""
+    if int(state.get('runs', 0)) + 1 >= REFIT_EVERY:
+        return 'age'
+    if rows > int(state['rows']) * (1 + REFIT_GROWTH):
+        return 'growth'
+    return None
+
+
+def _keep(path, state, info):
+    """Record one more run of the stored model and mark `info` as reused."""
+    runs = int(state.get('runs', 0)) + 1
+    _store(path, **{name: value for name, value in state.items() if name not in ('schema', 'runs')},
+           runs=np.int64(runs))
+    info.update(refit=False, reason=None, fitRows=int(state['rows']), runs=runs)
+
+
+def kmeans_centers(name, X, n_clusters, fit, threshold=DRIFT_THRESHOLD, cache_dir=CACHE_DIR, incremental=True):
+    """(centres, nearest-centre labels, info) for X, reusing the stored centres until they drift.
+
+    `fit(X)` returns fresh centres; info records whether it ran, why ('new',
+    'shape', 'drift', 'age' or 'growth'), and the drift when it was measured.
+    """
+    path = _path(cache_dir, name)
+    state = _load(path) if incremental else None
+    info = {'refit': True, 'reason': 'new', 'drift': None, 'rows': len(X)}
+    if state is not None and state['centers'].shape != (n_clusters, X.shape[1]):
+        info['reason'] = 'shape'
+    elif state is not None:
+        info['reason'] = _stale(state, len(X))
+        if info['reason'] is None:
+            cost, labels = kmeans_cost(X, state['centers'])
+            info['drift'] = _drift(cost, state['cost'])
+            if abs(info['drift']) <= threshold:
+                _keep(path, state, info)
+                return state['centers'], labels, info
+            info['reason'] = 'drift'
+    centers = np.asarray(fit(X), np.float32)
+    cost, labels = kmeans_cost(X, centers)
+    _store(path, centers=centers, cost=np.float64(cost), rows=np.int64(len(X)), runs=np.int64(0))
+    info.update(fitRows=len(X), runs=0)
+    return centers, labels, info
+
+
+def pca_basis(name, X, n_components, fit, threshold=DRIFT_THRESHOLD, cache_dir=CACHE_DIR, incremental=True):
+    """(components, mean, info) for X, reusing the stored basis until its residual share drifts.
+
+    `fit(X)` returns fresh (components, mean); project with (X - mean) @ components.T.
+    info is as for kmeans_centers().
+    """
+    path = _path(cache_dir, name)
+    state = _load(path) if incremental else None
+    info = {'refit': True, 'reason': 'new', 'drift': None, 'rows': len(X)}
+    if state is not None and state['components'].shape != (n_components, X.shape[1]):
+        info['reason'] = 'shape'
+    elif state is not None:
+        info['reason'] = _stale(state, len(X))
+        if info['reason'] is None:
+            info['drift'] = _drift(pca_cost(X, state['components'], state['mean']), state['cost'])
+            if abs(info['drift']) <= threshold:
+                _keep(path, state, info)
+                return state['components'], state['mean'], info
+            info['reason'] = 'drift'
+    components, mean = fit(X)
+    components, mean = np.asarray(components, np.float32), np.asarray(mean, np.float32)
+    _store(path, components=components, mean=mean, cost=np.float64(pca_cost(X, components, mean)),
+           rows=np.int64(len(X)), runs=np.int64(0))
+    info.update(fitRows=len(X), runs=0)
+    return components, mean, info
+
+
+def full_rebuild_gap(X, model, fresh):
+    """How much worse a kept model fits X than a fresh fit: cost(model) / cost(fresh) - 1.
+
+    Both are centres (an array) or both (components, mean) pairs.
+    """
+    if isinstance(model, tuple):
+        return _drift(pca_cost(X, *model), pca_cost(X, *fresh))
+    return _drift(kmeans_cost(X, model)[0], kmeans_cost(X, fresh)[0])
@@ -11,15 +11,25 @@ text=text. Owned videos keep their detection/concepts (attached from the old fil
 the hook-detail panel; library videos have none (views degrade gracefully). Per-second
 is collapsed (library has no per-second) — N.second mirrors the hook so the toggle works.
 
+Incremental by default: kNN lists, KMeans centres and PCA bases carry over from the
+previous corpus revision (novelty_state), so a nightly run only queries the new rows
+and refits a model once its cost on the grown corpus has drifted past the threshold,
+the corpus has outgrown its fit, or it has been reused for novelty_state.REFIT_EVERY runs.
+
 Run: python3 principles_novelty.py   (writes the served novelty.json + backs up the old)
+     --full    ignore the carried state and rebuild every list and model
+     --verify  also check the kNN lists against a full rebuild and report how far the
+               kept models are from fresh fits
 """
-import os, io, json, datetime
+import os, sys, json, datetime
 import numpy as np, boto3
-from sklearn.neighbors import NearestNeighbors
 from sklearn.cluster import MiniBatchKMeans
 from sklearn.decomposition import PCA
 from scipy.stats import rankdata
 
+import corpus_snapshot
+import novelty_state
+
 HERE = os.path.dirname(os.path.abspath(__file__))
 OUT = os.path.join(HERE, 'buildings/jarvis/retention-study/principles/novelty.json')
 def env(k):
@@ -34,26 +44,18 @@ def r2_get(k):
     try: return s3.get_object(Bucket=BUCKET, Key=k)['Body'].read()
     except Exception: return None
 def norm(X): return X / (np.linalg.norm(X, axis=1, keepdims=True) + 1e-9)
+INCREMENTAL = '--full' not in sys.argv; VERIFY = '--verify' in sys.argv
 def pct(a): a = np.asarray(a, float); r = np.full(len(a), 0.5); m = np.isfinite(a); r[m] = (rankdata(a[m]) - 1) / max(1, m.sum() - 1); return r
 
 print('loading corpus embeddings…', flush=True)
-ch = {}
-for sk, ck in [('vis', 'visual'), ('txt', 'text'), ('tog', 'together')]:
-    z = np.load(io.BytesIO(r2_get(f'raw/{ck}/embeddings.npz')), allow_pickle=True)
-    ch[sk] = {'ids': [str(x) for x in z['ids']], 'V': norm(np.asarray(z['vecs'], np.float32))}
-    if sk == 'vis':
-        META = {'views': np.asarray(z['views'], float), 'subs': np.asarray(z['subs'], float),
-                'title': [str(t) for t in z['title']], 'mine': np.asarray(z['mine'], bool) if 'mine' in z.files else np.zeros(len(z['ids']), bool)}
-ids = ch['vis']['ids']; N = len(ids); idpos = {v: i for i, v in enumerate(ids)}
-def align(sk):
-    M = np.full((N, ch[sk]['V'].shape[1]), np.nan, np.float32); have = np.zeros(N, bool)
-    for j, vid in enumerate(ch[sk]['ids']):
-        i = idpos.get(vid)
-        if i is not None: M[i] = ch[sk]['V'][j]; have[i] = True
-    return M, have
-VIS = (ch['vis']['V'], np.ones(N, bool)); TXT = align('txt'); TOG = align('tog')
-# modality → (embeddings, valid-mask)
+ch = {sk: corpus_snapshot.open_channel(s3, BUCKET, ck) for sk, ck in [('vis', 'visual'), ('txt', 'text'), ('tog', 'together')]}
+META = {'views': np.asarray(ch['vis'].column('views'), float), 'subs': np.asarray(ch['vis'].column('subs'), float),
+        'title': ch['vis'].column('title').tolist(), 'mine': np.asarray(ch['vis'].column('mine'), bool)}
+ids = ch['vis'].ids.tolist(); N = len(ids); idpos = ch['vis'].positions()
+VIS = (ch['vis'].vecs, np.ones(N, bool)); TXT = corpus_snapshot.aligned(ch['txt'], ch['vis']); TOG = corpus_snapshot.aligned(ch['tog'], ch['vis'])
+# modality → (embeddings, valid-mask); SPACE names the channel so concept/text share one pass and one state
 MODE = {'whole': TOG, 'concept': TXT, 'visual': VIS, 'text': TXT}
+SPACE = {'whole': 'tog', 'concept': 'txt', 'visual': 'vis', 'text': 'txt'}
 print(f'corpus N={N}; text-covered={int(TXT[1].sum())}', flush=True)
 
 # metadata: age + month (temporal) from library db
@@ -64,38 +66,56 @@ for v in db.get('videos', {}).values():
     if i is not None and len(ud) == 8 and ud.isdigit():
         d = datetime.date(int(ud[:4]), int(ud[4:6]), int(ud[6:8])); age[i] = max(1, (today - d).days); month[i] = int(ud[:4]) * 12 + int(ud[4:6])
 
-def proj2d(Xn, valid):
+def pca_fit(n):
+    def fit(X): p = PCA(n, random_state=0).fit(X); return p.components_, p.mean_
+    return fit
+def kmeans_fit(K):
+    return lambda X: MiniBatchKMeans(K, random_state=0, n_init=3, batch_size=1024).fit(X).cluster_centers_
+REPORT = {}   # state name → refit/drift (+ full-rebuild gap with --verify)
+def kept_model(name, X, n, kind):
+    fit = kmeans_fit(n) if kind == 'kmeans' else pca_fit(n)
+    gated = novelty_state.kmeans_centers if kind == 'kmeans' else novelty_state.pca_basis
+    a, b, info = gated(name, X, n, fit, incremental=INCREMENTAL)
+    if VERIFY and not info['refit']:
+        info['rebuildGap'] = novelty_state.full_rebuild_gap(X, a if kind == 'kmeans' else (a, b), fit(X))
+    REPORT[name] = info
+    return a, b
+
+def proj2d(Xn, valid, space):
     P = np.zeros((N, 2))                              # missing (silent) → origin, never NaN
     idx = np.where(valid)[0]
     if len(idx) > 10:
-        p = PCA(2, random_state=0).fit_transform(Xn[idx])
+        comp, mean = kept_model(f'{space}-pca2', Xn[idx], 2, 'pca')
+        p = (Xn[idx] - mean) @ comp.T
         p = p / (np.abs(p).max(0) + 1e-9)            # → ~[-1,1]
         P[idx] = np.nan_to_num(p)
     return P
 
-def geom(Xn, valid):
+def geom(Xn, valid, space):
     """global nov (mean kNN cos-dist) + niche (kmeans label + dist to centre)."""
     nov = np.full(N, np.nan); lab = np.zeros(N, int); dc = np.full(N, np.nan)
     idx = np.where(valid)[0]
     if len(idx) < 50: return nov, lab, dc
-    Xv = Xn[idx]; k = min(9, len(idx))
-    nn = NearestNeighbors(n_neighbors=k, metric='cosine').fit(Xv); dist, _ = nn.kneighbors(Xv)
-    nov[idx] = dist[:, 1:].mean(1)
-    K = 8
-    km = MiniBatchKMeans(K, random_state=0, n_init=3, batch_size=1024).fit(Xv); cen = norm(km.cluster_centers_)
-    lab[idx] = km.labels_; dc[idx] = 1 - np.einsum('ij,ij->i', Xv, cen[km.labels_])
+    Xv = np.asarray(Xn[idx], np.float32)
+    sims, _, stats = novelty_state.neighbor_lists(f'{space}-knn9', np.asarray(ids)[idx], Xv, 9, incremental=INCREMENTAL)
+    print(f'  kNN {space}: {stats}', flush=True)
+    if VERIFY: print(f'  kNN {space} vs full rebuild: max gap {novelty_state.verify_neighbors(Xv, sims):.1e}', flush=True)
+    nov[idx] = 1 - sims[:, 1:].mean(1)
+    cen, labels = kept_model(f'{space}-kmeans8', Xv, 8, 'kmeans'); cen = norm(cen)
+    lab[idx] = labels; dc[idx] = 1 - np.einsum('ij,ij->i', Xv, cen[labels])
     return nov, lab, dc
 
-hook = {'global': {}, 'niche': {}, 'proj': {}}
+hook = {'global': {}, 'niche': {}, 'proj': {}}; GEOM = {}
 for mk, (M, valid) in MODE.items():
     print(f'modality {mk}…', flush=True)
-    Xn = np.nan_to_num(M)
-    nov, lab, dc = geom(Xn, valid)
+    Xn = np.nan_to_num(M); space = SPACE[mk]
+    if space not in GEOM: GEOM[space] = geom(Xn, valid, space), proj2d(Xn, valid, space)
+    (nov, lab, dc), P = GEOM[space]
     # neutral-fill missing (silent videos for text/concept) so views never break
     novf = np.where(np.isfinite(nov), nov, np.nanmedian(nov[valid]) if valid.any() else 0)
     hook['global'][mk] = {'nov': [round(float(x), 4) for x in novf], 'pct': [round(float(x), 4) for x in pct(np.where(valid, nov, np.nan))]}
     hook['niche'][mk] = {'labels': [int(x) for x in lab], 'k': 8, 'dist_to_centre': [round(float(x), 4) if x == x else 0.0 for x in dc]}
-    P = proj2d(Xn, valid); hook['proj'][mk] = [[round(float(x), 4), round(float(y), 4)] for x, y in P]
+    hook['proj'][mk] = [[round(float(x), 4), round(float(y), 4)] for x, y in P]
 
 # temporal: dist to earlier-month centroid (together space)
 tn = np.full(N, np.nan); Tg = np.nan_to_num(TOG[0])
@@ -115,15 +135,17 @@ hook['scene'] = {'spread': hook['niche']['whole']['dist_to_centre']}
 # combo: clusters on together + rarity (= together combinatorial via PCA residual)
 print('combo…', flush=True)
 Tv = Tg[TOG[1]]; tidx = np.where(TOG[1])[0]
-kmC = MiniBatchKMeans(12, random_state=0, n_init=3, batch_size=1024).fit(Tv)
-labC = np.zeros(N, int); labC[tidx] = kmC.labels_
-cen2 = PCA(2, random_state=0).fit(Tv).transform(kmC.cluster_centers_); cen2 = cen2 / (np.abs(cen2).max(0) + 1e-9)
-freq = np.bincount(kmC.labels_, minlength=12)
+cenC, labelsC = kept_model('tog-kmeans12', Tv, 12, 'kmeans')
+labC = np.zeros(N, int); labC[tidx] = labelsC
+comp2, mean2 = kept_model('tog-pca2', Tv, 2, 'pca')
+cen2 = (cenC - mean2) @ comp2.T; cen2 = cen2 / (np.abs(cen2).max(0) + 1e-9)
+freq = np.bincount(labelsC, minlength=12)
 clusters = [{'id': i, 'label': f'cluster {i}', 'freq': int(freq[i]), 'pos': [round(float(cen2[i][0]), 4), round(float(cen2[i][1]), 4)]} for i in range(12)]
-npc = min(50, Tv.shape[1]); pcaT = PCA(npc, random_state=0).fit(Tv)
-res = np.linalg.norm(Tv - pcaT.inverse_transform(pcaT.transform(Tv)), axis=1) / (np.linalg.norm(Tv, axis=1) + 1e-9)
+npc = min(50, Tv.shape[1]); compT, meanT = kept_model('tog-pca50', Tv, npc, 'pca')
+res = np.linalg.norm(Tv - (((Tv - meanT) @ compT.T) @ compT + meanT), axis=1) / (np.linalg.norm(Tv, axis=1) + 1e-9)
 rar = np.full(N, np.nan); rar[tidx] = res
 combo = {'clusters': clusters, 'edges': [], 'rarity': [None if x != x else round(float(x), 4) for x in rar], 'k_clusters': 12}
+print('models:', {name: {k: round(v, 4) if isinstance(v, float) else v for k, v in info.items()} for name, info in REPORT.items()}, flush=True)
 
 # videos (+ attach owned detail from old file)
 owned_detail = {}
@@ -5,13 +5,18 @@ RAW hook embeddings — THREE channels, all from the FIRST 5 SECONDS of each lib
   text      = Whisper transcript of the first 5s → Gemini text embed (if any speech)
   together  = montage + transcript embedded as ONE multimodal content
 One dot = one video's hook. No labels. Saves the montage (raw/montage/<id>.jpg) + transcript so
-each point's RAW INPUT is inspectable. Per channel: raw/<chan>/embeddings.npz + raw/<chan>/map.json
+each point's RAW INPUT is inspectable. Per channel: raw/<chan>/segments/ (append-only shard archive,
+see embedding_archive.py) + raw/<chan>/embeddings.npz (at run start/end and every RAW_LEGACY_NPZ_EVERY
+seconds of checkpoints, for the scripts that still read it) + raw/<chan>/map.json
 (projections + HELD-OUT scores: fit on 70%, measured on the 30% it never saw). Resumable per channel.
 Usage: RAW_MAX=5000 python3 raw_embed.py
 """
 import os, sys, json, base64, subprocess, tempfile, shutil, time, io, threading, re
 import numpy as np, boto3, urllib.request, urllib.error
 from concurrent.futures import ThreadPoolExecutor
+import embedding_archive
+import embedding_gateway
+from media_extract import extract_opening
 from sklearn.cluster import MiniBatchKMeans
 from sklearn.linear_model import LogisticRegression, Ridge
 from sklearn.metrics import roc_auc_score
@@ -40,6 +45,8 @@ def coherent(txt):
     return real >= 2 and real / len(toks) >= 0.5
 
 HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(HERE, 'buildings', 'jarvis', 'promise-lab'))
+import embedding_store
 def env(k):
     v = os.environ.get(k)
     if v: return v
@@ -61,8 +68,16 @@ MAP_EVERY = max(0, int(os.environ.get('RAW_MAP_EVERY', '0')))
 STATUS_EVERY = max(10, int(os.environ.get('RAW_STATUS_EVERY', '50')))
 STREAM_R2 = os.environ.get('RAW_STREAM_R2', '1') != '0'
 CREDIT_RETRY_SECONDS = max(15, int(os.environ.get('RAW_CREDIT_RETRY_SECONDS', '60')))
-EMB_URL = 'https://generativelanguage.googleapis.com/v1beta/models/gemini-embedding-2:embedContent'
 CHANS = ['visual', 'text', 'together']
+# Checkpoints append shards to raw/<chan>/segments/ (embedding_archive). The legacy
+# whole-channel embeddings.npz (read by add_steered_proj, run_predictor_lab, indicators,
+# novelty, build_principles) is a full rewrite, so it is refreshed at most every
+# LEGACY_NPZ_EVERY seconds of checkpoints; the first checkpoint of a run always refreshes it,
+# which also brings it up to date after a crashed run that never reached its end.
+LEGACY_NPZ_EVERY = max(0, int(os.environ.get('RAW_LEGACY_NPZ_EVERY', '900')))
+ARCHIVE_DTYPE = os.environ.get('RAW_ARCHIVE_DTYPE', 'float32')
+ARCHIVE_COLUMNS = {'ids': str, 'views': np.float64, 'outlier': np.float64, 'subs': np.float64,
+                   'title': str, 'txt': str, 'mine': bool, 'silent': bool}
 
 def run_steering():
     """Publish the account projections and compact score-card artifacts after every map rebuild."""
@@ -104,6 +119,7 @@ def r2_get(key):
     try: return s3.get_object(Bucket=BUCKET, Key=key)['Body'].read()
     except Exception: return None
 def r2_put(key, data, ct): s3.put_object(Bucket=BUCKET, Key=key, Body=data, ContentType=ct)
+def r2_delete(key): s3.delete_object(Bucket=BUCKET, Key=key)
 _status_lock = threading.Lock()
 _status_payload = {}
 def emit_status(stage, **extra):
@@ -191,13 +207,21 @@ def record_provider_success():
 
 
 def embed(parts, tries=6):
-    body = json.dumps({'content': {'parts': parts}, 'outputDimensionality': DIM}).encode()
+    # Content-addressed, so a restarted build or a re-embedded video reads its vector from disk.
+    # Keyed by the exact ffmpeg montage bytes this producer has always embedded (no canonical
+    # re-encode), so every row in a raw/<chan> archive keeps one input contract. It shares a
+    # vector with raw_upload only when both sent byte-identical montages.
+    cache = embedding_store.shared_cache()
+    cached = cache.get_many([parts])[0]
+    if cached is not None:
+        return cached
     attempt = 0
     while attempt < tries:
         try:
-            req = urllib.request.Request(EMB_URL, data=body, method='POST', headers={'Content-Type': 'application/json', 'x-goog-api-key': KEY})
-            with urllib.request.urlopen(req, timeout=60) as r:
-                vector = np.array(json.loads(r.read())['embedding']['values'], np.float32)
+            # One gateway try per attempt: this loop owns the retry/hold policy,
+            # the gateway coalesces concurrent workers into batch calls.
+            vector = embedding_gateway.embed(parts, KEY, DIM, tries=1, timeout=60)
+            cache.put_many([parts], [vector])
             record_provider_success()
             return vector
         except Exception as exc:
@@ -251,29 +275,20 @@ def hook_inputs(vid, src='lib'):
                         Params={'Bucket': BUCKET, 'Key': f'library/videos/{vid}.mp4'},
                         ExpiresIn=600,
                     )
-                    subprocess.run(['ffmpeg', '-nostdin', '-loglevel', 'error', '-i', signed, '-t', '5',
-                                    '-vf', 'fps=1,scale=320:-1,tile=5x1', '-frames:v', '1', mon], timeout=60)
-                    if os.path.exists(mon):
-                        streamed = True
-                        try:
-                            subprocess.run(['ffmpeg', '-nostdin', '-loglevel', 'error', '-i', signed, '-t', '5',
-                                            '-vn', '-ar', '16000', '-ac', '1', wav], timeout=60)
-                        except Exception:
-                            pass
+                    # montage + 16 kHz audio in one decode of the stream (media_extract)
+                    streamed = extract_opening(signed, tmp, trim='output', timeout=60)[0] is not None
                 except Exception:
                     streamed = False
             if not streamed:
                 s3.download_file(BUCKET, f'library/videos/{vid}.mp4', mp4)
         if src == 'owned' or not STREAM_R2 or not os.path.exists(mon):
-            subprocess.run(['ffmpeg', '-nostdin', '-loglevel', 'error', '-t', '5', '-i', mp4, '-vf', 'fps=1,scale=320:-1,tile=5x1', '-frames:v', '1', mon], timeout=40)
+            extract_opening(mp4, tmp, timeout=40)
         if not os.path.exists(mon): return None
         montage = open(mon, 'rb').read()
         r2_put(f'raw/montage/{vid}.jpg', montage, 'image/jpeg')
         b64 = base64.b64encode(montage).decode()
         txt, good = '', False
         try:
-            if not os.path.exists(wav) and os.path.exists(mp4):
-                subprocess.run(['ffmpeg', '-nostdin', '-loglevel', 'error', '-t', '5', '-i', mp4, '-vn', '-ar', '16000', '-ac', '1', wav], timeout=40)
             if os.path.exists(wav): txt, good = whisper_text(wav)
         except Exception: pass
         return b64, txt, good
@@ -335,17 +350,26 @@ print(f"owned: {len(OWNED)} across {len(_ch)} accounts · total to consider: {le
 
 # ---- per-channel stores (migrate old raw/embeddings.npz → visual) ----
 store = {c: {'ids': [], 'vecs': [], 'views': [], 'outlier': [], 'subs': [], 'title': [], 'txt': [], 'mine': [], 'silent': []} for c in CHANS}
+archived = {c: None for c in CHANS}   # last manifest saved per channel
+rewrite = set()                         # channels whose saved rows were edited since
+legacy_written = {c: 0.0 for c in CHANS}  # when each channel's embeddings.npz was last rewritten
 def load_chan(c):
-    buf = r2_get(f'raw/{c}/embeddings.npz') or (r2_get('raw/embeddings.npz') if c == 'visual' else None)
-    if not buf: return
-    z = np.load(io.BytesIO(buf), allow_pickle=True)
+    manifest = embedding_archive.load_manifest(r2_get, f'raw/{c}/segments')
+    if manifest:
+        z = embedding_archive.read(manifest, r2_get)
+        archived[c] = manifest
+    else:
+        buf = r2_get(f'raw/{c}/embeddings.npz') or (r2_get('raw/embeddings.npz') if c == 'visual' else None)
+        if not buf: return
+        z = dict(np.load(io.BytesIO(buf), allow_pickle=True))
     s = store[c]; s['ids'] = list(z['ids']); s['vecs'] = list(z['vecs'])
     for k in ['views', 'outlier', 'subs', 'title']: s[k] = list(z[k])
     n = len(s['ids'])
-    s['txt'] = list(z['txt']) if 'txt' in z.files else [''] * n
-    base_mine = [bool(x) for x in z['mine']] if 'mine' in z.files else [False] * n
+    s['txt'] = list(z['txt']) if 'txt' in z else [''] * n
+    base_mine = [bool(x) for x in z['mine']] if 'mine' in z else [False] * n
     s['mine'] = [base_mine[i] or (s['ids'][i] in mineids) for i in range(n)]   # an owned id is always mine, even if it was first seen as a library video
-    s['silent'] = [bool(x) for x in z['silent']] if 'silent' in z.files else [not coherent(t) for t in s['txt']]
+    s['silent'] = [bool(x) for x in z['silent']] if 'silent' in z else [not coherent(t) for t in s['txt']]
+    if s['mine'] != base_mine or 'silent' not in z: rewrite.add(c)
 for c in CHANS: load_chan(c)
 done = {c: set(store[c]['ids']) for c in CHANS}
 print({c: len(done[c]) for c in CHANS}, flush=True)
@@ -381,6 +405,8 @@ def migrate_clean():
     if len(keep) != len(s['ids']):
         for k in list(s.keys()): s[k] = [s[k][i] for i in keep]
         print(f"text: pruned {len(keep)} coherent voiceovers (dropped junk)", flush=True)
+        rewrite.add('text')
+    if any(s['silent']): rewrite.add('text')
     s['silent'] = [False] * len(s['ids'])
     # VISUAL + TOGETHER keep every video, but flag the silent ones. A video HAS a
     # voiceover iff it produced a text embedding — derive silence from text-channel
@@ -388,7 +414,9 @@ def migrate_clean():
     # (the earliest-migrated visual rows have no txt and would falsely read silent).
     voiced = set(store['text']['ids'])
     for c in ['visual', 'together']:
-        store[c]['silent'] = [vid not in voiced for vid in store[c]['ids']]
+        silent = [vid not in voiced for vid in store[c]['ids']]
+        if silent != [bool(x) for x in store[c]['silent']]: rewrite.add(c)
+        store[c]['silent'] = silent
     # TOGETHER: any hook that fused HALLUCINATED text → re-embed image-only (cheap:
     # the montage is already on R2, so no re-download), so junk text can't confound it.
     st = store['together']
@@ -397,7 +425,7 @@ def migrate_clean():
         print(f"together: re-embedding {len(bad)} hooks image-only (had hallucinated text)…", flush=True)
         with ThreadPoolExecutor(WORKERS) as ex:
             for i, e in ex.map(_reembed_imgonly, [('together', i) for i in bad]):
-                if e is not None: st['vecs'][i] = e; st['txt'][i] = ''; st['silent'][i] = True
+                if e is not None: st['vecs'][i] = e; st['txt'][i] = ''; st['silent'][i] = True; rewrite.add('together')
         print("together: image-only re-embed done", flush=True)
     for c in CHANS: done[c] = set(store[c]['ids'])
 
@@ -492,25 +520,35 @@ def build_map(c):
         print(f'map[{c}] skipped:', str(e)[:120], flush=True)
 
 
-def save_npz(c):
+def save_npz(c, legacy=False):
     s = store[c]
     if not s['ids']: return
-    bio = io.BytesIO()
     n = len(s['ids'])
     mine = (s.get('mine') or [False] * n)[:n] + [False] * max(0, n - len(s.get('mine') or []))
     silent = (s.get('silent') or [False] * n)[:n] + [False] * max(0, n - len(s.get('silent') or []))
+    # Only rows embedded since the last checkpoint are uploaded (the lists are sliced, not copied).
+    archived[c] = embedding_archive.save(
+        f'raw/{c}/segments',
+        {'ids': s['ids'], 'vecs': s['vecs'], 'views': s['views'], 'outlier': s['outlier'], 'subs': s['subs'],
+         'title': s['title'], 'txt': s['txt'], 'mine': mine, 'silent': silent},
+        r2_put, previous=archived[c], dtype=ARCHIVE_DTYPE, rewrite=c in rewrite, column_dtypes=ARCHIVE_COLUMNS,
+        delete=r2_delete)
+    rewrite.discard(c)
+    if not legacy: return
+    bio = io.BytesIO()
     np.savez_compressed(bio, ids=np.array(s['ids'], object), vecs=np.array(s['vecs'], np.float32),
                         views=np.array(s['views'], np.float64), outlier=np.array(s['outlier'], np.float64),
                         subs=np.array(s['subs'], np.float64), title=np.array(s['title'], object), txt=np.array(s['txt'], object),
                         mine=np.array(mine, bool), silent=np.array(silent, bool))
     r2_put(f'raw/{c}/embeddings.npz', bio.getvalue(), 'application/octet-stream')
+    legacy_written[c] = time.time()
 
 
 migrate_clean()                # apply the no-voiceover gate to already-embedded data
 if not BACKFILL_MODE:
     # Persist cleaned embeddings immediately, but keep the last validated live maps
     # available until this run has produced complete staged replacements.
-    for c in CHANS: save_npz(c)
+    for c in CHANS: save_npz(c, legacy=True)
 
 
 def work(v):
@@ -563,7 +601,7 @@ def work(v):
                         ratePerMinute=round(rate * 60, 2), etaSeconds=round(unresolved / rate) if rate > 0 else None,
                         message=f'Attempted {cnt[0]:,}; stored {completed[0]:,}; {unresolved:,} unresolved')
         if cnt[0] % CHECKPOINT_EVERY == 0:
-            for c in CHANS: save_npz(c)
+            for c in CHANS: save_npz(c, legacy=time.time() - legacy_written[c] >= LEGACY_NPZ_EVERY)
             if MAP_EVERY and cnt[0] % MAP_EVERY == 0:
                 for c in CHANS: build_map(c)
 
@@ -571,7 +609,7 @@ def work(v):
 with ThreadPoolExecutor(WORKERS) as ex:
     list(ex.map(work, todo))
 for c in CHANS:
-    save_npz(c)
+    save_npz(c, legacy=True)
 remaining = [v for v in stored if needs(v)]
 if remaining:
     emit_status('retrying', discovered=len(stored), eligible=len(stored), queued=len(remaining),
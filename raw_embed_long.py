@@ -19,6 +19,8 @@ from sklearn.cross_decomposition import PLSRegression
 from sklearn.discriminant_analysis import LinearDiscriminantAnalysis as LDA
 from sklearn.cluster import MiniBatchKMeans
 HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(HERE, 'buildings', 'jarvis', 'promise-lab'))
+import embedding_gateway, embedding_store
 def env(k):
     v = os.environ.get(k)
     if v: return v
@@ -35,7 +37,6 @@ def r2_put(k, d, ct): s3.put_object(Bucket=BUCKET, Key=k, Body=d, ContentType=ct
 
 DIM = 1536
 KEY = env('GEMINI_API_KEY')
-EMB_URL = 'https://generativelanguage.googleapis.com/v1beta/models/gemini-embedding-2:embedContent'
 CHANS = ['visual', 'text', 'together']
 SAVE_EVERY = int(os.environ.get('RAW_LONG_SAVE_EVERY', '100'))
 LIMIT = int(os.environ.get('RAW_LONG_LIMIT', '0'))
@@ -52,17 +53,17 @@ def run_steering():
         raise
 
 def embed(parts):
-    for attempt in range(6):
-        try:
-            r = requests.post(EMB_URL, headers={'x-goog-api-key': KEY, 'Content-Type': 'application/json'},
-                              json={'content': {'parts': parts}, 'outputDimensionality': DIM}, timeout=60)
-            if r.status_code == 200:
-                return np.asarray(r.json()['embedding']['values'], np.float32)
-            if r.status_code in (429, 500, 503): time.sleep(2 * (attempt + 1)); continue
-            print('  embed HTTP', r.status_code, r.text[:120], flush=True); return None
-        except Exception as e:
-            time.sleep(2 * (attempt + 1))
-    return None
+    cache = embedding_store.shared_cache()
+    cached = cache.get_many([parts])[0]
+    if cached is not None:
+        return cached
+    try:
+        vector = embedding_gateway.embed(parts, KEY, DIM, tries=6, timeout=60)
+    except embedding_gateway.EmbeddingGatewayError as e:
+        if not e.retryable: print('  embed', str(e)[:140], flush=True)
+        return None
+    cache.put_many([parts], [vector])
+    return vector
 def img_part(b64): return {'inlineData': {'mimeType': 'image/jpeg', 'data': b64}}
 
 def get_thumb(vid):
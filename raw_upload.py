@@ -12,9 +12,12 @@ to — consistent across all three channels/projections).
 
 Identical montage/whisper/embed to raw_embed.py so the upload's vectors are comparable.
 """
-import os, sys, json, base64, subprocess, tempfile, shutil, io, time, re, hashlib, unicodedata
+import os, sys, json, base64, subprocess, tempfile, shutil, io, time, re, hashlib, threading, unicodedata
 import numpy as np, boto3, urllib.request, urllib.error
 from PIL import Image, __version__ as PILLOW_VERSION
+import embedding_archive
+import embedding_gateway
+import neighbor_index
 from creator_adaptive_keep import (
     load_serving_state,
     score_creator_adaptive_keep,
@@ -28,6 +31,15 @@ from shorts_score_ledger import (
 )
 
 HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(HERE, 'buildings', 'jarvis', 'promise-lab'))
+import embedding_store
+from media_extract import (
+    CANONICAL_MONTAGE_HEIGHT,
+    CANONICAL_MONTAGE_QUALITY,
+    CANONICAL_MONTAGE_WIDTH,
+    canonicalize_montage_bytes,
+    extract_opening,
+)
 DISPLAY_CONTRACT_PATH = os.path.join(
     HERE,
     'buildings',
@@ -72,7 +84,9 @@ s3 = boto3.client('s3', endpoint_url=f"https://{env('R2_ACCOUNT_ID')}.r2.cloudfl
                   aws_access_key_id=env('R2_ACCESS_KEY_ID'), aws_secret_access_key=env('R2_SECRET_ACCESS_KEY'), region_name='auto')
 DIM = 1536
 EMBEDDING_MODEL = 'gemini-embedding-2'
+EMBED_DEADLINE_S = 90
 TRANSCRIPTION_MODEL = env('RAW_TRANSCRIPTION_MODEL') or 'gemini-2.5-flash'
+# Provenance only: vectors are identical through embedContent and the gateway's batch endpoint.
 EMB_URL = f'https://generativelanguage.googleapis.com/v1beta/models/{EMBEDDING_MODEL}:embedContent'
 SCORE_CACHE_VERSION = 3
 DISPLAY_CONTRACT_VERSION = _load_display_contract_version()
@@ -114,9 +128,6 @@ CREATOR_ADAPTIVE_KEEP_SERVING_MANIFEST_KEY = (
 CREATOR_ADAPTIVE_KEEP_COORDINATE_ID = (
     COORDINATE_GOVERNANCE['coordinates']['creatorAdaptiveKeepForecast']['id']
 )
-CANONICAL_MONTAGE_WIDTH = 1600
-CANONICAL_MONTAGE_HEIGHT = 568
-CANONICAL_MONTAGE_QUALITY = 90
 SCORE_REVISION_KEYS = (
     'raw/steer_models.npz',
     'raw/indicators/weights.npz',
@@ -125,6 +136,9 @@ SCORE_REVISION_KEYS = (
     'raw/visual/embeddings.npz',
     'raw/text/embeddings.npz',
     'raw/together/embeddings.npz',
+    'raw/visual/segments/manifest.json',
+    'raw/text/segments/manifest.json',
+    'raw/together/segments/manifest.json',
 )
 
 class ScoreArtifactIntegrityError(RuntimeError):
@@ -140,6 +154,9 @@ def r2_get(key):
         '_PINNED_ARTIFACT_REVISIONS',
         {},
     ).get(key)
+    resident = _resident_payload(key, expected)
+    if resident is not None:
+        return resident
     request = {'Bucket': BUCKET, 'Key': key}
     if expected:
         state = expected.get('state')
@@ -204,6 +221,7 @@ def r2_get(key):
             raise ScoreArtifactIntegrityError(
                 f'pinned artifact content hash changed: {key}'
             )
+        _keep_resident(key, expected, payload)
     return payload
 
 
@@ -243,6 +261,10 @@ def _indicator_registry_snapshot():
             'error': f'{type(error).__name__}: {str(error)[:200]}',
         }
 
+# The --serve daemon scores on several threads: each lazily loaded model cache below (and
+# the resident payload/embedding caches) is filled under this lock, so two requests never
+# load the same artifact twice or see a half-built entry.
+_RESIDENT_LOCK = threading.RLock()
 _VISUAL_KEEP_MODEL_CACHE = None
 _CREATOR_ADAPTIVE_KEEP_STATE_CACHE = None
 _CHANNEL_FREE_MODEL_CACHE = None
@@ -334,53 +356,54 @@ def _visual_keep_forecast_from_payload(
 
 def visual_keep_forecast(embedding):
     global _VISUAL_KEEP_MODEL_CACHE
-    if _VISUAL_KEEP_MODEL_CACHE is None:
-        manifest_bytes = r2_get(VISUAL_KEEP_MODEL_MANIFEST_KEY)
-        if not manifest_bytes:
-            raise RuntimeError('visual keep predictor release manifest is unavailable')
-        try:
-            manifest = json.loads(manifest_bytes)
-        except Exception as error:
-            raise RuntimeError('visual keep predictor release manifest is not valid JSON') from error
-        artifact_sha256 = str(manifest.get('artifactSha256') or '').lower()
-        artifact_key = str(manifest.get('archiveKey') or '')
-        expected_archive_key = (
-            'raw/predictor-lab/visual-keep-model/by-sha256/'
-            f'{artifact_sha256}.json'
-        )
-        if (
-            manifest.get('coordinateId') != VISUAL_KEEP_COORDINATE_ID
-            or manifest.get('canonicalKey') != VISUAL_KEEP_MODEL_KEY
-            or not _exact_sha256(artifact_sha256)
-            or artifact_key != expected_archive_key
-            or not _exact_sha256(manifest.get('producerSourceSha256'))
-            or not _exact_sha256(manifest.get('featureContractSha256'))
-        ):
-            raise RuntimeError('visual keep predictor release manifest failed integrity validation')
-        payload_bytes = r2_get(artifact_key)
-        if not payload_bytes:
-            raise RuntimeError('visual keep predictor immutable artifact is unavailable')
-        actual_sha256 = hashlib.sha256(payload_bytes).hexdigest()
-        if actual_sha256 != artifact_sha256:
-            raise RuntimeError('visual keep predictor immutable artifact hash does not match its manifest')
-        try:
-            payload = json.loads(payload_bytes)
-        except Exception as error:
-            raise RuntimeError('visual keep predictor artifact is not valid JSON') from error
-        if (
-            payload.get('coordinateId') != VISUAL_KEEP_COORDINATE_ID
-            or payload.get('producerSourceSha256') != manifest.get('producerSourceSha256')
-            or payload.get('featureContractVersion') != manifest.get('featureContractVersion')
-            or payload.get('featureContractSha256') != manifest.get('featureContractSha256')
-        ):
-            raise RuntimeError('visual keep predictor artifact provenance does not match its release manifest')
-        _VISUAL_KEEP_MODEL_CACHE = {
-            'payload': payload,
-            'artifact_sha256': artifact_sha256,
-            'artifact_key': artifact_key,
-            'manifest_sha256': hashlib.sha256(manifest_bytes).hexdigest(),
-        }
-    cached = _VISUAL_KEEP_MODEL_CACHE
+    with _RESIDENT_LOCK:
+        if _VISUAL_KEEP_MODEL_CACHE is None:
+            manifest_bytes = r2_get(VISUAL_KEEP_MODEL_MANIFEST_KEY)
+            if not manifest_bytes:
+                raise RuntimeError('visual keep predictor release manifest is unavailable')
+            try:
+                manifest = json.loads(manifest_bytes)
+            except Exception as error:
+                raise RuntimeError('visual keep predictor release manifest is not valid JSON') from error
+            artifact_sha256 = str(manifest.get('artifactSha256') or '').lower()
+            artifact_key = str(manifest.get('archiveKey') or '')
+            expected_archive_key = (
+                'raw/predictor-lab/visual-keep-model/by-sha256/'
+                f'{artifact_sha256}.json'
+            )
+            if (
+                manifest.get('coordinateId') != VISUAL_KEEP_COORDINATE_ID
+                or manifest.get('canonicalKey') != VISUAL_KEEP_MODEL_KEY
+                or not _exact_sha256(artifact_sha256)
+                or artifact_key != expected_archive_key
+                or not _exact_sha256(manifest.get('producerSourceSha256'))
+                or not _exact_sha256(manifest.get('featureContractSha256'))
+            ):
+                raise RuntimeError('visual keep predictor release manifest failed integrity validation')
+            payload_bytes = r2_get(artifact_key)
+            if not payload_bytes:
+                raise RuntimeError('visual keep predictor immutable artifact is unavailable')
+            actual_sha256 = hashlib.sha256(payload_bytes).hexdigest()
+            if actual_sha256 != artifact_sha256:
+                raise RuntimeError('visual keep predictor immutable artifact hash does not match its manifest')
+            try:
+                payload = json.loads(payload_bytes)
+            except Exception as error:
+                raise RuntimeError('visual keep predictor artifact is not valid JSON') from error
+            if (
+                payload.get('coordinateId') != VISUAL_KEEP_COORDINATE_ID
+                or payload.get('producerSourceSha256') != manifest.get('producerSourceSha256')
+                or payload.get('featureContractVersion') != manifest.get('featureContractVersion')
+                or payload.get('featureContractSha256') != manifest.get('featureContractSha256')
+            ):
+                raise RuntimeError('visual keep predictor artifact provenance does not match its release manifest')
+            _VISUAL_KEEP_MODEL_CACHE = {
+                'payload': payload,
+                'artifact_sha256': artifact_sha256,
+                'artifact_key': artifact_key,
+                'manifest_sha256': hashlib.sha256(manifest_bytes).hexdigest(),
+            }
+        cached = _VISUAL_KEEP_MODEL_CACHE
     return _visual_keep_forecast_from_payload(
         embedding,
         cached['payload'],
@@ -539,28 +562,30 @@ def _channel_free_keep_forecasts_from_payload(
 
 def channel_free_keep_forecasts(embeddings):
     global _CHANNEL_FREE_MODEL_CACHE
-    if _CHANNEL_FREE_MODEL_CACHE is None:
-        try:
-            payload_bytes = open(CHANNEL_FREE_MODEL_PATH, 'rb').read()
-        except OSError as error:
-            raise RuntimeError(
-                'channel-free keep model artifact is unavailable'
-            ) from error
-        artifact_sha256 = hashlib.sha256(payload_bytes).hexdigest()
-        try:
-            payload = json.loads(payload_bytes)
-        except Exception as error:
-            raise RuntimeError(
-                'channel-free keep model artifact is invalid JSON'
-            ) from error
-        _CHANNEL_FREE_MODEL_CACHE = {
-            'payload': payload,
-            'artifact_sha256': artifact_sha256,
-        }
+    with _RESIDENT_LOCK:
+        if _CHANNEL_FREE_MODEL_CACHE is None:
+            try:
+                payload_bytes = open(CHANNEL_FREE_MODEL_PATH, 'rb').read()
+            except OSError as error:
+                raise RuntimeError(
+                    'channel-free keep model artifact is unavailable'
+                ) from error
+            artifact_sha256 = hashlib.sha256(payload_bytes).hexdigest()
+            try:
+                payload = json.loads(payload_bytes)
+            except Exception as error:
+                raise RuntimeError(
+                    'channel-free keep model artifact is invalid JSON'
+                ) from error
+            _CHANNEL_FREE_MODEL_CACHE = {
+                'payload': payload,
+                'artifact_sha256': artifact_sha256,
+            }
+        cached = _CHANNEL_FREE_MODEL_CACHE
     return _channel_free_keep_forecasts_from_payload(
         embeddings,
-        _CHANNEL_FREE_MODEL_CACHE['payload'],
-        _CHANNEL_FREE_MODEL_CACHE['artifact_sha256'],
+        cached['payload'],
+        cached['artifact_sha256'],
     )
 
 def creator_adaptive_keep_forecast(visual, together, profile):
@@ -568,139 +593,140 @@ def creator_adaptive_keep_forecast(visual, together, profile):
     profile = str(profile or '').strip().lower()
     if not profile:
         return None
-    if _CREATOR_ADAPTIVE_KEEP_STATE_CACHE is None:
-        serving_manifest_bytes = r2_get(
-            CREATOR_ADAPTIVE_KEEP_SERVING_MANIFEST_KEY
-        )
-        model_manifest_bytes = r2_get(
-            CREATOR_ADAPTIVE_KEEP_MODEL_MANIFEST_KEY
-        )
-        if not serving_manifest_bytes or not model_manifest_bytes:
-            raise RuntimeError(
-                'creator-adaptive keep serving release is unavailable'
-            )
-        try:
-            serving_manifest = json.loads(serving_manifest_bytes)
-            model_manifest = json.loads(model_manifest_bytes)
-        except Exception as error:
-            raise RuntimeError(
-                'creator-adaptive keep release manifest is invalid JSON'
-            ) from error
-        artifact_sha256 = str(
-            serving_manifest.get('artifactSha256') or ''
-        ).lower()
-        artifact_key = str(serving_manifest.get('archiveKey') or '')
-        expected_key = (
-            'raw/predictor-lab/creator-adaptive-keep-serving/by-sha256/'
-            f'{artifact_sha256}.npz'
-        )
-        model_artifact_sha256 = str(
-            model_manifest.get('artifactSha256') or ''
-        ).lower()
-        model_artifact_key = str(
-            model_manifest.get('archiveKey') or ''
-        )
-        expected_model_key = (
-            'raw/predictor-lab/creator-adaptive-keep-model/by-sha256/'
-            f'{model_artifact_sha256}.json'
-        )
-        if (
-            serving_manifest.get('coordinateId')
-            != CREATOR_ADAPTIVE_KEEP_COORDINATE_ID
-            or serving_manifest.get('canonicalKey')
-            != CREATOR_ADAPTIVE_KEEP_SERVING_KEY
-            or artifact_key != expected_key
-            or not _exact_sha256(artifact_sha256)
-            or not _exact_sha256(model_artifact_sha256)
-            or serving_manifest.get('modelArtifactSha256')
-            != model_artifact_sha256
-            or model_manifest.get('coordinateId')
-            != CREATOR_ADAPTIVE_KEEP_COORDINATE_ID
-            or model_manifest.get('canonicalKey')
-            != CREATOR_ADAPTIVE_KEEP_MODEL_KEY
-            or model_artifact_key != expected_model_key
-            or not _exact_sha256(
-                model_manifest.get('producerSourceSha256')
-            )
-            or not _exact_sha256(
-                model_manifest.get('featureContractSha256')
-            )
-            or not _exact_sha256(
-                serving_manifest.get('producerSourceSha256')
+    with _RESIDENT_LOCK:
+        if _CREATOR_ADAPTIVE_KEEP_STATE_CACHE is None:
+            serving_manifest_bytes = r2_get(
+                CREATOR_ADAPTIVE_KEEP_SERVING_MANIFEST_KEY
             )
-            or not _exact_sha256(
-                serving_manifest.get('servingScorerSourceSha256')
+            model_manifest_bytes = r2_get(
+                CREATOR_ADAPTIVE_KEEP_MODEL_MANIFEST_KEY
             )
-            or serving_manifest.get('featureContractVersion')
-            != model_manifest.get('featureContractVersion')
-            or serving_manifest.get('featureContractSha256')
-            != model_manifest.get('featureContractSha256')
-        ):
-            raise RuntimeError(
-                'creator-adaptive keep serving manifest failed integrity validation'
-            )
-        artifact = r2_get(artifact_key)
-        if not artifact:
-            raise RuntimeError(
-                'creator-adaptive keep immutable serving artifact is unavailable'
+            if not serving_manifest_bytes or not model_manifest_bytes:
+                raise RuntimeError(
+                    'creator-adaptive keep serving release is unavailable'
+                )
+            try:
+                serving_manifest = json.loads(serving_manifest_bytes)
+                model_manifest = json.loads(model_manifest_bytes)
+            except Exception as error:
+                raise RuntimeError(
+                    'creator-adaptive keep release manifest is invalid JSON'
+                ) from error
+            artifact_sha256 = str(
+                serving_manifest.get('artifactSha256') or ''
+            ).lower()
+            artifact_key = str(serving_manifest.get('archiveKey') or '')
+            expected_key = (
+                'raw/predictor-lab/creator-adaptive-keep-serving/by-sha256/'
+                f'{artifact_sha256}.npz'
             )
-        if hashlib.sha256(artifact).hexdigest() != artifact_sha256:
-            raise RuntimeError(
-                'creator-adaptive keep serving artifact hash does not match'
+            model_artifact_sha256 = str(
+                model_manifest.get('artifactSha256') or ''
+            ).lower()
+            model_artifact_key = str(
+                model_manifest.get('archiveKey') or ''
             )
-        state = load_serving_state(artifact)
-        metadata = state.get('metadata') or {}
-        scorer_source_sha256 = hashlib.sha256(
-            open(
-                os.path.join(HERE, 'creator_adaptive_keep.py'),
-                'rb',
-            ).read()
-        ).hexdigest()
-        if (
-            metadata.get('modelArtifactSha256') != model_artifact_sha256
-            or metadata.get('servingScorerSourceSha256')
-            != scorer_source_sha256
-            or serving_manifest.get('servingScorerSourceSha256')
-            != scorer_source_sha256
-            or metadata.get('producerSourceSha256')
-            != serving_manifest.get('producerSourceSha256')
-            or metadata.get('featureContractVersion')
-            != serving_manifest.get('featureContractVersion')
-            or metadata.get('featureContractSha256')
-            != serving_manifest.get('featureContractSha256')
-        ):
-            raise RuntimeError(
-                'creator-adaptive keep serving code or model revision is incompatible'
+            expected_model_key = (
+                'raw/predictor-lab/creator-adaptive-keep-model/by-sha256/'
+                f'{model_artifact_sha256}.json'
             )
-        _CREATOR_ADAPTIVE_KEEP_STATE_CACHE = {
-            'state': state,
-            'artifact_sha256': artifact_sha256,
-            'artifact_key': artifact_key,
-            'manifest_sha256': hashlib.sha256(
-                serving_manifest_bytes
-            ).hexdigest(),
-            'manifest_key': CREATOR_ADAPTIVE_KEEP_SERVING_MANIFEST_KEY,
-            'model_artifact_sha256': model_artifact_sha256,
-            'model_artifact_key': model_artifact_key,
-            'model_manifest_sha256': hashlib.sha256(
-                model_manifest_bytes
-            ).hexdigest(),
-            'model_manifest_key':
-                CREATOR_ADAPTIVE_KEEP_MODEL_MANIFEST_KEY,
-            'model_producer_source_sha256':
-                model_manifest.get('producerSourceSha256'),
-            'serving_producer_source_sha256':
-                serving_manifest.get('producerSourceSha256'),
-            'serving_scorer_source_sha256':
-                serving_manifest.get('servingScorerSourceSha256'),
-            'feature_contract_version':
-                serving_manifest.get('featureContractVersion'),
-            'feature_contract_sha256':
-                serving_manifest.get('featureContractSha256'),
-            'candidate_registry_sha256':
-                metadata.get('candidateRegistrySha256'),
-        }
-    cached = _CREATOR_ADAPTIVE_KEEP_STATE_CACHE
+            if (
+                serving_manifest.get('coordinateId')
+                != CREATOR_ADAPTIVE_KEEP_COORDINATE_ID
+                or serving_manifest.get('canonicalKey')
+                != CREATOR_ADAPTIVE_KEEP_SERVING_KEY
+                or artifact_key != expected_key
+                or not _exact_sha256(artifact_sha256)
+                or not _exact_sha256(model_artifact_sha256)
+                or serving_manifest.get('modelArtifactSha256')
+                != model_artifact_sha256
+                or model_manifest.get('coordinateId')
+                != CREATOR_ADAPTIVE_KEEP_COORDINATE_ID
+                or model_manifest.get('canonicalKey')
+                != CREATOR_ADAPTIVE_KEEP_MODEL_KEY
+                or model_artifact_key != expected_model_key
+                or not _exact_sha256(
+                    model_manifest.get('producerSourceSha256')
+                )
+                or not _exact_sha256(
+                    model_manifest.get('featureContractSha256')
+                )
+                or not _exact_sha256(
+                    serving_manifest.get('producerSourceSha256')
+                )
+                or not _exact_sha256(
+                    serving_manifest.get('servingScorerSourceSha256')
+                )
+                or serving_manifest.get('featureContractVersion')
+                != model_manifest.get('featureContractVersion')
+                or serving_manifest.get('featureContractSha256')
+                != model_manifest.get('featureContractSha256')
+            ):
+                raise RuntimeError(
+                    'creator-adaptive keep serving manifest failed integrity validation'
+                )
+            artifact = r2_get(artifact_key)
+            if not artifact:
+                raise RuntimeError(
+                    'creator-adaptive keep immutable serving artifact is unavailable'
+                )
+            if hashlib.sha256(artifact).hexdigest() != artifact_sha256:
+                raise RuntimeError(
+                    'creator-adaptive keep serving artifact hash does not match'
+                )
+            state = load_serving_state(artifact)
+            metadata = state.get('metadata') or {}
+            scorer_source_sha256 = hashlib.sha256(
+                open(
+                    os.path.join(HERE, 'creator_adaptive_keep.py'),
+                    'rb',
+                ).read()
+            ).hexdigest()
+            if (
+                metadata.get('modelArtifactSha256') != model_artifact_sha256
+                or metadata.get('servingScorerSourceSha256')
+                != scorer_source_sha256
+                or serving_manifest.get('servingScorerSourceSha256')
+                != scorer_source_sha256
+                or metadata.get('producerSourceSha256')
+                != serving_manifest.get('producerSourceSha256')
+                or metadata.get('featureContractVersion')
+                != serving_manifest.get('featureContractVersion')
+                or metadata.get('featureContractSha256')
+                != serving_manifest.get('featureContractSha256')
+            ):
+                raise RuntimeError(
+                    'creator-adaptive keep serving code or model revision is incompatible'
+                )
+            _CREATOR_ADAPTIVE_KEEP_STATE_CACHE = {
+                'state': state,
+                'artifact_sha256': artifact_sha256,
+                'artifact_key': artifact_key,
+                'manifest_sha256': hashlib.sha256(
+                    serving_manifest_bytes
+                ).hexdigest(),
+                'manifest_key': CREATOR_ADAPTIVE_KEEP_SERVING_MANIFEST_KEY,
+                'model_artifact_sha256': model_artifact_sha256,
+                'model_artifact_key': model_artifact_key,
+                'model_manifest_sha256': hashlib.sha256(
+                    model_manifest_bytes
+                ).hexdigest(),
+                'model_manifest_key':
+                    CREATOR_ADAPTIVE_KEEP_MODEL_MANIFEST_KEY,
+                'model_producer_source_sha256':
+                    model_manifest.get('producerSourceSha256'),
+                'serving_producer_source_sha256':
+                    serving_manifest.get('producerSourceSha256'),
+                'serving_scorer_source_sha256':
+                    serving_manifest.get('servingScorerSourceSha256'),
+                'feature_contract_version':
+                    serving_manifest.get('featureContractVersion'),
+                'feature_contract_sha256':
+                    serving_manifest.get('featureContractSha256'),
+                'candidate_registry_sha256':
+                    metadata.get('candidateRegistrySha256'),
+            }
+        cached = _CREATOR_ADAPTIVE_KEEP_STATE_CACHE
     result = score_creator_adaptive_keep(
         cached['state'],
         visual,
@@ -747,33 +773,6 @@ def normalize_transcript(value):
     """Canonicalize only representation, not meaning, before both hashing and embedding."""
     return re.sub(r'\s+', ' ', unicodedata.normalize('NFKC', str(value or ''))).strip()
 
-def canonicalize_montage_bytes(value):
-    """Give every source path the exact same pixel geometry and JPEG encoder contract."""
-    try:
-        with Image.open(io.BytesIO(value)) as source:
-            if (
-                source.format == 'JPEG'
-                and source.size
-                == (CANONICAL_MONTAGE_WIDTH, CANONICAL_MONTAGE_HEIGHT)
-            ):
-                return bytes(value)
-            image = source.convert('RGB').resize(
-                (CANONICAL_MONTAGE_WIDTH, CANONICAL_MONTAGE_HEIGHT),
-                Image.Resampling.LANCZOS,
-            )
-            output = io.BytesIO()
-            image.save(
-                output,
-                format='JPEG',
-                quality=CANONICAL_MONTAGE_QUALITY,
-                subsampling=2,
-                optimize=False,
-                progressive=False,
-            )
-            return output.getvalue()
-    except Exception as error:
-        raise RuntimeError(f'could not canonicalize the five-frame montage: {error}') from error
-
 def canonicalize_montage_b64(value):
     raw = base64.b64decode(value)
     return base64.b64encode(canonicalize_montage_bytes(raw)).decode()
@@ -916,6 +915,14 @@ def _score_ledger_code_sha256():
     except Exception:
         return None
 
+def _neighbor_index_code_sha256():
+    try:
+        return hashlib.sha256(
+            open(os.path.join(HERE, 'neighbor_index.py'), 'rb').read()
+        ).hexdigest()
+    except Exception:
+        return None
+
 _FFMPEG_VERSION = None
 def _ffmpeg_version():
     global _FFMPEG_VERSION
@@ -954,6 +961,8 @@ def _score_revisions():
             'sha256': _score_code_sha256(),
             'score_ledger_module_sha256':
                 _score_ledger_code_sha256(),
+            'neighbor_index_module_sha256':
+                _neighbor_index_code_sha256(),
         },
         'models': {
             'embedding': {
@@ -1285,37 +1294,24 @@ def _score_replay_store(
 
 def embed(parts, tries=3):
     # bounded so 3 sequential embeds can't blow past the server's 240s kill (was 5×60s=300s PER call,
-    # which intermittently hung the whole upload when Gemini was slow). 3×30s = 90s worst case per embed.
-    body = json.dumps({'content': {'parts': parts}, 'outputDimensionality': DIM}).encode()
+    # which intermittently hung the whole upload when Gemini was slow). EMBED_DEADLINE_S = 90s worst
+    # case per embed, retries and quota waits included: a retry whose Retry-After would land past it
+    # fails at once. Uploads ride the gateway's interactive lane, so a backfill's 429 pause can't stall them.
+    # The shared gateway retries only 408/429/5xx/network failures;
+    # bad key, billing suspension and other 4xx raise at once with 'Gemini embedding HTTP <status>'.
+    # Image parts are keyed by, and sent as, their canonical montage bytes, so re-scoring a hook
+    # never reaches the embedding API. (raw_embed keys its library montages by their own bytes.)
+    cache = embedding_store.shared_cache(canonicalize_montage_bytes)
+    parts = cache.canonical_parts(parts)
+    cached = cache.get_many([parts])[0]
+    if cached is not None:
+        return cached
     if not KEY:
         raise RuntimeError('GEMINI_API_KEY is not configured')
-    last_error = 'unknown Gemini embedding failure'
-    for a in range(tries):
-        retry_delay = 1.0 * (a + 1)
-        try:
-            req = urllib.request.Request(EMB_URL, data=body, method='POST', headers={'Content-Type': 'application/json', 'x-goog-api-key': KEY})
-            with urllib.request.urlopen(req, timeout=30) as r:
-                return np.array(json.loads(r.read())['embedding']['values'], np.float32)
-        except urllib.error.HTTPError as error:
-            try:
-                payload = json.loads(error.read().decode('utf-8', 'replace'))
-                detail = str((payload.get('error') or {}).get('message') or '')[:240]
-            except Exception:
-                detail = ''
-            last_error = f'Gemini embedding HTTP {error.code}' + (f': {detail}' if detail else '')
-            # Bad key, billing suspension, and exhausted project quota do not improve
-            # when retried seconds later. A 429 can also be a transient rate limit,
-            # so honor Retry-After and surface it only after bounded retries.
-            if error.code in (400, 401, 403):
-                raise RuntimeError(last_error)
-            if error.code == 429:
-                try: retry_delay = min(10.0, max(1.0, float(error.headers.get('Retry-After') or retry_delay)))
-                except Exception: pass
-        except Exception as error:
-            last_error = f'{type(error).__name__}: {str(error)[:220]}'
-        if a < tries - 1:
-            time.sleep(retry_delay)
-    raise RuntimeError(last_error)
+    vector = embedding_gateway.embed(parts, KEY, DIM, EMBEDDING_MODEL, tries=tries, timeout=30,
+                                     deadline=EMBED_DEADLINE_S, lane=embedding_gateway.INTERACTIVE)
+    cache.put_many([parts], [vector])
+    return vector
 def img_part(b64): return {'inlineData': {'mimeType': 'image/jpeg', 'data': b64}}
 
 def gemini_transcribe(wav):
@@ -1364,43 +1360,46 @@ def whisper_text(wav):
     """Use one transcriber on Render and the relay so source mode cannot change text."""
     return gemini_transcribe(wav)
 
-def _montage_audio(src, mon, wav):
-    """Extract the 5-frame montage + first-5s audio→transcript from one source file.
-    ffmpeg auto-detects the container/codec, so .mov/.mp4/.webm/.mkv all work here."""
-    subprocess.run(['ffmpeg', '-nostdin', '-loglevel', 'error', '-t', '5', '-i', src, '-vf', 'fps=1,scale=320:-1,tile=5x1', '-frames:v', '1', mon], timeout=90)
+def _montage_audio(src, folder):
+    """Extract the 5-frame montage + first-5s audio→transcript + duration from one source
+    file in a single decode (media_extract). ffmpeg auto-detects the container/codec, so
+    .mov/.mp4/.webm/.mkv all work here → (montage path | None, txt, good, duration)."""
+    mon, wav, duration = extract_opening(src, folder, timeout=90)
     txt, good = '', False
-    if os.path.exists(mon):
-        try:
-            subprocess.run(['ffmpeg', '-nostdin', '-loglevel', 'error', '-t', '5', '-i', src, '-vn', '-ar', '16000', '-ac', '1', wav], timeout=90)
-        except Exception: pass
-        if os.path.exists(wav) and os.path.getsize(wav) > 1000:
-            txt, good = whisper_text(wav)
-    return txt, good
-
-def hook_inputs(src):
-    """first-5s montage (b64) + (transcript, is_voiceover) from ANY local video file.
-    Tries the file directly first; if ffmpeg can't decode it (exotic codec/container),
-    normalizes to a clean H.264 mp4 and retries — so any uploadable format works."""
+    if mon and wav and os.path.getsize(wav) > 1000:
+        txt, good = whisper_text(wav)
+    return mon, txt, good, duration
+
+def hook_media(src):
+    """first-5s montage (b64) + (transcript, is_voiceover) + container duration from ANY
+    local video file. Tries the file directly first; if ffmpeg can't decode it (exotic
+    codec/container), normalizes to a clean H.264 mp4 and retries — so any uploadable
+    format works. The duration always comes from the original file (None if unreadable)."""
     tmp = tempfile.mkdtemp(prefix='rawup_')
     try:
-        mon, wav, norm = os.path.join(tmp, 'm.jpg'), os.path.join(tmp, 'a.wav'), os.path.join(tmp, 'norm.mp4')
-        txt, good = _montage_audio(src, mon, wav)
-        if not os.path.exists(mon):                       # decode failed → transcode then retry
+        norm = os.path.join(tmp, 'norm.mp4')
+        mon, txt, good, duration = _montage_audio(src, tmp)
+        if not mon:                                       # decode failed → transcode then retry
             try:
                 subprocess.run(['ffmpeg', '-nostdin', '-loglevel', 'error', '-i', src, '-t', '6',
                                 '-c:v', 'libx264', '-pix_fmt', 'yuv420p', '-c:a', 'aac', '-movflags', '+faststart', norm], timeout=180)
             except Exception: pass
             if os.path.exists(norm):
-                for f in (mon, wav):
-                    try: os.remove(f)
+                for f in ('m.jpg', 'a.wav'):
+                    try: os.remove(os.path.join(tmp, f))
                     except Exception: pass
-                txt, good = _montage_audio(norm, mon, wav)
-        if not os.path.exists(mon): return None
+                mon, txt, good, _ = _montage_audio(norm, tmp)
+        if not mon: return None
         b64 = base64.b64encode(open(mon, 'rb').read()).decode()
-        return b64, txt, good
+        return b64, txt, good, duration
     finally:
         shutil.rmtree(tmp, ignore_errors=True)
 
+def hook_inputs(src):
+    """hook_media() without the duration: (montage b64, transcript, is_voiceover) or None."""
+    media = hook_media(src)
+    return media[:3] if media else None
+
 class _YoutubeLogger:
     def debug(self, *args): pass
     def warning(self, *args): pass
@@ -1528,10 +1527,20 @@ import gc, tempfile
 # ~72MB embedding files from R2 every upload and holding them in RAM swap-thrashed the tight box.
 # Fix: keep a normalized copy on local disk (validated by the R2 ETag so it's never stale), memory-map
 # it, and compute similarities in CHUNKS so a matmul never pulls the whole 72MB into RAM. First upload
-# after a deploy warms the cache; every one after skips the download entirely. Result cached per request.
+# after a deploy warms the cache; every one after skips the download entirely. Result cached per request
+# (per thread: the --serve daemon scores concurrent requests on worker threads).
 _CDIR = tempfile.gettempdir()
-_NBR = {}
+_NBR = threading.local()
+_NBR_INDEX = {}
+_NORM_EMB_ETAG = {}
+_NORM_EMB_KEY = {}
 _PINNED_ARTIFACT_REVISIONS = {}
+_CHANNEL_LOCKS = {}
+
+def _channel_lock(c):
+    """One lock per channel: concurrent requests must not both write the same cache files."""
+    with _RESIDENT_LOCK:
+        return _CHANNEL_LOCKS.setdefault(c, threading.RLock())
 
 def _zip_central_dir(key, size, etag=None):
     """Member table of a remote zip (npz) from ONE small ranged read of its central directory."""
@@ -1577,7 +1586,76 @@ def _zip_member_stream(key, info, etag=None):
         piece = d.flush()
         if piece: yield piece
 
+def _norm_emb_segments(c):
+    """(unit mmap, ids) from the segmented archive, or None when the channel predates it
+    (or the pinned revision does). Shards are content addressed, so after an embed
+    checkpoint only the newly appended shards are downloaded; the manifest ETag pins
+    the revision exactly like the npz ETag did."""
+    key = embedding_archive.manifest_key(f'raw/{c}/segments')
+    expected = _PINNED_ARTIFACT_REVISIONS.get(key)
+    if expected and expected.get('state') != 'present':
+        return None
+    try:
+        etag = str(s3.head_object(Bucket=BUCKET, Key=key).get('ETag') or '').strip('"')
+    except Exception as error:
+        if expected:
+            raise RuntimeError(f'could not verify pinned artifact {key}: {error}') from error
+        return None
+    if expected and etag != str(expected.get('etag') or '').strip('"'):
+        raise RuntimeError(f'pinned artifact changed before scoring: {key} (found {etag or "unavailable"})')
+    npy = os.path.join(_CDIR, f'rawseg_{c}.npy'); meta = os.path.join(_CDIR, f'rawseg_{c}.meta.json')
+    try:
+        m = json.load(open(meta))
+        if etag and m.get('etag') == etag:
+            _NORM_EMB_ETAG[c], _NORM_EMB_KEY[c] = etag, key
+            return np.load(npy, mmap_mode='r'), m['ids']
+    except Exception: pass
+    try:
+        payload = s3.get_object(Bucket=BUCKET, Key=key, IfMatch=etag)['Body'].read()
+        manifest = embedding_archive.load_manifest(lambda _: payload, f'raw/{c}/segments')
+        print(f'[warm] {c}: assembling {len(manifest["shards"])} archive shards', file=sys.stderr, flush=True)
+        embedding_archive.write_unit_matrix(manifest, r2_get, npy)
+        ids = embedding_archive.read_ids(manifest, r2_get)
+        json.dump({'etag': etag, 'ids': ids}, open(meta, 'w'))
+    except Exception as e:
+        print(f'[warm] {c}: archive FAILED ({type(e).__name__}: {str(e)[:120]})', file=sys.stderr, flush=True)
+        if expected:
+            raise RuntimeError(f'could not materialize pinned artifact {key}: {e}') from e
+        return None
+    _NORM_EMB_ETAG[c], _NORM_EMB_KEY[c] = etag, key
+    return np.load(npy, mmap_mode='r'), ids
+
 def _norm_emb(c):
+    """(unit mmap, ids) for channel `c`. The --serve daemon keeps the mmap resident and
+    hands it back without a HEAD while it is still the revision this request pinned."""
+    with _channel_lock(c):
+        return _resident_norm_emb(c)
+
+def _resident_norm_emb(c):
+    if _RESIDENT_EMB is None:
+        return _load_norm_emb(c)
+    hit = _RESIDENT_EMB.get(c)
+    if hit is not None:
+        key, etag, V, ids = hit
+        segments_key = embedding_archive.manifest_key(f'raw/{c}/segments')
+        pinned_key = (
+            segments_key
+            if (_PINNED_ARTIFACT_REVISIONS.get(segments_key) or {}).get('state') == 'present'
+            else f'raw/{c}/embeddings.npz'
+        )
+        expected = _PINNED_ARTIFACT_REVISIONS.get(pinned_key) or {}
+        if key == pinned_key and etag == str(expected.get('etag') or '').strip('"'):
+            _NORM_EMB_ETAG[c], _NORM_EMB_KEY[c] = etag, key
+            return V, ids
+    V, ids = _load_norm_emb(c)
+    if V is not None and c in _NORM_EMB_KEY:
+        _RESIDENT_EMB[c] = (_NORM_EMB_KEY[c], _NORM_EMB_ETAG[c], V, ids)
+    return V, ids
+
+def _load_norm_emb(c):
+    hit = _norm_emb_segments(c)
+    if hit is not None:
+        return hit
     npy = os.path.join(_CDIR, f'rawemb_{c}.npy'); meta = os.path.join(_CDIR, f'rawemb_{c}.meta.json')
     key = f'raw/{c}/embeddings.npz'
     etag, size = None, None
@@ -1603,7 +1681,9 @@ def _norm_emb(c):
         return None
     if etag and os.path.exists(npy) and os.path.exists(meta):
         hit = _cached()
-        if hit: return hit
+        if hit:
+            _NORM_EMB_ETAG[c], _NORM_EMB_KEY[c] = etag, key
+            return hit
     # The library grew ~5x (66k videos → visual/together embeddings.npz are ~380MB EACH), so the
     # old read-whole-npz-into-RAM warm held ~3 copies (~1.2GB) and OOM-restarted the 2GB deploy
     # box — which lost the in-memory scoring job, and the UI's auto-resubmit looped the OOM.
@@ -1634,6 +1714,7 @@ def _norm_emb(c):
         V.flush(); del V; gc.collect()
         os.replace(tmp, npy); json.dump({'etag': etag, 'ids': ids}, open(meta, 'w'))
         print(f'[warm] {c}: cached + normalized → mmap', file=sys.stderr, flush=True)
+        _NORM_EMB_ETAG[c], _NORM_EMB_KEY[c] = etag, key
         return np.load(npy, mmap_mode='r'), ids
     except Exception as e:
         print(f'[warm] {c}: FAILED ({type(e).__name__}: {str(e)[:120]}) — stale cache rejected', file=sys.stderr, flush=True)
@@ -1642,6 +1723,36 @@ def _norm_emb(c):
         if expected and expected.get('state') == 'present':
             raise RuntimeError(f'could not materialize pinned artifact {key}: {e}') from e
         return (None, None)
+def _neighbor_index(c, V):
+    """IVF index over the cached unit matrix, pinned to the same npz ETag (built once per
+    revision, on disk next to the mmap). None → callers fall back to the exact full scan."""
+    etag = _NORM_EMB_ETAG.get(c)
+    if V is None or not len(V) or not etag:
+        return None
+    slot = (c, etag)
+    with _channel_lock(c):
+        if slot not in _NBR_INDEX:
+            try:
+                _NBR_INDEX[slot] = neighbor_index.load_or_build(
+                    V,
+                    os.path.join(_CDIR, f'rawemb_{c}.ivf-{re.sub(r"[^a-zA-Z0-9_-]+", "", etag)[:80]}'),
+                    {'key': _NORM_EMB_KEY[c], 'etag': etag},
+                )
+            except Exception as e:
+                print(f'[warm] {c}: neighbor index unavailable ({type(e).__name__}: {str(e)[:120]}) — exact scan', file=sys.stderr, flush=True)
+                _NBR_INDEX[slot] = None
+        return _NBR_INDEX[slot]
+
+def _warm_channel(c):
+    V, ids = _norm_emb(c)
+    index = _neighbor_index(c, V)
+    if index is not None:
+        recall = index.manifest.get('recall') or {}
+        print(f'[warm] {c}: neighbor index {index.manifest.get("lists")} cells, probe {index.probes}, '
+              f'audited recall@{recall.get("neighbors")} mean {recall.get("meanRecall")} '
+              f'min {recall.get("minimumRecall")}', file=sys.stderr, flush=True)
+    return V, ids
+
 def warm_all():
     """Warm the three neighbour caches in PARALLEL threads — each stream is network-bound
     and independent, so overlapping them cuts a cold warm (fresh deploy, ~900MB at the
@@ -1650,23 +1761,23 @@ def warm_all():
     from concurrent.futures import ThreadPoolExecutor
     chans = ('visual', 'text', 'together')
     with ThreadPoolExecutor(3) as ex:
-        for c, (V, ids) in zip(chans, ex.map(_norm_emb, chans)):
+        for c, (V, ids) in zip(chans, ex.map(_warm_channel, chans)):
             print(f'[warm] {c}: {("ready n=" + str(len(ids))) if ids else "UNAVAILABLE"}', file=sys.stderr, flush=True)
 
 def neighbors(c, vec, k=12):
-    if c not in _NBR:
+    nbr = _NBR.__dict__.setdefault('by_channel', {})
+    if c not in nbr:
         V, ids = _norm_emb(c)
-        if V is None: _NBR[c] = None
-        elif len(V) == 0: _NBR[c] = []
+        if V is None: nbr[c] = None
+        elif len(V) == 0: nbr[c] = []
         else:
-            q = (np.asarray(vec, np.float32) / (np.linalg.norm(vec) + 1e-9))
-            n = len(V); sims = np.empty(n, np.float32)
-            for i in range(0, n, 4096): sims[i:i + 4096] = np.asarray(V[i:i + 4096]) @ q   # chunked over the mmap → low RAM
+            # probed cells + exact rerank touch a few thousand rows of the mmap, not all of it
+            index = _neighbor_index(c, V)
+            if index is not None: order, sims = index.search(vec, 13)
+            else: order, sims = neighbor_index.exact_top(V, vec, 13)
             del V; gc.collect()
-            kk = min(13, n)
-            part = np.argpartition(-sims, kk - 1)[:kk]
-            _NBR[c] = [{'id': ids[i], 'sim': round(float(sims[i]), 4)} for i in part[np.argsort(-sims[part])]]
-    r = _NBR[c]
+            nbr[c] = [{'id': ids[i], 'sim': round(float(s), 4)} for i, s in zip(order, sims)]
+    r = nbr[c]
     return r if r is None else r[:k]
 
 def _score_input_manifest(
@@ -1824,16 +1935,13 @@ def _score_output(
         'channels': score.get('channels') or {},
     }
 
-def _run():
-    global _PINNED_ARTIFACT_REVISIONS
-    global _VISUAL_KEEP_MODEL_CACHE
-    global _CREATOR_ADAPTIVE_KEEP_STATE_CACHE
-    _PINNED_ARTIFACT_REVISIONS = {}
-    _VISUAL_KEEP_MODEL_CACHE = None
-    _CREATOR_ADAPTIVE_KEEP_STATE_CACHE = None
-    _NBR.clear()
+def _run(argv, revisions=None):
+    """Score one upload and return the JSON object the CLI prints. `revisions` is the
+    --serve daemon's shared snapshot (already pinned); a one-shot run looks them up itself."""
+    if revisions is None:
+        _reset_resident_state()
     args = {}
-    a = sys.argv[1:]
+    a = list(argv)
     for i in range(0, len(a) - 1, 2):
         if a[i].startswith('--'): args[a[i][2:]] = a[i + 1]
     # --image: a montage image is provided directly (built from photos in the browser)
@@ -1848,14 +1956,13 @@ def _run():
     if args.get('youtube'):
         # ⬇ score straight from a YouTube link: download the short (lowest useful quality),
         # then run the EXACT same 5-frame + first-5s-transcript pipeline as a manual upload.
-        m = re.search(r'(?:v=|youtu\.be/|/shorts/|/live/)([\w-]{11})', args['youtube']) or re.search(r'^([\w-]{11})$', args['youtube'].strip())
-        if not m:
-            print(json.dumps({'error': 'could not find a YouTube video id in that link'})); return
-        vid = m.group(1)
+        vid = youtube_video_id(args['youtube'])
+        if not vid:
+            return {'error': 'could not find a YouTube video id in that link'}
         try:
             import yt_dlp
         except Exception:
-            print(json.dumps({'error': 'yt-dlp is not installed on this server yet — redeploy to pick it up'})); return
+            return {'error': 'yt-dlp is not installed on this server yet — redeploy to pick it up'}
         ytmp = tempfile.mkdtemp(prefix='rawyt_')
         try:
             info, path, acquisition = download_youtube_hook(vid, ytmp)
@@ -1864,42 +1971,61 @@ def _run():
                 except Exception: dur_s = None
             if not args.get('title'):
                 args['title'] = str(info.get('title') or vid)[:80]
-            extra = {'videoId': vid, 'sourceUrl': f'https://www.youtube.com/watch?v={vid}',
-                     'sourceTitle': str(info.get('title') or '')[:120], 'sourceViews': info.get('view_count'),
-                     'sourceChannel': str(info.get('channel') or info.get('uploader') or '')[:80],
-                     'sourcePublished': info.get('upload_date') or info.get('timestamp'),
-                     'sourceSubscribers': info.get('channel_follower_count'),
-                     'sourceAcquisition': acquisition}
+            extra = youtube_extra(vid, info, acquisition)
             inp = hook_inputs(path)
             if not inp:
-                print(json.dumps({'error': 'downloaded but could not extract frames (ffmpeg decode failed)'})); return
+                return {'error': 'downloaded but could not extract frames (ffmpeg decode failed)'}
             b64, txt, good = inp
         except Exception as e:
             msg = str(e)[:200]
-            print(json.dumps({'error': 'YouTube download failed: ' + msg})); return
+            return {'error': 'YouTube download failed: ' + msg}
         finally:
             shutil.rmtree(ytmp, ignore_errors=True)
     elif args.get('image'):
         img = args['image']
         if not os.path.exists(img):
-            print(json.dumps({'error': 'no image'})); return
+            return {'error': 'no image'}
         b64 = base64.b64encode(open(img, 'rb').read()).decode()
         txt = (args.get('text') or '').strip()
         good = bool(txt)                                   # user-set text is used verbatim
     else:
         path = args.get('file')
         if not path or not os.path.exists(path):
-            print(json.dumps({'error': 'no file'})); return
-        inp = hook_inputs(path)
-        if not inp:
-            print(json.dumps({'error': 'could not read this video — ffmpeg failed to decode it even after transcoding'})); return
-        b64, txt, good = inp
-        if dur_s is None:                                  # only ffprobe if the client didn't send the real duration (else we'd read the 6s clip)
+            return {'error': 'no file'}
+        media = hook_media(path)
+        if not media:
+            return {'error': 'could not read this video — ffmpeg failed to decode it even after transcoding'}
+        b64, txt, good, _ = media
+        # Only ffprobe if the client didn't send the real duration (else we'd read the 6s clip).
+        # ffprobe, not the banner duration: dur_s feeds the score and the replay keys, and the
+        # banner only has centisecond precision.
+        if dur_s is None:
             try:
                 r = subprocess.run(['ffprobe', '-v', 'error', '-show_entries', 'format=duration', '-of', 'csv=p=0', path],
                                    capture_output=True, text=True, timeout=20)
                 dur_s = float(r.stdout.strip()) if r.stdout.strip() else None
             except Exception: dur_s = None
+    prepared = prepare_score(b64, txt, good, dur_s, creator_profile, revisions)
+    return finish_score(prepared, extra, args.get('title', 'My hook'), source_mode)
+
+def youtube_video_id(link):
+    m = re.search(r'(?:v=|youtu\.be/|/shorts/|/live/)([\w-]{11})', link) or re.search(r'^([\w-]{11})$', link.strip())
+    return m.group(1) if m else None
+
+def youtube_extra(vid, info, acquisition):
+    """Source fields a --youtube score carries alongside the score itself."""
+    return {'videoId': vid, 'sourceUrl': f'https://www.youtube.com/watch?v={vid}',
+            'sourceTitle': str(info.get('title') or '')[:120], 'sourceViews': info.get('view_count'),
+            'sourceChannel': str(info.get('channel') or info.get('uploader') or '')[:80],
+            'sourcePublished': info.get('upload_date') or info.get('timestamp'),
+            'sourceSubscribers': info.get('channel_follower_count'),
+            'sourceAcquisition': acquisition}
+
+def prepare_score(b64, txt, good, dur_s, creator_profile=None, revisions=None):
+    """Canonical inputs, the replay-cache lookup and (on a miss) the three embeddings —
+    the network-bound half of a score. finish_score() does the rest; callers that hold a
+    daemon snapshot pass its `revisions` to both halves' request."""
+    global _PINNED_ARTIFACT_REVISIONS
     b64 = canonicalize_montage_b64(b64)
     txt = normalize_transcript(txt)
     good = bool(good and txt)
@@ -1909,21 +2035,33 @@ def _run():
         good,
         dur_s,
         creator_profile,
+        revisions,
     )
-    _PINNED_ARTIFACT_REVISIONS = dict(
-        ((replay.get('meta') or {}).get('scorer_revisions') or {}).get(
-            'artifacts'
-        ) or {}
-    )
+    if revisions is None:
+        _PINNED_ARTIFACT_REVISIONS = dict(
+            ((replay.get('meta') or {}).get('scorer_revisions') or {}).get(
+                'artifacts'
+            ) or {}
+        )
+    prepared = {'b64': b64, 'txt': txt, 'good': good, 'dur_s': dur_s,
+                'creator_profile': creator_profile, 'replay': replay}
+    if replay.get('score') is None:
+        prepared['ev'] = embed([img_part(b64)])
+        prepared['et'] = embed([{'text': txt}]) if good else None
+        prepared['eg'] = embed([img_part(b64)] + ([{'text': txt}] if good else []))
+    return prepared
+
+def finish_score(prepared, extra, title, source_mode):
+    """Indicators, steer, neighbours and the replay-cache write for a prepared upload →
+    the JSON object the CLI prints."""
+    b64, txt, good, dur_s = prepared['b64'], prepared['txt'], prepared['good'], prepared['dur_s']
+    creator_profile, replay = prepared['creator_profile'], prepared['replay']
     if replay.get('score') is not None:
-        print(json.dumps(_score_output(
-            extra, args.get('title', 'My hook'), b64, txt, good, dur_s,
-            replay['score'], replay['meta'], creator_profile, source_mode)))
-        return
-
-    ev = embed([img_part(b64)])
-    et = embed([{'text': txt}]) if good else None
-    eg = embed([img_part(b64)] + ([{'text': txt}] if good else []))
+        return _score_output(
+            extra, title, b64, txt, good, dur_s,
+            replay['score'], replay['meta'], creator_profile, source_mode)
+    ev, et, eg = prepared['ev'], prepared['et'], prepared['eg']
+    _NBR.by_channel = {}
     warm_all()   # every neighbor artifact is pinned to the revision in this score identity
     # score the hook on every validated indicator (project its embedding onto the
     # registry's probe weights; + per-modality global novelty from the neighbours).
@@ -2085,9 +2223,278 @@ def _run():
         creator_profile,
         good,
     )
-    print(json.dumps(_score_output(
-        extra, args.get('title', 'My hook'), b64, txt, good, dur_s,
-        score, replay_meta, creator_profile, source_mode)))
+    return _score_output(
+        extra, title, b64, txt, good, dur_s,
+        score, replay_meta, creator_profile, source_mode)
+
+# ── --serve: one warm scorer for the whole server ─────────────────────────────
+# A process per upload paid the numpy/boto3/sklearn imports, ~20 R2 HEADs for the revision
+# snapshot, the mmap opens and every pinned model download again on each score. The daemon
+# reads JSON lines {"id", "argv"} on stdin and answers {"id", "result"} on stdout, where
+# result is exactly the object the one-shot CLI prints for that argv. Requests run on
+# worker threads and share one revision snapshot, re-checked at most every
+# RAW_SCORE_REVISION_TTL_S seconds; while a snapshot is current the keep models, the
+# neighbour mmaps and every sha-verified pinned payload stay resident. A changed snapshot
+# drains in-flight requests before anything resident is dropped, so no request ever mixes
+# two revisions and its provenance is the one a fresh process would have recorded.
+# Resident payloads are bounded by count and total bytes, least recently used out first.
+_RESIDENT_PAYLOADS = None          # OrderedDict {(key, sha256): bytes} while serving; None in one-shot runs
+_RESIDENT_EMB = None               # {channel: (artifact key, etag, unit mmap, ids)}
+_RESIDENT_PAYLOAD_MAX_BYTES = 64 * 1024 * 1024
+_RESIDENT_PAYLOAD_MAX_ENTRIES = int(env('RAW_SCORE_RESIDENT_PAYLOADS') or 64)
+_RESIDENT_PAYLOAD_BUDGET_BYTES = int(env('RAW_SCORE_RESIDENT_PAYLOAD_MB') or 256) * 1024 * 1024
+_RESIDENT_PAYLOAD_BYTES = 0
+_RESIDENT_SNAPSHOT = None
+
+def _resident_payload(key, expected):
+    if _RESIDENT_PAYLOADS is None or not expected or expected.get('state') != 'present':
+        return None
+    slot = (key, str(expected.get('sha256') or '').lower())
+    with _RESIDENT_LOCK:
+        payload = _RESIDENT_PAYLOADS.get(slot)
+        if payload is not None:
+            _RESIDENT_PAYLOADS.move_to_end(slot)
+        return payload
+
+def _keep_resident(key, expected, payload):
+    global _RESIDENT_PAYLOAD_BYTES
+    sha256 = str(expected.get('sha256') or '').lower()
+    if _RESIDENT_PAYLOADS is None or not sha256 or len(payload) > _RESIDENT_PAYLOAD_MAX_BYTES:
+        return
+    with _RESIDENT_LOCK:
+        slot = (key, sha256)
+        if slot in _RESIDENT_PAYLOADS:
+            _RESIDENT_PAYLOADS.move_to_end(slot)
+            return
+        _RESIDENT_PAYLOADS[slot] = payload
+        _RESIDENT_PAYLOAD_BYTES += len(payload)
+        while len(_RESIDENT_PAYLOADS) > 1 and (
+            len(_RESIDENT_PAYLOADS) > _RESIDENT_PAYLOAD_MAX_ENTRIES
+            or _RESIDENT_PAYLOAD_BYTES > _RESIDENT_PAYLOAD_BUDGET_BYTES
+        ):
+            _RESIDENT_PAYLOAD_BYTES -= len(_RESIDENT_PAYLOADS.popitem(last=False)[1])
+
+def _reset_resident_state(revisions=None):
+    """Pin `revisions` (none → unpinned) and drop everything loaded under the previous pin."""
+    global _PINNED_ARTIFACT_REVISIONS
+    global _VISUAL_KEEP_MODEL_CACHE
+    global _CREATOR_ADAPTIVE_KEEP_STATE_CACHE
+    global _CHANNEL_FREE_MODEL_CACHE
+    global _RESIDENT_PAYLOAD_BYTES
+    with _RESIDENT_LOCK:
+        _PINNED_ARTIFACT_REVISIONS = dict((revisions or {}).get('artifacts') or {})
+        _VISUAL_KEEP_MODEL_CACHE = None
+        _CREATOR_ADAPTIVE_KEEP_STATE_CACHE = None
+        _CHANNEL_FREE_MODEL_CACHE = None
+        if _RESIDENT_PAYLOADS is not None:
+            _RESIDENT_PAYLOADS.clear()
+            _RESIDENT_EMB.clear()
+            _RESIDENT_PAYLOAD_BYTES = 0
+
+class _RevisionSnapshot:
+    """The revision snapshot shared by every in-flight daemon request.
+
+    enter() returns the current snapshot, first re-reading the artifact revisions when it
+    is older than `ttl` (one request does the lookup; the others keep scoring under the
+    snapshot that is still current). When the lookup finds a change, new requests wait,
+    in-flight ones finish, and only then is resident state reset to the new pin.
+    """
+
+    def __init__(self, ttl, lookup=None):
+        self.ttl = ttl
+        self.lookup = lookup or _score_revisions
+        self.cond = threading.Condition()
+        self.revisions = None
+        self.fingerprint = None
+        self.checked = 0.0
+        self.checking = False
+        self.swapping = False
+        self.active = 0
+        self.swaps = 0
+
+    def enter(self):
+        with self.cond:
+            while self.swapping or (self.revisions is None and self.checking):
+                self.cond.wait()
+            due = not self.checking and (
+                self.revisions is None or time.monotonic() - self.checked >= self.ttl
+            )
+            if not due:
+                self.active += 1
+                return self.revisions
+            self.checking = True
+        try:
+            fresh = self.lookup()
+        except BaseException:
+            with self.cond:
+                self.checking = False
+                self.cond.notify_all()
+            raise
+        fingerprint = _revision_fingerprint(fresh)
+        with self.cond:
+            self.checking = False
+            # an unavailable lookup is used for this request but retried by the next one
+            if not any(
+                (row or {}).get('state') == 'unavailable'
+                for row in (fresh.get('artifacts') or {}).values()
+            ):
+                self.checked = time.monotonic()
+            if fingerprint != self.fingerprint:
+                self.swapping = True
+                while self.active:
+                    self.cond.wait()
+                _reset_resident_state(fresh)
+                self.revisions, self.fingerprint = fresh, fingerprint
+                self.swaps += 1
+                self.swapping = False
+            self.active += 1
+            self.cond.notify_all()
+            return self.revisions
+
+    def leave(self):
+        with self.cond:
+            self.active -= 1
+            self.cond.notify_all()
+
+def resident_snapshot(ttl=None):
+    """Switch this process to resident scoring and return its one shared _RevisionSnapshot.
+    Score inside snapshot.enter()/leave() and pass the returned revisions to _run (or to
+    prepare_score) so every request is pinned to the snapshot."""
+    global _RESIDENT_PAYLOADS, _RESIDENT_EMB, _RESIDENT_SNAPSHOT, _RESIDENT_PAYLOAD_BYTES
+    if _RESIDENT_SNAPSHOT is None:
+        from collections import OrderedDict
+        _RESIDENT_PAYLOADS, _RESIDENT_EMB, _RESIDENT_PAYLOAD_BYTES = OrderedDict(), {}, 0
+        _RESIDENT_SNAPSHOT = _RevisionSnapshot(
+            float(env('RAW_SCORE_REVISION_TTL_S') or 60) if ttl is None else ttl
+        )
+    return _RESIDENT_SNAPSHOT
+
+def _error_output(error):
+    import traceback
+    return {'error': 'processing failed: ' + str(error)[:200], 'trace': traceback.format_exc()[-500:]}
+
+class _RequestTaggedStream:
+    """Text stream that prefixes each line a request thread writes with `[id:<request id>] `,
+    so the server can hand a request's log lines to that request alone."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.local = threading.local()
+        self.lock = threading.Lock()
+
+    def tag(self, request_id):
+        self.local.request_id = request_id
+
+    def write(self, text):
+        pending = getattr(self.local, 'pending', '') + text
+        *lines, self.local.pending = pending.split('\n')
+        request_id = getattr(self.local, 'request_id', None)
+        prefix = f'[id:{request_id}] ' if request_id is not None else ''
+        if lines:
+            with self.lock:
+                self.stream.write(''.join(f'{prefix}{line}\n' for line in lines))
+        return len(text)
+
+    def flush(self):
+        with self.lock:
+            self.stream.flush()
+
+def serve(stdin=None, stdout=None, workers=None, ttl=None, stderr=None):
+    """Answer JSON-line score requests until stdin closes (see the section comment).
+
+    {"op": "cancel", "id": ...} cancels one request: a queued one is answered
+    {"error": "cancelled"} without scoring; a running one cannot be interrupted and
+    answers when it finishes. Log lines a request writes are tagged with its id.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    stdin = stdin or sys.stdin
+    out = stdout or sys.stdout
+    saved_streams = sys.stdout, sys.stderr
+    logs = _RequestTaggedStream(stderr or sys.stderr)
+    sys.stderr = logs
+    if stdout is None:
+        sys.stdout = logs              # stray prints must never corrupt the protocol stream
+    workers = workers or max(1, int(env('RAW_SCORE_DAEMON_WORKERS') or 2))
+    snapshot = resident_snapshot(ttl)
+    write_lock = threading.Lock()
+    served = {'requests': 0, 'errors': 0, 'cancelled': 0}
+    queued, cancelled = set(), set()
+
+    def reply(message):
+        line = json.dumps(message)
+        with write_lock:
+            out.write(line + '\n')
+            out.flush()
+
+    def handle(request_id, argv):
+        with write_lock:
+            skip = request_id in cancelled
+            queued.discard(request_id)
+            cancelled.discard(request_id)
+        if skip:
+            with write_lock:
+                served['cancelled'] += 1
+            reply({'id': request_id, 'result': {'error': 'cancelled'}})
+            return
+        started = time.time()
+        logs.tag(request_id)
+        try:
+            try:
+                revisions = snapshot.enter()
+                try:
+                    result = _run(argv, revisions)
+                finally:
+                    snapshot.leave()
+            except Exception as error:
+                result = _error_output(error)
+            with write_lock:
+                served['requests'] += 1
+                served['errors'] += 'error' in result
+            print(f'[serve] {request_id}: {"error" if "error" in result else "ok"} in '
+                  f'{time.time() - started:.1f}s', file=sys.stderr, flush=True)
+        finally:
+            logs.tag(None)
+        reply({'id': request_id, 'result': result})
+
+    try:
+        reply({'ready': True, 'pid': os.getpid(), 'workers': workers, 'revisionTtlS': snapshot.ttl})
+        with ThreadPoolExecutor(workers) as pool:
+            for line in stdin:
+                if not line.strip():
+                    continue
+                request_id = None
+                try:
+                    request = json.loads(line)
+                    request_id, argv = request.get('id'), request.get('argv')
+                    if request.get('op') == 'cancel':
+                        with write_lock:
+                            if request_id in queued:
+                                cancelled.add(request_id)
+                        continue
+                    if request.get('op') == 'stats':
+                        with _RESIDENT_LOCK:
+                            resident = {
+                                'residentPayloads': len(_RESIDENT_PAYLOADS),
+                                'residentPayloadBytes': _RESIDENT_PAYLOAD_BYTES,
+                                'residentChannels': sorted(_RESIDENT_EMB),
+                            }
+                        reply({'id': request_id, 'stats': {
+                            **served,
+                            'revisionFingerprint': snapshot.fingerprint,
+                            'revisionSwaps': snapshot.swaps,
+                            **resident,
+                        }})
+                        continue
+                    if not isinstance(argv, list) or not all(isinstance(item, str) for item in argv):
+                        raise ValueError('argv must be a list of strings')
+                except Exception as error:
+                    reply({'id': request_id, 'result': {'error': f'bad request: {str(error)[:200]}'}})
+                    continue
+                with write_lock:
+                    queued.add(request_id)
+                pool.submit(handle, request_id, argv)
+    finally:
+        sys.stdout, sys.stderr = saved_streams
 
 def main():
     if '--contract' in sys.argv:
@@ -2097,11 +2504,14 @@ def main():
         try: warm_all()
         except Exception as e: print(f'[prewarm] failed: {e}', file=sys.stderr, flush=True)
         return
+    if '--serve' in sys.argv:
+        serve()
+        return
     try:
-        _run()
+        result = _run(sys.argv[1:])
     except Exception as e:
-        import traceback
-        print(json.dumps({'error': 'processing failed: ' + str(e)[:200], 'trace': traceback.format_exc()[-500:]}))
+        result = _error_output(e)
+    print(json.dumps(result))
 
 if __name__ == '__main__':
     main()
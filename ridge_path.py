@@ -0,0 +1,69 @@
+"""Held-out ridge predictions for a whole alpha grid from one decomposition.
+
+Alpha selection used to refit sklearn Ridge from scratch for every alpha in
+every fold. With an intercept, ridge centers X and y on the training rows and
+solves (Xc'Xc + alpha I) w = Xc'yc. Writing Xc'Xc = V diag(lam) V' once per fold
+turns every alpha into a diagonal rescale:
+
+    w(alpha) = V diag(1 / (lam + alpha)) V' Xc'yc
+
+so fit() does the O(n d^2 + d^3) work once and predict() returns the held-out
+predictions for any number of alphas with one (rows x d) @ (d x alphas) product.
+The Gram matrix is accumulated over centered row chunks, so a wide embedding
+fold never holds a second centered copy of its design. These are the exact
+ridge solutions (sklearn's Ridge up to solver round-off), not an approximation.
+"""
+
+import numpy as np
+
+
+CHUNK_ROWS = 4096
+# Quarter-decade grid from 0.1 to 1000; it contains the five decade alphas the
+# callers used to try one refit at a time.
+ALPHAS = tuple(float(f'{alpha:.3g}') for alpha in np.logspace(-1, 3, 17))
+
+
+def fit(X, y):
+    """Decompose one training fold; the result feeds predict() and coefficients()."""
+    y = np.asarray(y, np.float64)
+    means = np.zeros(np.shape(X)[1], np.float64)
+    for start in range(0, len(y), CHUNK_ROWS):
+        means += np.asarray(X[start:start + CHUNK_ROWS], np.float64).sum(axis=0)
+    means /= len(y)
+    y_mean = float(y.mean())
+    gram = np.zeros((len(means), len(means)), np.float64)
+    moment = np.zeros(len(means), np.float64)
+    for start in range(0, len(y), CHUNK_ROWS):
+        block = np.asarray(X[start:start + CHUNK_ROWS], np.float64) - means
+        gram += block.T @ block
+        moment += block.T @ (y[start:start + CHUNK_ROWS] - y_mean)
+    eigenvalues, vectors = np.linalg.eigh(gram)
+    return {
+        'means': means,
+        'yMean': y_mean,
+        'vectors': vectors,
+        'eigenvalues': np.clip(eigenvalues, 0.0, None),
+        'projection': vectors.T @ moment,
+    }
+
+
+def _weights(path, alphas):
+    """Rotated coefficients, one column per alpha (alphas must be positive)."""
+    alphas = np.asarray(alphas, np.float64).reshape(1, -1)
+    return path['projection'][:, None] / (path['eigenvalues'][:, None] + alphas)
+
+
+def coefficients(path, alpha):
+    """(coefficients, intercept) of the ridge fit at `alpha`."""
+    coef = path['vectors'] @ _weights(path, [alpha])[:, 0]
+    return coef, path['yMean'] - float(path['means'] @ coef)
+
+
+def predict(path, X, alphas=ALPHAS):
+    """Predictions for the rows of `X`, shape (rows, len(alphas))."""
+    output = np.empty((len(X), len(alphas)), np.float64)
+    weights = _weights(path, alphas)
+    for start in range(0, len(X), CHUNK_ROWS):
+        block = np.asarray(X[start:start + CHUNK_ROWS], np.float64) - path['means']
+        output[start:start + len(block)] = path['yMean'] + (block @ path['vectors']) @ weights
+    return output
@@ -4,12 +4,20 @@ Save the corpus NOVELTY MODELS so an uploaded hook can be scored on EVERY novelt
 type (not just global) — niche (kmeans centroids), combinatorial (PCA basis),
 temporal (recent-corpus centroid). Same definitions as principles_novelty.py, so
 an upload's novelty is comparable to the registry curves. → raw/novelty_models.npz
-Run: python3 save_novelty_models.py
+Centroids and PCA bases are kept from the last run (novelty_state) and only refit once
+their cost on the grown corpus drifts past the threshold, the corpus outgrows their fit,
+or they reach the refit age; the npz is re-uploaded only when a model was refit or the
+recent centroid moved.
+Run: python3 save_novelty_models.py   [--full: refit everything] [--verify: report the
+     gap between the kept models and fresh fits]
 """
-import os, io, json, datetime
+import os, io, sys, json, datetime
 import numpy as np, boto3
 from sklearn.cluster import MiniBatchKMeans
 from sklearn.decomposition import PCA
+
+import corpus_snapshot
+import novelty_state
 HERE = os.path.dirname(os.path.abspath(__file__))
 def env(k):
     v = os.environ.get(k)
@@ -23,18 +31,31 @@ def r2_get(k):
     try: return s3.get_object(Bucket=BUCKET, Key=k)['Body'].read()
     except Exception: return None
 def norm(X): return X / (np.linalg.norm(X, axis=1, keepdims=True) + 1e-9)
+INCREMENTAL = '--full' not in sys.argv; VERIFY = '--verify' in sys.argv
+def kmeans_fit(K): return lambda X: MiniBatchKMeans(K, random_state=0, n_init=3, batch_size=1024).fit(X).cluster_centers_
+def pca_fit(n):
+    def fit(X): p = PCA(n, random_state=0).fit(X); return p.components_, p.mean_
+    return fit
 
 db = json.loads(r2_get('library/db.json') or b'{"videos":{}}')
-out = {}
+out = {}; refit = False
 for sk, ck in [('vis', 'visual'), ('txt', 'text'), ('tog', 'together')]:
-    z = np.load(io.BytesIO(r2_get(f'raw/{ck}/embeddings.npz')), allow_pickle=True)
-    ids = [str(x) for x in z['ids']]; X = norm(np.asarray(z['vecs'], np.float32)); n = len(ids)
+    snap = corpus_snapshot.open_channel(s3, BUCKET, ck)
+    ids = snap.ids.tolist(); X = snap.vecs; n = len(ids)
     K = min(25, max(2, n // 200))
-    cen = norm(MiniBatchKMeans(K, random_state=0, n_init=3, batch_size=1024).fit(X).cluster_centers_)
-    npc = min(50, X.shape[1], n - 1); pca = PCA(npc, random_state=0).fit(X)
+    raw, _, kinfo = novelty_state.kmeans_centers(f'models-{sk}-kmeans', X, K, kmeans_fit(K), incremental=INCREMENTAL)
+    cen = norm(raw)
+    npc = min(50, X.shape[1], n - 1)
+    comp, mean, pinfo = novelty_state.pca_basis(f'models-{sk}-pca', X, npc, pca_fit(npc), incremental=INCREMENTAL)
+    refit |= kinfo['refit'] or pinfo['refit']
+    for what, info, model, fit in [('centroids', kinfo, raw, kmeans_fit(K)), ('pca', pinfo, (comp, mean), pca_fit(npc))]:
+        gap = f' · gap to full rebuild {novelty_state.full_rebuild_gap(X, model, fit(X)):+.4f}' if VERIFY and not info['refit'] else ''
+        drift = '—' if info['drift'] is None else f'{info["drift"]:+.4f}'
+        state = f'refit: {info["reason"]}' if info['refit'] else 'kept'
+        print(f'{sk} {what}: {state} (drift {drift}){gap}', flush=True)
     # recent-corpus centroid (temporal reference for a "now" upload) = latest 2 months
     if sk == 'vis':
-        month = np.full(n, -1, int); idpos = {v: i for i, v in enumerate(ids)}
+        month = np.full(n, -1, int); idpos = snap.positions()
         for v in db.get('videos', {}).values():
             i = idpos.get(str(v.get('videoId', ''))); ud = str(v.get('uploadDate', '') or '')
             if i is not None and len(ud) == 8 and ud.isdigit(): month[i] = int(ud[:4]) * 12 + int(ud[4:6])
@@ -43,16 +64,21 @@ for sk, ck in [('vis', 'visual'), ('txt', 'text'), ('tog', 'together')]:
     if sk != 'vis':
         recent = np.full(n, -1, int)
         for v in db.get('videos', {}).values():
-            i = ids.index(str(v.get('videoId', ''))) if str(v.get('videoId', '')) in ids else None
+            i = snap.positions().get(str(v.get('videoId', '')))
         recent = None
     # use the global mean as temporal reference if month unavailable (robust)
     mvals = MONTH['vis'][:n] if sk == 'vis' else np.full(n, -1)
     rc = norm(X[mvals >= (mvals[mvals > 0].max() - 1)].mean(0, keepdims=True))[0] if (mvals > 0).any() else norm(X.mean(0, keepdims=True))[0]
     out[f'{sk}_centroids'] = cen.astype(np.float32)
-    out[f'{sk}_pca_comp'] = pca.components_.astype(np.float32)
-    out[f'{sk}_pca_mean'] = pca.mean_.astype(np.float32)
+    out[f'{sk}_pca_comp'] = comp.astype(np.float32)
+    out[f'{sk}_pca_mean'] = mean.astype(np.float32)
     out[f'{sk}_recent'] = rc.astype(np.float32)
     print(f'{sk}: {K} centroids · PCA{npc} · recent-centroid saved', flush=True)
+old = r2_get('raw/novelty_models.npz')
+if not refit and old:
+    with np.load(io.BytesIO(old)) as prev:
+        if set(prev.files) == set(out) and all(prev[k].shape == v.shape and np.allclose(prev[k], v, atol=1e-6) for k, v in out.items()):
+            print('no model drifted past the threshold · raw/novelty_models.npz is current', flush=True); sys.exit(0)
 bio = io.BytesIO(); np.savez_compressed(bio, **out)
 s3.put_object(Bucket=BUCKET, Key='raw/novelty_models.npz', Body=bio.getvalue(), ContentType='application/octet-stream')
 print('saved → raw/novelty_models.npz', flush=True)
@@ -432,6 +432,79 @@ def kernel_ridge_prediction(
     )
 
 
+def kernel_ridge_predictions(
+    gram: np.ndarray,
+    outcomes: np.ndarray,
+    histories: list[np.ndarray],
+    test_indices: np.ndarray,
+    alphas: Iterable[float],
+) -> dict[float, np.ndarray]:
+    """Batched, bit-identical form of ``kernel_ridge_prediction``.
+
+    KRR histories are the trailing 12/30/40 strictly earlier same-account
+    rows, so every system is at most 40x40 and rows in one timestamp batch
+    share an identical history. The cost was interpreter overhead per tiny
+    solve, not the solves themselves: each distinct history is gathered once,
+    equal-length systems are stacked, and one LAPACK call per (length, alpha)
+    solves them. Stacked ``np.linalg.solve`` runs the same per-matrix gesv as
+    the single-system call, so predictions match the row-at-a-time path
+    exactly.
+    """
+    alphas = tuple(float(alpha) for alpha in alphas)
+    predictions = {
+        alpha: np.full(len(test_indices), np.nan, dtype=np.float64)
+        for alpha in alphas
+    }
+    slots: dict[tuple[int, ...], int] = {}
+    by_length: dict[int, list[tuple[int, ...]]] = defaultdict(list)
+    for history in histories:
+        key = tuple(int(index) for index in history)
+        if key not in slots:
+            slots[key] = len(by_length[len(key)])
+            by_length[len(key)].append(key)
+    solved: dict[tuple[float, int], tuple[np.ndarray, np.ndarray]] = {}
+    for length, keys in by_length.items():
+        members = np.asarray(keys, dtype=int).reshape(len(keys), length)
+        kernels = gram[members[:, :, None], members[:, None, :]]
+        labels = outcomes[members]
+        train_means = np.mean(labels, axis=1)
+        centered = labels - train_means[:, None]
+        identity = np.eye(length)
+        for alpha in alphas:
+            systems = kernels + alpha * identity
+            try:
+                weights = np.linalg.solve(
+                    systems,
+                    centered[..., None],
+                )[..., 0]
+            except np.linalg.LinAlgError:
+                weights = np.empty_like(centered)
+                for slot, (system, target) in enumerate(
+                    zip(systems, centered)
+                ):
+                    try:
+                        weights[slot] = np.linalg.solve(system, target)
+                    except np.linalg.LinAlgError:
+                        weights[slot] = np.linalg.lstsq(
+                            system,
+                            target,
+                            rcond=None,
+                        )[0]
+            solved[(alpha, length)] = (train_means, weights)
+    for row, (history, test_index) in enumerate(
+        zip(histories, test_indices)
+    ):
+        length = len(history)
+        slot = slots[tuple(int(index) for index in history)]
+        for alpha in alphas:
+            train_means, weights = solved[(alpha, length)]
+            predictions[alpha][row] = float(
+                float(train_means[slot])
+                + gram[int(test_index), history] @ weights[slot]
+            )
+    return predictions
+
+
 def weighted_knn(
     similarity: np.ndarray,
     targets: np.ndarray,
@@ -564,6 +637,11 @@ def build_experts(
         * (centered_visual_gram + centered_together_gram),
     }
 
+    krr_windows = sorted({window for _, window, _ in KRR_SPECS})
+    krr_rows: list[int] = []
+    krr_histories: dict[int, list[np.ndarray]] = {
+        window: [] for window in krr_windows
+    }
     for index in range(n_rows):
         prior = strictly_earlier_history(index, context, freeze_final)
         prior_cache[index] = prior
@@ -575,16 +653,10 @@ def build_experts(
         source_valid[index] = True
         for name in HISTORY_NAMES:
             experts[expert_name_history(name)][index] = stats[name]
-        for modality, window, alpha in KRR_SPECS:
-            history = prior[-min(window, len(prior)) :]
-            experts[
-                expert_name_krr(modality, window, alpha)
-            ][index] = kernel_ridge_prediction(
-                grams[modality],
-                outcomes,
-                history,
-                index,
-                alpha,
+        krr_rows.append(index)
+        for window in krr_windows:
+            krr_histories[window].append(
+                prior[-min(window, len(prior)) :]
             )
         for modality, neighbors, temperature in SAME_KNN_SPECS:
             experts[
@@ -602,6 +674,26 @@ def build_experts(
                 temperature,
             )
 
+    krr_test = np.asarray(krr_rows, dtype=int)
+    for modality in sorted({modality for modality, _, _ in KRR_SPECS}):
+        for window in krr_windows:
+            alphas = tuple(
+                alpha
+                for spec_modality, spec_window, alpha in KRR_SPECS
+                if spec_modality == modality and spec_window == window
+            )
+            batched = kernel_ridge_predictions(
+                grams[modality],
+                outcomes,
+                krr_histories[window],
+                krr_test,
+                alphas,
+            )
+            for alpha in alphas:
+                experts[
+                    expert_name_krr(modality, window, alpha)
+                ][krr_test] = batched[float(alpha)]
+
     residual = np.full(n_rows, np.nan, dtype=np.float64)
     standardized_residual = np.full(
         n_rows,
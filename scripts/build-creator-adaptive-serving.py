@@ -18,6 +18,13 @@ import numpy as np
 ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
+from creator_adaptive_keep import (  # noqa: E402
+    KRR_ALPHA,
+    KRR_DUAL_MEMBERS,
+    KRR_MODALITIES,
+    kernel_ridge_dual_sha256,
+    profile_kernel_ridge_duals,
+)
 from shorts_score_ledger import GOVERNANCE  # noqa: E402
 
 BENCHMARK_PATH = ROOT / 'scripts/benchmark-causal-keep-mixture.py'
@@ -215,6 +222,23 @@ def build_state(benchmark, rows, visual, together, model):
             ),
         }
 
+    # Solved from the exact float32 histories the archive stores, so the
+    # served features equal a per-score solve bit for bit.
+    profile_histories = {
+        'together': profile_together,
+        'visual': profile_visual,
+    }
+    krr_duals = {}
+    for modality in KRR_MODALITIES:
+        (
+            krr_duals[f'profile_krr_{modality}_mean'],
+            krr_duals[f'profile_krr_{modality}_dual'],
+        ) = profile_kernel_ridge_duals(
+            profile_histories[modality],
+            profile_outcomes,
+            profile_counts,
+        )
+
     model_bytes = MODEL_PATH.read_bytes()
     metadata = {
         'schema': 'creator-adaptive-keep-serving-v1',
@@ -239,6 +263,11 @@ def build_state(benchmark, rows, visual, together, model):
         'referenceN': int(np.sum(source_valid)),
         'stage3TrainingN': int(np.sum(complete)),
         'profiles': profiles,
+        'krrDual': {
+            'alpha': KRR_ALPHA,
+            'members': list(KRR_DUAL_MEMBERS),
+            'sha256': kernel_ridge_dual_sha256(krr_duals),
+        },
         'producer': 'scripts/build-creator-adaptive-serving.py',
         'producerSourceSha256': hashlib.sha256(
             Path(__file__).read_bytes()
@@ -248,7 +277,8 @@ def build_state(benchmark, rows, visual, together, model):
         ).hexdigest(),
         'determinism': (
             'The artifact stores the exact causal reference vectors, '
-            'strictly-earlier profile histories, stage-two bias state, '
+            'strictly-earlier profile histories, their precomputed '
+            'kernel-ridge dual coefficients, stage-two bias state, '
             'and final global stage-three Ridge state.'
         ),
     }
@@ -284,6 +314,7 @@ def build_state(benchmark, rows, visual, together, model):
         ('profile_baseline', profile_baseline),
         ('profile_scale', profile_scale),
         ('profile_stage2_bias', profile_stage2_bias),
+        *((name, krr_duals[name]) for name in KRR_DUAL_MEMBERS),
     ])
     return artifact, metadata
 
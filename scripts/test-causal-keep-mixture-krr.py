@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""Batched causal KRR experts must equal the row-at-a-time reference exactly."""
+
+from __future__ import annotations
+
+import importlib.util
+import sys
+from pathlib import Path
+
+import numpy as np
+
+
+ROOT = Path(__file__).resolve().parents[1]
+PATH = ROOT / "scripts" / "benchmark-causal-keep-mixture.py"
+SPEC = importlib.util.spec_from_file_location("causal_keep_mixture_krr", PATH)
+MODULE = importlib.util.module_from_spec(SPEC)
+assert SPEC and SPEC.loader
+sys.modules[SPEC.name] = MODULE
+SPEC.loader.exec_module(MODULE)
+
+
+def unit_rows(values: np.ndarray) -> np.ndarray:
+    return values / np.linalg.norm(values, axis=1, keepdims=True)
+
+
+def fixture() -> tuple[list[dict], np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(731)
+    rows = []
+    for account, count in (("acct-a", 70), ("acct-b", 55)):
+        # Repeated timestamps exercise equal-batch histories.
+        stamps = np.sort(rng.integers(0, count // 2, size=count))
+        for position, stamp in enumerate(stamps):
+            rows.append({
+                "id": f"{account}-{position}",
+                "account": account,
+                "accountName": account.upper(),
+                "publishedAt": float(stamp),
+                "keep": float(rng.uniform(30, 90)),
+            })
+    visual = unit_rows(rng.normal(size=(len(rows), 12)))
+    together = unit_rows(rng.normal(size=(len(rows), 12)))
+    return rows, visual, together
+
+
+def main() -> None:
+    rows, visual, together = fixture()
+    context = MODULE.build_context(rows)
+    gram = visual @ visual.T
+    outcomes = context["outcomes"]
+
+    histories, tests = [], []
+    for index in range(len(rows)):
+        prior = MODULE.strictly_earlier_history(index, context, False)
+        if len(prior) >= MODULE.MIN_HISTORY:
+            histories.append(prior[-min(30, len(prior)) :])
+            tests.append(index)
+    batched = MODULE.kernel_ridge_predictions(
+        gram,
+        outcomes,
+        histories,
+        np.asarray(tests),
+        (0.03, 1.0),
+    )
+    for alpha in (0.03, 1.0):
+        reference = np.asarray([
+            MODULE.kernel_ridge_prediction(gram, outcomes, history, test, alpha)
+            for history, test in zip(histories, tests)
+        ])
+        assert np.array_equal(batched[alpha], reference), alpha
+
+    checked = 0
+    for freeze_final in (False, True):
+        experts, _, _ = MODULE.build_experts(
+            rows,
+            visual,
+            together,
+            context,
+            freeze_final,
+        )
+        grams = {
+            "visual": visual @ visual.T,
+            "together": together @ together.T,
+        }
+        grams["combined"] = 0.5 * (grams["visual"] + grams["together"])
+        for index in range(len(rows)):
+            prior = MODULE.strictly_earlier_history(index, context, freeze_final)
+            for modality, window, alpha in MODULE.KRR_SPECS:
+                value = experts[MODULE.expert_name_krr(modality, window, alpha)][index]
+                if len(prior) < MODULE.MIN_HISTORY:
+                    assert np.isnan(value)
+                    continue
+                expected = MODULE.kernel_ridge_prediction(
+                    grams[modality],
+                    outcomes,
+                    prior[-min(window, len(prior)) :],
+                    index,
+                    alpha,
+                )
+                assert value == expected, (modality, window, alpha, index)
+                checked += 1
+    assert checked
+    print({"ok": True, "krrPredictionsChecked": checked, "histories": len(histories)})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""Contract: a pooled derived run accepts exactly what the serial run does and frees its shared memory."""
+
+from __future__ import annotations
+
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+from multiprocessing import shared_memory
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parents[1]
+CACHE = tempfile.TemporaryDirectory()
+os.environ["JARVIS_FEATURE_CACHE_DIR"] = CACHE.name
+# Spawned pool workers import the pipeline by module name, so load it from sys.path.
+sys.path.insert(0, str(ROOT / "buildings" / "jarvis"))
+import pipeline as PIPELINE  # noqa: E402
+
+KEYS = [
+    "hook_retention_pct", "retention_50pct", "retention_90pct", "final_5pct_retention",
+    "retention_variance", "like_rate", "comment_rate", "subs_gained_per_view", "duration_log",
+]
+KINDS = [
+    "pair_correlation", "rank_pair_correlation", "conditional_delta_to_views",
+    "quantile_gap_to_views", "residual_pair_to_views", "bridge_strength_pre_to_post",
+]
+SINGLE_KINDS = {"quantile_gap_to_views"}
+# Fields stamped with the wall clock at run time.
+CLOCK_FIELDS = {"id", "ran_at", "created_at", "updated_at"}
+
+
+def video(rng: random.Random, index: int) -> dict:
+    hook = rng.random()
+    views = int(10 ** (2 + 3 * hook + rng.random()))
+    return {
+        "_ytId": f"vid{index}",
+        "_sha256": f"sha{index}",
+        "metadata": {"viewCount": views, "duration": rng.randint(8, 60)},
+        "analytics": {
+            "retentionCurve": [{"retention": max(0.0, 1 - (1 - hook) * i / 100 - 0.1 * rng.random())}
+                               for i in range(100)],
+            "totalViews": views,
+            "likes": rng.randint(0, max(1, views // 20)),
+            "comments": rng.randint(0, 50),
+            "subscribersGained": rng.randint(0, 40),
+        },
+    }
+
+
+def stable(value):
+    if isinstance(value, dict):
+        return {key: stable(item) for key, item in value.items() if key not in CLOCK_FIELDS}
+    if isinstance(value, list):
+        return [stable(item) for item in value]
+    return value
+
+
+def derived_run(videos: list, candidates: dict, workers: int):
+    saved = {}
+    shared = []
+    share = PIPELINE._share_feature_matrix
+
+    def record(features, keys):
+        shm, spec = share(features, keys)
+        shared.append(spec["name"])
+        return shm, spec
+
+    defaults = {PIPELINE.GRAPH_FILE: {"nodes": [], "edges": [], "derived_edges": []}}
+    PIPELINE.load_json = lambda path, default=None: defaults.get(path, [])
+    PIPELINE.save_json = lambda path, data: saved.__setitem__(path, data)
+    PIPELINE.load_videos = lambda: videos
+    PIPELINE.generate_derived_candidates = lambda indicators, existing: candidates
+    PIPELINE._share_feature_matrix = record
+    PIPELINE._FEATURE_MATRIX.update(videos=None, matrix=None)
+    out = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(out):
+            completed = PIPELINE.cmd_derived_run(max_per_kind=6, kinds=KINDS, workers=workers)
+    finally:
+        PIPELINE._share_feature_matrix = share
+    log = [line for line in out.getvalue().splitlines() if "workers=" not in line]
+    return completed, stable(saved[PIPELINE.DERIVED_EXPERIMENTS_FILE]), log, shared
+
+
+def main() -> None:
+    rng = random.Random(5)
+    videos = [video(rng, index) for index in range(240)]
+    pairs = [(a, b) for i, a in enumerate(KEYS) for b in KEYS[i + 1:]]
+    candidates = {kind: [(key,) for key in KEYS] if kind in SINGLE_KINDS else list(pairs) for kind in KINDS}
+
+    serial, serial_derived, serial_log, serial_shared = derived_run(videos, candidates, workers=1)
+    pooled, pooled_derived, pooled_log, pooled_shared = derived_run(videos, candidates, workers=2)
+
+    assert serial_shared == [] and len(pooled_shared) == 1
+    assert sum(serial.values()) > 0
+    assert pooled == serial, (pooled, serial)
+    assert pooled_derived == serial_derived
+    assert pooled_log == serial_log
+    try:
+        shared_memory.SharedMemory(name=pooled_shared[0]).close()
+    except FileNotFoundError:
+        pass
+    else:
+        raise AssertionError(f"shared feature matrix {pooled_shared[0]} was not unlinked")
+    CACHE.cleanup()
+    print("jarvis derived pool contracts passed")
+
+
+if __name__ == "__main__":
+    main()
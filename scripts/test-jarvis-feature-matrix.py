@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""Contracts for the Jarvis pipeline metric registry and columnar feature matrix."""
+
+from __future__ import annotations
+
+import importlib.util
+import math
+import os
+import random
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from scipy import stats
+
+
+ROOT = Path(__file__).resolve().parents[1]
+PATH = ROOT / "buildings" / "jarvis" / "pipeline.py"
+SPEC = importlib.util.spec_from_file_location("jarvis_pipeline", PATH)
+PIPELINE = importlib.util.module_from_spec(SPEC)
+assert SPEC and SPEC.loader
+SPEC.loader.exec_module(PIPELINE)
+
+CURVE_KEYS = [
+    "hook_retention_pct", "final_5pct_retention", "mid_video_cliff", "retention_entropy",
+    "hook_drop_rate", "early_momentum", "retention_25pct", "retention_50pct", "retention_75pct",
+    "retention_90pct", "above_baseline_mean", "peak_count", "drop_count", "max_peak_delta",
+    "max_drop_delta", "retention_variance", "retention_skew",
+]
+ANALYTICS_KEYS = [
+    "view_accel_7day", "week1_week2_ratio", "non_sub_view_share", "swipe_away_rate",
+    "daily_view_peak_day", "like_rate", "comment_rate", "share_rate", "subs_gained_per_view",
+    "subs_per_like", "revenue_per_view",
+]
+
+
+def video(rng: random.Random, index: int, views: int) -> dict:
+    points = rng.choice([0, 4, 12, 30, 101])
+    return {
+        "_ytId": f"vid{index}",
+        "_sha256": f"sha{index}",
+        "metadata": {"viewCount": views, "duration": rng.choice([0, 31, 58])},
+        "transcript": rng.choice(["", "so here is the whole thing we made today"]),
+        "analytics": {
+            "retentionCurve": [{"retention": rng.random() * 1.1} for _ in range(points)],
+            "dailyViews": [{"views": rng.randint(0, 500)} for _ in range(rng.choice([0, 5, 14]))],
+            "totalViews": rng.choice([0, rng.randint(100, 90000)]),
+            "likes": rng.randint(0, 900),
+            "subscribersGained": rng.randint(0, 40),
+            "swipedAwayRate": rng.choice([None, rng.random()]),
+        },
+    }
+
+
+def same(expected, actual) -> bool:
+    if expected is None or actual is None:
+        return expected is actual
+    return float(expected) == float(actual) or (math.isnan(float(expected)) and math.isnan(float(actual)))
+
+
+def check_registry_dispatch() -> None:
+    for key in CURVE_KEYS + ANALYTICS_KEYS:
+        assert key in PIPELINE._METRIC_EXTRACTORS, key
+        assert PIPELINE._interaction_components(key) is None, key
+
+    calls = []
+
+    @PIPELINE.register_metric("contract_probe_metric")
+    def probe(analysis):
+        calls.append(analysis)
+        return (7.0, None)
+
+    try:
+        analysis = {"analytics": {}}
+        assert PIPELINE.extract_metric("contract_probe_metric", analysis) == (7.0, None)
+        assert calls == [analysis]
+    finally:
+        del PIPELINE._METRIC_EXTRACTORS["contract_probe_metric"]
+
+    curve = {"analytics": {"retentionCurve": [{"retention": 1 - i / 100} for i in range(100)]}}
+    assert PIPELINE.extract_metric("hook_retention_pct", curve) == (0.9, None)
+    assert PIPELINE.extract_metric("retention_90pct", curve) == (1 - 90 / 100, None)
+    assert PIPELINE.extract_metric("retention_90pct", {"analytics": None}) == (None, "no curve")
+    # A null (or missing) point reads as no curve there, as in the legacy chain.
+    holes = {"analytics": {"retentionCurve": [{"retention": 1 - i / 100} for i in range(100)]}}
+    holes["analytics"]["retentionCurve"][10] = {"retention": None}
+    holes["analytics"]["retentionCurve"][75] = {}
+    assert PIPELINE.extract_metric("hook_retention_pct", holes) == (None, "no curve")
+    assert PIPELINE.extract_metric("retention_75pct", holes) == (None, "no curve")
+    assert PIPELINE.extract_metric("early_momentum", holes) == (None, "no curve")
+    assert PIPELINE.extract_metric("retention_25pct", holes) == (1 - 25 / 100, None)
+    assert PIPELINE.extract_metric("early_momentum", curve) == (float((1 - 25 / 100) - (1 - 10 / 100)), None)
+    assert PIPELINE.extract_metric("like_rate", {"analytics": {"totalViews": 2000, "likes": 10}}) == (5.0, None)
+    assert PIPELINE.extract_metric("like_rate", {"analytics": {}}) == (None, "no views")
+    # Keys nobody registered still reach the legacy chain.
+    assert "duration_log" not in PIPELINE._METRIC_EXTRACTORS
+    assert PIPELINE.extract_metric("duration_log", {"metadata": {"duration": 100}}) == (2.0, None)
+
+
+def check_feature_matrix(cache: Path) -> None:
+    rng = random.Random(4)
+    videos = [video(rng, index, 0 if index % 5 == 2 else rng.randint(10, 10 ** 6)) for index in range(23)]
+    features = PIPELINE.FeatureMatrix(videos, cache_dir=cache)
+
+    kept = [vid for vid in videos if vid["metadata"]["viewCount"]]
+    assert len(features.videos) == len(kept) == 18
+    assert features.ids == [vid["_ytId"] for vid in kept]
+    for index, vid in enumerate(videos):
+        row = features.rows[index]
+        if not vid["metadata"]["viewCount"]:
+            assert row is None
+            continue
+        assert features.videos[row] is vid
+        assert math.isclose(features.log_views[row], math.log10(vid["metadata"]["viewCount"]))
+
+    interaction = "hook_retention_pct_x_duration_log"
+    keys = CURVE_KEYS + ANALYTICS_KEYS + ["duration_log", "transcript_word_count", interaction]
+    for key in keys:
+        column, valid = features.column(key), features.valid(key)
+        assert column.shape == (len(kept),)
+        for row, vid in enumerate(kept):
+            if key == interaction:
+                a, _ = PIPELINE.extract_metric("hook_retention_pct", vid)
+                b, _ = PIPELINE.extract_metric("duration_log", vid)
+                value = None if a is None or b is None else a * b
+            else:
+                value, reason = PIPELINE.extract_metric(key, vid)
+                if value is None:
+                    assert features.skip_reason(key, row) == reason, (key, row)
+            assert valid[row] == (value is not None and math.isfinite(value)), (key, row)
+            if valid[row]:
+                assert same(value, column[row]), (key, row, value, column[row])
+
+    # Another snapshot's cache survives unless it has gone unused past the max age.
+    active, abandoned = cache / "features-othersnapshot.npz", cache / "features-abandoned.npz"
+    active.write_bytes(b"x")
+    abandoned.write_bytes(b"x")
+    old = time.time() - PIPELINE.FEATURE_CACHE_MAX_AGE - 60
+    os.utime(abandoned, (old, old))
+    features.flush()
+    assert features.path.exists()
+    assert active.exists() and not abandoned.exists()
+    extract = PIPELINE.extract_metric
+    PIPELINE.extract_metric = lambda key, analysis: (_ for _ in ()).throw(AssertionError(key))
+    try:
+        reloaded = PIPELINE.FeatureMatrix(videos, cache_dir=cache)
+        for key in keys:
+            np.testing.assert_array_equal(reloaded.column(key), features.column(key))
+            np.testing.assert_array_equal(reloaded.valid(key), features.valid(key))
+    finally:
+        PIPELINE.extract_metric = extract
+
+    videos[0]["_sha256"] = "changed"
+    assert PIPELINE.FeatureMatrix(videos, cache_dir=cache).path != features.path
+
+
+def check_pair_correlations(cache: Path) -> None:
+    rng = np.random.default_rng(6)
+    x = rng.normal(size=(300, 5))
+    y = 0.5 * x + rng.normal(size=(300, 5))
+    x[rng.random(x.shape) < 0.2] = np.nan
+    y[rng.random(y.shape) < 0.1] = np.inf
+    x[:, 1] = np.round(x[:, 1])
+    y[:, 2] = np.round(2 * y[:, 2])
+    x[:, 3] = 0.1
+    y[5:, 4] = np.nan
+    out = PIPELINE.paired_correlations(x, y)
+    for j in range(x.shape[1]):
+        keep = np.isfinite(x[:, j]) & np.isfinite(y[:, j])
+        assert out["n"][j] == keep.sum(), j
+        if keep.sum() < 3 or np.ptp(x[keep, j]) == 0 or np.ptp(y[keep, j]) == 0:
+            assert all(math.isnan(out[name][j]) for name in ("r", "p_value", "rho", "p_rho")), j
+            continue
+        r, p = stats.pearsonr(x[keep, j], y[keep, j])
+        rho, p_rho = stats.spearmanr(x[keep, j], y[keep, j])
+        assert np.allclose([out["r"][j], out["rho"][j]], [r, rho], rtol=0, atol=1e-12), j
+        assert np.allclose([out["p_value"][j], out["p_rho"][j]], [p, p_rho], rtol=1e-9, atol=1e-300), j
+
+    rng = random.Random(8)
+    videos = [video(rng, index, rng.randint(10, 10 ** 6)) for index in range(80)]
+    features = PIPELINE.FeatureMatrix(videos, cache_dir=cache)
+    paired = PIPELINE.paired_correlations
+    shapes = []
+    PIPELINE.paired_correlations = lambda a, b: shapes.append(a.shape) or paired(a, b)
+    try:
+        pairs = [("like_rate", "retention_50pct"), ("hook_retention_pct", "subs_gained_per_view"),
+                 ("like_rate", "retention_50pct")]
+        result = features.pair_correlations(pairs)
+        features.pair_correlations(pairs[:1])
+    finally:
+        PIPELINE.paired_correlations = paired
+    # Only the two distinct requested pairs are computed, once.
+    assert shapes == [(80, 2)], shapes
+    for a, b in pairs:
+        keep = features.valid(a) & features.valid(b)
+        rho, _ = stats.spearmanr(features.column(a)[keep], features.column(b)[keep])
+        assert result[(a, b)]["n"] == keep.sum()
+        assert math.isclose(result[(a, b)]["rho"], rho, abs_tol=1e-12), (a, b)
+
+    # correlation_matrix expands the cross product over the same kernel; the
+    # symmetric default computes each unordered pair once.
+    keys = ["like_rate", "retention_50pct", "hook_retention_pct"]
+    shapes = []
+    PIPELINE.paired_correlations = lambda a, b: shapes.append(a.shape) or paired(a, b)
+    try:
+        square = features.correlation_matrix(keys)
+        cross = features.correlation_matrix(keys[:2], ["subs_gained_per_view"], spearman=False)
+    finally:
+        PIPELINE.paired_correlations = paired
+    assert square["r"].shape == (3, 3) and cross["r"].shape == (2, 1) and "rho" not in cross
+    # (like_rate, retention_50pct) is already cached from the pair list above.
+    assert shapes == [(80, 5), (80, 2)], shapes
+    np.testing.assert_array_equal(square["rho"], square["rho"].T)
+    for i, a in enumerate(keys):
+        for j, b in enumerate(keys):
+            keep = features.valid(a) & features.valid(b)
+            assert square["n"][i, j] == keep.sum(), (a, b)
+            r, _ = stats.pearsonr(features.column(a)[keep], features.column(b)[keep])
+            assert math.isclose(square["r"][i, j], r, abs_tol=1e-12), (a, b)
+    assert cross["r"][0, 0] == features.pair_correlation("like_rate", "subs_gained_per_view")["r"]
+
+
+def main() -> None:
+    check_registry_dispatch()
+    with tempfile.TemporaryDirectory() as cache:
+        check_pair_correlations(Path(cache))
+    with tempfile.TemporaryDirectory() as cache:
+        check_feature_matrix(Path(cache))
+    print("jarvis feature matrix contracts passed")
+
+
+if __name__ == "__main__":
+    main()
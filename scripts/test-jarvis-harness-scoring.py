@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""Contract: the batched hook-rl / thumb-rl scorers agree with the per-candidate scoring they replaced."""
+
+from __future__ import annotations
+
+import importlib.util
+import math
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+from sklearn.cross_decomposition import PLSRegression
+
+
+ROOT = Path(__file__).resolve().parents[1]
+JARVIS = ROOT / "buildings" / "jarvis"
+# The harnesses read their box .env at import; these keys never leave the process.
+ENV_TEXT = "\n".join([
+    "GEMINI_API_KEY=test", "REPLICATE_API_TOKEN=test", "R2_BUCKET_NAME=bucket",
+    "R2_ACCOUNT_ID=account", "R2_ACCESS_KEY_ID=key", "R2_SECRET_ACCESS_KEY=secret",
+])
+
+
+def load(name: str, path: Path):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    assert spec and spec.loader
+    with mock.patch.object(Path, "read_text", return_value=ENV_TEXT):
+        spec.loader.exec_module(module)
+    return module
+
+
+def unit(rows: np.ndarray) -> np.ndarray:
+    return (rows / (np.linalg.norm(rows, axis=1, keepdims=True) + 1e-8)).astype(np.float32)
+
+
+def map_points(rng: np.random.Generator, rows: int) -> np.ndarray:
+    points = rng.normal(size=(rows, 2)) * 40
+    points[rng.random(rows) < 0.2] = np.nan
+    return points
+
+
+# The per-candidate scorers as they were before batching, against the same module state.
+def old_score_keep(H, emb):
+    en = emb / (np.linalg.norm(emb) + 1e-8)
+    sims = H.real_vecs() @ en
+    order = np.argsort(sims); top = order[-12:][::-1]
+    nbr = [[H._NIDS[0][i], round(float(sims[i]), 4)] for i in top]
+    w = np.maximum(0.001, sims[top]); ke = H._KEEP[0][top]; good = ~np.isnan(ke)
+    keep_pred = float(np.sum(ke[good] * w[good]) / (np.sum(w[good]) + 1e-9))
+    keep_pctile = float((H._KEEPSORT[0] < keep_pred).mean())
+    kxy = H._KXY[0][order[-12:]]; g2 = ~np.isnan(kxy[:, 0])
+    return {"keep_pred": round(keep_pred, 2), "keep_pctile": round(keep_pctile, 4),
+            "nn_cos": float(sims.max()), "x": round(float(np.mean(kxy[g2, 0])), 1),
+            "y": round(float(np.mean(kxy[g2, 1])), 1), "nbr": nbr}
+
+
+def old_score(H, emb):
+    ax = H.axis()
+    z = ((emb - ax["mu"]) / ax["sd"]).reshape(1, -1)
+    pred = float(ax["pls"].predict(z).ravel()[0])
+    pctile = float((ax["pctile_ref"] < pred).mean())
+    en = emb / (np.linalg.norm(emb) + 1e-8)
+    sims = H.real_vecs() @ en
+    order = np.argsort(sims)
+    top = order[-12:][::-1]
+    nbr = [[H._NIDS[0][i], round(float(sims[i]), 4)] for i in top]
+    xy = H._ROWXY[0][order[-12:]]; good = ~np.isnan(xy[:, 0])
+    return {"pred": pred, "pctile": pctile, "nn_cos": float(sims.max()),
+            "nn10_cos": float(np.sort(sims)[-10:].mean()),
+            "x": round(float(np.mean(xy[good, 0])), 1), "y": round(float(np.mean(xy[good, 1])), 1),
+            "nbr": nbr}
+
+
+def old_score_thumb(T, emb):
+    sc = T.scorer()
+    en = emb / (np.linalg.norm(emb) + 1e-8)
+    proj = float(en @ sc["blend"])
+    pctile = float(np.searchsorted(sc["ladder"], proj) / len(sc["ladder"]))
+    sims = T.real_vecs() @ en
+    order = np.argsort(sims); top = order[-12:][::-1]
+    nbr = [[T._RIDS[0][i], round(float(sims[i]), 4)] for i in top]
+    xy = T._XY[0][order[-12:]]; good = ~np.isnan(xy[:, 0])
+    return {"pctile": round(pctile, 4), "proj": round(proj, 4), "nn_cos": float(sims.max()),
+            "x": round(float(np.mean(xy[good, 0])), 1) if good.any() else 0.0,
+            "y": round(float(np.mean(xy[good, 1])), 1) if good.any() else 0.0, "nbr": nbr}
+
+
+def same_scores(expected: dict, actual: dict, label: str) -> None:
+    assert expected.keys() == actual.keys(), (label, expected.keys(), actual.keys())
+    assert [vid for vid, _ in actual["nbr"]] == [vid for vid, _ in expected["nbr"]], label
+    for (_, a), (_, b) in zip(expected["nbr"], actual["nbr"]):
+        assert abs(a - b) <= 1.5e-4, (label, a, b)
+    for key, value in expected.items():
+        if key == "nbr":
+            continue
+        # Cosines come from a GEMM instead of a matrix-vector product: round-off only.
+        tolerance = 0.011 if key == "keep_pred" else 1e-5
+        assert math.isclose(value, actual[key], rel_tol=0, abs_tol=tolerance), (label, key, value, actual[key])
+
+
+def check_hook_harness(rng: np.random.Generator) -> None:
+    H = load("hook_rl_harness", JARVIS / "hook-rl" / "harness.py")
+    rows, dim = 700, 24
+    library = rng.normal(size=(rows, dim)).astype(np.float32)
+    keep = rng.uniform(10, 90, size=rows)
+    keep[rng.random(rows) < 0.15] = np.nan
+    H._REAL[0] = unit(library)
+    H._NIDS[0] = [f"hook{row}" for row in range(rows)]
+    H._ROWXY[0], H._KXY[0] = map_points(rng, rows), map_points(rng, rows)
+    H._KEEP[0], H._KEEPSORT[0] = keep, np.sort(keep[~np.isnan(keep)])
+    H._MAP[0] = True
+    pls = PLSRegression(n_components=3).fit(library, library[:, 0] * 2 + rng.normal(size=rows))
+    H._AX[0] = {"pls": pls, "mu": np.zeros(dim, np.float32), "sd": np.ones(dim, np.float32),
+                "pctile_ref": np.sort(rng.normal(size=400))}
+
+    candidates = rng.normal(size=(37, dim)).astype(np.float32)
+    candidates[:5] = library[:5] + rng.normal(scale=0.05, size=(5, dim))
+    with mock.patch.object(H, "BATCH_ROWS", 16):
+        keeps, scores = H.score_keep_batch(candidates), H.score_batch(candidates)
+    for index, emb in enumerate(candidates):
+        same_scores(old_score_keep(H, emb), keeps[index], f"keep {index}")
+        same_scores(old_score(H, emb), scores[index], f"score {index}")
+        same_scores(old_score_keep(H, emb), H.score_keep(emb), f"single keep {index}")
+    assert H.score_batch([]) == [] and H.score_keep_batch([]) == []
+
+
+def check_thumb_harness(rng: np.random.Generator) -> None:
+    T = load("thumb_rl_harness_long", JARVIS / "thumb-rl" / "harness_long.py")
+    rows, dim = 500, 20
+    library = rng.normal(size=(rows, dim)).astype(np.float32)
+    T._REAL[0] = unit(library)
+    T._RIDS[0] = [f"thumb{row}" for row in range(rows)]
+    T._XY[0] = map_points(rng, rows)
+    T._XY[0][:40] = np.nan
+    T._MAP[0] = True
+    T._SC[0] = {"blend": unit(rng.normal(size=(1, dim)))[0], "ladder": np.sort(rng.normal(scale=0.3, size=300)),
+                "p90": 0.4, "n": 300}
+
+    candidates = rng.normal(size=(29, dim)).astype(np.float32)
+    candidates[:3] = library[:3]
+    with mock.patch.object(T, "BATCH_ROWS", 8):
+        scores = T.score_thumb_batch(candidates)
+    for index, emb in enumerate(candidates):
+        same_scores(old_score_thumb(T, emb), scores[index], f"thumb {index}")
+    assert T.score_thumb_batch([]) == []
+
+
+def main() -> None:
+    rng = np.random.default_rng(20)
+    check_hook_harness(rng)
+    check_thumb_harness(rng)
+    print("jarvis harness scoring contracts passed")
+
+
+if __name__ == "__main__":
+    main()
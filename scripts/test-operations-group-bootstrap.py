@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""The vectorized group bootstrap must resample exactly what the per-replicate loop did."""
+
+from __future__ import annotations
+
+import importlib.util
+import sys
+from pathlib import Path
+
+import numpy as np
+
+
+ROOT = Path(__file__).resolve().parents[1]
+PATH = ROOT / "buildings" / "jarvis" / "operations-lab" / "group_bootstrap.py"
+SPEC = importlib.util.spec_from_file_location("operations_group_bootstrap", PATH)
+MODULE = importlib.util.module_from_spec(SPEC)
+assert SPEC and SPEC.loader
+sys.modules[SPEC.name] = MODULE
+SPEC.loader.exec_module(MODULE)
+
+
+def reference(values, membership, groups, threshold, repeats, seed):
+    """The concatenating loop the engine replaced."""
+    unique_groups = np.asarray(sorted(set(groups.tolist())), dtype=object)
+    by_group = {group: np.where(groups == group)[0] for group in unique_groups}
+    rng = np.random.default_rng(seed)
+    rows = []
+    for _ in range(repeats):
+        sampled = rng.choice(unique_groups, size=len(unique_groups), replace=True)
+        indices = np.concatenate([by_group[group] for group in sampled])
+        inside = membership[indices]
+        if len(np.unique(inside)) < 2:
+            continue
+        sampled_values = values[indices]
+        rows.append([
+            np.mean(sampled_values[inside]) - np.mean(sampled_values[~inside]),
+            np.mean(sampled_values[inside] >= threshold) - np.mean(sampled_values[~inside] >= threshold),
+        ])
+    return np.asarray(rows).reshape(-1, 2)
+
+
+def main() -> None:
+    checked = 0
+    for seed in range(25):
+        rng = np.random.default_rng(seed)
+        rows = int(rng.integers(20, 300))
+        values = rng.normal(60.0, 15.0, rows)
+        # Sparse membership makes some replicates draw no inside row at all.
+        membership = rng.random(rows) < rng.uniform(0.02, 0.5)
+        groups = np.asarray([f"acct-{value}" for value in rng.integers(0, int(rng.integers(2, 30)), rows)],
+                            dtype=object)
+        codes, group_count = MODULE.group_codes(groups)
+        samples = MODULE.bootstrap_mean_differences(
+            codes,
+            group_count,
+            membership,
+            [values, values >= 70.0],
+            repeats=200,
+            seed=seed,
+        )
+        expected = reference(values, membership, groups, 70.0, 200, seed)
+        assert samples.shape == expected.shape, (seed, samples.shape, expected.shape)
+        assert np.allclose(samples, expected, rtol=0.0, atol=1e-9), seed
+        checked += len(samples)
+
+    counts = MODULE.multinomial_counts(np.random.default_rng(3), 7, 50)
+    rng = np.random.default_rng(3)
+    for row in counts:
+        assert np.array_equal(row, np.bincount(rng.integers(0, 7, size=7), minlength=7))
+    assert np.all(counts.sum(axis=1) == 7)
+    print({"ok": True, "replicatesChecked": checked})
+
+
+if __name__ == "__main__":
+    main()
@@ -702,6 +702,52 @@ assert Counter(map(len, views_registry)) == {
     7: 18821,
 }
 
+# The stacked-batch search ranks exactly like scoring one candidate at a time,
+# including the board's tie order when every candidate scores the same.
+search_rng = predictor.np.random.RandomState(3)
+search_X = search_rng.normal(size=(90, 9))
+search_X[search_rng.rand(90, 9) < 0.1] = predictor.np.nan
+search_y = 0.4 * predictor.np.nan_to_num(search_X[:, 2]) + search_rng.normal(size=90)
+search_folds = predictor.deterministic_folds([str(index) for index in range(90)])
+search_datasets = [
+    (search_X[search_folds != fold], search_y[search_folds != fold],
+     search_X[search_folds == fold], search_y[search_folds == fold])
+    for fold in sorted(set(search_folds.tolist()))
+]
+search_registry = predictor.candidate_registry(9, 400)
+search_statistics = []
+search_baseline = 0.0
+for train_X, train_y, test_X, test_y in search_datasets:
+    train_scaled, test_scaled, _, _, _ = predictor.impute_scale(train_X, test_X)
+    train_design = predictor.np.column_stack([predictor.np.ones(len(train_y)), train_scaled])
+    test_design = predictor.np.column_stack([predictor.np.ones(len(test_y)), test_scaled])
+    search_statistics.append({
+        "trainXtX": train_design.T @ train_design,
+        "trainXty": train_design.T @ train_y,
+        "testXtX": test_design.T @ test_design,
+        "testXty": test_design.T @ test_y,
+        "testYty": float(test_y @ test_y),
+    })
+    search_baseline += float(predictor.np.sum((test_y - train_y.mean()) ** 2))
+one_at_a_time = sorted(
+    (
+        (1 - predictor.candidate_sse(search_statistics, candidate, 2.0) / search_baseline, candidate)
+        for candidate in search_registry
+    ),
+    key=lambda item: -item[0],
+)[:25]
+batched_board = predictor.search_candidate_datasets(search_datasets, search_registry, top_n=25)
+assert [row["indices"] for row in batched_board] == [list(candidate) for _, candidate in one_at_a_time]
+assert all(
+    abs(row["score"] - predictor.clean_number(score)) < 1e-4
+    for row, (score, _) in zip(batched_board, one_at_a_time)
+)
+flat_datasets = [(train_X, predictor.np.ones(len(train_X)), test_X, predictor.np.ones(len(test_X)))
+                 for train_X, _, test_X, _ in search_datasets]
+flat_board = predictor.search_candidate_datasets(flat_datasets, search_registry, top_n=4)
+# With equal scores a later candidate never displaces the board.
+assert [row["indices"] for row in flat_board] == [list(candidate) for candidate in search_registry[:4]]
+
 
 # The visual-only study preserves three genuinely different claims. Its plotted
 # point predictions and range diagnostics are persisted rather than recomputed
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""The saved-channel import pipeline overlaps videos without exceeding any stage bound."""
+import os, sys, threading, time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import yt_relay_watcher as worker
+
+raw = worker.raw_scorer
+peak, running, lock = {}, {}, threading.Lock()
+
+
+def staged(stage, result, delay=.05):
+    def run(*args):
+        with lock:
+            running[stage] = running.get(stage, 0) + 1
+            peak[stage] = max(peak.get(stage, 0), running[stage])
+        time.sleep(delay)
+        with lock:
+            running[stage] -= 1
+        return result(*args)
+    return run
+
+
+class Snapshot:
+    def __init__(self):
+        self.active = 0
+
+    def enter(self):
+        self.active += 1
+        return {'artifacts': {}}
+
+    def leave(self):
+        self.active -= 1
+
+
+snapshot = Snapshot()
+raw.resident_snapshot = lambda ttl=None: snapshot
+raw.download_youtube_hook = staged('download', lambda vid, folder: (
+    {'title': 'T ' + vid, 'duration': 31, 'view_count': 7, 'channel': 'C'}, os.path.join(folder, vid), 'ranged'))
+raw.hook_inputs = staged('extract', lambda path: ('b64', 'text ' + os.path.basename(path), True))
+raw.prepare_score = staged('embed', lambda b64, txt, good, dur_s, profile, revisions: {
+    'txt': txt, 'dur_s': dur_s, 'revisions': revisions})
+raw.finish_score = staged('score', lambda prepared, extra, title, mode: dict(
+    extra, txt=prepared['txt'], dur=prepared['dur_s'], title=title, mode=mode))
+
+limits = {'download': 2, 'extract': 1, 'embed': 3, 'score': 1}
+pipeline = worker.ChannelImportPipeline(limits=limits, in_flight=6, subprocess_scoring=False)
+ids = ['vid%08d' % index for index in range(10)]
+for video_id in ids[:6]:
+    pipeline.submit({'id': video_id, 'title': ''})
+records = {}
+while len(records) < len(ids):
+    for video_id, record in pipeline.results(timeout=2):
+        records[video_id] = record
+        submitted = len(records) + len(pipeline.in_flight())
+        if submitted < len(ids):
+            pipeline.submit({'id': ids[submitted], 'title': 'Given ' + ids[submitted]})
+depth = pipeline.queue_depth()
+pipeline.close()
+
+assert all(peak[stage] <= limits[stage] for stage in limits), peak
+assert peak['download'] == 2 and peak['embed'] >= 1, peak
+assert depth['inFlight'] == 0 and all(depth[stage]['done'] == len(ids) for stage in limits), depth
+assert snapshot.active == 0
+first = records[ids[0]]
+assert first['videoId'] == ids[0] and first['sourceUrl'].endswith(ids[0]), first
+assert first['title'] == 'T ' + ids[0] and first['mode'] == 'youtube' and first['dur'] == 31.0, first
+assert first['txt'] == 'text ' + ids[0] and first['sourceAcquisition'] == 'ranged', first
+assert records[ids[-1]]['title'] == 'Given ' + ids[-1]
+
+# A stop makes queued and in-flight videos give up instead of scoring.
+pipeline = worker.ChannelImportPipeline(limits=limits, in_flight=4, subprocess_scoring=False)
+for video_id in ids[:4]:
+    pipeline.submit({'id': video_id})
+pipeline.stop()
+stopped = []
+while pipeline.in_flight():
+    stopped += pipeline.results(timeout=2)
+pipeline.close()
+assert len(stopped) == 4 and all(record.get('stopped') for _, record in stopped), stopped
+assert snapshot.active == 0
+
+bad = worker.ChannelImportPipeline(limits=limits, in_flight=1, subprocess_scoring=False)
+bad.submit({'id': 'x', 'sourceUrl': 'https://example.com/nothing'})
+(_, record), = bad.results(timeout=2)
+bad.close()
+assert record == {'error': 'could not find a YouTube video id in that link'}, record
+# A hung download fails at its deadline, and a failing extract is reported as an extract failure.
+hang = threading.Event()
+download, extract, prepare = raw.download_youtube_hook, raw.hook_inputs, raw.prepare_score
+hung_folders = []
+
+
+def hung_download(vid, folder):
+    if vid != 'hungvideo01':
+        return download(vid, folder)
+    hung_folders.append(folder)
+    hang.wait(30)
+    # The abandoned download still writes into its folder after the job gave up.
+    open(os.path.join(folder, vid + '.part'), 'wb').close()
+    return download(vid, folder)
+
+
+raw.download_youtube_hook = hung_download
+raw.hook_inputs = lambda path: (_ for _ in ()).throw(OSError('ffmpeg exited 1'))
+timed = worker.ChannelImportPipeline(limits=limits, in_flight=2, subprocess_scoring=False,
+                                     deadlines={'download': .8})
+started = time.time()
+timed.submit({'id': 'hungvideo01'})
+timed.submit({'id': 'vid00000000'})
+failures = {}
+while len(failures) < 2:
+    failures.update(timed.results(timeout=5))
+timed.close()
+assert time.time() - started < 5
+assert failures['hungvideo01']['error'].startswith('YouTube download failed: timed out after 0.8s'), failures
+assert failures['vid00000000']['error'] == 'frame extraction failed: ffmpeg exited 1', failures
+assert os.path.isdir(hung_folders[0]), 'the folder was removed under a running download'
+
+# A stop abandons a stage that is still running after the grace period.
+stuck = worker.ChannelImportPipeline(limits=limits, in_flight=1, subprocess_scoring=False, stop_grace=.5)
+stuck.submit({'id': 'hungvideo01'})
+time.sleep(.2)
+started = time.time()
+stuck.stop()
+(_, record), = stuck.results(timeout=5)
+assert record.get('stopped') and time.time() - started < 3, record
+stuck.close()
+assert all(os.path.isdir(folder) for folder in hung_folders)
+hang.set()
+deadline = time.time() + 5
+while any(os.path.isdir(folder) for folder in hung_folders) and time.time() < deadline:
+    time.sleep(.05)
+assert not any(os.path.isdir(folder) for folder in hung_folders), hung_folders
+assert snapshot.active == 0
+
+# An overrun embed keeps its snapshot entered until the embed really returns.
+embed_hang = threading.Event()
+raw.hook_inputs = extract
+raw.prepare_score = lambda *args: embed_hang.wait(30) and prepare(*args)
+slow = worker.ChannelImportPipeline(limits=limits, in_flight=1, subprocess_scoring=False,
+                                    deadlines={'embed': .6})
+slow.submit({'id': 'vid00000001'})
+(_, record), = slow.results(timeout=5)
+slow.close()
+assert record['error'].startswith('embedding failed: timed out after 0.6s'), record
+assert snapshot.active == 1
+embed_hang.set()
+deadline = time.time() + 5
+while snapshot.active and time.time() < deadline:
+    time.sleep(.05)
+assert snapshot.active == 0
+print({'ok': True, 'peaks': peak, 'videos': len(records)})
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""Saved-channel imports journal per-video changes and compact them into the manifest."""
+import hashlib, io, json, os, sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import yt_relay_watcher as worker
+
+CHANNEL = 'ch00000000000000aa'
+MANIFEST_KEY = worker.CHANNEL_ROOT + CHANNEL + '/manifest.json'
+
+
+class FakeS3:
+    def __init__(self):
+        self.objects = {}
+        self.gets, self.puts, self.heads = [], [], []
+
+    def etag(self, key):
+        return '"' + hashlib.md5(self.objects[key], usedforsecurity=False).hexdigest() + '"'
+
+    def fail(self, status, code):
+        error = RuntimeError(code)
+        error.response = {'ResponseMetadata': {'HTTPStatusCode': status}, 'Error': {'Code': code}}
+        raise error
+
+    def list_objects_v2(self, **kwargs):
+        prefix = kwargs.get('Prefix', '')
+        return {'Contents': [{'Key': key, 'ETag': self.etag(key)} for key in sorted(self.objects)
+                             if key.startswith(prefix)],
+                'IsTruncated': False}
+
+    def get_object(self, **kwargs):
+        key = kwargs['Key']
+        self.gets.append(key)
+        if key not in self.objects:
+            self.fail(404, 'NoSuchKey')
+        if kwargs.get('IfMatch') is not None and kwargs['IfMatch'] != self.etag(key):
+            self.fail(412, 'PreconditionFailed')
+        return {'Body': io.BytesIO(self.objects[key]), 'ETag': self.etag(key)}
+
+    def head_object(self, **kwargs):
+        self.heads.append(kwargs['Key'])
+        return {'ETag': self.etag(kwargs['Key'])}
+
+    def put_object(self, **kwargs):
+        key = kwargs['Key']
+        if ((kwargs.get('IfMatch') is not None and (key not in self.objects or self.etag(key) != kwargs['IfMatch']))
+                or (kwargs.get('IfNoneMatch') == '*' and key in self.objects)):
+            self.fail(412, 'PreconditionFailed')
+        self.objects[key] = bytes(kwargs['Body'])
+        self.puts.append(key)
+        return {'ETag': self.etag(key)}
+
+    def delete_objects(self, **kwargs):
+        for item in kwargs['Delete']['Objects']:
+            self.objects.pop(item['Key'], None)
+
+
+def manifest(videos):
+    return {'version': 1, 'id': CHANNEL, 'url': 'https://www.youtube.com/@x', 'name': 'X', 'createdAt': 1000,
+            'status': 'running', 'phase': 'scoring', 'controlRevision': 1, 'controlUpdatedAt': 1000,
+            'videos': [{'id': 'v%010d' % index, 'status': 'queued', 'attempts': 0} for index in range(videos)]}
+
+
+original_s3 = worker.s3
+fake = worker.s3 = FakeS3()
+try:
+    current = worker.save_manifest(manifest(40))
+    snapshot = json.loads(fake.objects[worker.channel_snapshot_key(CHANNEL)])
+    assert snapshot['manifestEtag'] == fake.etag(MANIFEST_KEY)
+
+    # Per-video progress is one small event write; the manifest waits for compaction.
+    journal = worker.ChannelJournal(CHANNEL, compact_events=5, compact_seconds=3600)
+    fake.puts.clear()
+    for video in current['videos'][:4]:
+        video.update({'status': 'error', 'attempts': 1, 'error': 'boom'})
+        current = journal.append(current, video, current={'id': video['id'], 'title': None, 'number': 1})
+    assert MANIFEST_KEY not in fake.puts and len(fake.puts) == 4, fake.puts
+    assert current['failed'] == 4 and current['current']['id'] == 'v0000000003'
+    events = worker.list_json(worker.channel_journal_prefix(CHANNEL))
+    assert len(events) == 4 and events == sorted(events)
+
+    # A crash here leaves the events; the next import replays them. Events from before
+    # a later resume only keep finished rows.
+    fresh = json.loads(fake.objects[MANIFEST_KEY])
+    assert all(video['status'] == 'queued' for video in fresh['videos'])
+    done = dict(fresh['videos'][5], status='done', attempts=1)
+    worker.put_json(worker.channel_journal_prefix(CHANNEL) + '0000000000001-00000001.json',
+                    {'schema': worker.CHANNEL_JOURNAL_SCHEMA, 'at': 1, 'video': done, 'fields': {'status': 'x'}})
+    fresh['controlUpdatedAt'] = 500
+    replayed = worker.replay_channel_journal(fresh)
+    assert [video['status'] for video in replayed['videos'][:6]] == ['error'] * 4 + ['queued', 'done']
+    assert replayed['status'] == 'running' and replayed['failed'] == 4
+    assert not worker.list_json(worker.channel_journal_prefix(CHANNEL))
+
+    # Reaching the event threshold compacts into one manifest write.
+    journal = worker.ChannelJournal(CHANNEL, compact_events=3, compact_seconds=3600)
+    current = replayed
+    fake.puts.clear()
+    for video in current['videos'][6:9]:
+        video.update({'status': 'scoring', 'attempts': 1})
+        current = journal.append(current, video)
+    assert fake.puts.count(MANIFEST_KEY) == 1 and not journal.pending
+    assert not worker.list_json(worker.channel_journal_prefix(CHANNEL))
+    assert json.loads(fake.objects[MANIFEST_KEY])['videos'][8]['status'] == 'scoring'
+
+    # Index rebuilds read the compacted snapshot while it matches the listed manifest ETag.
+    fake.gets.clear()
+    index = worker.rebuild_channel_index_from_manifests(updated_at=9000)
+    assert MANIFEST_KEY not in fake.gets and index['channels'][0]['queued'] == current['queued']
+    assert MANIFEST_KEY not in fake.heads
+    fake.objects[MANIFEST_KEY] = fake.objects[MANIFEST_KEY].replace(b'"name":"X"', b'"name":"Y"')
+    fake.gets.clear()
+    index = worker.rebuild_channel_index_from_manifests(updated_at=9001)
+    assert MANIFEST_KEY in fake.gets and index['channels'][0]['name'] == 'Y'
+
+    # Stop flags come from control.json unless it predates the manifest's control revision.
+    worker.seed_channel_control(current)
+    assert worker.channel_stop_requested(current) is False
+    fake.gets.clear()
+    worker.put_json(worker.channel_control_key(CHANNEL),
+                    {'id': CHANNEL, 'controlRevision': 2, 'stopRequested': True})
+    assert worker.channel_stop_requested(current) is True and MANIFEST_KEY not in fake.gets
+    assert worker.channel_stop_requested(dict(current, controlRevision=3)) is False
+    assert MANIFEST_KEY in fake.gets
+
+    # A control write that failed after the manifest saved its stop flag is caught on
+    # the periodic manifest poll.
+    stopped = json.loads(fake.objects[MANIFEST_KEY])
+    stopped.update(stopRequested=True, controlRevision=4)
+    fake.objects[MANIFEST_KEY] = json.dumps(stopped).encode()
+    worker.put_json(worker.channel_control_key(CHANNEL), {'id': CHANNEL, 'controlRevision': 2, 'stopRequested': False})
+    assert worker.channel_stop_requested(current, 1) is False
+    assert worker.channel_stop_requested(current, worker.CHANNEL_STOP_MANIFEST_EVERY) is True
+finally:
+    worker.s3 = original_s3
+print({'ok': True, 'eventsBeforeCompaction': 4})
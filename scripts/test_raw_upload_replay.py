@@ -562,11 +562,11 @@ def test_channel_free_outputs_fail_closed_and_silent_inputs_are_explicit():
 
 
 def test_production_lookup_precedes_embedding():
-    source = inspect.getsource(RAW._run)
+    source = inspect.getsource(RAW.prepare_score)
     lookup = source.index('_score_replay_prepare(')
-    return_on_hit = source.index("if replay.get('score') is not None:")
-    first_embedding = source.index('ev = embed(')
-    assert lookup < return_on_hit < first_embedding
+    embed_on_miss = source.index("if replay.get('score') is None:")
+    first_embedding = source.index("prepared['ev'] = embed(")
+    assert lookup < embed_on_miss < first_embedding
 
 
 def test_channel_free_formula_replays_all_four_frozen_coordinates():
@@ -638,6 +638,141 @@ def test_revision_pinned_reads_fail_closed_on_mutation():
         )
 
 
+def test_serve_daemon_shares_one_pinned_snapshot_and_answers_like_the_cli():
+    fake_s3 = FakeS3()
+    key = RAW.VISUAL_KEEP_MODEL_MANIFEST_KEY
+    fake_s3.objects[key] = b'{"release":"one"}'
+    RAW.s3 = fake_s3
+    snapshot = revisions('a')
+    snapshot['artifacts'][key] = RAW._object_revision(key)
+    lookups = []
+    seen = []
+
+    def lookup():
+        lookups.append(1)
+        return snapshot
+
+    def fake_run(argv, pinned):
+        # everything pinned-and-verified is read from R2 once, then served from memory
+        payload = RAW.r2_get(key)
+        seen.append((pinned is snapshot, RAW._PINNED_ARTIFACT_REVISIONS.get(key, {}).get('etag')))
+        return {'argv': argv, 'payload': payload.decode()}
+
+    reads = []
+    original_get, original_run, original_lookup = fake_s3.get_object, RAW._run, RAW._score_revisions
+    fake_s3.get_object = lambda **request: reads.append(request['Key']) or original_get(**request)
+    RAW._run, RAW._score_revisions = fake_run, lookup
+    requests = [json.dumps({'id': f'r{index}', 'argv': ['--image', f'/tmp/{index}.jpg']}) for index in range(4)]
+    out = io.StringIO()
+    try:
+        RAW.serve(
+            stdin=io.StringIO('\n'.join(requests + ['{"id": "bad", "argv": "--file x"}', '{"id": "s", "op": "stats"}']) + '\n'),
+            stdout=out,
+            workers=2,
+            ttl=3600,
+        )
+    finally:
+        RAW._run, RAW._score_revisions = original_run, original_lookup
+        RAW._RESIDENT_PAYLOADS = RAW._RESIDENT_EMB = RAW._RESIDENT_SNAPSHOT = None
+        RAW._reset_resident_state()
+    replies = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert replies[0]['ready'] is True
+    by_id = {reply['id']: reply for reply in replies[1:]}
+    for index in range(4):
+        assert by_id[f'r{index}']['result'] == {
+            'argv': ['--image', f'/tmp/{index}.jpg'],
+            'payload': '{"release":"one"}',
+        }
+    assert by_id['bad']['result']['error'].startswith('bad request')
+    assert 'requests' in by_id['s']['stats']
+    assert len(lookups) == 1
+    assert set(reads) == {key} and len(reads) <= 2   # two workers may both miss before either stores it
+    assert seen == [(True, snapshot['artifacts'][key]['etag'])] * 4
+
+
+def test_serve_daemon_cancels_one_queued_request_and_tags_its_logs():
+    import threading
+    released = threading.Event()
+    ran = []
+
+    def fake_run(argv, pinned):
+        print(f'scoring {argv[-1]}', file=sys.stderr, flush=True)
+        if argv[-1] == 'slow':
+            released.wait(5)
+        ran.append(argv[-1])
+        return {'argv': argv}
+
+    def stdin():
+        yield json.dumps({'id': 'r0', 'argv': ['--image', 'slow']}) + '\n'
+        yield json.dumps({'id': 'r1', 'argv': ['--image', 'queued']}) + '\n'
+        yield json.dumps({'id': 'r2', 'argv': ['--image', 'kept']}) + '\n'
+        yield json.dumps({'op': 'cancel', 'id': 'r1'}) + '\n'
+        released.set()
+
+    original_run, original_lookup = RAW._run, RAW._score_revisions
+    RAW._run, RAW._score_revisions = fake_run, lambda: revisions('a')
+    out, logs = io.StringIO(), io.StringIO()
+    try:
+        RAW.serve(stdin=stdin(), stdout=out, workers=1, ttl=3600, stderr=logs)
+    finally:
+        RAW._run, RAW._score_revisions = original_run, original_lookup
+        RAW._RESIDENT_PAYLOADS = RAW._RESIDENT_EMB = RAW._RESIDENT_SNAPSHOT = None
+        RAW._reset_resident_state()
+    by_id = {reply.get('id'): reply for reply in map(json.loads, out.getvalue().splitlines())}
+    assert by_id['r1']['result'] == {'error': 'cancelled'}
+    assert by_id['r0']['result'] == {'argv': ['--image', 'slow']}
+    assert by_id['r2']['result'] == {'argv': ['--image', 'kept']}
+    assert ran == ['slow', 'kept']
+    lines = logs.getvalue().splitlines()
+    assert '[id:r0] scoring slow' in lines and '[id:r2] scoring kept' in lines
+    assert not any('queued' in line for line in lines)
+    assert not isinstance(sys.stderr, RAW._RequestTaggedStream)   # serve() restored the process streams
+
+
+def test_resident_payloads_are_bounded_by_count_and_bytes():
+    original = RAW._RESIDENT_PAYLOAD_MAX_ENTRIES, RAW._RESIDENT_PAYLOAD_BUDGET_BYTES
+    RAW._RESIDENT_PAYLOAD_MAX_ENTRIES, RAW._RESIDENT_PAYLOAD_BUDGET_BYTES = 3, 10
+    try:
+        RAW.resident_snapshot(3600)
+        for index in range(5):
+            RAW._keep_resident(f'k{index}', {'sha256': f'{index:064x}'}, b'1234')
+        # 10 bytes hold two 4-byte payloads; the oldest went first.
+        assert list(RAW._RESIDENT_PAYLOADS) == [('k3', f'{3:064x}'), ('k4', f'{4:064x}')]
+        assert RAW._RESIDENT_PAYLOAD_BYTES == 8
+        RAW._RESIDENT_PAYLOAD_BUDGET_BYTES = 1000
+        for index in range(5, 9):
+            RAW._keep_resident(f'k{index}', {'sha256': f'{index:064x}'}, b'1234')
+        assert [key for key, _ in RAW._RESIDENT_PAYLOADS] == ['k6', 'k7', 'k8']
+    finally:
+        RAW._RESIDENT_PAYLOAD_MAX_ENTRIES, RAW._RESIDENT_PAYLOAD_BUDGET_BYTES = original
+        RAW._RESIDENT_PAYLOADS = RAW._RESIDENT_EMB = RAW._RESIDENT_SNAPSHOT = None
+        RAW._reset_resident_state()
+
+
+def test_revision_snapshot_swaps_only_after_in_flight_requests_drain():
+    import threading
+    versions = [revisions('a'), revisions('b')]
+    snapshot = RAW._RevisionSnapshot(ttl=0, lookup=lambda: versions[min(len(swapped), 1)])
+    swapped = []
+    original_reset = RAW._reset_resident_state
+    RAW._reset_resident_state = lambda fresh=None: swapped.append(fresh['scorer']['sha256'])
+    try:
+        first = snapshot.enter()
+        assert first['scorer']['sha256'] == 'scorer-a'
+        entered = []
+        waiter = threading.Thread(target=lambda: entered.append(snapshot.enter()))
+        waiter.start()
+        waiter.join(0.2)
+        assert waiter.is_alive() and not entered   # the 'b' swap waits on the in-flight 'a' request
+        snapshot.leave()
+        waiter.join(5)
+        assert entered[0]['scorer']['sha256'] == 'scorer-b'
+        snapshot.leave()
+        assert swapped == ['scorer-a', 'scorer-b'] and snapshot.swaps == 2
+    finally:
+        RAW._reset_resident_state = original_reset
+
+
 if __name__ == '__main__':
     original_s3 = RAW.s3
     try:
@@ -653,6 +788,10 @@ if __name__ == '__main__':
         test_production_lookup_precedes_embedding()
         test_channel_free_formula_replays_all_four_frozen_coordinates()
         test_revision_pinned_reads_fail_closed_on_mutation()
+        test_serve_daemon_shares_one_pinned_snapshot_and_answers_like_the_cli()
+        test_serve_daemon_cancels_one_queued_request_and_tags_its_logs()
+        test_resident_payloads_are_bounded_by_count_and_bytes()
+        test_revision_snapshot_swaps_only_after_in_flight_requests_drain()
     finally:
         RAW._PINNED_ARTIFACT_REVISIONS = {}
         RAW.s3 = original_s3
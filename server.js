@@ -1903,6 +1903,8 @@ function spawnRawPython(args, options) {
     return child;
 }
 function killRawPythonTree(child, signal = 'SIGKILL') {
+    // A resident-worker job cancels only itself (see createJsonLineWorker).
+    if (child && typeof child.cancel === 'function') return child.cancel(signal);
     if (!child || !child.pid) return;
     try {
         if (process.platform !== 'win32') process.kill(-child.pid, signal);
@@ -1911,6 +1913,170 @@ function killRawPythonTree(child, signal = 'SIGKILL') {
         try { child.kill(signal); } catch (_) {}
     }
 }
+// A resident Python worker speaking JSON lines: each request is one stdin line with an
+// `id`, each reply one stdout line echoing it. submit() returns a job emitter ('reply' with
+// the message, or 'exit' if the worker died first or the job was cancelled). The worker
+// prefixes its stderr lines with `[id:<id>] ` while it works on a request; those lines are
+// relayed on that job's 'stderr' only, untagged ones go to the server log. killRawPythonTree
+// on a job cancels that job alone: the worker gets a {"op": "cancel"} line (a queued request
+// is dropped, a running one finishes and its reply is discarded) and the job exits as killed.
+// The worker process itself is torn down only once every job it still holds is a cancelled
+// one — e.g. a hung request — and the next submit starts a fresh one.
+function createJsonLineWorker(label, args, options) {
+    const { EventEmitter } = require('events');
+    let worker = null;
+    const start = () => {
+        const child = spawnRawPython(args, { ...(options || {}), stdio: ['pipe', 'pipe', 'pipe'] });
+        const state = { child, jobs: new Map(), abandoned: new Set(), seq: 0, exited: false, buffered: '', errBuffered: '' };
+        const reapIfAbandoned = () => {
+            if (!state.exited && state.jobs.size === 0 && state.abandoned.size > 0) {
+                console.log(`[${label}] stopping: only cancelled requests still running`);
+                killRawPythonTree(child);
+            }
+        };
+        state.cancel = (id, signal) => {
+            const job = state.jobs.get(id);
+            if (!job) return;
+            state.jobs.delete(id);
+            state.abandoned.add(id);
+            try { child.stdin.write(JSON.stringify({ op: 'cancel', id }) + '\n'); } catch (_) {}
+            job.emit('exit', null, signal || 'SIGKILL');
+            reapIfAbandoned();
+        };
+        child.stdout.on('data', chunk => {
+            state.buffered += chunk;
+            let newline;
+            while ((newline = state.buffered.indexOf('\n')) >= 0) {
+                const line = state.buffered.slice(0, newline);
+                state.buffered = state.buffered.slice(newline + 1);
+                let message = null;
+                try { message = JSON.parse(line); } catch (e) { continue; }
+                if (!message) continue;
+                if (state.abandoned.delete(message.id)) continue;
+                const job = state.jobs.get(message.id);
+                if (!job) continue;
+                state.jobs.delete(message.id);
+                job.emit('reply', message);
+                reapIfAbandoned();
+            }
+        });
+        child.stderr.on('data', chunk => {
+            state.errBuffered += chunk;
+            let newline;
+            while ((newline = state.errBuffered.indexOf('\n')) >= 0) {
+                const line = state.errBuffered.slice(0, newline);
+                state.errBuffered = state.errBuffered.slice(newline + 1);
+                const tagged = /^\[id:([^\]]+)\] /.exec(line);
+                const job = tagged && state.jobs.get(tagged[1]);
+                if (job) job.stderr.emit('data', line.slice(tagged[0].length) + '\n');
+                else console.log(`[${label}]`, line.slice(0, 500));
+            }
+            if (state.errBuffered.length > 65536) state.errBuffered = state.errBuffered.slice(-8192);
+        });
+        const finish = (code, signal) => {
+            if (state.exited) return;
+            state.exited = true;
+            for (const job of state.jobs.values()) job.emit('exit', code, signal || 'SIGKILL');
+            state.jobs.clear();
+            state.abandoned.clear();
+            console.log(`[${label}] exit`, code, signal || '');
+        };
+        child.on('close', finish);
+        child.on('error', error => {
+            for (const job of state.jobs.values()) job.emit('error', error);
+            state.jobs.clear();
+            finish(null, null);
+        });
+        child.stdin.on('error', () => {});
+        return state;
+    };
+    return {
+        submit(message) {
+            if (!worker || worker.exited) worker = start();
+            const owner = worker;
+            const job = new EventEmitter();
+            job.stderr = new EventEmitter();
+            const id = `job-${++owner.seq}`;
+            job.id = id;
+            job.cancel = signal => owner.cancel(id, signal);
+            job.kill = job.cancel;
+            owner.jobs.set(id, job);
+            owner.child.stdin.write(JSON.stringify({ ...message, id }) + '\n');
+            return job;
+        },
+    };
+}
+// Score jobs go to ONE warm `raw_upload.py --serve` worker instead of a fresh interpreter
+// per upload (imports, ~20 R2 revision HEADs, mmap opens and pinned model downloads on
+// every score). spawnRawScorer returns a child-like handle — stdout 'data' carries the
+// exact JSON line the CLI prints, then 'close' — so call sites are unchanged, timeout
+// kills included. RAW_SCORE_DAEMON=0 → one spawn per job, as before.
+const RAW_SCORE_DAEMON = process.env.RAW_SCORE_DAEMON !== '0';
+const rawScoreWorker = createJsonLineWorker(
+    'raw-score-daemon',
+    [path.join(__dirname, 'raw_upload.py'), '--serve'],
+    { env: { ...RAW_PY_ENV, RAW_SCORE_DAEMON_WORKERS: String(HEAVY_SCORE_LIMIT) } },
+);
+function spawnRawScorer(args) {
+    if (!RAW_SCORE_DAEMON) return spawnRawPython(args);
+    const { EventEmitter } = require('events');
+    const job = rawScoreWorker.submit({ argv: args.slice(1) });
+    job.stdout = new EventEmitter();
+    job.on('reply', message => {
+        job.stdout.emit('data', JSON.stringify(message.result) + '\n');
+        job.emit('close', 0, null);
+    });
+    job.on('exit', (code, signal) => job.emit('close', code, signal));
+    return job;
+}
+// Promise Lab openings go to a resident `score_hook.py --serve` that keeps the frozen
+// partition/opening/retention models parsed and the embedding cache open between
+// requests. Each request is submitted as it arrives; the scorer coalesces whatever is
+// waiting into one batch, and a timed-out request is cancelled alone (createJsonLineWorker).
+// PROMISE_HOOK_RESIDENT=0 → one `--json-stdin` process per request, as before.
+const PROMISE_HOOK_RESIDENT = process.env.PROMISE_HOOK_RESIDENT !== '0';
+const promiseHookWorker = createJsonLineWorker(
+    'promise-hook-scorer',
+    [path.join(__dirname, 'buildings/jarvis/promise-lab/score_hook.py'), '--serve'],
+    { env: RAW_PY_ENV },
+);
+function scorePromiseHookResident(opening) {
+    const scoreTimeout = Math.max(
+        300000,
+        parseInt(process.env.PROMISE_HOOK_SCORE_TIMEOUT_MS || '900000', 10),
+    );
+    const maximumOutputBytes = Math.max(
+        32 * 1024 * 1024,
+        parseInt(process.env.PROMISE_HOOK_MAX_OUTPUT_BYTES || String(128 * 1024 * 1024), 10),
+    );
+    return new Promise((ok, no) => {
+        const job = promiseHookWorker.submit({ openings: [opening] });
+        let se = '';
+        let settled = false;
+        const settle = (fn, value) => {
+            if (settled) return;
+            settled = true;
+            clearTimeout(timer);
+            fn(value);
+        };
+        const timer = setTimeout(() => {
+            killRawPythonTree(job);
+            settle(no, new Error('hook scorer timeout'));
+        }, scoreTimeout);
+        job.stderr.on('data', d => { se += d; if (se.length > 20000) se = se.slice(-20000); });
+        job.on('reply', message => {
+            const row = (message.results || [])[0] || {};
+            if (message.error || row.error) return settle(no, new Error(message.error || row.error));
+            if (Buffer.byteLength(JSON.stringify(row.result || {}), 'utf8') > maximumOutputBytes) {
+                return settle(no, new Error(`hook scorer exceeded the configured ${maximumOutputBytes}-byte response budget`));
+            }
+            console.log('[promise-hook] scored', JSON.stringify(row.timingsMs || {}));
+            settle(ok, row.result);
+        });
+        job.on('exit', code => settle(no, new Error((se.trim().split('\n').pop() || `hook scorer exited ${code}`).slice(-240))));
+        job.on('error', error => settle(no, error));
+    });
+}
 function validateRawScoreResult(result, options = {}) {
     if (!result || typeof result !== 'object') throw new Error('scorer returned no JSON result');
     if (result.error) throw new Error(result.error);
@@ -6349,9 +6515,35 @@ async function refreshSavedChannelIndexEntry(id) {
     );
 }
 
+// The import worker polls this small object for stop flags instead of
+// re-downloading the whole manifest every few seconds.
+async function writeSavedChannelControl(manifest) {
+    await cloud.uploadToR2(
+        `${SAVED_CHANNEL_ROOT}${manifest.id}/control.json`,
+        Buffer.from(JSON.stringify({
+            schema: 'saved-channel-control-v1',
+            id: manifest.id,
+            controlRevision: Number.isSafeInteger(manifest.controlRevision)
+                ? manifest.controlRevision
+                : 0,
+            controlIntent: manifest.controlIntent || null,
+            stopRequested: manifest.stopRequested === true,
+        })),
+        'application/json'
+    );
+}
+
+// control.json is written as soon as the manifest CAS lands, before the slower index
+// refresh can fail; the worker also re-reads the manifest every few stop polls in case
+// this write itself fails.
 async function mutateSavedChannelManifest(id, mutator) {
-    await savedChannelManifestCas(id).mutate(mutator);
-    return refreshSavedChannelIndexEntry(id);
+    const written = await savedChannelManifestCas(id).mutate(mutator);
+    if (written) await writeSavedChannelControl(written);
+    const manifest = await refreshSavedChannelIndexEntry(id);
+    if (!written || manifest.controlRevision !== written.controlRevision) {
+        await writeSavedChannelControl(manifest);
+    }
+    return manifest;
 }
 
 async function removeSavedChannelIndex(id) {
@@ -6816,6 +7008,7 @@ async function handlePromiseHookScore(req, res) {
             return runHeavyScoreInteractive(() => {
                 if (job) { job.status = 'running'; job.ts = Date.now(); }
                 return new Promise((ok, no) => {
+            if (PROMISE_HOOK_RESIDENT) return scorePromiseHookResident({ text, durationSeconds }).then(ok, no);
             const script = path.join(__dirname, 'buildings/jarvis/promise-lab/score_hook.py');
             const py = spawn(RAW_PYTHON, [script, '--json-stdin'], { env: RAW_PY_ENV, stdio: ['pipe', 'pipe', 'pipe'] });
             let so = '', se = '';
@@ -7940,7 +8133,7 @@ async function handleHttpRequest(req, res) {
         const t0 = Date.now();
         try {
             const r = await runHeavyScoreInteractive(() => new Promise(ok => {
-                const py = spawnRawPython([path.join(__dirname, 'raw_upload.py'), '--image', tmpImg, '--text', 'selftest hook do not save', '--title', 'selftest']);
+                const py = spawnRawScorer([path.join(__dirname, 'raw_upload.py'), '--image', tmpImg, '--text', 'selftest hook do not save', '--title', 'selftest']);
                 let out = '', err = '';
                 let timedOut = false;
                 py.stdout.on('data', d => out += d); py.stderr.on('data', d => err += d);
@@ -8429,7 +8622,7 @@ async function handleHttpRequest(req, res) {
                 ytArgs.push('--creator-profile', creatorProfile);
             }
             const ytRunner = () => runHeavyScoreInteractive(() => new Promise((ok, no) => {
-                const py = spawnRawPython(ytArgs);
+                const py = spawnRawScorer(ytArgs);
                 let out = '', err = '';
                 let timedOut = false;
                 py.stdout.on('data', d => out += d); py.stderr.on('data', d => err += d);
@@ -8539,7 +8732,7 @@ async function handleHttpRequest(req, res) {
                                 }
                                 scored = await runHeavyScoreInteractive(
                                     () => new Promise((resolve, reject) => {
-                                        const py = spawnRawPython(relayArgs);
+                                        const py = spawnRawScorer(relayArgs);
                                         let stdout = '', stderr = '';
                                         let timedOut = false;
                                         py.stdout.on(
@@ -8858,7 +9051,7 @@ async function handleHttpRequest(req, res) {
                 const upT0 = Date.now();
                 const upRunner = () => runHeavyScoreInteractive(() => new Promise((ok, no) => {
                         lastRawUpload = { ...(lastRawUpload || {}), stage: 'scoring', scoringAt: Date.now(), cgroupBeforeMB: (rawBoxStats().cgroup || {}).currentMB || null };
-                        const py = spawnRawPython(pyArgs);
+                        const py = spawnRawScorer(pyArgs);
                         let out = '', err = '';
                         let timedOut = false;
                         py.stdout.on('data', d => out += d); py.stderr.on('data', d => err += d);
@@ -9141,7 +9334,7 @@ async function handleHttpRequest(req, res) {
                 monArgs.push('--creator-profile', creatorProfile);
             }
             const monRunner = () => runHeavyScoreInteractive(() => new Promise((ok, no) => {
-                    const py = spawnRawPython(monArgs);
+                    const py = spawnRawScorer(monArgs);
                     let out = '', err = '';
                     let timedOut = false;
                     py.stdout.on('data', d => out += d); py.stderr.on('data', d => err += d);
@@ -25245,7 +25438,7 @@ async function scoreMontage(
                 const args = [path.join(__dirname, 'raw_upload.py'), '--image', tmp, '--text', String(text || '').slice(0, 2000), '--title', String(title || 'grind').slice(0, 80)];
                 const profile = safeCreatorProfile(creatorProfile);
                 if (profile) args.push('--creator-profile', profile);
-                const py = spawnRawPython(args);
+                const py = spawnRawScorer(args);
                 let out = '', err2 = '';
                 let settled = false;
                 let stopCheckActive = false;
@@ -0,0 +1,167 @@
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+import corpus_snapshot
+import embedding_archive
+
+
+class MissingKey(Exception):
+    response = {'ResponseMetadata': {'HTTPStatusCode': 404}, 'Error': {'Code': 'NoSuchKey'}}
+
+
+class FakeS3:
+    def __init__(self):
+        self.objects = {}
+        self.downloads = []
+
+    def etag(self, key):
+        return '"' + hashlib.md5(self.objects[key], usedforsecurity=False).hexdigest() + '"'
+
+    def get_object(self, Bucket, Key):
+        if Key not in self.objects:
+            raise MissingKey(Key)
+        return {'Body': io.BytesIO(self.objects[Key]), 'ETag': self.etag(Key)}
+
+    def head_object(self, Bucket, Key):
+        if Key not in self.objects:
+            raise MissingKey(Key)
+        return {'ETag': self.etag(Key)}
+
+    def download_file(self, Bucket, Key, Filename):
+        self.downloads.append(Key)
+        with open(Filename, 'wb') as handle:
+            handle.write(self.objects[Key])
+
+    def put(self, key, payload, content_type=None):
+        self.objects[key] = bytes(payload)
+
+
+def columns(ids, dim=5, seed=0):
+    rng = np.random.RandomState(seed)
+    return {
+        'ids': np.array(ids, object),
+        'vecs': rng.normal(size=(len(ids), dim)).astype(np.float32) * 3,
+        'views': np.arange(len(ids), dtype=float) * 100,
+        'title': np.array([f'title {vid}' for vid in ids], object),
+    }
+
+
+def put_npz(s3, chan, arrays):
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, **arrays)
+    s3.put(f'raw/{chan}/embeddings.npz', buffer.getvalue())
+
+
+def unit(rows):
+    return rows / (np.linalg.norm(rows, axis=1, keepdims=True) + 1e-9)
+
+
+class CorpusSnapshotTest(unittest.TestCase):
+    def setUp(self):
+        self.s3 = FakeS3()
+        self.cache = tempfile.mkdtemp()
+        shards = tempfile.mkdtemp()
+        for folder in (self.cache, shards):
+            self.addCleanup(shutil.rmtree, folder, ignore_errors=True)
+        patches = [
+            mock.patch.object(corpus_snapshot, '_OPEN', {}),
+            mock.patch.object(embedding_archive, 'CACHE_DIR', shards),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def open(self, chan):
+        return corpus_snapshot.open_channel(self.s3, 'bucket', chan, self.cache)
+
+    def test_npz_snapshot_is_unit_columnar_and_downloaded_once(self):
+        arrays = columns([f'v{index}' for index in range(9000)])
+        put_npz(self.s3, 'visual', arrays)
+        snap = self.open('visual')
+        self.assertFalse(snap.vecs.flags.writeable)
+        np.testing.assert_allclose(snap.vecs, unit(arrays['vecs']), rtol=1e-6)
+        self.assertEqual(snap.ids.tolist(), list(arrays['ids']))
+        self.assertEqual(snap.column('title')[3], 'title v3')
+        np.testing.assert_array_equal(snap.column('views'), arrays['views'])
+        self.assertFalse(snap.column('mine').any())
+        with self.assertRaises(RuntimeError):
+            snap.column('outlier')
+        corpus_snapshot._OPEN.clear()
+        self.assertEqual(self.open('visual').revision, snap.revision)
+        self.assertEqual(self.s3.downloads, ['raw/visual/embeddings.npz'])
+        self.assertEqual(os.listdir(os.path.dirname(snap.path)), [os.path.basename(snap.path)])
+
+    def test_segmented_archive_wins_and_a_new_revision_replaces_the_old(self):
+        put_npz(self.s3, 'text', columns(['a', 'b']))
+        arrays = columns(['a', 'b', 'c'], seed=1)
+        manifest = embedding_archive.save('raw/text/segments', arrays, self.s3.put)
+        snap = self.open('text')
+        self.assertTrue(snap.revision.startswith('segments-float32-'))
+        self.assertEqual(self.s3.downloads, [])
+        self.assertEqual(snap.ids.tolist(), ['a', 'b', 'c'])
+        np.testing.assert_allclose(snap.vecs, unit(arrays['vecs']), rtol=1e-6)
+        grown = columns(['a', 'b', 'c', 'd'], seed=1)
+        embedding_archive.save('raw/text/segments', grown, self.s3.put, previous=manifest)
+        newer = self.open('text')
+        self.assertNotEqual(newer.revision, snap.revision)
+        self.assertEqual(len(newer), 4)
+        self.assertEqual(sorted(os.listdir(os.path.dirname(snap.path))),
+                         sorted([os.path.basename(snap.path), os.path.basename(newer.path)]))
+
+    def test_pruning_keeps_recent_revisions_and_held_snapshots_readable(self):
+        manifest = None
+        held = []
+        for size in range(2, 3 + corpus_snapshot.KEEP_REVISIONS):
+            manifest = embedding_archive.save('raw/text/segments', columns([f'v{i}' for i in range(size)], seed=1),
+                                              self.s3.put, previous=manifest)
+            held.append(self.open('text'))
+        kept = os.listdir(os.path.dirname(held[0].path))
+        self.assertEqual(sorted(kept), sorted(os.path.basename(snap.path) for snap in held[-corpus_snapshot.KEEP_REVISIONS:]))
+        oldest = held[0]
+        self.assertFalse(os.path.exists(oldest.path))
+        self.assertEqual(oldest.column('title').tolist(), ['title v0', 'title v1'])
+        np.testing.assert_array_equal(oldest.rows(['v1', 'v0', 'x']), [1, 0, -1])
+
+    def test_null_values_stay_null(self):
+        arrays = columns(['a', 'b', 'c'])
+        arrays['title'] = np.array(['first', None, 'None'], object)
+        arrays['subs'] = np.array([10, None, 2.5], object)
+        put_npz(self.s3, 'visual', arrays)
+        snap = self.open('visual')
+        self.assertEqual(snap.column('title').tolist(), ['first', None, 'None'])
+        subs = snap.column('subs')
+        self.assertEqual(subs.tolist(), [10.0, None, 2.5])
+        self.assertTrue(np.isnan(np.asarray(subs, float)[1]))
+        self.assertFalse(np.ma.is_masked(snap.column('views')))
+
+    def test_alignment_matches_the_dict_loops_it_replaces(self):
+        master_ids = ['m3', 'x', 'm1', 'm2', 'm0']
+        put_npz(self.s3, 'visual', columns(master_ids))
+        put_npz(self.s3, 'text', columns(['m1', 'm0', 'y', 'm1', 'm3'], seed=2))
+        master, text = self.open('visual'), self.open('text')
+        matrix, have = corpus_snapshot.aligned(text, master)
+        expected = np.full(matrix.shape, np.nan, np.float32)
+        pos = {vid: row for row, vid in enumerate(master_ids)}
+        for row, vid in enumerate(text.ids.tolist()):
+            if vid in pos:
+                expected[pos[vid]] = text.vecs[row]
+        np.testing.assert_array_equal(matrix, expected)
+        np.testing.assert_array_equal(have, [True, False, True, False, True])
+        self.assertEqual(text.positions()['m1'], 3)
+
+        map_ids = ['m2', 'm0', 'gone']
+        rows = corpus_snapshot.alignment(master, map_ids, 'map-etag', self.cache)
+        np.testing.assert_array_equal(rows, [3, 4, -1])
+        with mock.patch.object(corpus_snapshot.Snapshot, 'rows', side_effect=AssertionError):
+            np.testing.assert_array_equal(corpus_snapshot.alignment(master, map_ids, 'map-etag', self.cache), rows)
+
+
+if __name__ == '__main__':
+    unittest.main()
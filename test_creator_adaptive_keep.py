@@ -0,0 +1,121 @@
+import io
+import json
+import unittest
+
+import numpy as np
+
+import creator_adaptive_keep as serving
+
+
+def unit_rows(values):
+    return values / np.linalg.norm(values, axis=-1, keepdims=True)
+
+
+class CreatorAdaptiveKeepServingTest(unittest.TestCase):
+    def make_arrays(self):
+        rng = np.random.default_rng(17)
+        profiles, history, dim, references = 2, 30, 16, 60
+        counts = np.asarray([30, 11], dtype=np.int32)
+        profile_visual = np.zeros((profiles, history, dim), dtype=np.float32)
+        profile_together = np.zeros_like(profile_visual)
+        profile_outcomes = np.full((profiles, history), np.nan, dtype=np.float32)
+        for index, count in enumerate(counts):
+            profile_visual[index, :count] = unit_rows(rng.normal(size=(count, dim)))
+            profile_together[index, :count] = unit_rows(rng.normal(size=(count, dim)))
+            profile_outcomes[index, :count] = rng.uniform(30, 90, size=count)
+        metadata = {
+            'schema': 'creator-adaptive-keep-serving-v1',
+            'coordinateId': serving.COORDINATE_ID,
+            'featureNames': list(serving.FEATURE_NAMES),
+            'profiles': {},
+        }
+        arrays = {
+            'reference_centered_visual': unit_rows(rng.normal(size=(references, dim))).astype(np.float32),
+            'reference_centered_together': unit_rows(rng.normal(size=(references, dim))).astype(np.float32),
+            'reference_standardized_residual': rng.normal(size=references).astype(np.float32),
+            'stage3_mean': rng.normal(size=8),
+            'stage3_std': np.full(8, 2.0),
+            'stage3_weights': rng.normal(size=8) * 0.1,
+            'stage3_y_mean': np.asarray([0.5]),
+            'profile_ids': np.asarray(['alpha', 'beta']),
+            'profile_counts': counts,
+            'profile_visual': profile_visual,
+            'profile_together': profile_together,
+            'profile_outcomes': profile_outcomes,
+            'profile_mean_visual': rng.normal(size=(profiles, dim)).astype(np.float32),
+            'profile_mean_together': rng.normal(size=(profiles, dim)).astype(np.float32),
+            'profile_baseline': np.asarray([60.0, 55.0], dtype=np.float32),
+            'profile_scale': np.asarray([8.0, 6.0], dtype=np.float32),
+            'profile_stage2_bias': np.asarray([0.5, -0.25], dtype=np.float32),
+        }
+        return metadata, arrays
+
+    def archive(self, metadata, arrays):
+        output = io.BytesIO()
+        np.savez(output, metadata_json=np.asarray([json.dumps(metadata)]), **arrays)
+        return output.getvalue()
+
+    def with_duals(self, metadata, arrays):
+        duals = {}
+        for modality in serving.KRR_MODALITIES:
+            (
+                duals[f'profile_krr_{modality}_mean'],
+                duals[f'profile_krr_{modality}_dual'],
+            ) = serving.profile_kernel_ridge_duals(
+                arrays[f'profile_{modality}'],
+                arrays['profile_outcomes'],
+                arrays['profile_counts'],
+            )
+        metadata = {**metadata, 'krrDual': {'sha256': serving.kernel_ridge_dual_sha256(duals)}}
+        return metadata, {**arrays, **duals}
+
+    def per_score_solve(self, state, query, modality, profile_index):
+        count = int(state['profile_counts'][profile_index])
+        vectors = state[f'profile_{modality}'][profile_index, :count]
+        mean, weights = serving._kernel_ridge_dual(
+            vectors,
+            state['profile_outcomes'][profile_index, :count],
+        )
+        return float(mean + (query @ vectors.T) @ weights)
+
+    def test_stored_duals_reproduce_per_score_solve_exactly(self):
+        metadata, arrays = self.with_duals(*self.make_arrays())
+        state = serving.load_serving_state(self.archive(metadata, arrays))
+        legacy = serving.load_serving_state(self.archive(*self.make_arrays()))
+        rng = np.random.default_rng(5)
+        visual, together = rng.normal(size=16), rng.normal(size=16)
+        for profile_index, profile in enumerate(('alpha', 'beta')):
+            served = serving.score_creator_adaptive_keep(state, visual, together, profile)
+            self.assertEqual(
+                served,
+                serving.score_creator_adaptive_keep(legacy, visual, together, profile),
+            )
+            for modality in serving.KRR_MODALITIES:
+                np.testing.assert_array_equal(
+                    state[f'profile_krr_{modality}_dual'],
+                    legacy[f'profile_krr_{modality}_dual'],
+                )
+            query = serving._normalized(together)
+            count = int(state['profile_counts'][profile_index])
+            expected = self.per_score_solve(state, query, 'together', profile_index)
+            served_feature = float(
+                state['profile_krr_together_mean'][profile_index]
+                + (query @ state['profile_together'][profile_index, :count].T)
+                @ state['profile_krr_together_dual'][profile_index, :count]
+            )
+            self.assertEqual(served_feature, expected)
+
+    def test_tampered_or_partial_dual_state_is_rejected(self):
+        metadata, arrays = self.with_duals(*self.make_arrays())
+        tampered = dict(arrays)
+        tampered['profile_krr_visual_dual'] = arrays['profile_krr_visual_dual'] + 1e-12
+        with self.assertRaisesRegex(RuntimeError, 'hash verification'):
+            serving.load_serving_state(self.archive(metadata, tampered))
+        partial = dict(arrays)
+        del partial['profile_krr_visual_mean']
+        with self.assertRaisesRegex(RuntimeError, 'incomplete'):
+            serving.load_serving_state(self.archive(metadata, partial))
+
+
+if __name__ == '__main__':
+    unittest.main()
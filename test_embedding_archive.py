@@ -0,0 +1,177 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+import embedding_archive
+
+
+class FakeBucket:
+    def __init__(self):
+        self.objects = {}
+        self.puts = []
+
+    def put(self, key, payload, content_type):
+        self.objects[key] = bytes(payload)
+        self.puts.append(key)
+
+    def get(self, key):
+        return self.objects.get(key)
+
+    def delete(self, key):
+        del self.objects[key]
+
+
+def channel(n, dim=6, seed=0):
+    rng = np.random.RandomState(seed)
+    return {
+        'ids': [f'vid{index:05d}' for index in range(n)],
+        'vecs': list(rng.normal(size=(n, dim)).astype(np.float32)),
+        'views': [float(index * 10) for index in range(n)],
+        'title': [f'title {index}' for index in range(n)],
+        'mine': [index % 7 == 0 for index in range(n)],
+    }
+
+
+def extend(arrays, more):
+    return {name: list(arrays[name]) + list(more[name]) for name in arrays}
+
+
+class EmbeddingArchiveTest(unittest.TestCase):
+    def setUp(self):
+        self.bucket = FakeBucket()
+        self.cache = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache, ignore_errors=True)
+        self.prefix = 'raw/visual/segments'
+
+    def read(self):
+        manifest = embedding_archive.load_manifest(self.bucket.get, self.prefix)
+        return manifest, embedding_archive.read(manifest, self.bucket.get, self.cache)
+
+    def test_checkpoints_upload_only_new_rows_and_round_trip(self):
+        arrays = channel(30)
+        manifest = embedding_archive.save(self.prefix, arrays, self.bucket.put)
+        self.bucket.puts.clear()
+        arrays = extend(arrays, channel(5, seed=1))
+        arrays['ids'][30:] = [f'new{index}' for index in range(5)]
+        manifest = embedding_archive.save(self.prefix, arrays, self.bucket.put, previous=manifest)
+        shard_puts = [key for key in self.bucket.puts if not key.endswith('manifest.json')]
+        self.assertEqual(len(shard_puts), 3)  # one vecs + one meta + one ids object
+        new_vecs = np.load(io.BytesIO(self.bucket.objects[manifest['shards'][-1]['vecs']['key']]))
+        self.assertEqual(len(new_vecs), 5)
+        new_ids = json.loads(self.bucket.objects[manifest['shards'][-1]['ids']['key']])
+        self.assertEqual(new_ids, arrays['ids'][30:])
+        # The manifest names the shards but does not repeat every id.
+        self.assertNotIn('ids', manifest)
+        self.assertNotIn(b'vid00001', self.bucket.objects[embedding_archive.manifest_key(self.prefix)])
+        self.assertEqual(embedding_archive.read_ids(manifest, self.bucket.get, self.cache), arrays['ids'])
+
+        _, columns = self.read()
+        np.testing.assert_array_equal(columns['vecs'], np.asarray(arrays['vecs'], np.float32))
+        self.assertEqual(columns['ids'].tolist(), arrays['ids'])
+        self.assertEqual(columns['mine'].tolist(), arrays['mine'])
+        self.assertEqual(columns['title'].tolist(), arrays['title'])
+
+    def test_small_tail_shards_fold_into_a_full_shard(self):
+        with mock.patch.object(embedding_archive, 'SHARD_ROWS', 10):
+            arrays = channel(4)
+            manifest = embedding_archive.save(self.prefix, arrays, self.bucket.put)
+            for seed in range(1, 4):
+                more = channel(4, seed=seed)
+                more['ids'] = [f's{seed}-{index}' for index in range(4)]
+                arrays = extend(arrays, more)
+                manifest = embedding_archive.save(self.prefix, arrays, self.bucket.put, previous=manifest)
+            # 4+4+4 folded into a full shard at the third save; the remainder stays open.
+            self.assertEqual([entry['rows'] for entry in manifest['shards']], [10, 2, 4])
+            _, columns = self.read()
+            self.assertEqual(columns['ids'].tolist(), arrays['ids'])
+
+    def test_fold_deletes_replaced_shards_and_readers_prune_their_cache(self):
+        other = 'raw/text/segments'
+        kept = embedding_archive.save(other, channel(3), self.bucket.put)
+        embedding_archive.shard_vectors(kept, self.bucket.get, self.cache)
+        with mock.patch.object(embedding_archive, 'SHARD_ROWS', 10):
+            arrays = channel(4)
+            manifest = embedding_archive.save(self.prefix, arrays, self.bucket.put, delete=self.bucket.delete)
+            embedding_archive.read(manifest, self.bucket.get, self.cache)
+            for seed in range(1, 4):
+                more = channel(4, seed=seed)
+                more['ids'] = [f's{seed}-{index}' for index in range(4)]
+                arrays = extend(arrays, more)
+                manifest = embedding_archive.save(self.prefix, arrays, self.bucket.put, previous=manifest,
+                                                  delete=self.bucket.delete)
+                embedding_archive.read(manifest, self.bucket.get, self.cache)
+        live = {entry[kind]['key'] for entry in manifest['shards'] for kind in ('vecs', 'meta', 'ids')}
+        stored = {key for key in self.bucket.objects if key.startswith(f'{self.prefix}/') and 'manifest' not in key}
+        self.assertEqual(stored, live)
+        cached = {os.path.relpath(os.path.join(folder, name), self.cache)
+                  for folder, _, names in os.walk(self.cache) for name in names}
+        # The vectors reader fetched vecs and meta only; the other channel's cache is untouched.
+        self.assertEqual({key for key in cached if key.startswith(f'{self.prefix}/')},
+                         {key for key in live if '/ids-' not in key})
+        self.assertIn(kept['shards'][0]['vecs']['key'], cached)
+
+    def test_rewrite_reuses_unchanged_shards(self):
+        with mock.patch.object(embedding_archive, 'SHARD_ROWS', 10):
+            arrays = channel(25)
+            manifest = embedding_archive.save(self.prefix, arrays, self.bucket.put)
+            self.bucket.puts.clear()
+            arrays['mine'][22] = not arrays['mine'][22]
+            manifest = embedding_archive.save(self.prefix, arrays, self.bucket.put, previous=manifest, rewrite=True)
+        # Only the last shard's metadata changed.
+        self.assertEqual(len(self.bucket.puts), 2)
+        self.assertTrue(self.bucket.puts[0].startswith(f'{self.prefix}/meta-'))
+        _, columns = self.read()
+        self.assertEqual(columns['mine'].tolist(), arrays['mine'])
+
+    def test_v1_manifest_is_read_and_extended(self):
+        arrays = channel(12)
+        manifest = embedding_archive.save(self.prefix, arrays, self.bucket.put)
+        for entry in manifest['shards']:
+            del entry['ids']
+        manifest.update(schema='embedding-archive-v1', ids=arrays['ids'])
+        self.bucket.objects[embedding_archive.manifest_key(self.prefix)] = json.dumps(manifest).encode()
+        legacy = embedding_archive.load_manifest(self.bucket.get, self.prefix)
+        self.assertEqual(embedding_archive.read_ids(legacy, self.bucket.get, self.cache), arrays['ids'])
+
+        more = channel(3, seed=2)
+        more['ids'] = ['x0', 'x1', 'x2']
+        arrays = extend(arrays, more)
+        self.bucket.puts.clear()
+        manifest = embedding_archive.save(self.prefix, arrays, self.bucket.put, previous=legacy)
+        self.assertEqual(manifest['schema'], embedding_archive.SCHEMA)
+        self.assertEqual(manifest['shards'][0]['vecs'], legacy['shards'][0]['vecs'])
+        self.assertTrue(self.bucket.puts[0].startswith(f'{self.prefix}/ids-'))
+        _, columns = self.read()
+        self.assertEqual(columns['ids'].tolist(), arrays['ids'])
+        self.assertEqual(embedding_archive.read_ids(manifest, self.bucket.get, self.cache), arrays['ids'])
+
+    def test_unit_matrix_matches_normalized_rows_and_float16_option(self):
+        arrays = channel(40)
+        manifest = embedding_archive.save(self.prefix, arrays, self.bucket.put, dtype='float16')
+        path = os.path.join(self.cache, 'unit.npy')
+        embedding_archive.write_unit_matrix(manifest, self.bucket.get, path, self.cache)
+        matrix = np.load(path, mmap_mode='r')
+        expected = np.asarray(arrays['vecs'], np.float32).astype(np.float16).astype(np.float32)
+        expected /= np.linalg.norm(expected, axis=1, keepdims=True) + embedding_archive.EPSILON
+        np.testing.assert_allclose(matrix, expected, rtol=1e-6, atol=1e-7)
+
+    def test_tampered_shard_is_rejected(self):
+        manifest = embedding_archive.save(self.prefix, channel(8), self.bucket.put)
+        key = manifest['shards'][0]['vecs']['key']
+        self.bucket.objects[key] = self.bucket.objects[key][:-4] + b'\0\0\0\0'
+        with self.assertRaisesRegex(RuntimeError, 'hash verification'):
+            embedding_archive.shard_vectors(manifest, self.bucket.get, self.cache)
+        manifest['rows'] += 1
+        self.bucket.objects[embedding_archive.manifest_key(self.prefix)] = json.dumps(manifest).encode()
+        with self.assertRaisesRegex(RuntimeError, 'row counts'):
+            embedding_archive.load_manifest(self.bucket.get, self.prefix)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,302 @@
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+import embedding_gateway
+
+
+def stub_vector(parts, dimensions):
+    seed = int(hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()[:8], 16)
+    return np.random.RandomState(seed).normal(size=dimensions).astype(np.float32)
+
+
+class StubGemini:
+    """batchEmbedContents stand-in that records every call it serves."""
+
+    def __init__(self):
+        self.calls = []
+        self.failures = []  # (status, headers) replayed before serving
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                with stub.lock:
+                    stub.calls.append((self.path, self.headers.get('x-goog-api-key'), body))
+                    failure = stub.failures.pop(0) if stub.failures else None
+                if failure is None and any(
+                    part.get('text') == 'bad' for r in body['requests'] for part in r['content']['parts']
+                ):
+                    failure = (400, {})
+                if failure is not None:
+                    status, headers = failure
+                    payload = json.dumps({'error': {'message': f'stub {status}'}}).encode()
+                    self.send_response(status)
+                    for key, value in headers.items():
+                        self.send_header(key, value)
+                else:
+                    payload = json.dumps({'embeddings': [
+                        {'values': stub_vector(r['content']['parts'], r['outputDimensionality']).tolist()}
+                        for r in body['requests']
+                    ]}).encode()
+                    self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.root = f'http://127.0.0.1:{self.server.server_address[1]}/v1beta'
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def contents_sent(self):
+        return sum(len(body['requests']) for _, _, body in self.calls)
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class EmbeddingGatewayTest(unittest.TestCase):
+    def setUp(self):
+        self.stub = StubGemini()
+        self.addCleanup(self.stub.close)
+        folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, folder, ignore_errors=True)
+        self.quota_path = os.path.join(folder, 'quota.bucket')
+
+    def gateway(self, **options):
+        options.setdefault('quota', embedding_gateway.QuotaBucket(self.quota_path, rpm=600000))
+        options.setdefault('interactive_quota', embedding_gateway.QuotaBucket(self.quota_path + '.fast', rpm=600000))
+        gateway = embedding_gateway.EmbeddingGateway('test-key', self.stub.root, window_ms=20, **options)
+        self.addCleanup(gateway.close)
+        return gateway
+
+    def test_concurrent_singles_coalesce_into_batch_calls(self):
+        gateway = self.gateway(max_batch=16)
+        contents = [[{'text': f'hook {index}'}] for index in range(40)]
+
+        async def run():
+            return await asyncio.gather(*[gateway.embed(parts, 8) for parts in contents])
+
+        vectors = asyncio.run(run())
+        for parts, vector in zip(contents, vectors):
+            np.testing.assert_array_equal(vector, stub_vector(parts, 8))
+        self.assertEqual([len(body['requests']) for _, _, body in self.stub.calls], [16, 16, 8])
+        path, key, body = self.stub.calls[0]
+        self.assertEqual(path, '/v1beta/models/gemini-embedding-2:batchEmbedContents')
+        self.assertEqual(key, 'test-key')
+        self.assertEqual(body['requests'][0]['model'], 'models/gemini-embedding-2')
+        stats = gateway.stats()
+        self.assertEqual((stats['requests'], stats['embedded'], stats['batches']), (40, 40, 3))
+        self.assertIsNotNone(stats['latencyMs']['p95'])
+
+    def test_identical_in_flight_content_is_sent_once(self):
+        gateway = self.gateway()
+        image = [{'inlineData': {'mimeType': 'image/jpeg', 'data': 'AAAA'}}, {'text': 'title'}]
+
+        async def run():
+            return await asyncio.gather(*[gateway.embed(image, 8) for _ in range(10)])
+
+        vectors = asyncio.run(run())
+        self.assertEqual(self.stub.contents_sent(), 1)
+        self.assertEqual(gateway.stats()['deduplicated'], 9)
+        vectors[0][:] = 0  # callers get independent copies
+        np.testing.assert_array_equal(vectors[1], stub_vector(image, 8))
+
+    def test_retryable_errors_retry_and_429_pauses_shared_quota(self):
+        gateway = self.gateway()
+        self.stub.failures = [(429, {'Retry-After': '0.3'}), (503, {'Retry-After': '0.25'})]
+        events = []
+
+        async def run():
+            return await gateway.embed([{'text': 'retry me'}], 8, on_retry=events.append)
+
+        vector = asyncio.run(run())
+        np.testing.assert_array_equal(vector, stub_vector([{'text': 'retry me'}], 8))
+        self.assertEqual(len(self.stub.calls), 3)
+        self.assertEqual([event['status'] for event in events], [429, 503])
+        self.assertEqual(gateway.stats()['retries'], 2)
+        # The 429 deferral is visible to any other process sharing the bucket.
+        other = embedding_gateway.QuotaBucket(self.quota_path, rpm=600000)
+        self.assertGreater(other._update(lambda t, blocked, now: (t, blocked, blocked)), 0)
+
+    def test_non_retryable_status_fails_without_retry(self):
+        gateway = self.gateway()
+
+        async def run():
+            return await asyncio.gather(
+                gateway.embed([{'text': 'bad'}], 8, tries=5),
+                return_exceptions=True,
+            )
+
+        (error,) = asyncio.run(run())
+        self.assertIsInstance(error, embedding_gateway.EmbeddingGatewayError)
+        self.assertEqual(error.status, 400)
+        self.assertFalse(error.retryable)
+        self.assertIn('HTTP 400', str(error))
+        self.assertEqual(len(self.stub.calls), 1)
+
+    def test_non_retryable_batch_error_fails_only_the_bad_content(self):
+        gateway = self.gateway()
+        contents = [[{'text': f'good {index}'}] for index in range(6)]
+        contents.insert(3, [{'text': 'bad'}])
+
+        async def run():
+            return await asyncio.gather(*[gateway.embed(parts, 8, tries=5) for parts in contents],
+                                        return_exceptions=True)
+
+        results = asyncio.run(run())
+        error = results.pop(3)
+        self.assertIsInstance(error, embedding_gateway.EmbeddingGatewayError)
+        self.assertEqual(error.status, 400)
+        self.assertFalse(error.retryable)
+        for parts, vector in zip(contents[:3] + contents[4:], results):
+            np.testing.assert_array_equal(vector, stub_vector(parts, 8))
+        self.assertEqual(len(self.stub.calls[0][2]['requests']), 7)
+        stats = gateway.stats()
+        self.assertEqual((stats['embedded'], stats['failures']), (6, 1))
+        self.assertGreater(stats['splits'], 0)
+
+    def test_batches_are_capped_by_request_bytes(self):
+        gateway = self.gateway(max_batch=100, max_batch_bytes=1000)
+        contents = [[{'inlineData': {'mimeType': 'image/jpeg', 'data': f'{index:03d}' + 'A' * 300}}]
+                    for index in range(10)]
+        contents.append([{'inlineData': {'mimeType': 'image/jpeg', 'data': 'B' * 3000}}])
+
+        async def run():
+            return await asyncio.gather(*[gateway.embed(parts, 8) for parts in contents])
+
+        vectors = asyncio.run(run())
+        for parts, vector in zip(contents, vectors):
+            np.testing.assert_array_equal(vector, stub_vector(parts, 8))
+        sizes = sorted(len(body['requests']) for _, _, body in self.stub.calls)
+        self.assertEqual(sum(sizes), 11)
+        self.assertEqual(sizes[0], 1)  # the oversized content goes alone
+        for _, _, body in self.stub.calls:
+            if len(body['requests']) > 1:
+                self.assertLessEqual(sum(len(json.dumps(r['content']['parts'], separators=(',', ':')))
+                                         for r in body['requests']), 1000)
+
+    def test_server_delays_are_capped_and_deadlines_fail_fast(self):
+        headers = {'retry-after': '3600'}
+        self.assertEqual(embedding_gateway.retry_delay_seconds(429, headers, {}, 0), 60.0)
+        self.assertEqual(embedding_gateway.retry_delay_seconds(429, headers, {}, 0, cap=5), 5.0)
+        self.assertEqual(embedding_gateway.retry_delay_seconds(503, {}, {}, 10), 60.0)
+
+        gateway = self.gateway()
+        self.stub.failures = [(503, {'Retry-After': '30'})]
+        started = time.monotonic()
+
+        async def run():
+            return await gateway.embed([{'text': 'slow'}], 8, tries=4, deadline=5, lane='interactive')
+
+        with self.assertRaises(embedding_gateway.EmbeddingGatewayError) as caught:
+            asyncio.run(run())
+        self.assertLess(time.monotonic() - started, 5)
+        self.assertEqual(caught.exception.status, 503)
+        self.assertIn('deadline', str(caught.exception))
+        self.assertEqual(len(self.stub.calls), 1)
+
+        self.stub.failures = [(503, {'Retry-After': '0.25'})] * 10
+
+        async def run_out():
+            return await gateway.embed([{'text': 'flaky'}], 8, tries=10, deadline=0.4)
+
+        started = time.monotonic()
+        with self.assertRaises(embedding_gateway.EmbeddingGatewayError):
+            asyncio.run(run_out())
+        self.assertLess(time.monotonic() - started, 1.0)
+        self.assertEqual(gateway.stats()['deadlineFailures'], 2)
+
+    def test_a_deadline_fails_only_its_own_caller(self):
+        gateway = self.gateway()
+        self.stub.failures = [(503, {'Retry-After': '0.5'})]
+        parts = [{'text': 'shared'}]
+
+        async def run():
+            patient = asyncio.ensure_future(gateway.embed(parts, 8, tries=4))
+            hasty = asyncio.ensure_future(gateway.embed(parts, 8, tries=1, deadline=0.2))
+            return await asyncio.gather(patient, hasty, return_exceptions=True)
+
+        vector, error = asyncio.run(run())
+        self.assertIsInstance(error, embedding_gateway.EmbeddingGatewayError)
+        self.assertIn('deadline', str(error))
+        # The hasty caller's deadline and single try do not bind the patient one.
+        np.testing.assert_array_equal(vector, stub_vector(parts, 8))
+        self.assertEqual(len(self.stub.calls), 2)
+        stats = gateway.stats()
+        self.assertEqual((stats['deduplicated'], stats['deadlineFailures'], stats['failures']), (1, 1, 0))
+
+        # Once its last caller gives up, the content is dropped instead of sent.
+        gateway.quotas['bulk'].defer(30)
+
+        async def run_alone():
+            return await gateway.embed([{'text': 'abandoned'}], 8, deadline=0.2)
+
+        with self.assertRaises(embedding_gateway.EmbeddingGatewayError):
+            asyncio.run(run_alone())
+        self.assertEqual(gateway.stats()['inFlight'], 0)
+        self.assertEqual(len(self.stub.calls), 2)
+
+    def test_interactive_lane_is_not_held_by_a_bulk_429_pause(self):
+        gateway = self.gateway()
+        gateway.quotas['bulk'].defer(30)
+
+        async def run():
+            bulk = asyncio.ensure_future(gateway.embed([{'text': 'backfill'}], 8))
+            vector = await gateway.embed([{'text': 'upload'}], 8, deadline=5, lane='interactive')
+            self.assertFalse(bulk.done())
+            bulk.cancel()
+            return vector
+
+        np.testing.assert_array_equal(asyncio.run(run()), stub_vector([{'text': 'upload'}], 8))
+        self.assertEqual(self.stub.contents_sent(), 1)
+
+    def test_quota_bucket_is_shared_across_processes(self):
+        bucket = embedding_gateway.QuotaBucket(self.quota_path, rpm=60)  # 1/s, burst 1
+        self.assertEqual(bucket.reserve(1), 0.0)
+        script = (
+            'import sys, embedding_gateway;'
+            f'print(embedding_gateway.QuotaBucket({self.quota_path!r}, rpm=60).reserve(2))'
+        )
+        waited = float(subprocess.check_output(
+            [sys.executable, '-c', script],
+            cwd=os.path.dirname(os.path.abspath(embedding_gateway.__file__)),
+        ))
+        # Two more tokens at 1/s, less whatever refilled while Python started.
+        self.assertGreater(waited, 1.0)
+        self.assertLessEqual(waited, 2.0)
+
+    def test_blocking_facade_batches_calls_from_many_threads(self):
+        contents = [[{'text': f'thread {index}'}] for index in range(24)]
+        with ThreadPoolExecutor(24) as pool:
+            vectors = list(pool.map(
+                lambda parts: embedding_gateway.embed(parts, 'facade-key', 8, api_root=self.stub.root),
+                contents,
+            ))
+        for parts, vector in zip(contents, vectors):
+            np.testing.assert_array_equal(vector, stub_vector(parts, 8))
+        self.assertLess(len(self.stub.calls), len(contents))
+        stats = embedding_gateway.stats('facade-key', self.stub.root)
+        self.assertEqual(stats['embedded'], 24)
+
+
+if __name__ == '__main__':
+    unittest.main()
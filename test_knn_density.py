@@ -0,0 +1,40 @@
+import unittest
+
+import numpy as np
+
+import knn_density
+
+
+def unit(rows):
+    return rows / np.linalg.norm(rows, axis=1, keepdims=True)
+
+
+class KnnDensityTest(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.RandomState(7)
+        self.corpus = unit(rng.normal(size=(700, 12))).astype(np.float32)
+        self.queries = self.corpus[rng.choice(700, 90, replace=False)]
+
+    def test_blocks_match_the_full_sorted_matrix(self):
+        full = self.queries @ self.corpus.T
+        expected = -np.sort(-full, axis=1)[:, :51]
+        for query_block, corpus_block, workers in ((32, 64, 1), (1000, 50, 3), (7, 1000, 2)):
+            sims, rows, means = knn_density.top_similarities(
+                self.queries, self.corpus, 51, query_block, corpus_block, workers)
+            np.testing.assert_allclose(sims, expected, rtol=0, atol=1e-6)
+            np.testing.assert_allclose(np.take_along_axis(full, rows, axis=1), sims, rtol=0, atol=1e-6)
+            np.testing.assert_allclose(means, full.mean(axis=1), rtol=0, atol=1e-6)
+
+    def test_self_queries_find_themselves_first(self):
+        sims, rows, _ = knn_density.top_similarities(self.corpus, self.corpus, 16, 100, 128)
+        np.testing.assert_array_equal(rows[:, 0], np.arange(len(self.corpus)))
+        self.assertTrue(np.all(np.diff(sims, axis=1) <= 0))
+
+    def test_k_is_clamped_to_the_corpus(self):
+        sims, rows, _ = knn_density.top_similarities(self.queries[:3], self.corpus[:5], 9)
+        self.assertEqual(sims.shape, (3, 5))
+        self.assertEqual(sorted(rows[0].tolist()), list(range(5)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+import knn_density
+import knn_graph
+import novelty_state
+
+
+def unit(rows):
+    return (rows / np.linalg.norm(rows, axis=1, keepdims=True)).astype(np.float32)
+
+
+class KnnGraphTest(unittest.TestCase):
+    def setUp(self):
+        self.cache = tempfile.mkdtemp()
+        state = tempfile.mkdtemp()
+        for folder in (self.cache, state):
+            self.addCleanup(shutil.rmtree, folder, ignore_errors=True)
+        patch = mock.patch.object(novelty_state, 'CACHE_DIR', state)
+        patch.start()
+        self.addCleanup(patch.stop)
+        rng = np.random.RandomState(11)
+        self.vecs = unit(rng.normal(size=(500, 12)))
+        self.ids = [f'v{row}' for row in range(500)]
+
+    def graph(self, revision='npz-a', k=16):
+        return knn_graph.load_or_build(self.vecs, self.ids, 'raw/visual', revision, k, {'source': 'test'}, self.cache)
+
+    def test_artifact_is_compact_pinned_and_reused(self):
+        graph = self.graph()
+        directory = knn_graph.graph_directory('raw/visual', 'npz-a', self.cache)
+        with open(os.path.join(directory, 'manifest.json')) as handle:
+            manifest = json.load(handle)
+        self.assertEqual((manifest['revision'], manifest['rows'], manifest['neighbors']), ('npz-a', 500, 16))
+        self.assertEqual(manifest['provenance'], {'source': 'test'})
+        self.assertEqual(np.load(os.path.join(directory, 'rows.npy')).dtype, np.int32)
+        self.assertEqual(np.load(os.path.join(directory, 'sims.npy')).dtype, np.float16)
+        np.testing.assert_array_equal(graph.graph_rows[:, 0], np.arange(500))
+        with mock.patch.object(novelty_state, 'neighbor_lists', side_effect=AssertionError):
+            self.assertIsNotNone(self.graph())
+            self.assertIsNone(knn_graph.load(self.vecs, self.ids[::-1], directory, 'npz-a'))
+            self.assertIsNone(knn_graph.load(self.vecs, self.ids, directory, 'npz-a', k=32))
+            self.assertIsNone(knn_graph.load(self.vecs, self.ids, directory, 'npz-b'))
+
+    def test_slices_equal_a_fresh_exact_knn(self):
+        graph = self.graph()
+        queries = np.arange(0, 500, 7)
+        expected, _, _ = knn_density.top_similarities(self.vecs[queries], self.vecs, 11)
+        sims, rows = graph.row_neighbors(queries, 11)
+        np.testing.assert_allclose(sims, expected, rtol=0, atol=1e-6)
+        np.testing.assert_allclose(np.einsum('id,ikd->ik', self.vecs[queries], self.vecs[rows]), sims, atol=1e-6)
+        wide, _ = graph.row_neighbors(queries, 40)
+        np.testing.assert_allclose(wide, knn_density.top_similarities(self.vecs[queries], self.vecs, 40)[0], atol=1e-6)
+
+        within = np.arange(0, 500, 3)
+        subset, _, _ = knn_density.top_similarities(self.vecs[queries], self.vecs[within], 6)
+        sims, rows = graph.row_neighbors(queries, 6, within)
+        np.testing.assert_allclose(sims, subset, rtol=0, atol=1e-6)
+        self.assertTrue(np.isin(rows, within).all())
+        sparse = np.arange(0, 500, 50)
+        sims, rows = graph.row_neighbors(queries, 6, sparse)
+        np.testing.assert_allclose(sims, knn_density.top_similarities(self.vecs[queries], self.vecs[sparse], 6)[0],
+                                   atol=1e-6)
+
+        sims, ids = graph.neighbors(['v3', 'v9'], 4, within=[f'v{row}' for row in within])
+        self.assertEqual(ids.shape, (2, 4))
+        self.assertEqual(ids[0, 0], 'v3')
+        with self.assertRaises(RuntimeError):
+            graph.neighbors(['missing'], 4)
+
+    def test_pinned_frozen_graph_survives_newer_revisions(self):
+        frozen = knn_graph.load_or_build(self.vecs, self.ids, 'frozen/raw/visual', 'npz-a', 16, None, self.cache,
+                                         pin=True)
+        self.assertTrue(frozen.manifest['pinned'])
+        knn_graph.load_or_build(self.vecs[:300], self.ids[:300], 'frozen/raw/visual', 'npz-b', 16, None, self.cache)
+        for revision in ('seg-1', 'seg-2', 'seg-3', 'seg-4'):
+            knn_graph.load_or_build(self.vecs[:400], self.ids[:400], 'raw/visual', revision, 16, None, self.cache)
+        live = sorted(os.listdir(os.path.join(self.cache, 'raw_visual')))
+        self.assertEqual(live, ['seg-2', 'seg-3', 'seg-4'])
+        for revision in ('npz-c', 'npz-d', 'npz-e'):
+            knn_graph.load_or_build(self.vecs[:300], self.ids[:300], 'frozen/raw/visual', revision, 16, None,
+                                    self.cache)
+        kept = sorted(os.listdir(os.path.join(self.cache, 'frozen_raw_visual')))
+        self.assertEqual(kept, ['npz-a', 'npz-c', 'npz-d', 'npz-e'])
+        # The frozen and live archives keep separate incremental state.
+        self.assertEqual(len({name for name in os.listdir(novelty_state.CACHE_DIR) if 'knn-graph-' in name}), 2)
+        with mock.patch.object(novelty_state, 'neighbor_lists', side_effect=AssertionError):
+            graph = knn_graph.load_or_build(self.vecs, self.ids, 'frozen/raw/visual', 'npz-a', 16, None, self.cache)
+        np.testing.assert_array_equal(graph.graph_rows, frozen.graph_rows)
+
+
+if __name__ == '__main__':
+    unittest.main()
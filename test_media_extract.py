@@ -0,0 +1,115 @@
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+from unittest import mock
+
+import media_extract
+
+
+LEGACY_MONTAGE = ['-vf', 'fps=1,scale=320:-1,tile=5x1', '-frames:v', '1']
+BANNER = ("Input #0, mov,mp4,m4a,3gp,3g2,mj2, from 'v.mp4':\n"
+          "  Duration: 00:01:02.48, start: 0.000000, bitrate: 1500 kb/s\n")
+
+
+class FakeFfmpeg:
+    """Writes each requested output unless the source has no audio and audio was requested."""
+
+    def __init__(self, has_audio=True):
+        self.has_audio = has_audio
+        self.calls = []
+
+    def __call__(self, command, **kwargs):
+        self.calls.append(command)
+        outputs = [arg for arg in command if arg.endswith(('.jpg', '.wav'))]
+        if not self.has_audio and any(path.endswith('.wav') for path in outputs):
+            return subprocess.CompletedProcess(command, 1, '', BANNER + 'Output file #1 does not contain any stream\n')
+        for path in outputs:
+            with open(path, 'wb') as handle:
+                handle.write(b'x' * 2000)
+        return subprocess.CompletedProcess(command, 0, '', BANNER)
+
+
+class MediaExtractTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.folder, ignore_errors=True)
+
+    def extract(self, fake, **kwargs):
+        with mock.patch.object(media_extract.subprocess, 'run', fake):
+            return media_extract.extract_opening('v.mp4', self.folder, **kwargs)
+
+    def test_one_process_emits_montage_audio_and_duration(self):
+        fake = FakeFfmpeg()
+        mon, wav, duration = self.extract(fake)
+        self.assertEqual(len(fake.calls), 1)
+        command = fake.calls[0]
+        # Same input trim and montage output arguments as the single-output command.
+        start = command.index('-t')
+        self.assertEqual(command[start:start + 4], ['-t', '5', '-i', 'v.mp4'])
+        self.assertEqual(command[start + 4:start + 9], LEGACY_MONTAGE + [mon])
+        self.assertEqual(command[start + 9:], ['-vn', '-ar', '16000', '-ac', '1', wav])
+        self.assertTrue(os.path.exists(mon) and os.path.exists(wav))
+        self.assertAlmostEqual(duration, 62.48)
+
+    def test_output_trim_cuts_each_output(self):
+        fake = FakeFfmpeg()
+        mon, wav, _ = self.extract(fake, trim='output', timeout=60)
+        command = fake.calls[0]
+        start = command.index('-i')
+        self.assertEqual(command[start:], ['-i', 'v.mp4', '-t', '5'] + LEGACY_MONTAGE + [mon]
+                         + ['-t', '5', '-vn', '-ar', '16000', '-ac', '1', wav])
+
+    def test_silent_source_falls_back_to_the_montage_alone(self):
+        fake = FakeFfmpeg(has_audio=False)
+        mon, wav, duration = self.extract(fake)
+        self.assertEqual(len(fake.calls), 2)
+        self.assertFalse(any(arg.endswith('.wav') for arg in fake.calls[1]))
+        self.assertIsNotNone(mon)
+        self.assertIsNone(wav)
+        self.assertAlmostEqual(duration, 62.48)
+
+    def test_banner_duration(self):
+        self.assertEqual(media_extract.banner_duration('  Duration: 01:00:00.50, start'), 3600.5)
+        self.assertIsNone(media_extract.banner_duration('  Duration: N/A, start: 0'))
+        self.assertIsNone(media_extract.banner_duration(None))
+
+
+
+@unittest.skipUnless(shutil.which('ffmpeg'), 'ffmpeg is not installed')
+class RealFfmpegTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.folder, ignore_errors=True)
+        self.src = os.path.join(self.folder, 'src.mp4')
+        subprocess.run(['ffmpeg', '-nostdin', '-loglevel', 'error', '-f', 'lavfi', '-i', 'testsrc=size=360x640:rate=30',
+                        '-f', 'lavfi', '-i', 'sine=frequency=440:sample_rate=44100', '-t', '7',
+                        '-c:v', 'libx264', '-pix_fmt', 'yuv420p', '-c:a', 'aac', self.src], check=True, timeout=120)
+
+    def two_pass(self, name):
+        # The separate montage and audio commands extract_opening replaced.
+        mon, wav = os.path.join(self.folder, f'{name}.jpg'), os.path.join(self.folder, f'{name}.wav')
+        base = ['ffmpeg', '-nostdin', '-loglevel', 'error', '-t', '5', '-i', self.src]
+        subprocess.run(base + LEGACY_MONTAGE + [mon], timeout=90)
+        subprocess.run(base + ['-vn', '-ar', '16000', '-ac', '1', wav], timeout=90)
+        return mon, wav
+
+    def read(self, path):
+        with open(path, 'rb') as handle:
+            return handle.read()
+
+    def test_single_decode_outputs_are_byte_identical_to_the_two_pass_path(self):
+        old_mon, old_wav = self.two_pass('old')
+        out = os.path.join(self.folder, 'new')
+        os.mkdir(out)
+        mon, wav, duration = media_extract.extract_opening(self.src, out)
+        self.assertEqual(self.read(mon), self.read(old_mon))
+        self.assertEqual(self.read(wav), self.read(old_wav))
+        self.assertEqual(media_extract.canonicalize_montage_bytes(self.read(mon)),
+                         media_extract.canonicalize_montage_bytes(self.read(old_mon)))
+        self.assertAlmostEqual(duration, 7.0, delta=0.1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+import neighbor_index
+
+
+def clustered_rows(n=3000, dim=48, clusters=40, seed=7):
+    rng = np.random.RandomState(seed)
+    centers = rng.normal(size=(clusters, dim))
+    labels = rng.randint(clusters, size=n)
+    return (centers[labels] + 0.35 * rng.normal(size=(n, dim))).astype(np.float32)
+
+
+class NeighborIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.raw = clustered_rows()
+        self.unit = neighbor_index._unit(self.raw)
+        self.revision = {'key': 'raw/visual/embeddings.npz', 'etag': 'etag-1'}
+
+    def test_search_matches_exact_scan_with_exact_similarities(self):
+        index = neighbor_index.build(self.unit, os.path.join(self.directory, 'ivf'), self.revision)
+        rng = np.random.RandomState(3)
+        queries = self.unit[rng.choice(len(self.unit), 20, replace=False)] + 0.05 * rng.normal(size=(20, 48))
+        hits = 0
+        for query in queries:
+            exact_rows, exact_sims = neighbor_index.exact_top(self.unit, query, 13)
+            rows, sims = index.search(query, 13)
+            hits += len(set(rows.tolist()) & set(exact_rows.tolist()))
+            expected = (self.unit[rows] @ neighbor_index._unit(query)).astype(np.float32)
+            np.testing.assert_allclose(sims, expected, rtol=1e-5, atol=1e-6)
+            self.assertTrue(np.all(np.diff(sims) <= 0))
+        self.assertGreaterEqual(hits / (20 * 13), 0.99)
+        self.assertGreaterEqual(index.manifest['recall']['meanRecall'], neighbor_index.RECALL_FLOOR)
+        self.assertLess(index.probes, index.manifest['lists'])
+
+    def test_persisted_index_is_pinned_to_revision(self):
+        directory = os.path.join(self.directory, 'ivf')
+        built = neighbor_index.load_or_build(self.unit, directory, self.revision)
+        loaded = neighbor_index.load(self.unit, directory, self.revision)
+        self.assertIsNotNone(loaded)
+        np.testing.assert_array_equal(loaded.centroids, built.centroids)
+        self.assertEqual(loaded.probes, built.probes)
+        with open(os.path.join(directory, 'manifest.json'), encoding='utf8') as handle:
+            self.assertEqual(json.load(handle)['revision'], self.revision)
+        self.assertIsNone(neighbor_index.load(self.unit, directory, {**self.revision, 'etag': 'etag-2'}))
+        self.assertIsNone(neighbor_index.load(self.unit[:-1], directory, self.revision))
+        self.assertIsNone(neighbor_index.load(self.unit, directory, self.revision, normalize=True))
+
+    def test_normalizing_index_reranks_raw_rows_by_cosine(self):
+        index = neighbor_index.build(self.raw, os.path.join(self.directory, 'raw'), self.revision, normalize=True)
+        query = self.raw[11] * 3.0
+        rows, sims = index.search(query, 5)
+        exact_rows, exact_sims = neighbor_index.exact_top(self.raw, query, 5, normalize=True)
+        self.assertEqual(rows[0], 11)
+        self.assertEqual(rows.tolist(), exact_rows.tolist())
+        np.testing.assert_allclose(sims, exact_sims, rtol=1e-5)
+
+    def test_build_runs_the_exact_audit_scan_once(self):
+        exact = neighbor_index._exact_top_batch
+        calls = []
+        neighbor_index._exact_top_batch = lambda *args: calls.append(args[1].shape) or exact(*args)
+        self.addCleanup(setattr, neighbor_index, '_exact_top_batch', exact)
+        # 90 lists start at 2 probes, which this corpus needs widened at least once.
+        index = neighbor_index.build(self.unit, os.path.join(self.directory, 'ivf'), self.revision, lists=90)
+        self.assertEqual(calls, [(neighbor_index.AUDIT_PROBES, 48)])
+        recall = index.manifest['recall']
+        self.assertGreaterEqual(recall['meanRecall'], neighbor_index.RECALL_FLOOR)
+        self.assertLessEqual(recall['minimumRecall'], recall['meanRecall'])
+        self.assertLess(index.probes, 90)
+
+    def test_audit_probes_are_held_out_from_their_own_neighbours(self):
+        index = neighbor_index.build(self.unit, os.path.join(self.directory, 'ivf'), self.revision)
+        rows, queries, exact = index.audit_sample(k=13)
+        self.assertEqual(len(rows), neighbor_index.AUDIT_PROBES)
+        # Each query is off its source row, like an upload that is not in the corpus.
+        self.assertTrue(np.all(np.sum(queries * self.unit[rows], axis=1) < 0.99))
+        for row, query, truth in zip(rows, queries, exact):
+            expected, _ = neighbor_index.exact_top(self.unit, query, 14)
+            self.assertEqual(truth.tolist(), [found for found in expected.tolist() if found != row][:13])
+        recall = index.audit_recall(k=13, sample=(rows, queries, exact))
+        self.assertEqual(recall['noise'], neighbor_index.AUDIT_NOISE)
+        self.assertEqual(index.manifest['recall']['noise'], neighbor_index.AUDIT_NOISE)
+
+    def test_tiny_corpus_degrades_to_exact_scan(self):
+        rows = self.unit[:10]
+        index = neighbor_index.build(rows, os.path.join(self.directory, 'tiny'), self.revision)
+        found, _ = index.search(rows[4], 13)
+        self.assertEqual(len(found), 10)
+        self.assertEqual(found[0], 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+import knn_density
+import novelty_state
+
+
+def unit(rows):
+    return (rows / np.linalg.norm(rows, axis=1, keepdims=True)).astype(np.float32)
+
+
+def kmeans_fit(X):
+    return np.asarray(X[:4], np.float32)
+
+
+def pca_fit(X):
+    mean = np.asarray(X, np.float64).mean(axis=0)
+    _, _, vt = np.linalg.svd(np.asarray(X, np.float64) - mean, full_matrices=False)
+    return vt[:3], mean
+
+
+class NoveltyStateTest(unittest.TestCase):
+    def setUp(self):
+        self.cache = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache, ignore_errors=True)
+        rng = np.random.RandomState(3)
+        self.vecs = unit(rng.normal(size=(600, 16)))
+        self.ids = [f'v{row}' for row in range(600)]
+
+    def lists(self, ids, vecs, **options):
+        return novelty_state.neighbor_lists('knn', ids, vecs, 9, cache_dir=self.cache, **options)
+
+    def test_growth_updates_match_a_full_rebuild(self):
+        first = self.lists(self.ids, self.vecs)
+        self.assertEqual(first[2]['mode'], 'full')
+        rng = np.random.RandomState(4)
+        vecs = np.concatenate([self.vecs[5:], unit(rng.normal(size=(40, 16)))])
+        vecs[100] = unit(rng.normal(size=(1, 16)))[0]
+        ids = self.ids[5:] + [f'n{row}' for row in range(40)]
+        ids, vecs = ids[::-1], vecs[::-1]
+        sims, rows, stats = self.lists(ids, vecs)
+        self.assertEqual(stats['mode'], 'incremental')
+        self.assertEqual((stats['added'], stats['removed']), (41, 6))
+        self.assertLess(stats['requeried'], 100)
+        self.assertGreater(stats['repaired'], 0)
+        full_sims, _, _ = knn_density.top_similarities(vecs, vecs, 9)
+        np.testing.assert_allclose(sims, full_sims, rtol=0, atol=1e-6)
+        np.testing.assert_allclose(np.einsum('ij,ikj->ik', vecs, vecs[rows]), sims, rtol=0, atol=1e-6)
+        self.assertLess(novelty_state.verify_neighbors(vecs, sims), 1e-6)
+        again = self.lists(ids, vecs)[2]
+        self.assertEqual((again['added'], again['requeried'], again['repaired']), (0, 0, 0))
+        self.assertEqual(self.lists(ids, vecs, incremental=False)[2]['mode'], 'full')
+
+    def test_verify_rejects_lists_that_miss_neighbors(self):
+        sims, _, _ = self.lists(self.ids, self.vecs)
+        sims = sims.copy()
+        sims[7, 3] -= 0.01
+        with self.assertRaises(RuntimeError):
+            novelty_state.verify_neighbors(self.vecs, sims)
+
+    def test_models_are_kept_until_their_cost_drifts(self):
+        rng = np.random.RandomState(5)
+        modes = unit(rng.normal(size=(5, 16)))
+        clustered = unit(modes[np.arange(620) % 4] + 0.3 * rng.normal(size=(620, 16)))
+        X = clustered[:400]
+        centers, labels, info = novelty_state.kmeans_centers('km', X, 4, kmeans_fit, cache_dir=self.cache)
+        self.assertTrue(info['refit'])
+        cost, expected = novelty_state.kmeans_cost(X, centers)
+        np.testing.assert_array_equal(labels, expected)
+        grown = clustered[:420]
+        kept, _, info = novelty_state.kmeans_centers('km', grown, 4, kmeans_fit, cache_dir=self.cache)
+        self.assertFalse(info['refit'])
+        self.assertLessEqual(abs(info['drift']), novelty_state.DRIFT_THRESHOLD)
+        np.testing.assert_array_equal(kept, centers)
+        shifted = np.concatenate([X[:240], unit(modes[4] + 0.3 * rng.normal(size=(160, 16)))])
+        _, _, info = novelty_state.kmeans_centers('km', shifted, 4, kmeans_fit, cache_dir=self.cache)
+        self.assertEqual((info['refit'], info['reason']), (True, 'drift'))
+        self.assertGreater(abs(info['drift']), novelty_state.DRIFT_THRESHOLD)
+        self.assertTrue(novelty_state.kmeans_centers(
+            'km', shifted, 5, lambda rows: rows[:5], cache_dir=self.cache)[2]['refit'])
+
+        components, mean, info = novelty_state.pca_basis('pca', X, 3, pca_fit, cache_dir=self.cache)
+        self.assertTrue(info['refit'])
+        _, _, info = novelty_state.pca_basis('pca', grown, 3, pca_fit, cache_dir=self.cache)
+        self.assertFalse(info['refit'])
+        self.assertAlmostEqual(novelty_state.full_rebuild_gap(X, (components, mean), pca_fit(X)), 0, places=5)
+        self.assertGreater(novelty_state.full_rebuild_gap(grown, (components, mean), pca_fit(grown)), 0)
+
+    def test_models_are_refit_by_age_and_growth_without_drift(self):
+        rng = np.random.RandomState(6)
+        X = unit(rng.normal(size=(500, 16)))
+        fits = []
+
+        def fit(rows):
+            fits.append(len(rows))
+            return pca_fit(rows)
+
+        reasons = []
+        for run in range(novelty_state.REFIT_EVERY + 1):
+            info = novelty_state.pca_basis('aging', X[:400 + run], 3, fit, cache_dir=self.cache)[2]
+            reasons.append(info['reason'])
+        self.assertEqual(reasons, ['new'] + [None] * (novelty_state.REFIT_EVERY - 1) + ['age'])
+        self.assertEqual(fits, [400, 400 + novelty_state.REFIT_EVERY])
+
+        novelty_state.kmeans_centers('growing', X[:400], 4, kmeans_fit, cache_dir=self.cache)
+        grown = int(400 * (1 + novelty_state.REFIT_GROWTH))
+        _, _, info = novelty_state.kmeans_centers('growing', X[:grown], 4, kmeans_fit, cache_dir=self.cache)
+        self.assertFalse(info['refit'])
+        _, _, info = novelty_state.kmeans_centers('growing', X[:grown + 1], 4, kmeans_fit, cache_dir=self.cache)
+        self.assertEqual((info['refit'], info['reason'], info['drift'], info['fitRows']), (True, 'growth', None, grown + 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import unittest
+from unittest import mock
+
+import numpy as np
+from sklearn.linear_model import Ridge
+
+import ridge_path
+
+
+class RidgePathTest(unittest.TestCase):
+    def check(self, rows, columns):
+        rng = np.random.RandomState(rows + columns)
+        X = rng.normal(size=(rows, columns)) + 3.0
+        y = X[:, 0] * 2 - X[:, -1] + rng.normal(size=rows) + 5.0
+        test = rng.normal(size=(17, columns))
+        path = ridge_path.fit(X, y)
+        predictions = ridge_path.predict(path, test)
+        self.assertEqual(predictions.shape, (17, len(ridge_path.ALPHAS)))
+        for column, alpha in enumerate(ridge_path.ALPHAS):
+            model = Ridge(alpha=alpha).fit(X, y)
+            np.testing.assert_allclose(predictions[:, column], model.predict(test), rtol=1e-7, atol=1e-8)
+            coef, intercept = ridge_path.coefficients(path, alpha)
+            np.testing.assert_allclose(coef, model.coef_, rtol=1e-7, atol=1e-9)
+            self.assertAlmostEqual(intercept, model.intercept_, places=7)
+
+    def test_matches_sklearn_ridge_for_tall_designs(self):
+        self.check(300, 12)
+
+    def test_matches_sklearn_ridge_for_wide_designs(self):
+        self.check(20, 45)
+
+    def test_chunked_gram_matches_one_block(self):
+        rng = np.random.RandomState(4)
+        X = rng.normal(size=(50, 6)).astype(np.float32)
+        y = rng.normal(size=50)
+        whole = ridge_path.predict(ridge_path.fit(X, y), X[:5], (1.0, 10.0))
+        with mock.patch.object(ridge_path, 'CHUNK_ROWS', 7):
+            chunked = ridge_path.predict(ridge_path.fit(X, y), X[:5], (1.0, 10.0))
+        np.testing.assert_allclose(chunked, whole, rtol=1e-10)
+
+    def test_grid_contains_the_decade_alphas(self):
+        self.assertTrue({0.1, 1.0, 10.0, 100.0, 1000.0} <= set(ridge_path.ALPHAS))
+        self.assertEqual(list(ridge_path.ALPHAS), sorted(ridge_path.ALPHAS))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -9,7 +9,8 @@ uploads, so one-off link scoring cannot drift with the Mac's Python or model env
 
 Installed as a launchd agent (com.businessworld.ytrelay) with KeepAlive — like the crawler,
 it should always be running."""
-import base64, hashlib, json, os, re, subprocess, sys, tempfile, threading, time
+import base64, hashlib, json, os, queue, re, shutil, subprocess, sys, tempfile, threading, time
+from concurrent.futures import ThreadPoolExecutor
 
 HERE = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, HERE)
@@ -72,6 +73,20 @@ CHANNEL_INDEX_ENTRY_KEYS = {
     'error',
 }
 CHANNEL_INDEX_CURRENT_KEYS = {'id', 'title', 'number'}
+# Per-video progress goes to an append-only journal of small event objects
+# (raw/saved-channels/<id>/journal/) that is folded into manifest.json every
+# CHANNEL_JOURNAL_COMPACT_EVENTS events or CHANNEL_JOURNAL_COMPACT_S seconds.
+# Stop flags are polled from the small control.json the server writes on every
+# control change (and, every CHANNEL_STOP_MANIFEST_EVERY polls, from the manifest
+# itself, in case a control write failed after the manifest was saved). Each
+# manifest write leaves a snapshot.json (its navigation entry, keyed by the manifest
+# ETag) so index rebuilds skip the full manifests.
+CHANNEL_JOURNAL_SCHEMA = 'saved-channel-journal-event-v1'
+CHANNEL_CONTROL_SCHEMA = 'saved-channel-control-v1'
+CHANNEL_SNAPSHOT_SCHEMA = 'saved-channel-manifest-snapshot-v1'
+CHANNEL_JOURNAL_COMPACT_EVENTS = int(env('CHANNEL_JOURNAL_COMPACT_EVENTS') or 50)
+CHANNEL_JOURNAL_COMPACT_S = float(env('CHANNEL_JOURNAL_COMPACT_S') or 30)
+CHANNEL_STOP_MANIFEST_EVERY = max(1, int(env('CHANNEL_STOP_MANIFEST_EVERY') or 15))
 INDICATOR_REGISTRY_KEY = 'raw/indicators/registry.json'
 _index_lock = threading.Lock()
 
@@ -129,12 +144,16 @@ def put_immutable_bytes(key, payload, content_type='application/json'):
     return body
 
 def list_json(prefix):
-    out, token = [], None
+    return list(list_json_etags(prefix))
+
+def list_json_etags(prefix):
+    """{key: ETag (None if the listing omitted it)} of the .json objects under `prefix`."""
+    out, token = {}, None
     while True:
         args = {'Bucket': BUCKET, 'Prefix': prefix}
         if token: args['ContinuationToken'] = token
         page = s3.list_objects_v2(**args)
-        out += [obj['Key'] for obj in page.get('Contents', []) if obj['Key'].endswith('.json')]
+        out.update((obj['Key'], obj.get('ETag')) for obj in page.get('Contents', []) if obj['Key'].endswith('.json'))
         token = page.get('NextContinuationToken') if page.get('IsTruncated') else None
         if not token: return out
 
@@ -467,7 +486,7 @@ def _channel_index_payload(index):
 
 def build_channel_index(manifest_artifacts, updated_at=None):
     channels = [
-        compact_channel(
+        artifact.get('channel') or compact_channel(
             artifact['manifest'],
             artifact['key'],
             artifact['bytes'],
@@ -639,8 +658,14 @@ def validate_channel_index(index):
 
 def _load_channel_manifest_artifacts():
     artifacts = []
-    for key in sorted(list_json(CHANNEL_ROOT)):
-        if not CHANNEL_MANIFEST_KEY_RE.fullmatch(key):
+    listed = list_json_etags(CHANNEL_ROOT)
+    for key in sorted(listed):
+        match = CHANNEL_MANIFEST_KEY_RE.fullmatch(key)
+        if not match:
+            continue
+        snapshot = _current_channel_snapshot(match.group(1), key, listed[key])
+        if snapshot:
+            artifacts.append(snapshot)
             continue
         response = s3.get_object(Bucket=BUCKET, Key=key)
         manifest_bytes = response['Body'].read()
@@ -664,6 +689,41 @@ def _load_channel_manifest_artifacts():
     return artifacts
 
 
+def channel_snapshot_key(channel_id):
+    return CHANNEL_ROOT + channel_id + '/snapshot.json'
+
+
+def _put_channel_snapshot(key, manifest, manifest_bytes, etag):
+    if not etag:
+        return
+    put_json(channel_snapshot_key(manifest['id']), {
+        'schema': CHANNEL_SNAPSHOT_SCHEMA,
+        'manifestKey': key,
+        'manifestEtag': etag,
+        'channel': compact_channel(manifest, key, manifest_bytes),
+    })
+
+
+def _current_channel_snapshot(channel_id, key, etag=None):
+    """The compacted navigation entry of `key`, when its snapshot matches the live ETag.
+
+    `etag` is the manifest ETag from the bucket listing, so a current snapshot costs
+    one GET; without it the manifest is HEADed."""
+    snapshot = get_json(channel_snapshot_key(channel_id))
+    if (
+        not isinstance(snapshot, dict)
+        or snapshot.get('schema') != CHANNEL_SNAPSHOT_SCHEMA
+        or snapshot.get('manifestKey') != key
+        or not isinstance(snapshot.get('channel'), dict)
+        or set(snapshot['channel']) != CHANNEL_INDEX_ENTRY_KEYS
+    ):
+        return None
+    etag = etag or s3.head_object(Bucket=BUCKET, Key=key).get('ETag')
+    if not etag or etag != snapshot.get('manifestEtag'):
+        return None
+    return {'key': key, 'channel': snapshot['channel'], 'etag': etag}
+
+
 def _r2_precondition_failed(exc):
     response = getattr(exc, 'response', {}) or {}
     metadata = response.get('ResponseMetadata') or {}
@@ -704,19 +764,20 @@ def _manifest_snapshot_is_current(artifacts):
     expected_keys = sorted(
         artifact['key'] for artifact in artifacts
     )
+    listed = list_json_etags(CHANNEL_ROOT)
     current_keys = sorted(
         key
-        for key in list_json(CHANNEL_ROOT)
+        for key in listed
         if CHANNEL_MANIFEST_KEY_RE.fullmatch(key)
     )
     if current_keys != expected_keys:
         return False
     for artifact in artifacts:
-        response = s3.head_object(
+        etag = listed[artifact['key']] or s3.head_object(
             Bucket=BUCKET,
             Key=artifact['key'],
-        )
-        if response.get('ETag') != artifact.get('etag'):
+        ).get('ETag')
+        if etag != artifact.get('etag'):
             return False
     return True
 
@@ -1021,6 +1082,10 @@ def save_manifest(manifest, max_attempts=8):
                 'saved-channel manifest failed exact read-after-write '
                 + 'verification: ' + key
             )
+        _put_channel_snapshot(
+            key, next_manifest, manifest_bytes,
+            verified.get('ETag') or written_etag,
+        )
         update_channel_index(next_manifest)
         return next_manifest
     raise RuntimeError(
@@ -1028,6 +1093,142 @@ def save_manifest(manifest, max_attempts=8):
         + key
     )
 
+def channel_control_key(channel_id):
+    return CHANNEL_ROOT + channel_id + '/control.json'
+
+
+def channel_journal_prefix(channel_id):
+    return CHANNEL_ROOT + channel_id + '/journal/'
+
+
+def seed_channel_control(manifest):
+    """Create control.json for channels imported before the server wrote one."""
+    try:
+        s3.put_object(
+            Bucket=BUCKET,
+            Key=channel_control_key(manifest['id']),
+            Body=stable_json_bytes({
+                'schema': CHANNEL_CONTROL_SCHEMA,
+                'id': manifest['id'],
+                'controlRevision': _manifest_control_revision(manifest),
+                'controlIntent': manifest.get('controlIntent'),
+                'stopRequested': bool(manifest.get('stopRequested')),
+            }),
+            ContentType='application/json',
+            IfNoneMatch='*',
+        )
+    except Exception as exc:
+        if not _r2_precondition_failed(exc):
+            raise
+
+
+def channel_stop_requested(manifest, poll=None):
+    """The stop flag from control.json; the full manifest is read when the control object
+    is missing or older than the control revision this import already saw, and on every
+    CHANNEL_STOP_MANIFEST_EVERY-th `poll`: the server saves the manifest before it writes
+    control.json, so a failed control write must not hide a stop for the rest of the import."""
+    control = None
+    if poll is None or poll % CHANNEL_STOP_MANIFEST_EVERY:
+        control = get_json(channel_control_key(manifest['id']))
+    if (
+        isinstance(control, dict)
+        and control.get('id') == manifest['id']
+        and _manifest_control_revision(control) >= _manifest_control_revision(manifest)
+    ):
+        return bool(control.get('stopRequested'))
+    key = CHANNEL_ROOT + manifest['id'] + '/manifest.json'
+    return bool((get_json(key, {}) or {}).get('stopRequested'))
+
+
+def apply_journal_event(manifest, event):
+    row = event.get('video')
+    if isinstance(row, dict) and row.get('id'):
+        videos = manifest.setdefault('videos', [])
+        index = next((index for index, video in enumerate(videos) if video.get('id') == row['id']), None)
+        if index is None:
+            videos.append(row)
+        else:
+            videos[index] = row
+    manifest.update(event.get('fields') or {})
+    return manifest
+
+
+def _delete_keys(keys):
+    for start in range(0, len(keys), 1000):
+        s3.delete_objects(Bucket=BUCKET, Delete={
+            'Objects': [{'Key': key} for key in keys[start:start + 1000]], 'Quiet': True})
+
+
+def replay_channel_journal(manifest):
+    """Fold events an interrupted import journaled but never compacted into `manifest`.
+    Events from before the latest run/stop/resume only contribute finished scores, so a
+    resume's re-queued rows are not put back into their old error state."""
+    keys = sorted(list_json(channel_journal_prefix(manifest['id'])))
+    if not keys:
+        return manifest
+    control_at = _navigation_integer(manifest.get('controlUpdatedAt'))
+    for key in keys:
+        event = get_json(key)
+        if not isinstance(event, dict) or event.get('schema') != CHANNEL_JOURNAL_SCHEMA:
+            continue
+        if _navigation_integer(event.get('at')) < control_at:
+            if (event.get('video') or {}).get('status') != 'done':
+                continue
+            event = {'video': event['video']}
+        apply_journal_event(manifest, event)
+    manifest = save_manifest(manifest)
+    _delete_keys(keys)
+    log('channel %s replayed %d journal events' % (manifest['id'], len(keys)))
+    return manifest
+
+
+class ChannelJournal:
+    """Append-only log of one import's manifest changes, compacted into manifest.json.
+
+    append() records a video row the caller already changed in place and/or top-level
+    fields as one small immutable event (the manifest itself only changes in memory),
+    so a scored video costs O(1) R2 writes however large the channel is. compact() is
+    the one full manifest write.
+    """
+
+    def __init__(self, channel_id, compact_events=None, compact_seconds=None):
+        self.prefix = channel_journal_prefix(channel_id)
+        self.session = '%013d' % int(time.time() * 1000)
+        self.compact_events = compact_events or CHANNEL_JOURNAL_COMPACT_EVENTS
+        self.compact_seconds = CHANNEL_JOURNAL_COMPACT_S if compact_seconds is None else compact_seconds
+        self.sequence = 0
+        self.pending = []
+        self.compacted_at = time.time()
+
+    def append(self, manifest, video=None, **fields):
+        event = {
+            'schema': CHANNEL_JOURNAL_SCHEMA,
+            'at': int(time.time() * 1000),
+            'video': json.loads(json.dumps(video)) if video is not None else None,
+            'fields': fields,
+        }
+        manifest.update(fields)
+        recount_manifest(manifest)
+        self.sequence += 1
+        key = '%s%s-%08d.json' % (self.prefix, self.session, self.sequence)
+        put_json(key, event)
+        self.pending.append(key)
+        if (
+            len(self.pending) >= self.compact_events
+            or time.time() - self.compacted_at >= self.compact_seconds
+        ):
+            return self.compact(manifest)
+        return manifest
+
+    def compact(self, manifest):
+        manifest = save_manifest(manifest)
+        if self.pending:
+            _delete_keys(self.pending)
+        self.pending = []
+        self.compacted_at = time.time()
+        return manifest
+
+
 def discover_channel(url):
     import yt_dlp
     target = url.rstrip('/') + '/shorts'
@@ -1070,6 +1271,339 @@ def append_view_snapshot(video, views, observed_at):
         history.append(snapshot)
     video['viewsHistory'] = history[-64:]
 
+# Saved-channel imports run every Short through download → extract → embed → score in
+# this process, overlapping one video's YouTube download with another's embedding calls
+# and a third's neighbour scoring. Each stage has its own bound so the watcher never
+# opens more YouTube downloads, ffmpeg decodes or embedding requests than it should;
+# CHANNEL_IMPORT_SUBPROCESS=1 falls back to one `raw_upload.py --youtube` per video.
+CHANNEL_IMPORT_STAGES = ('download', 'extract', 'embed', 'score')
+CHANNEL_IMPORT_LIMITS = {
+    'download': int(env('CHANNEL_IMPORT_DOWNLOADS') or 2),
+    'extract': int(env('CHANNEL_IMPORT_EXTRACTS') or 2),
+    'embed': int(env('CHANNEL_IMPORT_EMBEDS') or 4),
+    'score': int(env('CHANNEL_IMPORT_SCORES') or 1),
+}
+CHANNEL_IMPORT_IN_FLIGHT = int(env('CHANNEL_IMPORT_IN_FLIGHT') or 6)
+CHANNEL_IMPORT_SUBPROCESS = env('CHANNEL_IMPORT_SUBPROCESS') == '1'
+# Seconds a running stage may take before its video fails (yt-dlp's own socket_timeout only
+# bounds one read; a stalled ffmpeg cut or a retry loop can hang a download indefinitely).
+# The embed stage covers the scorer's own embedding deadline plus its cache lookups.
+CHANNEL_IMPORT_DEADLINES = {
+    'download': float(env('CHANNEL_IMPORT_DOWNLOAD_TIMEOUT_S') or 240),
+    'extract': float(env('CHANNEL_IMPORT_EXTRACT_TIMEOUT_S') or 120),
+    'embed': float(env('CHANNEL_IMPORT_EMBED_TIMEOUT_S') or raw_scorer.EMBED_DEADLINE_S + 60),
+    'score': float(env('CHANNEL_IMPORT_SCORE_TIMEOUT_S') or 180),
+}
+# After stop(), a stage still running this long is abandoned and its video re-queued.
+CHANNEL_IMPORT_STOP_GRACE_S = float(env('CHANNEL_IMPORT_STOP_GRACE_S') or 15)
+CHANNEL_IMPORT_STAGE_ERRORS = {
+    'download': 'YouTube download failed',
+    'extract': 'frame extraction failed',
+    'embed': 'embedding failed',
+    'score': 'scoring failed',
+}
+
+class ChannelImportStageError(RuntimeError):
+    """A pipeline stage failed or overran its deadline; the message names the stage."""
+
+    def __init__(self, stage, detail):
+        super().__init__(f'{CHANNEL_IMPORT_STAGE_ERRORS[stage]}: {detail}'[:240])
+        self.stage = stage
+
+class _StageAbandoned(Exception):
+    pass
+
+class _Release:
+    """Runs `cleanup` once its holder and every stage thread still using it have let go.
+
+    An overrun or abandoned stage keeps running on its thread; the download folder it
+    writes into and the snapshot it embeds against must outlive it, not the job.
+    """
+
+    def __init__(self, cleanup):
+        self.cleanup = cleanup
+        self.holders = 1
+        self.lock = threading.Lock()
+
+    def hold(self):
+        with self.lock:
+            self.holders += 1
+
+    def drop(self):
+        with self.lock:
+            self.holders -= 1
+            last = self.holders == 0
+        if last:
+            self.cleanup()
+
+class ChannelImportPipeline:
+    """Bounded, staged scoring of one channel's Shorts on worker threads.
+
+    submit() starts a video; results() hands finished (video id, record) pairs back to
+    the caller's thread, which keeps every manifest write. Records are exactly what
+    `raw_upload.py --youtube <id> --title <title>` prints, scored against the process's
+    one resident revision snapshot. A stage that overruns its deadline fails its video
+    with an error naming the stage. stop() makes in-flight videos give up at their next
+    stage boundary with the same {'stopped': True} record score_link returns; a stage
+    still running `stop_grace` seconds later is abandoned the same way. An overrun or
+    abandoned stage keeps its slot until its work really returns, so no bound is exceeded.
+    """
+
+    def __init__(self, limits=None, in_flight=None, subprocess_scoring=None, deadlines=None, stop_grace=None):
+        self.limits = dict(limits or CHANNEL_IMPORT_LIMITS)
+        self.deadlines = dict(CHANNEL_IMPORT_DEADLINES, **(deadlines or {}))
+        self.stop_grace = CHANNEL_IMPORT_STOP_GRACE_S if stop_grace is None else stop_grace
+        self.capacity = max(1, in_flight or CHANNEL_IMPORT_IN_FLIGHT)
+        self.subprocess_scoring = CHANNEL_IMPORT_SUBPROCESS if subprocess_scoring is None else subprocess_scoring
+        self.gates = {stage: threading.Semaphore(max(1, self.limits[stage])) for stage in CHANNEL_IMPORT_STAGES}
+        self.lock = threading.Lock()
+        self.depth = {stage: {'waiting': 0, 'running': 0, 'done': 0} for stage in CHANNEL_IMPORT_STAGES}
+        self.pending = set()
+        self.finished = queue.Queue()
+        self.stopped = threading.Event()
+        self.stopped_at = None
+        self.snapshot = None if self.subprocess_scoring else raw_scorer.resident_snapshot()
+        self.pool = ThreadPoolExecutor(max_workers=self.capacity, thread_name_prefix='channel-import')
+
+    def submit(self, video):
+        with self.lock:
+            self.pending.add(video['id'])
+        self.pool.submit(self._job, video['id'], video.get('sourceUrl') or video['id'], video.get('title') or '')
+
+    def results(self, timeout):
+        """Finished (video id, record) pairs, waiting up to `timeout` seconds for the first."""
+        out = []
+        try:
+            out.append(self.finished.get(timeout=timeout))
+            while True:
+                out.append(self.finished.get_nowait())
+        except queue.Empty:
+            pass
+        with self.lock:
+            self.pending.difference_update(video_id for video_id, _ in out)
+        return out
+
+    def in_flight(self):
+        with self.lock:
+            return set(self.pending)
+
+    def queue_depth(self):
+        with self.lock:
+            depth = {stage: dict(counts) for stage, counts in self.depth.items()}
+            depth['inFlight'] = len(self.pending)
+        return depth
+
+    def stop(self):
+        if self.stopped_at is None:
+            self.stopped_at = time.monotonic()
+        self.stopped.set()
+
+    def close(self):
+        self.stop()
+        self.pool.shutdown(wait=True)
+
+    def _abandon_due(self):
+        return self.stopped.is_set() and time.monotonic() - self.stopped_at >= self.stop_grace
+
+    def _stage(self, stage, work, deadline=True, uses=()):
+        """work() under the stage's bound, failing after its deadline (None: no deadline).
+
+        Each _Release in `uses` is held until work() really returns, on its own thread.
+        """
+        with self.lock:
+            self.depth[stage]['waiting'] += 1
+        try:
+            while not self.gates[stage].acquire(timeout=.5):
+                if self.stopped.is_set():
+                    raise _StageAbandoned()
+        finally:
+            with self.lock:
+                self.depth[stage]['waiting'] -= 1
+        with self.lock:
+            self.depth[stage]['running'] += 1
+        outcome, finished = {}, threading.Event()
+        for resource in uses:
+            resource.hold()
+
+        def run():
+            try:
+                outcome['value'] = work()
+            except BaseException as exc:
+                outcome['error'] = exc
+            finally:
+                with self.lock:
+                    self.depth[stage]['running'] -= 1
+                    self.depth[stage]['done'] += 1
+                self.gates[stage].release()
+                finished.set()
+                for resource in uses:
+                    resource.drop()
+
+        threading.Thread(target=run, name=f'channel-import-{stage}', daemon=True).start()
+        limit = self.deadlines[stage] if deadline is True else deadline
+        started = time.monotonic()
+        while not finished.wait(.5):
+            if self._abandon_due():
+                raise _StageAbandoned()
+            if limit is not None and time.monotonic() - started >= limit:
+                raise ChannelImportStageError(stage, f'timed out after {limit:g}s')
+        if 'error' in outcome:
+            raise ChannelImportStageError(stage, str(outcome['error'])[:200]) from outcome['error']
+        return outcome['value']
+
+    def _job(self, video_id, link, title):
+        try:
+            record = self._score(link, title)
+        except _StageAbandoned:
+            record = {'error': 'stopped by user', 'stopped': True}
+        except ChannelImportStageError as exc:
+            record = {'error': str(exc)}
+        except Exception as exc:
+            record = {'error': 'processing failed: ' + str(exc)[:200]}
+        self.finished.put((video_id, record))
+
+    def _score(self, link, title):
+        stopped = {'error': 'stopped by user', 'stopped': True}
+        if self.stopped.is_set():
+            return stopped
+        if self.subprocess_scoring:
+            # score_link enforces its own 7-minute limit and stop check on the subprocess.
+            return self._stage('score', lambda: score_link(link, title, self.stopped.is_set), deadline=None)
+        vid = raw_scorer.youtube_video_id(link)
+        if not vid:
+            return {'error': 'could not find a YouTube video id in that link'}
+        folder = tempfile.mkdtemp(prefix='rawyt_')
+        # Removed when this job and any download/extract thread it left behind are done.
+        downloads = _Release(lambda: shutil.rmtree(folder, ignore_errors=True))
+        try:
+            info, path, acquisition = self._stage(
+                'download', lambda: raw_scorer.download_youtube_hook(vid, folder), uses=(downloads,))
+            if self.stopped.is_set():
+                return stopped
+            inputs = self._stage('extract', lambda: raw_scorer.hook_inputs(path), uses=(downloads,))
+        finally:
+            downloads.drop()
+        if not inputs:
+            return {'error': 'downloaded but could not extract frames (ffmpeg decode failed)'}
+        if self.stopped.is_set():
+            return stopped
+        try: duration = float(info.get('duration') or 0) or None
+        except Exception: duration = None
+        title = str(title)[:80] if title else str(info.get('title') or vid)[:80]
+        revisions = self.snapshot.enter()
+        entered = _Release(self.snapshot.leave)
+        try:
+            prepared = self._stage('embed', lambda: raw_scorer.prepare_score(*inputs, duration, None, revisions),
+                                   uses=(entered,))
+            if self.stopped.is_set():
+                return stopped
+            return self._stage('score', lambda: raw_scorer.finish_score(
+                prepared, raw_scorer.youtube_extra(vid, info, acquisition), title, 'youtube'), uses=(entered,))
+        finally:
+            entered.drop()
+
+def _record_channel_score(journal, manifest, channel_id, video_id, record, pipeline,
+                          registry, registry_revision):
+    """Journal one finished score into the channel manifest → (manifest, retry delay or None)."""
+    video = next((item for item in manifest.get('videos', []) if item.get('id') == video_id), None)
+    if not video: return manifest, None
+    if record.get('stopped'):
+        video.update({'status': 'queued', 'error': None})
+        manifest = journal.append(manifest, video, pipeline=pipeline.queue_depth())
+        log('channel %s stopped during %s' % (channel_id, video['id']))
+        return manifest, None
+    if record.get('error'):
+        video.update({'status': 'error', 'error': str(record['error'])[:300]})
+        if video['attempts'] < 3:
+            video['status'] = 'queued'
+        manifest = journal.append(manifest, video, pipeline=pipeline.queue_depth())
+        return manifest, (min(20, video['attempts'] * 5) if video['status'] == 'queued' else None)
+
+    montage = record.pop('montage', None)
+    montage_saved = False
+    montage_error = 'scorer did not return a montage'
+    if montage:
+        for upload_attempt in range(3):
+            try:
+                s3.put_object(Bucket=BUCKET, Key=CHANNEL_ROOT + channel_id + '/montages/' + video['id'] + '.jpg',
+                              Body=base64.b64decode(montage), ContentType='image/jpeg')
+                montage_saved = True
+                break
+            except Exception as exc:
+                montage_error = str(exc)[:220]
+                log('channel %s montage upload %s attempt %d: %s' % (channel_id, video['id'], upload_attempt + 1, str(exc)[:100]))
+                if upload_attempt < 2: time.sleep(2 ** upload_attempt)
+    if not montage_saved:
+        video.update({'status': 'error', 'error': 'stored image failed: ' + montage_error})
+        if video['attempts'] < 3: video['status'] = 'queued'
+        manifest = journal.append(manifest, video, pipeline=pipeline.queue_depth())
+        return manifest, (min(20, video['attempts'] * 5) if video['status'] == 'queued' else None)
+    record.update({
+        'id': video['id'],
+        'savedChannelVideoId': video['id'],
+        'savedChannelId': channel_id,
+        'savedAt': int(time.time() * 1000),
+        'hasMontage': montage_saved,
+    })
+    if record.get('score_ledger'):
+        persisted_bundle = feature_bundle_from_ledger(
+            record['score_ledger']
+        )
+        features = persisted_bundle['features']
+        novelty_provenance = (
+            record.get('novelty_provenance')
+            or persisted_bundle['novelty_provenance']
+        )
+    else:
+        generated_bundle = materialize_score_bundle(
+            record,
+            registry,
+            registry_revision,
+        )
+        features = generated_bundle['features']
+        novelty_provenance = generated_bundle[
+            'novelty_provenance'
+        ]
+        record['steer'] = generated_bundle['addressed_steer']
+        record['score_ledger'] = generated_bundle['score_ledger']
+    record['novelty_provenance'] = novelty_provenance
+    # The canonical ledger owns persisted scalar scores. The scorer's
+    # denormalized caches are checked before this boundary and then
+    # discarded so saved-channel records cannot drift into two truths.
+    record.pop('steer', None)
+    record.pop('features', None)
+    record['score_record_sha256'] = score_record_binding_sha256(
+        record
+    )
+    record_bytes = stable_json_bytes(record)
+    record_artifact_sha256 = hashlib.sha256(
+        record_bytes
+    ).hexdigest()
+    put_immutable_bytes(
+        saved_channel_record_artifact_key(
+            channel_id,
+            record_artifact_sha256,
+        ),
+        record_bytes,
+    )
+    video.update(scored_video_update(
+        record,
+        video,
+        manifest.get('name'),
+        montage_saved,
+        novelty_provenance,
+        score_ledger=record.get('score_ledger'),
+        record_artifact_sha256=record_artifact_sha256,
+        record_byte_length=len(record_bytes),
+    ))
+    if isinstance(video.get('ledgerRepair'), dict):
+        video['ledgerRepair']['status'] = 'completed'
+        video['ledgerRepair']['completedAt'] = int(time.time() * 1000)
+    append_view_snapshot(video, video.get('views'), video.get('viewsObservedAt'))
+    manifest = journal.append(manifest, video, name=record.get('sourceChannel') or manifest.get('name'),
+                              pipeline=pipeline.queue_depth())
+    return manifest, None
+
 def process_channel_request(key):
     request = get_json(key, {}) or {}
     channel_id = str(request.get('id') or '')
@@ -1083,6 +1617,7 @@ def process_channel_request(key):
         manifest = {'version': 1, 'id': channel_id, 'url': url, 'name': url.rsplit('/', 1)[-1],
                     'createdAt': int(time.time() * 1000), 'videos': []}
     try:
+        manifest = replay_channel_journal(manifest)
         manifest.update({'status': 'running', 'phase': 'discovering', 'stopRequested': False,
                          'error': None, 'current': None, 'featureContractVersion': FEATURE_CONTRACT['version']})
         manifest = save_manifest(manifest)
@@ -1132,144 +1667,61 @@ def process_channel_request(key):
         )
 
         registry, registry_revision = load_indicator_registry()
-        while True:
-            candidate = next((video for video in (manifest.get('videos') or [])
-                              if video.get('status') != 'done'
-                              and not (video.get('status') == 'error' and int(video.get('attempts') or 0) >= 3)), None)
-            if not candidate: break
-            while interactive_relay_waiting():
-                fresh = get_json(manifest_key, manifest) or manifest
-                if fresh.get('stopRequested'): break
-                time.sleep(3)
-            manifest = get_json(manifest_key, manifest) or manifest
-            if manifest.get('stopRequested'):
-                manifest.update({'status': 'stopped', 'phase': 'stopped', 'current': None})
-                manifest = save_manifest(manifest)
-                log('channel %s stopped at %d/%d' % (channel_id, manifest.get('completed', 0), manifest.get('discovered', 0)))
-                s3.delete_object(Bucket=BUCKET, Key=key)
-                return
-            video = next((item for item in manifest.get('videos', []) if item.get('id') == candidate.get('id')), None)
-            if not video or video.get('status') == 'done': continue
-            video['status'] = 'scoring'; video['attempts'] = int(video.get('attempts') or 0) + 1; video['error'] = None
-            if isinstance(video.get('ledgerRepair'), dict):
-                video['ledgerRepair']['status'] = 'scoring'
-            manifest.update({'status': 'running', 'phase': 'scoring', 'current': {'id': video['id'], 'title': video.get('title'), 'number': manifest.get('completed', 0) + manifest.get('failed', 0) + 1}})
-            manifest = save_manifest(manifest)
-            log('channel %s %d/%d score %s' % (channel_id, manifest.get('completed', 0) + 1, manifest.get('discovered', 0), video['id']))
-            stop_state = {'checked': 0, 'value': False}
-            def should_stop():
-                if time.time() - stop_state['checked'] > 2:
-                    stop_state['checked'] = time.time()
-                    stop_state['value'] = bool((get_json(manifest_key, {}) or {}).get('stopRequested'))
-                return stop_state['value']
-            record = score_link(video.get('sourceUrl') or video['id'], video.get('title') or '', should_stop)
-            manifest = get_json(manifest_key, manifest) or manifest
-            video = next((item for item in manifest.get('videos', []) if item.get('id') == candidate.get('id')), None)
-            if not video: continue
-            if record.get('stopped'):
-                video.update({'status': 'queued', 'error': None})
-                manifest.update({'status': 'stopped', 'phase': 'stopped', 'current': None})
-                manifest = save_manifest(manifest)
-                log('channel %s stopped during %s' % (channel_id, video['id']))
-                s3.delete_object(Bucket=BUCKET, Key=key)
-                return
-            if record.get('error'):
-                video.update({'status': 'error', 'error': str(record['error'])[:300]})
-                if video['attempts'] < 3:
-                    video['status'] = 'queued'
-                manifest = save_manifest(manifest)
-                if video['status'] == 'queued': time.sleep(min(20, video['attempts'] * 5))
-                continue
-
-            montage = record.pop('montage', None)
-            montage_saved = False
-            montage_error = 'scorer did not return a montage'
-            if montage:
-                for upload_attempt in range(3):
-                    try:
-                        s3.put_object(Bucket=BUCKET, Key=CHANNEL_ROOT + channel_id + '/montages/' + video['id'] + '.jpg',
-                                      Body=base64.b64decode(montage), ContentType='image/jpeg')
-                        montage_saved = True
-                        break
-                    except Exception as exc:
-                        montage_error = str(exc)[:220]
-                        log('channel %s montage upload %s attempt %d: %s' % (channel_id, video['id'], upload_attempt + 1, str(exc)[:100]))
-                        if upload_attempt < 2: time.sleep(2 ** upload_attempt)
-            if not montage_saved:
-                video.update({'status': 'error', 'error': 'stored image failed: ' + montage_error})
-                if video['attempts'] < 3: video['status'] = 'queued'
-                manifest = save_manifest(manifest)
-                if video['status'] == 'queued': time.sleep(min(20, video['attempts'] * 5))
-                continue
-            record.update({
-                'id': video['id'],
-                'savedChannelVideoId': video['id'],
-                'savedChannelId': channel_id,
-                'savedAt': int(time.time() * 1000),
-                'hasMontage': montage_saved,
-            })
-            if record.get('score_ledger'):
-                persisted_bundle = feature_bundle_from_ledger(
-                    record['score_ledger']
-                )
-                features = persisted_bundle['features']
-                novelty_provenance = (
-                    record.get('novelty_provenance')
-                    or persisted_bundle['novelty_provenance']
-                )
-            else:
-                generated_bundle = materialize_score_bundle(
-                    record,
-                    registry,
-                    registry_revision,
-                )
-                features = generated_bundle['features']
-                novelty_provenance = generated_bundle[
-                    'novelty_provenance'
-                ]
-                record['steer'] = generated_bundle['addressed_steer']
-                record['score_ledger'] = generated_bundle['score_ledger']
-            record['novelty_provenance'] = novelty_provenance
-            # The canonical ledger owns persisted scalar scores. The scorer's
-            # denormalized caches are checked before this boundary and then
-            # discarded so saved-channel records cannot drift into two truths.
-            record.pop('steer', None)
-            record.pop('features', None)
-            record['score_record_sha256'] = score_record_binding_sha256(
-                record
-            )
-            record_bytes = stable_json_bytes(record)
-            record_artifact_sha256 = hashlib.sha256(
-                record_bytes
-            ).hexdigest()
-            put_immutable_bytes(
-                saved_channel_record_artifact_key(
-                    channel_id,
-                    record_artifact_sha256,
-                ),
-                record_bytes,
-            )
-            video.update(scored_video_update(
-                record,
-                video,
-                manifest.get('name'),
-                montage_saved,
-                novelty_provenance,
-                score_ledger=record.get('score_ledger'),
-                record_artifact_sha256=record_artifact_sha256,
-                record_byte_length=len(record_bytes),
-            ))
-            if isinstance(video.get('ledgerRepair'), dict):
-                video['ledgerRepair']['status'] = 'completed'
-                video['ledgerRepair']['completedAt'] = int(time.time() * 1000)
-            append_view_snapshot(video, video.get('views'), video.get('viewsObservedAt'))
-            manifest['name'] = record.get('sourceChannel') or manifest.get('name')
-            manifest = save_manifest(manifest)
-
-        manifest = get_json(manifest_key, manifest) or manifest
-        recount_manifest(manifest)
+        seed_channel_control(manifest)
+        journal = ChannelJournal(channel_id)
+        pipeline = ChannelImportPipeline()
+        retry_at = {}
+        stop_checked, stop_requested, stop_polls = 0, False, 0
+        try:
+            while True:
+                if time.time() - stop_checked > 2:
+                    stop_checked, stop_polls = time.time(), stop_polls + 1
+                    stop_requested = channel_stop_requested(manifest, stop_polls)
+                if stop_requested:
+                    # In-flight videos give up at their next stage (a stage still running after
+                    # CHANNEL_IMPORT_STOP_GRACE_S is abandoned); whatever finished is kept.
+                    pipeline.stop()
+                    while pipeline.in_flight():
+                        for video_id, record in pipeline.results(timeout=1):
+                            manifest, _ = _record_channel_score(
+                                journal, manifest, channel_id, video_id, record, pipeline,
+                                registry, registry_revision)
+                    manifest = journal.compact(manifest)
+                    manifest.update({'status': 'stopped', 'phase': 'stopped', 'current': None, 'pipeline': None})
+                    manifest = save_manifest(manifest)
+                    log('channel %s stopped at %d/%d' % (channel_id, manifest.get('completed', 0), manifest.get('discovered', 0)))
+                    s3.delete_object(Bucket=BUCKET, Key=key)
+                    return
+                in_flight = pipeline.in_flight()
+                waiting = [video for video in (manifest.get('videos') or [])
+                           if video.get('status') != 'done'
+                           and not (video.get('status') == 'error' and int(video.get('attempts') or 0) >= 3)
+                           and video.get('id') not in in_flight]
+                if not waiting and not in_flight: break
+                candidate = next((video for video in waiting if retry_at.get(video.get('id'), 0) <= time.time()), None)
+                if candidate and len(in_flight) < pipeline.capacity and not interactive_relay_waiting():
+                    video = candidate
+                    video['status'] = 'scoring'; video['attempts'] = int(video.get('attempts') or 0) + 1; video['error'] = None
+                    if isinstance(video.get('ledgerRepair'), dict):
+                        video['ledgerRepair']['status'] = 'scoring'
+                    pipeline.submit(video)
+                    manifest = journal.append(
+                        manifest, video, status='running', phase='scoring', pipeline=pipeline.queue_depth(),
+                        current={'id': video['id'], 'title': video.get('title'), 'number': manifest.get('completed', 0) + manifest.get('failed', 0) + 1})
+                    log('channel %s %d/%d score %s (%d in flight)' % (channel_id, manifest.get('completed', 0) + 1, manifest.get('discovered', 0), video['id'], len(in_flight) + 1))
+                    continue
+                # Full, waiting on retries, or yielding to interactive relay links.
+                for video_id, record in pipeline.results(timeout=1 if in_flight else 3):
+                    manifest, delay = _record_channel_score(
+                        journal, manifest, channel_id, video_id, record, pipeline,
+                        registry, registry_revision)
+                    if delay: retry_at[video_id] = time.time() + delay
+        finally:
+            pipeline.close()
+
+        manifest = journal.compact(manifest)
         terminal_status = 'done' if manifest.get('completed', 0) >= manifest.get('discovered', 0) else 'partial'
-        manifest.update({'status': terminal_status, 'phase': terminal_status, 'current': None, 'stopRequested': False})
+        manifest.update({'status': terminal_status, 'phase': terminal_status, 'current': None, 'stopRequested': False, 'pipeline': None})
         manifest = save_manifest(manifest)
         try: s3.delete_object(Bucket=BUCKET, Key=CHANNEL_ROOT + channel_id + '/analysis.json')
         except Exception: pass